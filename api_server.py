@@ -0,0 +1,108 @@
+"""Local HTTP/WebSocket API over scan results
+
+Runs the background scan service and serves its snapshots as JSON with
+ETag-based conditional requests, plus a WebSocket channel (/ws) pushing
+signal changes after every scan. See utils/result_api.py for endpoints.
+
+Examples:
+    python api_server.py --auto-scan
+    python api_server.py --port 9000 --scanners macd-4h support-level-4h
+    curl 'http://127.0.0.1:8765/api/scanners/support-level-4h?sort=Risk_Reward_Ratio&limit=20'
+"""
+import argparse
+import sys
+from scan_cli import resolve_scanners
+from utils.scan_service import ScanService
+from utils.result_api import ResultAPI, ResultAPIServer
+from utils.signal_history import SignalHistoryStore
+from utils.alert_dispatcher import AlertDispatcher, sinks_from_env
+from utils.watchlists import WatchlistStore, WatchlistAlerts
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line arguments
+
+    Args:
+        argv: Optional argument list (defaults to sys.argv)
+
+    Returns:
+        argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Serve NSE scanner results over HTTP and WebSocket")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port (default: 8765)")
+    parser.add_argument("--scanners", nargs="+", metavar="NAME",
+                        help="Scanners to run, by name or slug (default: all)")
+    parser.add_argument("--auto-scan", action="store_true", help="Scan on a schedule")
+    parser.add_argument("--schedule", choices=ScanService.SCHEDULE_MODES, default="bar_close",
+                        help="Scan after each bar close or on a fixed interval (default: bar_close)")
+    parser.add_argument("--interval", type=int, default=ScanService.MIN_INTERVAL_MINUTES,
+                        help="Minutes between scans with --schedule interval (default: 15)")
+    parser.add_argument("--no-initial-scan", action="store_true",
+                        help="Wait for the schedule instead of scanning at startup")
+    parser.add_argument("--history-dir", default="history/signals",
+                        help="Append every scan's signals to this Parquet log (default: history/signals)")
+    parser.add_argument("--no-history", action="store_true", help="Do not record signal history")
+    parser.add_argument("--no-alerts", action="store_true",
+                        help="Do not send ALERT_* or watchlist alerts")
+    parser.add_argument("--cors-origin", metavar="ORIGIN",
+                        help="Access-Control-Allow-Origin for browser dashboards")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Command-line entry point
+
+    Args:
+        argv: Optional argument list (defaults to sys.argv)
+
+    Returns:
+        Process exit status
+    """
+    args = parse_args(argv)
+
+    try:
+        names = resolve_scanners(args.scanners)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    service = ScanService(auto_scan=args.auto_scan, schedule_mode=args.schedule,
+                          interval_minutes=args.interval, enabled=names)
+    history = None
+    if not args.no_history:
+        history = SignalHistoryStore(args.history_dir)
+        history.start()
+        service.add_listener(history.append)
+    dispatchers = []
+    sinks = [] if args.no_alerts else sinks_from_env()
+    if sinks:
+        dispatchers.append(AlertDispatcher(sinks))
+        service.add_listener(dispatchers[-1].append)
+    if not args.no_alerts:
+        # Watchlists saved from the app subscribe to their own destinations
+        dispatchers.append(AlertDispatcher([], state_path="history/watchlist_alerts_sent.json"))
+        service.add_listener(WatchlistAlerts(WatchlistStore(), dispatchers[-1]).append)
+    for dispatcher in dispatchers:
+        dispatcher.start()
+    service.start()
+    if not args.no_initial_scan:
+        service.request_scan()
+
+    server = ResultAPIServer(ResultAPI(service), host=args.host, port=args.port, cors_origin=args.cors_origin)
+    print(f"Serving scan results on http://{args.host}:{args.port}/api/scanners (WebSocket: /ws)", file=sys.stderr)
+    try:
+        server.run()
+    finally:
+        service.stop(timeout=5)
+        if history is not None:
+            history.stop(timeout=30)
+        for dispatcher in dispatchers:
+            dispatcher.stop(timeout=30)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
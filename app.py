@@ -4,19 +4,33 @@ import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 import time
-import threading
-import queue
 import os
+import uuid
 import pytz
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Import custom modules
 from scanners.macd_scanner import MACDScanner
-from scanners.macd_scanner_original import MACDScannerOriginal
-from scanners.range_breakout_scanner import RangeBreakoutScanner
-from scanners.resistance_breakout_scanner import ResistanceBreakoutScanner
-from scanners.support_level_scanner import SupportLevelScanner
+from scanners.custom_screen_scanner import CustomScreenScanner
+from scanners.confluence_scanner import ConfluenceScanner
+from scanners.scanner_registry import SCANNER_JOBS
 from utils.market_indices import MarketIndices
 from utils.data_fetcher import DataFetcher
+from utils.scan_orchestrator import ScanOrchestrator
+from utils.screen_dsl import ScreenExpression, ScreenSyntaxError
+from utils.scan_cache import DETECTION_CACHE
+from utils.cache_policy import MARKET_DATA_CACHE
+from utils.market_calendar import NSE_CALENDAR
+from utils.signal_diff import SignalDiffer
+from utils.scan_service import ScanService
+from utils.result_api import ResultAPI, ResultAPIServer
+from utils.result_export import ResultExporter, RESULT_EXPORTER
+from utils.signal_history import SignalHistoryStore
+from utils.chart_builder import CHART_BUILDER
+from utils.result_view import RESULT_VIEWS
+from utils.alert_dispatcher import AlertDispatcher, sinks_from_env
+from utils.watchlists import WatchlistStore, WatchlistAlerts
+from utils.scan_profiler import SCAN_PROFILER
 
 # Page configuration
 st.set_page_config(
@@ -26,41 +40,114 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize session state
-if 'last_scan_time' not in st.session_state:
-    st.session_state.last_scan_time = None
-if 'scan_results' not in st.session_state:
-    st.session_state.scan_results = {}
-if 'auto_scan_enabled' not in st.session_state:
-    st.session_state.auto_scan_enabled = False
-if 'scan_interval' not in st.session_state:
-    st.session_state.scan_interval = 15  # minutes - FIXED: Default to 15 minutes
-if 'active_scanners' not in st.session_state:
-    st.session_state.active_scanners = {
-        "MACD 15min": True,
-        "MACD 4h": True, 
-        "MACD 1d": True,
-        "Range Breakout 4h": True,
-        "Resistance Breakout 4h": True,
-        "Support Level 4h": True
-    }
-
 # IST timezone
 IST = pytz.timezone('Asia/Kolkata')
 
+# Rows kept per top-K heap of each snapshot (ranked slices served by the results API)
+RESULT_TOP_K = 100
+# Watchlist choice meaning the full universe
+NO_WATCHLIST = "None (full universe)"
+# Page sizes offered for scanner result tables
+PAGE_SIZES = [25, 50, 100, 250, 500]
+# Display names of the scan service schedule modes
+SCHEDULE_LABELS = {'bar_close': 'At each bar close', 'interval': 'Fixed interval'}
+
+@st.cache_resource
+def get_signal_history():
+    """Start the append-only signal history writer once per server process"""
+    history = SignalHistoryStore()
+    history.start()
+    return history
+
+@st.cache_resource
+def get_alert_dispatcher():
+    """Start alert delivery once per server process (sinks come from ALERT_* variables)"""
+    dispatcher = AlertDispatcher(sinks_from_env())
+    dispatcher.start()
+    return dispatcher
+
+@st.cache_resource
+def get_watchlists():
+    """Load every user's watchlists once per server process"""
+    return WatchlistStore()
+
+@st.cache_resource
+def get_watchlist_alerts():
+    """Route new signals to watchlist alert subscriptions on their own dispatcher"""
+    dispatcher = AlertDispatcher([], state_path="history/watchlist_alerts_sent.json")
+    dispatcher.start()
+    return WatchlistAlerts(get_watchlists(), dispatcher)
+
+@st.cache_resource
+def get_scan_service():
+    """Start the background scan service once per server process"""
+    service = ScanService(top_k=RESULT_TOP_K)
+    service.add_listener(get_signal_history().append)
+    service.add_listener(get_alert_dispatcher().append)
+    service.add_listener(get_watchlist_alerts().append)
+    service.start()
+    return service
+
+@st.cache_resource
+def get_api_server():
+    """Serve scan results over HTTP/WebSocket when SCANNER_API_PORT is set"""
+    port = os.environ.get("SCANNER_API_PORT")
+    if not port:
+        return None
+    server = ResultAPIServer(ResultAPI(get_scan_service()), port=int(port))
+    server.start_in_thread()
+    return server
+
+@st.cache_resource
+def get_market_indices():
+    """Market indices client shared by every session (quotes are cached inside)"""
+    return MarketIndices()
+
+@st.cache_resource
+def get_custom_screen_scanner():
+    """Custom screen scanner shared by every session"""
+    return CustomScreenScanner()
+
+def init_session_state():
+    """Start the shared services and initialize session state
+
+    Called from main() rather than at import, since sharded detection
+    workers import this script (as __mp_main__) and must not start a scan
+    service of their own.
+    """
+    get_api_server()
+    
+    # View preferences only; results live in the scan service
+    if 'active_scanners' not in st.session_state:
+        enabled = get_scan_service().get_config()['enabled']
+        st.session_state.active_scanners = {name: name in enabled for name in SCANNER_JOBS}
+    if 'auto_scan_enabled' not in st.session_state:
+        st.session_state.auto_scan_enabled = get_scan_service().get_config()['auto_scan']
+    if 'screen_panels' not in st.session_state:
+        st.session_state.screen_panels = {}  # (timeframe, lookback days, max bars) -> BarPanel
+    if 'snapshot_version' not in st.session_state:
+        st.session_state.snapshot_version = 0  # scan snapshot shown by the last render
+
+def get_session_id():
+    """Id of this browser session, used for its scan service subscription"""
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        return ctx.session_id
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
+    return st.session_state.session_id
+
 def get_ist_time():
     """Get current time in IST"""
     return datetime.now(IST)
 
 def check_market_hours_ist():
-    """Check if NSE market is open in IST"""
-    now = get_ist_time()
-    market_open = now.replace(hour=9, minute=15, second=0, microsecond=0)
-    market_close = now.replace(hour=15, minute=30, second=0, microsecond=0)
-    is_weekday = now.weekday() < 5  # Monday = 0, Friday = 4
-    return is_weekday and market_open <= now <= market_close
+    """Check if NSE market is open in IST (weekends and exchange holidays are closed)"""
+    return NSE_CALENDAR.is_session_open(get_ist_time())
 
 def main():
+    init_session_state()
+    
     # Fresh modern UI header
     st.markdown("""
     <div style="background: linear-gradient(90deg, #1e3c72 0%, #2a5298 100%); padding: 2rem; border-radius: 10px; margin-bottom: 2rem;">
@@ -79,29 +166,36 @@ def main():
         market_status="🟢 OPEN" if check_market_hours_ist() else "🔴 CLOSED"
     ), unsafe_allow_html=True)
     
+    # Scans run in the background service; this render shows its latest snapshot
+    service = get_scan_service()
+    config = service.get_config()
+    snapshot = service.snapshot()
+    st.session_state.snapshot_version = snapshot.version
+    
     # Sidebar configuration
     with st.sidebar:
         st.markdown("### ⚙️ Scanner Configuration")
         
         # Auto-scan settings
         st.markdown("#### 🔄 Auto-Scan Settings")
-        auto_scan = st.checkbox("Enable Auto-Scan (15min intervals)", value=st.session_state.auto_scan_enabled)
+        auto_scan = st.checkbox("Enable Auto-Scan", key="auto_scan_enabled")
         
         # FIXED: Force scan interval to 15 minutes as per requirements
+        interval_options = [15, 30, 60]  # Removed 5 and 10 minute options
         scan_interval = st.selectbox(
             "Scan Interval (minutes)",
-            [15, 30, 60],  # Removed 5 and 10 minute options
-            index=0,  # Default to 15 minutes
+            interval_options,
+            index=interval_options.index(config['interval_minutes']) if config['interval_minutes'] in interval_options else 0,
+            disabled=config['schedule_mode'] != 'interval',
             key="scan_interval_select"
         )
         
-        if auto_scan != st.session_state.auto_scan_enabled:
-            st.session_state.auto_scan_enabled = auto_scan
-            st.session_state.scan_interval = scan_interval
-        
-        # Manual scan button
+        # Manual scan button: queued on the service, never run twice at once
         if st.button("🔍 Run Manual Scan", type="primary", use_container_width=True):
-            run_all_scanners()
+            if service.request_scan():
+                st.toast("🔍 Scan started in the background")
+            else:
+                st.toast("⏳ A scan is already running")
         
         # Scanner selection - PRESERVE EXISTING MACD LOGIC
         st.markdown("#### 📊 Active Scanners")
@@ -118,10 +212,27 @@ def main():
         st.session_state.active_scanners["Resistance Breakout 4h"] = st.checkbox("Resistance Breakout (4h)", value=st.session_state.active_scanners["Resistance Breakout 4h"])
         st.session_state.active_scanners["Support Level 4h"] = st.checkbox("Support Level (4h)", value=st.session_state.active_scanners["Support Level 4h"])
         
+        # Scans are shared: this session subscribes to the scanners it views
+        service.subscribe(
+            get_session_id(),
+            scanners=[name for name, active in st.session_state.active_scanners.items() if active],
+            auto_scan=auto_scan,
+            interval_minutes=scan_interval
+        )
+        
+        display_execution_settings(service, config)
+        
+        display_watchlist_settings(snapshot)
+        
         # Export options
         st.markdown("#### 📊 Export Options")
+        export_format = st.selectbox(
+            "Export Format",
+            ResultExporter.available_formats(),
+            format_func=lambda fmt: {'zip': 'Zipped CSV', 'parquet': 'Parquet', 'arrow': 'Arrow IPC'}[fmt]
+        )
         if st.button("📥 Export Results", use_container_width=True):
-            export_results()
+            export_results(snapshot, export_format)
     
     # Main content area
     col1, col2 = st.columns([3, 1])
@@ -130,23 +241,145 @@ def main():
         # Market indices display
         display_market_indices()
         
+        # Signals of the selected watchlist, filtered from the shared scan
+        display_watchlist_signals(snapshot)
+        
         # Scanner results tabs
-        display_scanner_results()
+        display_scanner_results(snapshot)
     
     with col2:
         # Status and info panel
-        display_status_panel()
+        display_status_panel(snapshot)
+
+def display_execution_settings(service, config):
+    """Display the server-wide schedule and worker settings, changed only on Apply"""
+    st.markdown("#### 🚀 Execution")
+    st.caption(
+        f"Schedule: {SCHEDULE_LABELS[config['schedule_mode']]} · Pool: {config['executor']} · "
+        f"Workers: {config['max_workers']} · Job timeout: {config['job_timeout']}s"
+    )
+    
+    # Unkeyed widgets start from the current shared values on every render, so
+    # another session's change shows here; nothing is sent until Apply
+    with st.expander("Change execution settings"):
+        with st.form("execution_settings"):
+            # Bar-close scheduling runs each scanner right after its own bar completes
+            schedule_mode = st.selectbox(
+                "Schedule",
+                ScanService.SCHEDULE_MODES,
+                index=ScanService.SCHEDULE_MODES.index(config['schedule_mode']),
+                format_func=SCHEDULE_LABELS.get
+            )
+            scan_executor = st.selectbox(
+                "Worker Pool",
+                ScanOrchestrator.EXECUTORS,
+                index=ScanOrchestrator.EXECUTORS.index(config['executor'])
+            )
+            scan_workers = st.number_input("Workers", min_value=1, max_value=32, value=config['max_workers'])
+            scan_job_timeout = st.number_input(
+                "Job Timeout (seconds)",
+                min_value=30,
+                max_value=3600,
+                value=config['job_timeout'],
+                step=30
+            )
+            st.caption("Execution settings are shared by every session and apply from the next cycle")
+            applied = st.form_submit_button("Apply to all sessions", use_container_width=True)
+    
+    if applied:
+        changed = service.configure(
+            schedule_mode=schedule_mode,
+            executor=scan_executor,
+            max_workers=int(scan_workers),
+            job_timeout=int(scan_job_timeout)
+        )
+        if changed:
+            st.toast("⚙️ Execution settings updated for every session")
+            st.rerun()
+
+def get_active_watchlist():
+    """Watchlist selected in this session, or None for the full universe"""
+    user = st.session_state.get("watchlist_user", "").strip()
+    name = st.session_state.get("active_watchlist")
+    if not user or not name or name == NO_WATCHLIST:
+        return None
+    return get_watchlists().get(user, name)
+
+def display_watchlist_settings(snapshot):
+    """Select, create and delete this user's watchlists"""
+    st.markdown("#### ⭐ Watchlists")
+    store = get_watchlists()
+    user = st.text_input("User Name", key="watchlist_user").strip()
+    if not user:
+        st.caption("Enter a user name to use watchlists")
+        return
+    
+    counts = store.signal_counts(snapshot, user)
+    st.selectbox(
+        "Active Watchlist",
+        [NO_WATCHLIST] + list(counts),
+        format_func=lambda name: name if name == NO_WATCHLIST else f"{name} ({counts[name]} signals)",
+        key="active_watchlist"
+    )
+    
+    active = get_active_watchlist()
+    with st.expander("✏️ Create / Edit Watchlist", expanded=False):
+        universe = [symbol.replace('.NS', '') for symbol in DataFetcher().get_nse_stock_list()]
+        current = [symbol.replace('.NS', '') for symbol in active.symbols] if active else []
+        # Widgets are keyed per watchlist so switching lists reloads the form
+        form_key = active.name if active else NO_WATCHLIST
+        name = st.text_input("Name", value=active.name if active else "", key=f"watchlist_name_{form_key}")
+        symbols = st.multiselect("Symbols", sorted(set(universe + current)), default=current, key=f"watchlist_symbols_{form_key}")
+        scanners = st.multiselect("Scanners (empty for all)", list(SCANNER_JOBS),
+                                  default=active.scanners if active else [], key=f"watchlist_scanners_{form_key}")
+        channels = [None, 'webhook', 'telegram']
+        channel = st.selectbox(
+            "Alerts",
+            channels,
+            index=channels.index(active.alert_channel) if active else 0,
+            format_func=lambda channel: {None: 'Off', 'webhook': 'Webhook', 'telegram': 'Telegram chat'}[channel],
+            key=f"watchlist_channel_{form_key}"
+        )
+        target = st.text_input(
+            "Webhook URL or Telegram chat id",
+            value=(active.alert_target or "") if active else "",
+            disabled=channel is None,
+            key=f"watchlist_target_{form_key}"
+        )
+        
+        col1, col2 = st.columns(2)
+        if col1.button("💾 Save", use_container_width=True):
+            try:
+                store.save(user, name, symbols, scanners, channel, target.strip() or None)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                # Rerun so the watchlist selector lists the saved watchlist
+                st.rerun()
+        if active is not None and col2.button("🗑️ Delete", use_container_width=True):
+            store.delete(user, active.name)
+            st.rerun()
+
+def display_watchlist_signals(snapshot):
+    """Display every scanner's signals on the active watchlist"""
+    watchlist = get_active_watchlist()
+    if watchlist is None:
+        return
     
-    # Auto-scan logic - FIXED: Use 15-minute intervals
-    if st.session_state.auto_scan_enabled:
-        handle_auto_scan()
+    signals = get_watchlists().signals(snapshot, watchlist)
+    st.markdown(f"### ⭐ {watchlist.name}: {len(signals)} signals on {len(watchlist.symbols)} symbols")
+    if not signals.empty:
+        st.dataframe(signals.drop(columns=['Direction']), use_container_width=True, hide_index=True)
+    st.caption("Scanner tabs below are filtered to this watchlist")
 
 def display_market_indices():
     """Display real-time market indices with fresh UI"""
     st.markdown("### 📊 Live Market Indices")
     
     try:
-        market_indices = MarketIndices()
+        # One cached batch download feeds quotes, sentiment and sectors,
+        # so reruns make no network calls
+        market_indices = get_market_indices()
         indices_data = market_indices.get_live_indices()
         
         if not indices_data.empty:
@@ -166,36 +399,230 @@ def display_market_indices():
                         value=f"₹{price:,.2f}",
                         delta=f"{change:+.2f} ({change_pct:+.2f}%)"
                     )
+            
+            sentiment = market_indices.get_market_sentiment()
+            if sentiment:
+                st.caption(f"**Market Sentiment:** {sentiment['sentiment']} "
+                           f"({sentiment['avg_change']:+.2f}% avg, "
+                           f"{sentiment['positive_indices']}/{sentiment['total_indices']} major indices up)")
+            
+            sectors = market_indices.get_sector_performance()
+            if not sectors.empty:
+                with st.expander("🏭 Sector Performance"):
+                    st.dataframe(
+                        sectors.sort_values('Change_1D%', ascending=False),
+                        use_container_width=True,
+                        hide_index=True,
+                        column_config={
+                            'Price': st.column_config.NumberColumn(format="%.2f"),
+                            'Change_1D%': st.column_config.NumberColumn("1D %", format="%+.2f"),
+                            'Change_5D%': st.column_config.NumberColumn("5D %", format="%+.2f")
+                        }
+                    )
         else:
             st.warning("📊 Market indices data temporarily unavailable")
     except Exception as e:
         st.error(f"⚠️ Error fetching market indices: {str(e)}")
 
-def display_scanner_results():
+def display_scanner_results(snapshot):
     """Display results from all active scanners with fresh UI"""
     st.markdown("### 🎯 Technical Scanner Results")
     
     # Get active scanners from session state
     active_scanners = [name for name, active in st.session_state.active_scanners.items() if active]
     
-    if active_scanners:
-        tabs = st.tabs(active_scanners)
-        
-        for i, scanner_name in enumerate(active_scanners):
-            with tabs[i]:
-                display_individual_scanner_results(scanner_name)
-    else:
+    tabs = st.tabs(active_scanners + ["Confluence", "Custom Screen"])
+    
+    for i, scanner_name in enumerate(active_scanners):
+        with tabs[i]:
+            display_individual_scanner_results(scanner_name, snapshot)
+    
+    with tabs[-2]:
+        display_confluence(snapshot)
+    
+    with tabs[-1]:
+        display_custom_screen()
+    
+    if not active_scanners:
         st.info("💡 No scanners selected. Please enable scanners from the sidebar.")
 
-def display_individual_scanner_results(scanner_name):
+def display_confluence(snapshot):
+    """Display symbols with aligned signals across scanners and timeframes"""
+    table = snapshot.signal_table
+    
+    if len(table) == 0:
+        st.info("No signals available for confluence. Run a scan to see results.")
+        return
+    
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        min_signals = st.number_input(
+            "Min Aligned Signals",
+            min_value=1,
+            max_value=max(len(table.scanners), 1),
+            value=min(2, max(len(table.scanners), 1)),
+            key="confluence_min_signals"
+        )
+    
+    with col2:
+        direction = st.selectbox("Direction", ["Both", "Bullish", "Bearish"], key="confluence_direction")
+    
+    direction = {"Both": None, "Bullish": 1, "Bearish": -1}[direction]
+    results = ConfluenceScanner().score(table, min_signals=min_signals, direction=direction)
+    
+    if results.empty:
+        st.info("No symbols with aligned signals")
+    else:
+        st.dataframe(results, use_container_width=True, hide_index=True)
+        st.write(f"**Symbols with confluence:** {len(results)} "
+                 f"(from {len(table)} signals across {len(table.scanners)} scanners)")
+
+def display_custom_screen():
+    """Display the custom screen builder and its results"""
+    expression = st.text_input(
+        "Screen Expression",
+        value=CustomScreenScanner.EXAMPLE_SCREEN,
+        key="custom_screen_expression",
+        help="Fields: open, high, low, close, volume. Indicators: sma(n), ema(n), vol_sma(n), "
+             "rsi(n), atr(n), macd, signal, histogram, highest(n), lowest(n), std(n), roc(n), "
+             "prev(x, n), abs(x), crosses_above(a, b), crosses_below(a, b). Combine with and/or/not."
+    )
+    
+    col1, col2, col3 = st.columns([1, 1, 1])
+    
+    with col1:
+        timeframe = st.selectbox("Timeframe", ["1d", "4h", "1h", "15m"], key="custom_screen_timeframe")
+    
+    with col2:
+        refresh = st.checkbox("Refresh bar data", value=False, key="custom_screen_refresh")
+    
+    with col3:
+        run_screen = st.button("▶️ Run Screen", use_container_width=True, key="custom_screen_run")
+    
+    if not run_screen:
+        return
+    
+    scanner = get_custom_screen_scanner()
+    
+    try:
+        compiled = ScreenExpression(expression)
+        lookback_days, max_bars = scanner.panel_size(compiled, timeframe)
+    except ScreenSyntaxError as e:
+        st.error(f"❌ Invalid screen: {str(e)}")
+        return
+    
+    # Bars are fetched once per timeframe and history length, and reused by every screen
+    panel_key = (timeframe, lookback_days, max_bars)
+    if refresh or panel_key not in st.session_state.screen_panels:
+        with st.spinner(f"📥 Loading {timeframe} bars for the universe..."):
+            st.session_state.screen_panels[panel_key] = scanner.load_panel(timeframe, lookback_days, max_bars)
+    
+    panel = st.session_state.screen_panels[panel_key]
+    results, elapsed_ms = scanner.screen(compiled, panel, timeframe)
+    
+    st.caption(f"Evaluated over {len(panel)} symbols x {panel.n_bars} bars in {elapsed_ms} ms")
+    
+    if results.empty:
+        st.info("No symbols match this screen")
+    else:
+        st.dataframe(results, use_container_width=True, hide_index=True)
+        st.write(f"**Matches:** {len(results)}")
+
+def format_progress(job):
+    """Progress bar label for one scanner job"""
+    if job['status'] == 'queued':
+        return "queued"
+    if job['status'] == 'error':
+        return "failed"
+    if job['status'] == 'done':
+        return f"done in {job['elapsed']:.0f}s · {job['signals']} signals"
+    
+    total = job['total'] if job['total'] is not None else "?"
+    eta = f"ETA {job['eta']:.0f}s" if job['eta'] is not None else "ETA --"
+    return f"{job['done']}/{total} symbols · {job['signals']} signals · {eta}"
+
+def progress_fraction(job):
+    """Completed fraction of one scanner job"""
+    if job['status'] in ('done', 'error'):
+        return 1.0
+    return job['done'] / job['total'] if job['total'] else 0.0
+
+@st.fragment(run_every=2)
+def display_live_results(scanner_name):
+    """Stream the rows a running scan has found so far for one scanner"""
+    service = get_scan_service()
+    if not service.status()['running']:
+        return
+    
+    job = service.progress().get(scanner_name)
+    if job is None or job['status'] not in ('queued', 'running'):
+        return
+    
+    st.progress(progress_fraction(job), text=f"🔄 Scanning: {format_progress(job)}")
+    live = service.live_results(scanner_name, n=20)
+    if not live.empty:
+        st.caption(f"Signals so far ({job['signals']}, first 20 shown)")
+        st.dataframe(live, use_container_width=True, hide_index=True)
+
+def display_individual_scanner_results(scanner_name, snapshot):
     """Display results for a specific scanner"""
-    if scanner_name in st.session_state.scan_results:
-        results = st.session_state.scan_results[scanner_name]
+    display_live_results(scanner_name)
+    
+    if scanner_name in snapshot.results:
+        results = snapshot.results[scanner_name]
         
         if isinstance(results, pd.DataFrame) and not results.empty:
-            # Add sorting and filtering options
+            # Filters and sorts run on indexes built once per snapshot
+            view = RESULT_VIEWS.get(snapshot, scanner_name)
+            watchlist = get_active_watchlist()
+            facets = view.facets()
+            
             col1, col2, col3 = st.columns([1, 1, 1])
             
+            with col1:
+                signals = st.multiselect(
+                    "Signal",
+                    options=list(facets['signals']),
+                    format_func=lambda label: f"{label} ({facets['signals'][label]})",
+                    key=f"signals_{scanner_name}"
+                )
+            
+            with col2:
+                sectors = st.multiselect(
+                    "Sector",
+                    options=list(facets['sectors']),
+                    format_func=lambda label: f"{label} ({facets['sectors'][label]})",
+                    key=f"sectors_{scanner_name}"
+                )
+            
+            with col3:
+                search = st.text_input("Symbol contains", key=f"search_{scanner_name}")
+            
+            ranges = {}
+            range_columns = [column for column, (low, high) in facets['ranges'].items() if low < high]
+            col1, col2 = st.columns([1, 2])
+            
+            with col1:
+                range_column = st.selectbox(
+                    "Filter by value",
+                    options=["None"] + range_columns,
+                    key=f"range_column_{scanner_name}"
+                )
+            
+            with col2:
+                if range_column != "None":
+                    low, high = facets['ranges'][range_column]
+                    ranges[range_column] = st.slider(
+                        range_column,
+                        min_value=low,
+                        max_value=high,
+                        value=(low, high),
+                        key=f"range_{scanner_name}_{range_column}"
+                    )
+            
+            col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+            
             with col1:
                 sort_by = st.selectbox(
                     "Sort by",
@@ -211,68 +638,158 @@ def display_individual_scanner_results(scanner_name):
                 )
             
             with col3:
-                max_results = st.number_input(
-                    "Max Results",
-                    min_value=10,
-                    max_value=100,
-                    value=50,
-                    key=f"max_{scanner_name}"
+                page_size = st.selectbox(
+                    "Rows per page",
+                    options=PAGE_SIZES,
+                    index=1,
+                    key=f"page_size_{scanner_name}"
                 )
             
-            # Sort and limit results
-            ascending = sort_order == "Ascending"
-            sorted_results = results.sort_values(by=sort_by, ascending=ascending).head(max_results)
+            with col4:
+                page_number = st.number_input(
+                    "Page",
+                    min_value=1,
+                    value=1,
+                    key=f"page_{scanner_name}"
+                )
             
-            # Display results table
-            st.dataframe(
+            page = view.page(
+                sort=sort_by,
+                ascending=sort_order == "Ascending",
+                page=page_number,
+                page_size=page_size,
+                signals=signals,
+                sectors=sectors,
+                ranges=ranges,
+                search=search,
+                symbols=watchlist.symbols if watchlist is not None else None
+            )
+            sorted_results = page.rows
+            
+            # Display results table (select a row to chart it)
+            selection = st.dataframe(
                 sorted_results,
                 use_container_width=True,
-                hide_index=True
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                key=f"table_{scanner_name}"
             )
             
             # Display summary stats
             st.write(f"**Total signals found:** {len(results)}")
-            st.write(f"**Showing top:** {len(sorted_results)} results")
+            if page.total:
+                st.write(f"**Showing:** {page.offset + 1}-{page.offset + len(sorted_results)} of "
+                         f"{page.total} matching results (page {page.page} of {page.pages})")
+            else:
+                st.write("**Showing:** no results match the filters")
+            
+            selected_rows = selection.selection.rows if selection is not None else []
+            if selected_rows:
+                display_signal_chart(scanner_name, sorted_results.iloc[selected_rows[0]].to_dict())
+            else:
+                st.caption("Select a row to chart the symbol")
+            
+            display_prefilter_report(results)
             
         else:
             st.info(f"No signals found for {scanner_name}")
+            if isinstance(results, pd.DataFrame):
+                display_prefilter_report(results)
     else:
         st.info(f"No data available for {scanner_name}. Run a scan to see results.")
 
-def display_status_panel():
+def display_signal_chart(scanner_name, row):
+    """Display candles, signal levels and MACD for a selected result row"""
+    if scanner_name not in SCANNER_JOBS:
+        return
+    
+    figure = CHART_BUILDER.figure(scanner_name, row)
+    if figure is None:
+        st.warning(f"No chart data available for {row.get('Symbol', row.get('symbol'))}")
+        return
+    st.plotly_chart(figure, use_container_width=True, key=f"chart_{scanner_name}")
+
+def display_prefilter_report(results):
+    """Display per-stage prefilter counts attached to scanner results"""
+    report = results.attrs.get('prefilter')
+    if not report:
+        return
+    
+    analyzed = report[-1]['Passed']
+    fetched = report[0]['Passed']
+    with st.expander(f"🧹 Prefilter: {analyzed} of {fetched} symbols analyzed"):
+        st.dataframe(pd.DataFrame(report), use_container_width=True, hide_index=True)
+
+@st.fragment(run_every=2)
+def watch_scan_service():
+    """Show background scan progress and rerun the page when a new snapshot is published"""
+    service = get_scan_service()
+    service.touch(get_session_id())
+    status = service.status()
+    
+    if status['running']:
+        st.info(f"🔄 Scan in progress ({int(status['running_for'])}s)")
+        for name, job in service.progress().items():
+            st.progress(progress_fraction(job), text=f"{name}: {format_progress(job)}")
+    elif status['scan_requested']:
+        st.info("⏳ Scan queued")
+    
+    if status['last_error']:
+        st.error(f"❌ Last scan failed: {status['last_error']}")
+    
+    if status['version'] != st.session_state.snapshot_version:
+        st.rerun()
+
+def display_status_panel(snapshot):
     """Display status and information panel with IST times"""
     st.markdown("### 📋 Control Panel")
     
     current_time = get_ist_time()
+    service = get_scan_service()
     
     # Last scan information
     st.markdown("#### ⏱️ Scan Status")
-    if st.session_state.last_scan_time:
-        st.write(f"**Last Scan:** {st.session_state.last_scan_time.strftime('%H:%M:%S IST')}")
-        time_since = current_time - st.session_state.last_scan_time
+    watch_scan_service()
+    
+    if snapshot.scan_time:
+        st.write(f"**Last Scan:** {snapshot.scan_time.strftime('%H:%M:%S IST')} ({snapshot.duration}s)")
+        time_since = current_time - snapshot.scan_time
         minutes_ago = int(time_since.total_seconds() / 60)
         st.write(f"**Time Since:** {minutes_ago} minutes ago")
     else:
         st.write("**Last Scan:** Never")
     
-    # Auto-scan status
-    if st.session_state.auto_scan_enabled:
+    for name, error in snapshot.errors.items():
+        st.warning(f"⚠️ {name}: {error}")
+    
+    # Auto-scan status (one schedule shared by every subscribed session)
+    schedule = service.schedule()
+    st.caption(f"👥 {service.subscriber_count()} session(s) share this scan engine")
+    if schedule['auto_scan']:
         st.success("✅ Auto-scan ENABLED")
-        st.write(f"**Interval:** {st.session_state.scan_interval} minutes")
+        if schedule['mode'] == 'bar_close':
+            st.write("**Schedule:** After each scanner's bar closes")
+        else:
+            st.write(f"**Interval:** {schedule['interval_minutes']} minutes")
+        if not st.session_state.auto_scan_enabled:
+            st.caption("Scheduled by another session")
         
-        # Next scan countdown
-        if st.session_state.last_scan_time:
-            # FIXED: Use minimum 15-minute intervals
-            actual_interval = max(st.session_state.scan_interval, 15)
-            next_scan = st.session_state.last_scan_time + timedelta(minutes=actual_interval)
+        # Next scan countdown (only trading sessions have bar closes)
+        upcoming = service.upcoming_scans(current_time)
+        if upcoming:
+            next_scan = min(upcoming.values())
             time_to_next = next_scan - current_time
             
-            if time_to_next.total_seconds() > 0:
+            if time_to_next.total_seconds() > 3600:
+                st.write(f"**Next Scan:** {next_scan.strftime('%a %d %b %H:%M:%S IST')}")
+            elif time_to_next.total_seconds() > 0:
                 minutes_left = int(time_to_next.total_seconds() / 60)
                 seconds_left = int(time_to_next.total_seconds() % 60)
                 st.write(f"**Next Scan:** {minutes_left}m {seconds_left}s")
             else:
                 st.write("**Next Scan:** ⏰ Due now")
+            st.caption(", ".join(name for name, due in upcoming.items() if due == next_scan))
     else:
         st.info("⏸️ Auto-scan DISABLED")
     
@@ -283,92 +800,132 @@ def display_status_panel():
         st.write(f"**Current Time:** {current_time.strftime('%H:%M:%S IST')}")
     else:
         st.error("🔴 MARKET CLOSED")
+        holiday = NSE_CALENDAR.holiday_name(current_time)
+        if holiday:
+            st.write(f"**Holiday:** {holiday}")
         st.write(f"**Current Time:** {current_time.strftime('%H:%M:%S IST')}")
         st.write("**Market Hours:** 09:15 - 15:30 IST")
+        st.write(f"**Next Open:** {NSE_CALENDAR.next_session_open(current_time).strftime('%a %d %b %H:%M IST')}")
     
     # Scanner statistics
     st.markdown("#### 📈 Live Statistics")
     total_signals = sum(len(results) if isinstance(results, pd.DataFrame) else 0 
-                       for results in st.session_state.scan_results.values())
+                       for results in snapshot.results.values())
     st.metric("🎯 Total Active Signals", total_signals)
     
     # Active scanners count
     active_count = sum(1 for active in st.session_state.active_scanners.values() if active)
     st.metric("🔧 Active Scanners", f"{active_count}/6")
+    
+    # Incremental scanning: symbols with unchanged bars are served from cache
+    cache_stats = DETECTION_CACHE.stats()
+    st.metric("♻️ Detection Cache Hit Rate", f"{cache_stats['hit_rate']}%")
+    st.caption(f"{cache_stats['entries']} cached symbol results, "
+               f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
+    
+    # Downloads skipped because the bars are still within their current bar
+    data_stats = MARKET_DATA_CACHE.stats()
+    st.metric("📦 Market Data Cache Hit Rate", f"{data_stats['hit_rate']}%")
+    st.caption(f"{data_stats['entries']} cached downloads, "
+               f"{data_stats['hits']} hits / {data_stats['misses']} misses")
+    
+    # Append-only signal log written after every cycle
+    history_stats = get_signal_history().stats()
+    if history_stats['enabled']:
+        st.caption(f"🗄️ Signal history: {history_stats['rows_written']:,} rows logged this session, "
+                   f"{history_stats['pending']} scans pending")
+    
+    # Notifications delivered in the background
+    alert_stats = get_alert_dispatcher().stats()
+    for name, counters in alert_stats['sinks'].items():
+        st.caption(f"📣 {name.title()} alerts: {counters['sent']} sent in {counters['batches']} messages, "
+                   f"{counters['pending']} pending, {counters['failed']} failed")
+    
+    # Signal changes since the previous scan
+    st.markdown("#### 🔔 Signal Changes")
+    changes = SignalDiffer.summarize(snapshot.events)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🆕 New", changes[SignalDiffer.INSERT])
+    col2.metric("✏️ Updated", changes[SignalDiffer.UPDATE])
+    col3.metric("⌛ Expired", changes[SignalDiffer.EXPIRE])
+    
+    if snapshot.events:
+        with st.expander("View changes"):
+            st.dataframe(
+                SignalDiffer.events_frame(snapshot.events),
+                use_container_width=True,
+                hide_index=True
+            )
+    
+    display_performance_panel(snapshot)
 
-def run_all_scanners():
-    """Run all enabled scanners - PRESERVE EXISTING MACD LOGIC"""
-    with st.spinner("🔄 Running active scanners..."):
-        try:
-            # Initialize scanners - UPDATED: Use original MACD logic
-            macd_scanner_original = MACDScannerOriginal()
-            range_scanner = RangeBreakoutScanner()
-            resistance_scanner = ResistanceBreakoutScanner()
-            support_scanner = SupportLevelScanner()
-            
-            # PRESERVE EXISTING MACD LOGIC - Run all MACD timeframes if enabled
-            if st.session_state.active_scanners["MACD 15min"]:
-                st.session_state.scan_results["MACD 15min"] = macd_scanner_original.scan(timeframe="15m")
-            
-            if st.session_state.active_scanners["MACD 4h"]:
-                st.session_state.scan_results["MACD 4h"] = macd_scanner_original.scan(timeframe="4h")
-            
-            if st.session_state.active_scanners["MACD 1d"]:
-                st.session_state.scan_results["MACD 1d"] = macd_scanner_original.scan(timeframe="1d")
-            
-            # NEW SCANNERS - Run 4-hour intervals as specified
-            if st.session_state.active_scanners["Range Breakout 4h"]:
-                st.session_state.scan_results["Range Breakout 4h"] = range_scanner.scan(timeframe="4h")
-            
-            if st.session_state.active_scanners["Resistance Breakout 4h"]:
-                st.session_state.scan_results["Resistance Breakout 4h"] = resistance_scanner.scan(timeframe="4h")
-            
-            if st.session_state.active_scanners["Support Level 4h"]:
-                st.session_state.scan_results["Support Level 4h"] = support_scanner.scan(timeframe="4h")
-            
-            # Update scan time in IST
-            st.session_state.last_scan_time = get_ist_time()
-            st.success("✅ All active scanners completed successfully!")
-            
-        except Exception as e:
-            st.error(f"❌ Error running scanners: {str(e)}")
-
-def handle_auto_scan():
-    """Handle automatic scanning based on 15-minute intervals in IST"""
-    current_time = get_ist_time()
+def display_performance_panel(snapshot):
+    """Display where the last scan cycle spent its time"""
+    st.markdown("#### ⚡ Performance")
+    profile = getattr(snapshot, 'profile', None)
     
-    if st.session_state.last_scan_time is None:
-        # Run initial scan
-        run_all_scanners()
+    stages = profile.stage_frame() if profile is not None and profile.jobs else None
+    if stages is None or stages.empty:
+        st.caption("Stage timings appear after the next scan (the process executor does not record them)")
     else:
-        # FIXED: Check if it's time for next scan (ensure 15-minute minimum)
-        time_since_last = current_time - st.session_state.last_scan_time
-        scan_interval_seconds = max(st.session_state.scan_interval, 15) * 60  # Minimum 15 minutes
+        busiest = stages.loc[stages['Wall s'].idxmax()]
+        st.write(f"**Slowest Stage:** {busiest['Stage']} ({busiest['Wall s']:.2f}s, {busiest['Share %']}% of scanner time)")
         
-        if time_since_last.total_seconds() >= scan_interval_seconds:
-            run_all_scanners()
-            st.rerun()
+        with st.expander("Stages"):
+            st.dataframe(stages, use_container_width=True, hide_index=True)
+            st.caption("Wall seconds per scanner and stage (stages nested in another count once, in the inner stage)")
+            st.dataframe(profile.job_frame(), use_container_width=True, hide_index=True)
+        
+        with st.expander("Slowest symbols"):
+            st.dataframe(profile.slowest_symbols(10), use_container_width=True, hide_index=True)
+        
+        if profile.dropped:
+            st.caption(f"Trace holds the first {profile.max_events:,} spans ({profile.dropped:,} more not traced)")
+        if st.button("📥 Export Trace", use_container_width=True, key="export_trace"):
+            st.download_button(
+                label=f"Download Chrome trace ({len(profile.trace_json()) / 1024:,.0f} KB)",
+                data=profile.trace_json(),
+                file_name=f"scan_trace_{snapshot.scan_time.strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+            st.caption("Open in chrome://tracing or ui.perfetto.dev")
+        
+        if profile.cprofile_text:
+            with st.expander("cProfile"):
+                st.code(profile.cprofile_text, language=None)
+                st.download_button(
+                    label="Download .prof",
+                    data=profile.cprofile_data,
+                    file_name=f"scan_{snapshot.scan_time.strftime('%Y%m%d_%H%M%S')}.prof",
+                    mime="application/octet-stream",
+                    use_container_width=True
+                )
+    
+    # cProfile slows a cycle down, so it only runs when asked for
+    if SCAN_PROFILER.capture_pending:
+        st.caption("🔬 The next scan will run under cProfile")
+    elif st.button("🔬 Profile Next Scan", use_container_width=True, key="profile_next_scan"):
+        SCAN_PROFILER.capture_next()
+        st.rerun()
 
-def export_results():
-    """Export scan results to CSV"""
+def export_results(snapshot, fmt):
+    """Serialize scan results in memory and offer them for download"""
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if snapshot.version == 0:
+            st.info("No scan results to export yet")
+            return
         
-        for scanner_name, results in st.session_state.scan_results.items():
-            if isinstance(results, pd.DataFrame) and not results.empty:
-                filename = f"{scanner_name.replace(' ', '_')}_{timestamp}.csv"
-                results.to_csv(filename, index=False)
-                
-                # Provide download link
-                with open(filename, 'rb') as f:
-                    st.download_button(
-                        label=f"Download {scanner_name} Results",
-                        data=f.read(),
-                        file_name=filename,
-                        mime='text/csv'
-                    )
+        data = RESULT_EXPORTER.export(snapshot, fmt)
+        st.download_button(
+            label=f"Download {fmt.upper()} ({len(data) / 1024:,.0f} KB)",
+            data=data,
+            file_name=ResultExporter.file_name(fmt, snapshot.scan_time),
+            mime=ResultExporter.mime_type(fmt),
+            use_container_width=True
+        )
         
-        st.success("✅ Export completed!")
+        st.success("✅ Export ready!")
         
     except Exception as e:
         st.error(f"❌ Export failed: {str(e)}")
@@ -18,6 +18,8 @@ import os
 import requests
 from datetime import datetime
 from zoneinfo import ZoneInfo
+from utils.signal_diff import SignalDiffer
+from utils.alert_dispatcher import AlertDispatcher, sinks_from_env
 from datetime import timedelta
 import os
 import requests
@@ -129,8 +131,11 @@ if 'crossover_data_1d' not in st.session_state:
 if 'auto_refresh' not in st.session_state:
     st.session_state.auto_refresh = True
     
-if 'previous_alerts' not in st.session_state:
-    st.session_state.previous_alerts = set()
+if 'signal_differ' not in st.session_state:
+    st.session_state.signal_differ = SignalDiffer()  # previous cycle's signals, keyed by bar time
+
+if 'signal_changes' not in st.session_state:
+    st.session_state.signal_changes = SignalDiffer.summarize([])
     
 if 'notification_enabled' not in st.session_state:
     st.session_state.notification_enabled = True
@@ -227,6 +232,13 @@ def calculate_macd(close_prices):
         'signals': signals
     }
 
+@st.cache_resource
+def get_alert_dispatcher():
+    """Start background alert delivery once per server process (sinks come from ALERT_* variables)"""
+    dispatcher = AlertDispatcher(sinks_from_env())
+    dispatcher.start()
+    return dispatcher
+
 def generate_sound_alert():
     """Generate sound alert for new detections"""
     try:
@@ -307,6 +319,7 @@ def scan_crossovers(timeframe='1d'):
                     'previous_type': prev_signal,
                     'current_signal': current_signal,
                     'timestamp': get_ist_time(),
+                    'bar_time': hist.index[-1],
                     'macd': macd_data['macd'],
                     'signal': macd_data['signal'],
                     'price': prices[-1]
@@ -333,17 +346,15 @@ def scan_stocks_now():
             # Scan for 1D crossovers
             crossovers_1d = scan_crossovers('1d')
 
-            # Check for new alerts
-            current_alerts_4h = {f"{c['symbol']}_{c['timestamp']}" for c in crossovers_4h}
-            current_alerts_1d = {f"{c['symbol']}_{c['timestamp']}" for c in crossovers_1d}
-
-            new_alerts_4h = [c for c in crossovers_4h if
-                             f"{c['symbol']}_{c['timestamp']}" not in st.session_state.previous_alerts]
-            new_alerts_1d = [c for c in crossovers_1d if
-                             f"{c['symbol']}_{c['timestamp']}" not in st.session_state.previous_alerts]
+            # Diff against the previous cycle: a crossover is new once per bar
+            differ = st.session_state.signal_differ
+            events = (differ.diff('MACD 4H', crossovers_4h, timeframe='4h') +
+                      differ.diff('MACD 1D', crossovers_1d, timeframe='1d'))
 
             # Send notifications for new alerts
-            all_new_alerts = new_alerts_4h + new_alerts_1d
+            all_new_alerts = [e['row'] for e in events if e['event'] == SignalDiffer.INSERT]
+            # Queued for email/Telegram/webhook delivery without waiting on the endpoints
+            get_alert_dispatcher().submit([e for e in events if e['event'] == SignalDiffer.INSERT])
 
             if all_new_alerts and st.session_state.notification_enabled:
                 # Generate sound alert
@@ -353,7 +364,7 @@ def scan_stocks_now():
             # Update session state
             st.session_state.crossover_data_4h = crossovers_4h
             st.session_state.crossover_data_1d = crossovers_1d
-            st.session_state.previous_alerts = current_alerts_4h | current_alerts_1d
+            st.session_state.signal_changes = SignalDiffer.summarize(events)
             st.session_state.last_scan_time = get_ist_time()
 
             return len(crossovers_4h), len(crossovers_1d), len(all_new_alerts)
@@ -562,6 +573,10 @@ def main():
         st.metric("4H Timeframe", total_4h)
         st.metric("1D Timeframe", total_1d)
 
+        changes = st.session_state.signal_changes
+        st.caption(f"Last scan: {changes['insert']} new, {changes['update']} updated, "
+                   f"{changes['expire']} expired")
+
         # Market hours info
         ist_time = get_ist_time()
         st.markdown(f"**IST Time:** {format_time_12hr(ist_time)}")
@@ -0,0 +1,581 @@
+"""Scanner benchmark suite
+
+Times every scanner end to end and each indicator and detection stage on
+its own, over a deterministic synthetic market (utils/synthetic_market.py),
+so no network access is needed and runs on the same machine are directly
+comparable. Each stage reports wall and CPU seconds, throughput in symbols
+per second and peak Python memory, and is compared with a stored baseline.
+
+Machine speed drifts between runs on shared hosts, so a fixed reference
+workload is timed around every stage and the comparison uses throughput
+relative to it. A stage counts as slower or faster only beyond both
+--tolerance and NOISE_FACTOR times its measured run-to-run noise, and a
+suspected slowdown is timed a second time before it counts.
+
+Examples:
+    python benchmark.py --list
+    python benchmark.py --sizes 100 --timeframes 4h
+    python benchmark.py --stages scan:support-level detect:support-levels
+    python benchmark.py --sizes 100 1000 5000 --save-baseline
+    python benchmark.py --fail-on-regression
+
+Exit status: 0 when every stage ran, 1 when a stage failed or, with
+--fail-on-regression, a stage is slower than the baseline beyond its noise
+threshold or its row count changed, 2 on invalid arguments.
+"""
+import argparse
+import gc
+import inspect
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytz
+from scanners.custom_screen_scanner import CustomScreenScanner
+from scanners.macd_scanner import MACDScanner
+from scanners.macd_scanner_original import MACDScannerOriginal
+from scanners.range_breakout_scanner import RangeBreakoutScanner
+from scanners.resistance_breakout_scanner import ResistanceBreakoutScanner
+from scanners.support_level_scanner import SupportLevelScanner
+from utils.data_fetcher import DataFetcher
+from utils.synthetic_market import DEFAULT_BARS, SyntheticMarket, synthetic_cache
+from utils.technical_indicators import TechnicalIndicators
+
+IST = pytz.timezone('Asia/Kolkata')
+
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+DEFAULT_SIZES = [100, 1000, 5000]
+TIMEFRAMES = ['15m', '1h', '4h', '1d']
+
+# Seconds after which a stage is not timed again
+LONG_RUN = 1.0
+# Seconds each stage is timed for at least (fast stages repeat until then)
+MIN_TIME = 0.5
+# Throughput change in percent always treated as noise (unchanged code
+# drifts by 10-20% between runs on a shared single-CPU host)
+TOLERANCE = 20.0
+# Multiple of the measured run-to-run spread a slowdown must exceed
+NOISE_FACTOR = 3
+# Seconds the reference workload is timed for on each side of a stage
+REFERENCE_TIME = 0.1
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+# One benchmarked stage: prepare(data_map, timeframe) returns a callable doing
+# the stage's work once (and returning its output row count, or None)
+Stage = namedtuple('Stage', ['name', 'prepare', 'timeframes'])
+
+
+def per_symbol(function):
+    """Stage preparer running a function on every symbol's bars"""
+    def prepare(data_map, timeframe):
+        def run():
+            for data in data_map.values():
+                function(data)
+            return None
+        return run
+    return prepare
+
+
+def scan_lookback(scanner_cls, timeframe):
+    """Lookback a scanner fetches by default on a timeframe"""
+    defaults = getattr(scanner_cls, 'DEFAULT_LOOKBACK_DAYS', None)
+    if defaults:
+        return defaults.get(timeframe, 90)
+    return inspect.signature(scanner_cls.scan).parameters['lookback_days'].default
+
+
+def full_scan(scanner_cls):
+    """
+    Stage preparer running a scanner's scan() over the synthetic universe
+
+    Bars are served from a cache filled under the scanner's own keys and
+    the detection cache is off, so every run fetches, prefilters and
+    detects every symbol.
+    """
+    def prepare(data_map, timeframe):
+        lookback_days = scan_lookback(scanner_cls, timeframe)
+        cache = synthetic_cache(scanner_cls, data_map, timeframe, lookback_days)
+
+        def run():
+            scanner = scanner_cls()
+            scanner.universe = list(data_map)
+            scanner.detection_cache = None
+            scanner.data_fetcher.cache = cache
+            return len(scanner.scan(timeframe=timeframe, lookback_days=lookback_days))
+        return run
+    return prepare
+
+
+def reference_run():
+    """
+    Build the reference workload timed around every stage
+
+    A fixed mix of pandas rolling windows, an EWM and a numpy sort, like
+    the indicator code, so its time tracks the machine's current speed.
+
+    Returns:
+        Callable doing the workload once
+    """
+    close = pd.Series(np.random.default_rng(0).normal(size=20000).cumsum() + 1000)
+
+    def run():
+        for _ in range(5):
+            close.rolling(20).mean()
+            close.ewm(span=12).mean()
+            np.sort(close.to_numpy())
+        return None
+    return run
+
+
+def build_stages():
+    """
+    Get every benchmark stage in run order
+
+    Returns:
+        OrderedDict with stage name as key and Stage as value
+    """
+    fetcher = DataFetcher()
+    ranges = RangeBreakoutScanner()
+    resistance = ResistanceBreakoutScanner()
+    support = SupportLevelScanner()
+
+    stages = [
+        Stage('resample:4h', per_symbol(fetcher._resample_to_4h), ('15m', '1h')),
+        Stage('indicator:macd', per_symbol(lambda data: TechnicalIndicators.calculate_macd(data['Close'])), None),
+        Stage('indicator:atr', per_symbol(TechnicalIndicators.calculate_atr), None),
+        Stage('indicator:rsi', per_symbol(lambda data: TechnicalIndicators.calculate_rsi(data['Close'])), None),
+        Stage('indicator:bollinger', per_symbol(lambda data: TechnicalIndicators.calculate_bollinger_bands(data['Close'])), None),
+        Stage('indicator:stochastic', per_symbol(TechnicalIndicators.calculate_stochastic), None),
+        Stage('indicator:volume-sma', per_symbol(lambda data: TechnicalIndicators.calculate_volume_sma(data['Volume'], 20)), None),
+        Stage('indicator:support-resistance', per_symbol(TechnicalIndicators.detect_support_resistance), None),
+        Stage('detect:ranges', per_symbol(ranges.detect_ranges), None),
+        Stage('detect:resistance-levels', per_symbol(resistance.identify_resistance_levels), None),
+        Stage('detect:support-levels', per_symbol(support.identify_support_levels), None),
+        Stage('detect:support-resistance-levels', per_symbol(support.identify_resistance_levels), None),
+        Stage('detect:macd-original', per_symbol(lambda data: MACDScannerOriginal.calculate_macd(data['Close'].tolist())), None),
+        Stage('scan:range-breakout', full_scan(RangeBreakoutScanner), None),
+        Stage('scan:resistance-breakout', full_scan(ResistanceBreakoutScanner), None),
+        Stage('scan:support-level', full_scan(SupportLevelScanner), None),
+        Stage('scan:macd', full_scan(MACDScanner), None),
+        Stage('scan:macd-original', full_scan(MACDScannerOriginal), None),
+        Stage('scan:custom-screen', full_scan(CustomScreenScanner), None)
+    ]
+    return OrderedDict((stage.name, stage) for stage in stages)
+
+
+def select_stages(stages, names):
+    """
+    Pick stages by name or group prefix
+
+    Args:
+        stages: OrderedDict of every stage
+        names: Stage names or prefixes such as 'scan' or 'indicator' (None for all)
+
+    Returns:
+        List of Stage in run order
+
+    Raises:
+        ValueError: When a name matches no stage
+    """
+    if not names:
+        return list(stages.values())
+
+    selected = []
+    for name in names:
+        matches = [stage for key, stage in stages.items() if key == name or key.split(':', 1)[0] == name]
+        if not matches:
+            raise ValueError(f"Unknown stage '{name}' (see --list)")
+        selected.extend(stage for stage in matches if stage not in selected)
+    return [stage for stage in stages.values() if stage in selected]
+
+
+def measure(run, repeat=1, memory=True, min_time=MIN_TIME):
+    """
+    Time a stage and measure its peak memory
+
+    A stage runs at least repeat times and until its timed runs add up to
+    min_time seconds, so a stage of a few milliseconds is timed over many
+    runs. The fastest run is kept; how far the median run lies above it
+    is the stage's noise. Repeats stop once a run takes longer than
+    LONG_RUN seconds, where timer noise is negligible. Timed runs go
+    without tracemalloc (it slows allocation-heavy code); peak memory
+    comes from one extra traced run.
+
+    Args:
+        run: Callable doing the stage's work once
+        repeat: Fewest timed runs
+        memory: Whether to measure peak memory
+        min_time: Fewest seconds of timed runs
+
+    Returns:
+        Tuple of (wall seconds, CPU seconds, run() result, peak MB or None,
+        noise in percent)
+    """
+    best_wall = best_cpu = None
+    result = None
+    walls = []
+    while len(walls) < repeat or sum(walls) < min_time:
+        gc.collect()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = run()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        walls.append(wall)
+        if best_wall is None or wall < best_wall:
+            best_wall, best_cpu = wall, cpu
+        if wall > LONG_RUN:
+            break
+
+    median = sorted(walls)[len(walls) // 2]
+    noise = 100 * (median / best_wall - 1) if best_wall > 0 else 0.0
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+
+    return best_wall, best_cpu, result, peak, noise
+
+
+def time_stage(run, reference, repeat=1, memory=True, min_time=MIN_TIME):
+    """
+    Time a stage between two timings of the reference workload
+
+    Args:
+        run: Callable doing the stage's work once
+        reference: Callable doing the reference workload once
+        repeat: Fewest timed runs
+        memory: Whether to measure peak memory
+        min_time: Fewest seconds of timed runs
+
+    Returns:
+        Tuple of (wall seconds, CPU seconds, run() result, peak MB or None,
+        noise in percent, reference seconds)
+    """
+    before = measure(reference, 1, False, REFERENCE_TIME)[0]
+    wall, cpu, result, peak, noise = measure(run, repeat, memory, min_time)
+    after = measure(reference, 1, False, REFERENCE_TIME)[0]
+
+    # The machine speeding up or slowing down during the stage is noise too
+    noise = max(noise, 100 * (max(before, after) / min(before, after) - 1))
+    return wall, cpu, result, peak, noise, (before + after) / 2
+
+
+def record(stage, timeframe, size, bars, wall, cpu, rows, peak, noise, reference):
+    """Build one result record"""
+    return {
+        'stage': stage,
+        'timeframe': timeframe,
+        'symbols': size,
+        'bars': bars,
+        'seconds': round(wall, 4),
+        'cpu_seconds': round(cpu, 4),
+        'symbols_per_sec': round(size / wall, 1) if wall > 0 else None,
+        'peak_mb': round(peak, 2) if peak is not None else None,
+        'noise_pct': round(noise, 1),
+        'reference_seconds': round(reference, 5),
+        'rows': rows
+    }
+
+
+def record_key(entry):
+    """Identity of a result across runs"""
+    return (entry['stage'], entry['timeframe'], entry['symbols'], entry['bars'])
+
+
+def load_baseline(path):
+    """
+    Read a stored baseline
+
+    Returns:
+        Dict with record key as key and record as value (empty when missing)
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as handle:
+            data = json.load(handle)
+        return {record_key(entry): entry for entry in data.get('results', [])}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error loading baseline from {path}: {e}", file=sys.stderr)
+        return {}
+
+
+def save_baseline(path, records, seed):
+    """
+    Merge results into a baseline file (stages not run keep their old entry)
+
+    Args:
+        path: Baseline JSON path
+        records: Result records of this run
+        seed: Synthetic market seed
+    """
+    merged = load_baseline(path)
+    for entry in records:
+        merged[record_key(entry)] = entry
+
+    data = {
+        'created': datetime.now(IST).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': seed,
+        'results': sorted(merged.values(), key=lambda entry: (TIMEFRAMES.index(entry['timeframe'])
+                                                               if entry['timeframe'] in TIMEFRAMES else 99,
+                                                               entry['symbols'], entry['stage']))
+    }
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle, indent=1)
+        handle.write('\n')
+
+
+def noise_threshold(entry, base, tolerance):
+    """
+    Throughput change in percent a comparison treats as noise
+
+    At least tolerance, and NOISE_FACTOR times the larger run-to-run noise
+    of the two measurements, so a stage whose runs scatter widely needs a
+    larger change to count.
+    """
+    noise = max(entry.get('noise_pct') or 0, base.get('noise_pct') or 0)
+    return max(tolerance, NOISE_FACTOR * noise)
+
+
+def compare(entry, baseline, tolerance):
+    """
+    Compare a result with its baseline entry
+
+    Args:
+        entry: Result record
+        baseline: Dict of baseline records by key
+        tolerance: Smallest throughput change in percent not treated as noise
+
+    Returns:
+        Tuple of (status, throughput change %, memory change %) where status
+        is 'new', 'ok', 'faster', 'slower' or 'rows changed'
+    """
+    base = baseline.get(record_key(entry))
+    if base is None or not base.get('symbols_per_sec') or not entry['symbols_per_sec']:
+        return 'new', None, None
+
+    speed = entry['symbols_per_sec'] / base['symbols_per_sec']
+    if entry.get('reference_seconds') and base.get('reference_seconds'):
+        # Discount a machine that is faster or slower than at baseline time
+        speed *= entry['reference_seconds'] / base['reference_seconds']
+    speed = 100 * (speed - 1)
+    memory = None
+    if entry['peak_mb'] and base.get('peak_mb'):
+        memory = 100 * (entry['peak_mb'] / base['peak_mb'] - 1)
+
+    threshold = noise_threshold(entry, base, tolerance)
+    if entry['rows'] != base.get('rows'):
+        # Same bars, different signals: detection behaviour changed
+        status = 'rows changed'
+    elif speed < -threshold:
+        status = 'slower'
+    elif speed > threshold:
+        status = 'faster'
+    else:
+        status = 'ok'
+    return status, speed, memory
+
+
+def print_result(entry, comparison, stream=sys.stdout):
+    """Print one result line"""
+    status, speed, memory = comparison
+    rows = entry['rows'] if entry['rows'] is not None else '-'
+    peak = f"{entry['peak_mb']:.1f}" if entry['peak_mb'] is not None else '-'
+    noise = f"{entry['noise_pct']:.1f}"
+    versus = status
+    if speed is not None:
+        versus = f"{speed:+.1f}% speed"
+        if memory is not None:
+            versus += f", {memory:+.1f}% memory"
+        versus += f" ({status})"
+    print(f"  {entry['stage']:<34}{entry['timeframe']:>5}{entry['symbols']:>9}{entry['seconds']:>10.3f}"
+          f"{entry['cpu_seconds']:>10.3f}{entry['symbols_per_sec'] or 0:>11.1f}{peak:>9}{noise:>8}{rows:>6}  {versus}",
+          file=stream)
+    stream.flush()
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line arguments
+
+    Args:
+        argv: Optional argument list (defaults to sys.argv)
+
+    Returns:
+        argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the NSE scanners on a synthetic market")
+    parser.add_argument("--list", action="store_true", help="List the benchmark stages and exit")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, metavar="N",
+                        help="Universe sizes in symbols (default: 100 1000 5000)")
+    parser.add_argument("--timeframes", nargs="+", choices=TIMEFRAMES, default=TIMEFRAMES,
+                        help="Bar intervals (default: all)")
+    parser.add_argument("--stages", nargs="+", metavar="NAME",
+                        help="Stages or groups to run, e.g. scan, indicator, detect:ranges (default: all)")
+    parser.add_argument("--bars", type=int, help="Bars per symbol (default: per timeframe)")
+    parser.add_argument("--seed", type=int, default=7, help="Synthetic market seed (default: 7)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Fewest timed runs per stage, fastest kept; stages over a second run once (default: 3)")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, metavar="SECONDS",
+                        help=f"Fewest seconds of timed runs per stage (default: {MIN_TIME:g})")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced run that measures peak memory")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, metavar="PATH",
+                        help=f"Baseline to compare with (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Merge this run's results into the baseline file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, metavar="PCT",
+                        help=f"Smallest throughput change in percent not treated as noise; raised to "
+                             f"{NOISE_FACTOR}x a stage's measured noise (default: {TOLERANCE:g})")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 when a stage is slower than the baseline beyond its "
+                             "noise threshold or its row count changed")
+    parser.add_argument("--output", metavar="PATH", help="Also write this run's results as JSON")
+
+    args = parser.parse_args(argv)
+
+    if any(size < 1 for size in args.sizes):
+        parser.error("--sizes must be positive")
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if args.min_time < 0:
+        parser.error("--min-time must not be negative")
+    if args.bars is not None and args.bars < 30:
+        parser.error("--bars must be at least 30")
+
+    return args
+
+
+def main(argv=None):
+    """
+    Command-line entry point
+
+    Args:
+        argv: Optional argument list (defaults to sys.argv)
+
+    Returns:
+        Process exit status
+    """
+    args = parse_args(argv)
+    stages = build_stages()
+
+    if args.list:
+        for name, stage in stages.items():
+            timeframes = ', '.join(stage.timeframes) if stage.timeframes else 'all timeframes'
+            print(f"{name:<34} {timeframes}")
+        return EXIT_OK
+
+    try:
+        selected = select_stages(stages, args.stages)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    baseline = load_baseline(args.baseline)
+    market = SyntheticMarket(seed=args.seed)
+    reference = reference_run()
+    records = []
+    regressions = []
+    failures = []
+
+    print(f"Benchmark on {platform.python_version()}, {os.cpu_count()} CPUs, seed {args.seed}"
+          f"{f', baseline {args.baseline}' if baseline else ', no baseline'}")
+    print(f"  {'Stage':<34}{'TF':>5}{'Symbols':>9}{'Seconds':>10}{'CPU s':>10}{'Symbols/s':>11}{'Peak MB':>9}"
+          f"{'Noise %':>8}{'Rows':>6}  vs baseline")
+
+    for timeframe in args.timeframes:
+        bars = args.bars or DEFAULT_BARS[timeframe]
+        for size in args.sizes:
+            symbols = market.symbols(size)
+            generated = {}
+
+            def generate():
+                generated.clear()
+                generated.update(market.universe(symbols, timeframe, bars))
+                return None
+
+            runs = [('generate', generate)]
+            for stage in selected:
+                if stage.timeframes is None or timeframe in stage.timeframes:
+                    runs.append((stage.name, None))
+
+            for name, run in runs:
+                try:
+                    if run is None:
+                        run = stages[name].prepare(generated, timeframe)
+                    timing = time_stage(run, reference, args.repeat, not args.no_memory, args.min_time)
+                    entry = record(name, timeframe, size, bars, *timing)
+                    comparison = compare(entry, baseline, args.tolerance)
+                    if comparison[0] == 'slower':
+                        # Confirm a slowdown with a second timing, keeping the faster one
+                        wall, cpu, rows, _, noise, machine = time_stage(run, reference, args.repeat, False, args.min_time)
+                        retry = record(name, timeframe, size, bars, wall, cpu, rows, entry['peak_mb'], noise, machine)
+                        retried = compare(retry, baseline, args.tolerance)
+                        if retried[1] > comparison[1]:
+                            entry, comparison = retry, retried
+                except Exception as e:
+                    print(f"  {name:<34}{timeframe:>5}{size:>9}  failed: {e}", file=sys.stderr)
+                    failures.append(f"{name} ({timeframe}, {size})")
+                    continue
+
+                if comparison[0] in ('slower', 'rows changed'):
+                    regressions.append((entry, comparison[0]))
+                records.append(entry)
+                print_result(entry, comparison)
+
+            generated.clear()
+            gc.collect()
+
+    if args.output:
+        try:
+            with open(args.output, 'w', encoding='utf-8') as handle:
+                json.dump({'seed': args.seed, 'results': records}, handle, indent=1)
+            print(f"Results written to {args.output}")
+        except OSError as e:
+            print(f"Error writing results to {args.output}: {e}", file=sys.stderr)
+
+    if args.save_baseline:
+        try:
+            save_baseline(args.baseline, records, args.seed)
+            print(f"Baseline saved to {args.baseline}")
+        except OSError as e:
+            print(f"Error saving baseline to {args.baseline}: {e}", file=sys.stderr)
+
+    new = sorted({entry['symbols'] for entry in records if record_key(entry) not in baseline})
+    if baseline and new and not args.save_baseline:
+        print(f"No baseline for some stages at {', '.join(f'{size:,}' for size in new)} symbols "
+              f"(record one with --save-baseline)")
+
+    status = EXIT_OK
+    if regressions:
+        print(f"{len(regressions)} stage(s) regressed against the baseline: "
+              + ', '.join(f"{entry['stage']} ({entry['timeframe']}, {entry['symbols']}): {change}"
+                          for entry, change in regressions))
+        if args.fail_on_regression:
+            status = EXIT_FAILED
+    if failures:
+        print(f"{len(failures)} stage(s) failed: {', '.join(failures)}", file=sys.stderr)
+        status = EXIT_FAILED
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,407 @@
+"""Headless scanner entry point
+
+Runs any set of scanners once or on a schedule without Streamlit, writes
+the results as JSON lines, Parquet or CSV and prints timing stats.
+
+Examples:
+    python scan_cli.py --list
+    python scan_cli.py --scanners macd-4h support-level-4h --output signals.jsonl
+    python scan_cli.py --universe symbols.txt --timeframe 1d --workers 4 --output scan.parquet
+    python scan_cli.py --every 15 --output signals.jsonl
+    python scan_cli.py --trace scan-trace.json --cprofile
+
+Exit status: 0 when every scanner finished, 1 when a scanner failed or
+timed out (or output could not be written), 2 on invalid arguments.
+"""
+import argparse
+import inspect
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+import pytz
+from scanners.scanner_registry import SCANNER_JOBS, get_scanner_jobs, dedupe_jobs, job_slug
+from utils.scan_orchestrator import ScanOrchestrator
+from utils.scan_cache import DETECTION_CACHE
+from utils.cache_policy import MARKET_DATA_CACHE
+from utils.scan_profiler import SCAN_PROFILER
+from utils.signal_table import SignalTable
+from utils.result_export import results_frame, parquet_safe
+
+IST = pytz.timezone('Asia/Kolkata')
+
+OUTPUT_FORMATS = ('jsonl', 'parquet', 'csv')
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line arguments
+
+    Args:
+        argv: Optional argument list (defaults to sys.argv)
+
+    Returns:
+        argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Run NSE stock scanners without Streamlit")
+    parser.add_argument("--list", action="store_true", help="List the available scanners and exit")
+    parser.add_argument("--scanners", nargs="+", metavar="NAME",
+                        help="Scanners to run, by name or slug (default: all)")
+    parser.add_argument("--universe", metavar="FILE",
+                        help="File with one symbol per line (or CSV whose first column is the symbol)")
+    parser.add_argument("--timeframe", help="Override every scanner's timeframe (e.g. 15m, 1h, 4h, 1d)")
+    parser.add_argument("--liquid-only", action="store_true",
+                        help="Skip illiquid and far-from-level symbols before support/resistance "
+                             "detection (faster, but may drop signals)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Scanner jobs run at once (default: CPU count)")
+    parser.add_argument("--executor", choices=ScanOrchestrator.EXECUTORS, default="thread",
+                        help="Worker pool type (default: thread)")
+    parser.add_argument("--job-timeout", type=int, default=600,
+                        help="Seconds a single scanner may run before it is abandoned; the command "
+                             "exits without waiting for it (default: 600)")
+    parser.add_argument("--output", metavar="PATH",
+                        help="Write results to PATH ('-' for JSON lines on stdout)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS,
+                        help="Output format (default: from the output file extension, else jsonl)")
+    parser.add_argument("--every", type=float, metavar="MINUTES",
+                        help="Run on a schedule every MINUTES instead of once")
+    parser.add_argument("--cycles", type=int, help="Stop after this many scheduled cycles")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Write each cycle's per-stage Chrome trace JSON (chrome://tracing, Perfetto)")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="Run each cycle under cProfile and print its top functions")
+
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.every is not None and args.every <= 0:
+        parser.error("--every must be positive")
+    if args.cycles is not None and args.cycles < 1:
+        parser.error("--cycles must be at least 1")
+
+    return args
+
+
+def resolve_scanners(names):
+    """
+    Map command-line scanner names to job names
+
+    Args:
+        names: Names or slugs given on the command line (None for all)
+
+    Returns:
+        List of job names
+
+    Raises:
+        ValueError: When a name matches no scanner
+    """
+    if not names:
+        return list(SCANNER_JOBS)
+
+    slugs = {job_slug(name): name for name in SCANNER_JOBS}
+    resolved = []
+    for name in names:
+        job = slugs.get(job_slug(name))
+        if job is None:
+            raise ValueError(f"Unknown scanner '{name}' (see --list)")
+        if job not in resolved:
+            resolved.append(job)
+    return resolved
+
+
+def load_universe(path):
+    """
+    Read a symbol universe file
+
+    Blank lines, '#' comments and a 'symbol' header are skipped; bare NSE
+    symbols get the .NS suffix.
+
+    Args:
+        path: Text or CSV file path
+
+    Returns:
+        List of unique symbols in file order
+
+    Raises:
+        ValueError: When the file holds no symbols
+    """
+    symbols = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            value = line.split('#', 1)[0].split(',', 1)[0].strip().strip('"')
+            if not value or value.lower() == 'symbol':
+                continue
+            symbol = SignalTable.normalize_symbol(value)
+            if symbol not in symbols:
+                symbols.append(symbol)
+
+    if not symbols:
+        raise ValueError(f"No symbols found in {path}")
+    return symbols
+
+
+def build_jobs(names, timeframe=None, liquid_only=False):
+    """
+    Build scanner jobs, optionally forcing one timeframe
+
+    Args:
+        names: Job names
+        timeframe: Optional timeframe replacing each job's own
+        liquid_only: Pass liquid_only=True to scanners that accept it
+
+    Returns:
+        Dict with job name as key and (scanner class, scan kwargs) as value
+    """
+    jobs = {}
+    for name, (scanner_cls, scan_kwargs) in get_scanner_jobs(names).items():
+        if timeframe and scan_kwargs.get('timeframe') != timeframe:
+            name = f"{name} ({timeframe})"
+            scan_kwargs = dict(scan_kwargs, timeframe=timeframe)
+        if liquid_only and 'liquid_only' in inspect.signature(scanner_cls.scan).parameters:
+            scan_kwargs = dict(scan_kwargs, liquid_only=True)
+        jobs[name] = (scanner_cls, scan_kwargs)
+    return jobs
+
+
+def output_format(path, fmt=None):
+    """Output format from --format or the file extension (jsonl by default)"""
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('parquet', 'pq'):
+        return 'parquet'
+    if extension == 'csv':
+        return 'csv'
+    return 'jsonl'
+
+
+def check_parquet_engine():
+    """Whether pandas can write Parquet (needs pyarrow or fastparquet)"""
+    for module in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+def cycle_path(path, scan_time):
+    """Insert the cycle time before a file's extension ('out.csv' -> 'out_20250101_091500.csv')"""
+    root, extension = os.path.splitext(path)
+    return f"{root}_{scan_time.strftime('%Y%m%d_%H%M%S')}{extension}"
+
+
+def write_output(results, path, fmt, scan_time, scheduled=False):
+    """
+    Write one cycle's results
+
+    JSON lines are appended on a schedule; CSV and Parquet files get one
+    file per cycle with the cycle time in the name.
+
+    Args:
+        results: Dict with job name as key and results DataFrame as value
+        path: Output path, or '-' for stdout
+        fmt: 'jsonl', 'parquet' or 'csv'
+        scan_time: IST datetime of the cycle
+        scheduled: Whether this is one of several scheduled cycles
+
+    Returns:
+        Path written (or '-')
+    """
+    frame = results_frame(results, scan_time)
+
+    if fmt == 'jsonl':
+        lines = frame.to_json(orient='records', lines=True, date_format='iso') if not frame.empty else ''
+        if path == '-':
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+        else:
+            with open(path, 'a' if scheduled else 'w', encoding='utf-8') as handle:
+                handle.write(lines)
+        return path
+
+    if path == '-':
+        raise ValueError(f"{fmt} output cannot be written to stdout")
+
+    if scheduled:
+        path = cycle_path(path, scan_time)
+    if fmt == 'csv':
+        frame.to_csv(path, index=False)
+    else:
+        parquet_safe(frame).to_parquet(path, index=False)
+    return path
+
+
+def print_stats(outcome, jobs, aliases, elapsed, scan_time, universe_size=None, stream=sys.stderr):
+    """
+    Print per-scanner timing stats for one cycle
+
+    Args:
+        outcome: ScanOrchestrator.run() result fanned out to every job name
+        jobs: Dict of job names that ran
+        aliases: Dict mapping job names to the job whose results they share
+        elapsed: Cycle wall-clock seconds
+        scan_time: IST datetime of the cycle
+        universe_size: Optional number of symbols in an explicit universe
+        stream: File to print to
+    """
+    universe = f", {universe_size} symbols" if universe_size else ""
+    print(f"Scan finished {scan_time.strftime('%Y-%m-%d %H:%M:%S IST')} in {elapsed:.2f}s "
+          f"({len(set(aliases.values()))} distinct jobs for {len(jobs)} scanners{universe})", file=stream)
+
+    width = max([len(name) for name in jobs] + [7])
+    print(f"  {'Scanner':<{width}}  {'Status':<8}{'Rows':>6}{'Seconds':>10}", file=stream)
+    for name in jobs:
+        if name in outcome['errors']:
+            status, rows = 'FAILED', '-'
+        else:
+            status, rows = 'ok', len(outcome['results'].get(name, []))
+        shared = '' if aliases.get(name, name) == name else f"  (shares {aliases[name]})"
+        seconds = outcome['timings'].get(name)
+        seconds = f"{seconds:.2f}" if seconds is not None else '-'
+        print(f"  {name:<{width}}  {status:<8}{rows:>6}{seconds:>10}{shared}", file=stream)
+
+    for name, error in outcome['errors'].items():
+        print(f"  error in {name}: {error}", file=stream)
+
+    profile = outcome.get('profile')
+    if profile is not None and profile.jobs:
+        stages = profile.stage_frame()
+        print("  stages: " + ", ".join(f"{row['Stage']} {row['Wall s']:.2f}s ({row['Share %']:.0f}%)"
+                                       for _, row in stages.iterrows()), file=stream)
+        slowest = profile.slowest_symbols(3)
+        if not slowest.empty:
+            print("  slowest symbols: " + ", ".join(f"{row['Symbol']} {row['Wall ms']:.0f}ms ({row['Scanner']})"
+                                                    for _, row in slowest.iterrows()), file=stream)
+
+    data_stats = MARKET_DATA_CACHE.stats()
+    detection_stats = DETECTION_CACHE.stats()
+    print(f"  market data cache {data_stats['hit_rate']}% hits ({data_stats['hits']}/{data_stats['hits'] + data_stats['misses']}), "
+          f"detection cache {detection_stats['hit_rate']}% hits "
+          f"({detection_stats['hits']}/{detection_stats['hits'] + detection_stats['misses']})", file=stream)
+    stream.flush()
+
+
+def run_cycle(args, jobs, universe=None, scheduled=False):
+    """
+    Run one scan cycle, write its output and print stats
+
+    Args:
+        args: Parsed arguments
+        jobs: Dict with job name as key and (scanner class, scan kwargs) as value
+        universe: Optional explicit symbol list
+        scheduled: Whether this is one of several scheduled cycles
+
+    Returns:
+        Exit status for the cycle
+    """
+    started = time.monotonic()
+    distinct, aliases = dedupe_jobs(jobs)
+    if args.cprofile:
+        SCAN_PROFILER.capture_next()
+    orchestrator = ScanOrchestrator(
+        executor=args.executor,
+        max_workers=args.workers,
+        job_timeout=args.job_timeout,
+        universe=universe
+    )
+    outcome = orchestrator.run(distinct)
+
+    # Jobs that did identical work share one result
+    for key in ('results', 'errors', 'timings'):
+        outcome[key] = {name: outcome[key][shared] for name, shared in aliases.items() if shared in outcome[key]}
+
+    scan_time = datetime.now(IST)
+    status = EXIT_FAILED if outcome['errors'] else EXIT_OK
+
+    if args.output:
+        try:
+            written = write_output(outcome['results'], args.output, output_format(args.output, args.format),
+                                   scan_time, scheduled)
+            if written != '-':
+                print(f"Results written to {written}", file=sys.stderr)
+        except Exception as e:
+            print(f"Error writing results to {args.output}: {e}", file=sys.stderr)
+            status = EXIT_FAILED
+
+    profile = outcome.get('profile')
+    if args.trace and profile is not None:
+        path = cycle_path(args.trace, scan_time) if scheduled else args.trace
+        try:
+            with open(path, 'wb') as handle:
+                handle.write(profile.trace_json())
+            print(f"Trace written to {path}", file=sys.stderr)
+        except OSError as e:
+            print(f"Error writing trace to {path}: {e}", file=sys.stderr)
+
+    print_stats(outcome, jobs, aliases, time.monotonic() - started, scan_time,
+                len(universe) if universe else None)
+    if args.cprofile and profile is not None and profile.cprofile_text:
+        print(profile.cprofile_text, file=sys.stderr)
+    return status
+
+
+def main(argv=None):
+    """
+    Command-line entry point
+
+    Args:
+        argv: Optional argument list (defaults to sys.argv)
+
+    Returns:
+        Process exit status
+    """
+    args = parse_args(argv)
+
+    if args.list:
+        for name, (scanner_cls, scan_kwargs) in SCANNER_JOBS.items():
+            print(f"{job_slug(name):<26} {name:<26} {scanner_cls.__name__} {scan_kwargs}")
+        return EXIT_OK
+
+    try:
+        names = resolve_scanners(args.scanners)
+        universe = load_universe(args.universe) if args.universe else None
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.output and output_format(args.output, args.format) == 'parquet' and not check_parquet_engine():
+        print("Error: Parquet output needs pyarrow or fastparquet (pip install pyarrow)", file=sys.stderr)
+        return EXIT_USAGE
+
+    jobs = build_jobs(names, args.timeframe, args.liquid_only)
+
+    if args.every is None:
+        return run_cycle(args, jobs, universe)
+
+    # Scheduled mode: cycles start every N minutes until stopped
+    status = EXIT_OK
+    cycles = 0
+    try:
+        while args.cycles is None or cycles < args.cycles:
+            started = datetime.now(IST)
+            status = max(status, run_cycle(args, jobs, universe, scheduled=True))
+            cycles += 1
+            if args.cycles is not None and cycles >= args.cycles:
+                break
+
+            next_start = started + timedelta(minutes=args.every)
+            wait = (next_start - datetime.now(IST)).total_seconds()
+            if wait > 0:
+                print(f"Next scan at {next_start.strftime('%H:%M:%S IST')}", file=sys.stderr)
+                time.sleep(wait)
+    except KeyboardInterrupt:
+        print("Stopped", file=sys.stderr)
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
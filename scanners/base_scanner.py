@@ -0,0 +1,419 @@
+import pandas as pd
+from utils.data_fetcher import DataFetcher
+from utils.technical_indicators import TechnicalIndicators
+from utils.shared_bars import ShardedDetector
+from utils.scan_cache import DETECTION_CACHE, DetectionCache
+from utils.scan_profiler import SCAN_PROFILER
+
+class BaseScanner:
+    """Shared fetch-then-analyze scan loop for per-symbol scanners"""
+
+    # Display label used in error messages
+    scanner_label = "Base"
+    # Minimum bars required before a symbol is analyzed
+    min_bars = 100
+    # Maximum number of symbols scanned (None for the full universe)
+    symbol_limit = 100
+    # Symbols fetched, prefiltered and analyzed together when a prefilter or
+    # detect pool is used (progress is reported after each batch)
+    stream_batch_size = 25
+
+    def __init__(self):
+        self.data_fetcher = DataFetcher()
+        self.tech_indicators = TechnicalIndicators()
+        # Optional process pool for sharded detection (set by the scan orchestrator)
+        self.detect_pool = None
+        self.detect_workers = 1
+        # Per-symbol results are reused while a symbol's bars are unchanged
+        self.detection_cache = DETECTION_CACHE
+        # Optional cheap universe-wide filter run ahead of detection
+        self.prefilter = self.build_prefilter()
+        self.prefilter_report = []
+        # Optional callable receiving each iter_scan() progress event (set by the scan orchestrator)
+        self.progress_callback = None
+        # Optional explicit symbol list replacing the default universe
+        self.universe = None
+
+    def get_symbols(self):
+        """
+        Get the symbol universe for this scanner
+
+        Returns:
+            List of stock symbols (the explicit universe in full when one is set)
+        """
+        if self.universe is not None:
+            return list(self.universe)
+        symbols = self.data_fetcher.get_nse_stock_list()
+        return symbols[:self.symbol_limit] if self.symbol_limit else symbols
+
+    def fetch_symbol_data(self, symbol, timeframe, lookback_days):
+        """
+        Fetch bars for a single symbol
+
+        Args:
+            symbol: Stock symbol
+            timeframe: Data timeframe
+            lookback_days: Number of days to look back
+
+        Returns:
+            DataFrame with OHLCV data or None
+        """
+        return self.data_fetcher.get_stock_data(
+            symbol,
+            period=f"{lookback_days}d",
+            interval=timeframe
+        )
+
+    @classmethod
+    def bars_cache_key(cls, symbol, timeframe, lookback_days):
+        """Key under which fetch_symbol_data() caches a symbol's bars"""
+        return DataFetcher.cache_key(symbol, f"{lookback_days}d", timeframe)
+
+    @staticmethod
+    def state_onset(index, holds):
+        """
+        Get the bar a state signal began on
+
+        Event signals (a crossover, a breakout) belong to the latest bar. State
+        signals (price near a level, building momentum) hold over a run of
+        bars, so they are keyed by the first bar of that run and keep one
+        identity while the state lasts.
+
+        Args:
+            index: Bar index of the analyzed data
+            holds: Callable taking a bar position and returning whether the
+                signal's condition held on that bar (it holds on the latest)
+
+        Returns:
+            Index value of the first bar of the run ending at the latest bar
+        """
+        start = len(index) - 1
+        while start > 0 and holds(start - 1):
+            start -= 1
+        return index[start]
+
+    def has_enough_data(self, data):
+        """Check whether fetched bars are long enough to analyze"""
+        return data is not None and len(data) >= self.min_bars
+
+    def analyze(self, symbol, data, timeframe):
+        """
+        Run detection for a single symbol
+
+        Args:
+            symbol: Stock symbol
+            data: OHLCV DataFrame
+            timeframe: Data timeframe
+
+        Returns:
+            Dict with one result row, or None when there is no signal
+        """
+        raise NotImplementedError
+
+    def build_prefilter(self):
+        """
+        Build the prefilter pipeline run before detection
+
+        Returns:
+            PrefilterPipeline, or None to analyze every fetched symbol
+        """
+        return None
+
+    def detection_params(self):
+        """
+        Parameters that change analyze() output, used in detection cache keys
+
+        Returns:
+            Hashable tuple (empty when detection has no tunable parameters)
+        """
+        return ()
+
+    def cache_key(self, symbol, timeframe):
+        """Detection cache key for one symbol"""
+        return (type(self).__name__, symbol, timeframe, self.detection_params())
+
+    def analyze_cached(self, symbol, data, timeframe):
+        """
+        Run detection for a single symbol unless its bars are unchanged
+
+        Args:
+            symbol: Stock symbol
+            data: OHLCV DataFrame
+            timeframe: Data timeframe
+
+        Returns:
+            Dict with one result row, or None when there is no signal
+        """
+        if self.detection_cache is None:
+            return self.analyze(symbol, data, timeframe)
+
+        key = self.cache_key(symbol, timeframe)
+        fingerprint = DetectionCache.fingerprint(data)
+        hit, row = self.detection_cache.get(key, fingerprint)
+        if hit:
+            return row
+
+        row = self.analyze(symbol, data, timeframe)
+        self.detection_cache.put(key, fingerprint, row)
+        return row
+
+    def detect_sharded(self, data_map, timeframe):
+        """
+        Analyze a fetched universe on the detect pool, skipping unchanged symbols
+
+        Args:
+            data_map: Dict with symbol as key and OHLCV DataFrame as value
+            timeframe: Data timeframe
+
+        Returns:
+            List of result rows in data_map order
+        """
+        cached = {}
+        changed = {}
+        fingerprints = {}
+
+        for symbol, data in data_map.items():
+            if self.detection_cache is None:
+                changed[symbol] = data
+                continue
+            fingerprints[symbol] = DetectionCache.fingerprint(data)
+            hit, row = self.detection_cache.get(self.cache_key(symbol, timeframe), fingerprints[symbol])
+            if hit:
+                cached[symbol] = row
+            else:
+                changed[symbol] = data
+
+        detector = ShardedDetector(self.detect_pool, self.detect_workers)
+        with SCAN_PROFILER.stage('detect', rows=len(changed)):
+            fresh = dict(detector.detect(type(self), changed, timeframe, keyed=True))
+
+        rows = []
+        for symbol in data_map:
+            if symbol in changed:
+                row = fresh.get(symbol)
+                if self.detection_cache is not None:
+                    self.detection_cache.put(self.cache_key(symbol, timeframe), fingerprints[symbol], row)
+            else:
+                row = cached[symbol]
+            if row:
+                rows.append(row)
+
+        return rows
+
+    def build_results(self, rows):
+        """
+        Convert result rows into the scanner's output DataFrame
+
+        Args:
+            rows: List of result row dicts
+
+        Returns:
+            DataFrame with scanner results
+        """
+        return pd.DataFrame(rows)
+
+    def fetch_universe(self, symbols, timeframe, lookback_days):
+        """
+        Fetch bars for every symbol that has enough data
+
+        Args:
+            symbols: List of stock symbols
+            timeframe: Data timeframe
+            lookback_days: Number of days to look back
+
+        Returns:
+            Dict with symbol as key and DataFrame as value
+        """
+        data_map = {}
+
+        for symbol in symbols:
+            try:
+                with SCAN_PROFILER.symbol(symbol), SCAN_PROFILER.stage('fetch') as span:
+                    data = self.fetch_symbol_data(symbol, timeframe, lookback_days)
+                    span.rows = len(data) if data is not None else 0
+                if self.has_enough_data(data):
+                    data_map[symbol] = data
+            except Exception as e:
+                print(f"Error fetching {symbol}: {e}")
+                continue
+
+        return data_map
+
+    def apply_prefilter(self, symbols, data_map):
+        """
+        Drop symbols the prefilter rules out and record per-stage counts
+
+        Args:
+            symbols: Symbol universe that was fetched
+            data_map: Dict with symbol as key and DataFrame as value
+
+        Returns:
+            Dict of symbols that go on to detection
+        """
+        fetched = {'Stage': 'fetched', 'Input': len(symbols), 'Passed': len(data_map),
+                   'Rejected': len(symbols) - len(data_map)}
+
+        if self.prefilter is None:
+            self.prefilter_report = [fetched]
+            return data_map
+
+        with SCAN_PROFILER.stage('prefilter', rows=len(data_map)):
+            survivors = self.prefilter.apply(data_map)
+        self.prefilter_report = [fetched] + self.prefilter.report
+        return survivors
+
+    def run_scan(self, timeframe, lookback_days):
+        """
+        Fetch and analyze every symbol in the universe
+
+        Collects iter_scan() progress, passing each event to
+        progress_callback when one is set.
+
+        Args:
+            timeframe: Data timeframe
+            lookback_days: Number of days to look back
+
+        Returns:
+            DataFrame with scanner results (per-stage prefilter counts in
+            attrs['prefilter'] when a prefilter ran)
+        """
+        try:
+            rows = []
+            for progress in self.iter_scan(timeframe, lookback_days):
+                rows.extend(progress['rows'])
+                if self.progress_callback is not None:
+                    self.progress_callback(progress)
+
+            results = self.build_results(rows)
+            if self.prefilter is not None:
+                results.attrs['prefilter'] = self.prefilter_report
+            return results
+
+        except Exception as e:
+            print(f"Error in {self.scanner_label} scanner: {e}")
+            return pd.DataFrame()
+
+    def iter_scan(self, timeframe, lookback_days):
+        """
+        Scan the universe, yielding result rows as symbols complete
+
+        Without a prefilter or detect pool, symbols are fetched and analyzed
+        one at a time and progress is yielded per symbol. Otherwise the
+        universe is processed in batches of stream_batch_size symbols: each
+        batch is fetched, prefiltered and analyzed inline or sharded across
+        the detect pool, so the first signals arrive after one batch rather
+        than after the whole universe is fetched. Either way, symbols whose
+        bars are unchanged since the last run are served from the detection
+        cache.
+
+        Args:
+            timeframe: Data timeframe
+            lookback_days: Number of days to look back
+
+        Yields:
+            Dict with done (symbols finished so far), total (universe size)
+            and rows (result rows found since the previous event)
+        """
+        symbols = self.get_symbols()
+        total = len(symbols)
+
+        if self.detect_pool is None and self.prefilter is None:
+            for done, symbol in enumerate(symbols, 1):
+                row = self.scan_symbol(symbol, timeframe, lookback_days)
+                yield {'done': done, 'total': total, 'rows': [row] if row else []}
+            return
+
+        batch_size = self.stream_batch_size
+        if self.detect_pool is not None:
+            # Keep every detect process busy within a batch
+            batch_size = max(batch_size, 8 * self.detect_workers)
+
+        report = []
+        for start in range(0, total, batch_size):
+            batch = symbols[start:start + batch_size]
+            data_map = self.fetch_universe(batch, timeframe, lookback_days)
+            data_map = self.apply_prefilter(batch, data_map)
+            report = self.merge_prefilter_report(report, self.prefilter_report)
+
+            if self.detect_pool is not None:
+                rows = self.detect_sharded(data_map, timeframe)
+            else:
+                rows = self.analyze_each(data_map, timeframe)
+
+            # Report counts for the whole universe once the scan finishes
+            self.prefilter_report = report
+            yield {'done': start + len(batch), 'total': total, 'rows': rows}
+
+    @staticmethod
+    def merge_prefilter_report(totals, report):
+        """
+        Add one batch's prefilter counts to running totals
+
+        Args:
+            totals: Report accumulated so far (list of stage dicts)
+            report: Report of the latest batch
+
+        Returns:
+            New list of stage dicts with Input, Passed and Rejected summed per stage
+        """
+        merged = {stage['Stage']: dict(stage) for stage in totals}
+        for stage in report:
+            if stage['Stage'] in merged:
+                for column in ('Input', 'Passed', 'Rejected'):
+                    merged[stage['Stage']][column] += stage[column]
+            else:
+                merged[stage['Stage']] = dict(stage)
+        return list(merged.values())
+
+    def scan_symbol(self, symbol, timeframe, lookback_days):
+        """
+        Fetch and analyze a single symbol
+
+        Args:
+            symbol: Stock symbol
+            timeframe: Data timeframe
+            lookback_days: Number of days to look back
+
+        Returns:
+            Dict with one result row, or None when there is no signal
+        """
+        try:
+            with SCAN_PROFILER.symbol(symbol):
+                with SCAN_PROFILER.stage('fetch') as span:
+                    data = self.fetch_symbol_data(symbol, timeframe, lookback_days)
+                    span.rows = len(data) if data is not None else 0
+
+                if not self.has_enough_data(data):
+                    return None
+
+                with SCAN_PROFILER.stage('detect', rows=len(data)):
+                    return self.analyze_cached(symbol, data, timeframe)
+
+        except Exception as e:
+            print(f"Error processing {symbol}: {e}")
+            return None
+
+    def analyze_each(self, data_map, timeframe):
+        """
+        Analyze already fetched symbols inline
+
+        Args:
+            data_map: Dict with symbol as key and DataFrame as value
+            timeframe: Data timeframe
+
+        Returns:
+            List of result rows
+        """
+        results = []
+
+        for symbol, data in data_map.items():
+            try:
+                with SCAN_PROFILER.symbol(symbol), SCAN_PROFILER.stage('detect', rows=len(data)):
+                    row = self.analyze_cached(symbol, data, timeframe)
+                if row:
+                    results.append(row)
+            except Exception as e:
+                print(f"Error processing {symbol}: {e}")
+                continue
+
+        return results
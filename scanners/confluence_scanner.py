@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from utils.signal_table import SignalTable
+
+class ConfluenceScanner:
+    """Confluence Scanner scoring symbols with aligned signals across scanners and timeframes"""
+
+    scanner_label = "Confluence"
+
+    def __init__(self, weights=None):
+        """
+        Args:
+            weights: Optional dict with scanner name as key and score weight as value
+                     (scanners not listed weigh 1.0)
+        """
+        self.weights = weights or {}
+
+    def score(self, table, min_signals=2, direction=None):
+        """
+        Score every symbol in a signal table
+
+        A symbol's direction is the side with more weighted signals. The score
+        rewards aligned signals, penalizes opposing ones and adds a bonus for
+        each extra timeframe the aligned signals span. A signal reported by
+        several scanner jobs that share their work counts once:
+
+            Score = 10 * (aligned - opposing) + 5 * (timeframes - 1) + avg strength / 10
+
+        Args:
+            table: SignalTable built from scanner results
+            min_signals: Minimum number of aligned signals required
+            direction: Optional 1 (bullish only) or -1 (bearish only)
+
+        Returns:
+            DataFrame of symbols sorted by score
+        """
+        try:
+            n_symbols = len(table.symbols)
+            if len(table) == 0 or n_symbols == 0:
+                return pd.DataFrame()
+
+            codes = table['symbol']
+            # Repeated reports of one signal (aliased jobs) count as neutral
+            side = np.where(table.first_rows(), table['direction'], 0).astype(np.int8)
+            weight = np.array([self.weights.get(name, 1.0) for name in table.scanners])[table['scanner']]
+
+            bullish = np.bincount(codes, weights=weight * (side > 0), minlength=n_symbols)
+            bearish = np.bincount(codes, weights=weight * (side < 0), minlength=n_symbols)
+            bullish_count = np.bincount(codes[side > 0], minlength=n_symbols)
+            bearish_count = np.bincount(codes[side < 0], minlength=n_symbols)
+
+            symbol_side = np.sign(bullish - bearish).astype(np.int8)
+            aligned = np.where(symbol_side > 0, bullish, bearish)
+            opposing = np.where(symbol_side > 0, bearish, bullish)
+            aligned_count = np.where(symbol_side > 0, bullish_count, bearish_count)
+
+            # Rows agreeing with their symbol's direction
+            agrees = (side != 0) & (side == symbol_side[codes])
+
+            # Distinct timeframes per symbol among aligned rows
+            pairs = np.unique(codes[agrees].astype(np.int64) * len(table.timeframes) + table['timeframe'][agrees])
+            timeframe_count = np.bincount(pairs // max(len(table.timeframes), 1), minlength=n_symbols)
+
+            strength = table['strength']
+            valid = agrees & ~np.isnan(strength)
+            strength_sum = np.bincount(codes[valid], weights=strength[valid], minlength=n_symbols)
+            strength_n = np.bincount(codes[valid], minlength=n_symbols)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                avg_strength = np.where(strength_n > 0, strength_sum / strength_n, 0.0)
+
+            score = 10 * (aligned - opposing) + 5 * np.maximum(timeframe_count - 1, 0) + avg_strength / 10
+
+            keep = (symbol_side != 0) & (aligned_count >= min_signals)
+            if direction is not None:
+                keep &= symbol_side == direction
+
+            selected = np.flatnonzero(keep)
+            selected = selected[np.argsort(-score[selected], kind='stable')]
+
+            rows = []
+            for code in selected:
+                symbol = table.symbols[code]
+                positions = table.symbol_rows(symbol)
+                matched = positions[agrees[positions]]
+                prices = table['price'][positions]
+                prices = prices[~np.isnan(prices)]
+
+                rows.append({
+                    'Symbol': symbol,
+                    'Direction': 'Bullish' if symbol_side[code] > 0 else 'Bearish',
+                    'Score': round(float(score[code]), 1),
+                    'Aligned_Signals': int(aligned_count[code]),
+                    'Opposing_Signals': int(bearish_count[code] if symbol_side[code] > 0 else bullish_count[code]),
+                    'Timeframes': ', '.join(sorted({table.timeframes[t] for t in table['timeframe'][matched]})),
+                    'Scanners': ', '.join(table.scanners[s] for s in table['scanner'][matched]),
+                    'Avg_Strength': round(float(avg_strength[code]), 1),
+                    'Current_Price': round(float(prices[-1]), 2) if len(prices) else None
+                })
+
+            return pd.DataFrame(rows)
+
+        except Exception as e:
+            print(f"Error in {self.scanner_label} scanner: {e}")
+            return pd.DataFrame()
+
+    def scan(self, results_by_scanner, min_signals=2, direction=None):
+        """
+        Score confluence over a set of scanner results
+
+        Args:
+            results_by_scanner: Dict with scanner name as key and results DataFrame as value
+            min_signals: Minimum number of aligned signals required
+            direction: Optional 1 (bullish only) or -1 (bearish only)
+
+        Returns:
+            DataFrame of symbols sorted by score
+        """
+        return self.score(SignalTable.from_results(results_by_scanner), min_signals, direction)
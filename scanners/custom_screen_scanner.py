@@ -0,0 +1,144 @@
+import time
+import numpy as np
+import pandas as pd
+from scanners.base_scanner import BaseScanner
+from utils.panel_indicators import BarPanel
+from utils.screen_dsl import ScreenExpression, ScreenSyntaxError
+from utils.scan_profiler import SCAN_PROFILER
+
+class CustomScreenScanner(BaseScanner):
+    """Custom Screen Scanner evaluating screen expressions across the whole universe"""
+
+    scanner_label = "Custom Screen"
+    min_bars = 30
+    symbol_limit = None
+
+    # Lookback needed for long indicators such as sma(200) on each timeframe
+    DEFAULT_LOOKBACK_DAYS = {
+        "15m": 30,
+        "1h": 120,
+        "4h": 180,
+        "1d": 400
+    }
+
+    # Longest history Yahoo serves per interval, in days (4h bars are built from 1h)
+    MAX_LOOKBACK_DAYS = {
+        "15m": 59,
+        "1h": 729,
+        "4h": 729,
+        "1d": 3650
+    }
+
+    # Bars per trading session, for sizing a lookback in days
+    BARS_PER_SESSION = {
+        "15m": 25,
+        "1h": 7,
+        "4h": 2,
+        "1d": 1
+    }
+
+    # Trailing bars kept per symbol for screens with short indicators
+    DEFAULT_MAX_BARS = 400
+
+    EXAMPLE_SCREEN = "macd > signal and close > sma(200) and volume > 2*vol_sma(20)"
+
+    def panel_size(self, expression, timeframe="1d", lookback_days=None):
+        """
+        Get the history a screen needs on a timeframe
+
+        Args:
+            expression: ScreenExpression
+            timeframe: Data timeframe
+            lookback_days: Lookback requested by the caller (defaults per timeframe)
+
+        Returns:
+            Tuple of (lookback_days, max_bars)
+
+        Raises:
+            ScreenSyntaxError: If the screen needs more bars than the timeframe's
+                data provider serves
+        """
+        bars = expression.bars_needed
+        # Five sessions a week, plus a margin for exchange holidays
+        days = int(np.ceil(bars / self.BARS_PER_SESSION.get(timeframe, 1) * 7 / 5 * 1.1)) + 7
+        limit = self.MAX_LOOKBACK_DAYS.get(timeframe)
+        if limit is not None and days > limit:
+            available = int(limit * 5 / 7 / 1.1) * self.BARS_PER_SESSION.get(timeframe, 1)
+            raise ScreenSyntaxError(
+                f"Screen needs {bars} {timeframe} bars per symbol, but only about {available} are available")
+
+        lookback_days = max(lookback_days or self.DEFAULT_LOOKBACK_DAYS.get(timeframe, 90), days)
+        if limit is not None:
+            lookback_days = min(lookback_days, limit)
+        return lookback_days, max(self.DEFAULT_MAX_BARS, bars)
+
+    def load_panel(self, timeframe="1d", lookback_days=None, max_bars=DEFAULT_MAX_BARS):
+        """
+        Fetch bars for the universe and pack them into a BarPanel
+
+        Args:
+            timeframe: Data timeframe
+            lookback_days: Number of days to look back (defaults per timeframe)
+            max_bars: Maximum number of trailing bars kept per symbol
+
+        Returns:
+            BarPanel with one row per symbol
+        """
+        lookback_days = lookback_days or self.DEFAULT_LOOKBACK_DAYS.get(timeframe, 90)
+        data_map = self.fetch_universe(self.get_symbols(), timeframe, lookback_days)
+        return BarPanel(data_map, max_bars=max_bars)
+
+    @SCAN_PROFILER.profiled('detect', rows_arg=2)
+    def screen(self, expression, panel, timeframe="1d"):
+        """
+        Evaluate a screen expression over a panel
+
+        Args:
+            expression: Screen expression text or ScreenExpression
+            panel: BarPanel to evaluate
+            timeframe: Timeframe the panel was built from
+
+        Returns:
+            Tuple of (DataFrame of matching symbols, evaluation time in milliseconds)
+        """
+        if not isinstance(expression, ScreenExpression):
+            expression = ScreenExpression(expression)
+
+        started = time.perf_counter()
+        evaluation = expression.evaluate(panel)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        mask = evaluation['mask']
+        matches = np.flatnonzero(mask)
+
+        results = pd.DataFrame({'Symbol': [panel.symbols[i] for i in matches]})
+        results['Current_Price'] = np.round(panel.latest(panel.field('close'))[matches], 2)
+        for term, values in evaluation['values'].items():
+            if term != 'close':
+                results[term] = np.round(values[matches], 4)
+        results['Timeframe'] = timeframe
+
+        return results, round(elapsed_ms, 2)
+
+    def scan(self, timeframe="1d", lookback_days=None, expression=EXAMPLE_SCREEN):
+        """
+        Scan the universe with a screen expression
+
+        Args:
+            timeframe: Data timeframe (15m, 1h, 4h, 1d)
+            lookback_days: Number of days to look back (defaults per timeframe)
+            expression: Screen expression
+
+        Returns:
+            DataFrame with matching symbols
+        """
+        try:
+            if not isinstance(expression, ScreenExpression):
+                expression = ScreenExpression(expression)
+            lookback_days, max_bars = self.panel_size(expression, timeframe, lookback_days)
+            panel = self.load_panel(timeframe, lookback_days, max_bars)
+            results, _ = self.screen(expression, panel, timeframe)
+            return results
+        except Exception as e:
+            print(f"Error in {self.scanner_label} scanner: {e}")
+            return pd.DataFrame()
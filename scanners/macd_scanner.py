@@ -1,14 +1,13 @@
-import pandas as pd
 import numpy as np
-from utils.data_fetcher import DataFetcher
-from utils.technical_indicators import TechnicalIndicators
+from scanners.base_scanner import BaseScanner
 
-class MACDScanner:
+class MACDScanner(BaseScanner):
     """MACD Scanner with 15-minute intervals for momentum analysis"""
     
-    def __init__(self):
-        self.data_fetcher = DataFetcher()
-        self.tech_indicators = TechnicalIndicators()
+    scanner_label = "MACD"
+    min_bars = 50
+    # Signals that hold over a run of bars (keyed by the bar they began on)
+    STATE_SIGNALS = ('Bullish Momentum', 'Bearish Momentum')
         
     def scan(self, timeframe="15m", lookback_days=30):
         """
@@ -21,64 +20,71 @@ class MACDScanner:
         Returns:
             DataFrame with MACD signals
         """
-        try:
-            # Get NSE stock list
-            symbols = self.data_fetcher.get_nse_stock_list()
-            results = []
+        return self.run_scan(timeframe, lookback_days)
+    
+    def analyze(self, symbol, data, timeframe):
+        """
+        Detect a MACD signal for a single symbol
+        
+        Args:
+            symbol: Stock symbol
+            data: OHLCV DataFrame
+            timeframe: Data timeframe
             
-            for symbol in symbols[:100]:  # Limit to first 100 for performance
-                try:
-                    # Fetch data
-                    data = self.data_fetcher.get_stock_data(
-                        symbol, 
-                        period=f"{lookback_days}d",
-                        interval=timeframe
-                    )
-                    
-                    if data is None or len(data) < 50:
-                        continue
-                    
-                    # Calculate MACD
-                    macd_data = self.tech_indicators.calculate_macd(
-                        data['Close'], 
-                        fast=12, 
-                        slow=26, 
-                        signal=9
-                    )
-                    
-                    # Check for MACD signals
-                    signal = self.detect_macd_signal(macd_data)
-                    
-                    if signal['type'] != 'none':
-                        # Get current price info
-                        current_price = data['Close'].iloc[-1]
-                        volume = data['Volume'].iloc[-1] if 'Volume' in data else 0
-                        
-                        # Calculate additional metrics
-                        price_change = ((current_price - data['Close'].iloc[-2]) / data['Close'].iloc[-2]) * 100
-                        
-                        results.append({
-                            'Symbol': symbol,
-                            'Signal': signal['type'],
-                            'MACD': round(macd_data['MACD'].iloc[-1], 4),
-                            'Signal_Line': round(macd_data['Signal'].iloc[-1], 4),
-                            'Histogram': round(macd_data['Histogram'].iloc[-1], 4),
-                            'Current_Price': round(current_price, 2),
-                            'Price_Change_%': round(price_change, 2),
-                            'Volume': int(volume),
-                            'Strength': signal['strength'],
-                            'Timeframe': timeframe
-                        })
-                        
-                except Exception as e:
-                    print(f"Error processing {symbol}: {e}")
-                    continue
+        Returns:
+            Dict with result row, or None when there is no signal
+        """
+        # Calculate MACD
+        macd_data = self.tech_indicators.calculate_macd(
+            data['Close'], 
+            fast=12, 
+            slow=26, 
+            signal=9
+        )
+        
+        # Check for MACD signals
+        signal = self.detect_macd_signal(macd_data)
+        
+        if signal['type'] == 'none':
+            return None
+        
+        # Get current price info
+        current_price = data['Close'].iloc[-1]
+        volume = data['Volume'].iloc[-1] if 'Volume' in data else 0
+        
+        # Calculate additional metrics
+        price_change = ((current_price - data['Close'].iloc[-2]) / data['Close'].iloc[-2]) * 100
+        
+        # Crossovers belong to the latest bar; momentum is keyed by the bar it began on
+        bar_time = data.index[-1]
+        if signal['type'] in self.STATE_SIGNALS:
+            macd = macd_data['MACD'].to_numpy()
+            signal_line = macd_data['Signal'].to_numpy()
+            histogram = macd_data['Histogram'].to_numpy()
+            bullish = signal['type'] == 'Bullish Momentum'
             
-            return pd.DataFrame(results)
+            def holds(i):
+                if i < 1:
+                    return False
+                if bullish:
+                    return macd[i] > signal_line[i] and histogram[i] > histogram[i - 1] > 0
+                return macd[i] < signal_line[i] and histogram[i] < histogram[i - 1] < 0
             
-        except Exception as e:
-            print(f"Error in MACD scanner: {e}")
-            return pd.DataFrame()
+            bar_time = self.state_onset(data.index, holds)
+        
+        return {
+            'Symbol': symbol,
+            'Signal': signal['type'],
+            'MACD': round(macd_data['MACD'].iloc[-1], 4),
+            'Signal_Line': round(macd_data['Signal'].iloc[-1], 4),
+            'Histogram': round(macd_data['Histogram'].iloc[-1], 4),
+            'Current_Price': round(current_price, 2),
+            'Price_Change_%': round(price_change, 2),
+            'Volume': int(volume),
+            'Strength': signal['strength'],
+            'Bar_Time': bar_time,
+            'Timeframe': timeframe
+        }
     
     def detect_macd_signal(self, macd_data):
         """
@@ -4,11 +4,21 @@ import yfinance as yf
 import time
 from datetime import datetime, timedelta
 import pytz
+from scanners.base_scanner import BaseScanner
+from utils.scan_profiler import SCAN_PROFILER
 
-class MACDScannerOriginal:
+class MACDScannerOriginal(BaseScanner):
     """MACD Scanner with exact logic from user's original file"""
     
+    scanner_label = "MACD"
+    min_bars = 30
+    symbol_limit = None  # Original logic scans the full stock list
+    
+    # Timeframes scanned on other bars (15m signals use daily bars)
+    SCAN_TIMEFRAMES = {"15m": "1d"}
+    
     def __init__(self):
+        super().__init__()
         self.ist = pytz.timezone('Asia/Kolkata')
         
     def get_ist_time(self):
@@ -28,6 +38,7 @@ class MACDScannerOriginal:
         return ema_array
 
     @staticmethod
+    @SCAN_PROFILER.profiled('indicators')
     def calculate_macd(close_prices):
         """Calculate MACD exactly like the Google Apps Script reference"""
         if len(close_prices) < 30:
@@ -74,63 +85,120 @@ class MACDScannerOriginal:
             'signals': signals
         }
     
+    def fetch_symbol_data(self, symbol, timeframe, lookback_days=None):
+        """
+        Fetch price history exactly like the original scanner
+        
+        Histories are kept in the shared market data cache until their next
+        bar close, so repeated scans within a bar skip the download.
+        
+        Args:
+            symbol: Stock symbol
+            timeframe: Scan timeframe ('4h' or '1d')
+            lookback_days: Unused, periods are fixed by the original logic
+            
+        Returns:
+            DataFrame with OHLCV data or None
+        """
+        interval = '4h' if timeframe == '4h' else '1d'
+        hist = self.data_fetcher.cache.get_or_load(
+            self.bars_cache_key(symbol, timeframe, lookback_days),
+            interval,
+            lambda: self._download_history(symbol, interval)
+        )
+        return hist.copy() if hist is not None else None
+    
+    @classmethod
+    def bars_cache_key(cls, symbol, timeframe, lookback_days=None):
+        """Key under which fetch_symbol_data() caches a symbol's history"""
+        return ('macd_original', symbol, '4h' if timeframe == '4h' else '1d')
+    
+    def _download_history(self, symbol, interval):
+        """Download the original scanner's history for one symbol"""
+        stock = yf.Ticker(symbol)
+
+        # Get data based on timeframe
+        if interval == '4h':
+            hist = stock.history(period="60d", interval="1h")
+            # Resample to 4-hour intervals
+            with SCAN_PROFILER.stage('resample', rows=len(hist)):
+                hist = hist.resample('4h').agg({
+                    'Open': 'first',
+                    'High': 'max',
+                    'Low': 'min',
+                    'Close': 'last',
+                    'Volume': 'sum'
+                }).dropna()
+        else:
+            hist = stock.history(period="3mo", interval="1d")
+
+        time.sleep(0.1)  # Rate limiting
+
+        # Empty downloads are not cached, they are often transient failures
+        return hist if not hist.empty else None
+    
+    def has_enough_data(self, data):
+        """Check whether fetched bars are long enough to analyze"""
+        return data is not None and not data.empty and len(data) >= self.min_bars
+    
+    def analyze(self, symbol, data, timeframe):
+        """
+        Detect a bearish to bullish MACD crossover for a single symbol
+        
+        Args:
+            symbol: Stock symbol
+            data: OHLCV DataFrame
+            timeframe: Scan timeframe
+            
+        Returns:
+            Dict with crossover details, or None when there is no crossover
+        """
+        prices = data['Close'].tolist()
+        macd_data = self.calculate_macd(prices)
+
+        if not macd_data:
+            return None
+
+        current_signal = macd_data['signals'][-1] if macd_data['signals'] else "NO SIGNAL"
+        prev_signal = macd_data['signals'][-2] if len(macd_data['signals']) > 1 else "NO SIGNAL"
+
+        # Focus on bearish to bullish transitions
+        bearish_signals = ["SELL", "WEAK SELL", "STRONG SELL"]
+        bullish_signals = ["BUY", "WEAK BUY", "STRONG BUY"]
+
+        # Check for signal change from bearish to bullish
+        if not (prev_signal in bearish_signals and current_signal in bullish_signals):
+            return None
+
+        return {
+            'symbol': symbol.replace('.NS', ''),
+            'type': "bullish",
+            'previous_type': prev_signal,
+            'current_signal': current_signal,
+            'timestamp': self.get_ist_time(),
+            'bar_time': data.index[-1],
+            'macd': macd_data['macd'],
+            'signal': macd_data['signal'],
+            'histogram': macd_data['histogram'],
+            'price': prices[-1],
+            'timeframe': timeframe,
+            'signal_strength': self._calculate_signal_strength(current_signal)
+        }
+    
     def scan_crossovers(self, stock_symbols, timeframe='1d'):
         """Scan for MACD crossovers focusing on bearish to bullish transitions"""
         crossovers = []
 
         for symbol in stock_symbols:
             try:
-                stock = yf.Ticker(symbol)
-
-                # Get data based on timeframe
-                if timeframe == '4h':
-                    hist = stock.history(period="60d", interval="1h")
-                    # Resample to 4-hour intervals
-                    hist = hist.resample('4h').agg({
-                        'Open': 'first',
-                        'High': 'max',
-                        'Low': 'min',
-                        'Close': 'last',
-                        'Volume': 'sum'
-                    }).dropna()
-                else:
-                    hist = stock.history(period="3mo", interval="1d")
-
-                if hist.empty or len(hist) < 30:
-                    continue
-
-                prices = hist['Close'].tolist()
-                macd_data = self.calculate_macd(prices)
+                hist = self.fetch_symbol_data(symbol, timeframe)
 
-                if not macd_data:
+                if not self.has_enough_data(hist):
                     continue
 
-                current_signal = macd_data['signals'][-1] if macd_data['signals'] else "NO SIGNAL"
-                prev_signal = macd_data['signals'][-2] if len(macd_data['signals']) > 1 else "NO SIGNAL"
-
-                # Focus on bearish to bullish transitions
-                bearish_signals = ["SELL", "WEAK SELL", "STRONG SELL"]
-                bullish_signals = ["BUY", "WEAK BUY", "STRONG BUY"]
-
-                # Check for signal change from bearish to bullish
-                if (prev_signal in bearish_signals and current_signal in bullish_signals):
-                    crossover_type = "bullish"
-
-                    crossovers.append({
-                        'symbol': symbol.replace('.NS', ''),
-                        'type': crossover_type,
-                        'previous_type': prev_signal,
-                        'current_signal': current_signal,
-                        'timestamp': self.get_ist_time(),
-                        'macd': macd_data['macd'],
-                        'signal': macd_data['signal'],
-                        'histogram': macd_data['histogram'],
-                        'price': prices[-1],
-                        'timeframe': timeframe,
-                        'signal_strength': self._calculate_signal_strength(current_signal)
-                    })
-
-                time.sleep(0.1)  # Rate limiting
+                crossover = self.analyze(symbol, hist, timeframe)
+                if crossover:
+                    crossovers.append(crossover)
 
             except Exception as e:
                 continue
@@ -161,27 +229,43 @@ class MACDScannerOriginal:
         Returns:
             DataFrame with MACD signals
         """
-        from utils.data_fetcher import DataFetcher
-        
-        data_fetcher = DataFetcher()
-        stock_symbols = data_fetcher.get_nse_stock_list()
-        
         # Map timeframes for scanning
-        if timeframe == "15m":
-            scan_timeframe = "1d"  # Use daily for 15m analysis
-        else:
-            scan_timeframe = timeframe
+        scan_timeframe = self.SCAN_TIMEFRAMES.get(timeframe, timeframe)
+            
+        return self.run_scan(scan_timeframe, lookback_days)
+    
+    @classmethod
+    def canonical_scan_kwargs(cls, scan_kwargs):
+        """
+        Reduce scan() arguments to the ones that change results
+        
+        Args:
+            scan_kwargs: Keyword arguments for scan()
             
-        crossovers = self.scan_crossovers(stock_symbols, scan_timeframe)
+        Returns:
+            Dict with the timeframe actually scanned (lookback_days is unused)
+        """
+        timeframe = scan_kwargs.get('timeframe', '15m')
+        return {'timeframe': cls.SCAN_TIMEFRAMES.get(timeframe, timeframe)}
+    
+    def build_results(self, rows):
+        """
+        Convert crossover rows into the scanner's output DataFrame
         
-        if not crossovers:
+        Args:
+            rows: List of crossover dicts
+            
+        Returns:
+            DataFrame with MACD signals
+        """
+        if not rows:
             return pd.DataFrame()
         
         # Convert to DataFrame
-        df = pd.DataFrame(crossovers)
+        df = pd.DataFrame(rows)
         
         # Add additional columns for compatibility
         df['signal_type'] = 'MACD Crossover'
         df['confidence'] = df['signal_strength'] / 5.0  # Normalize to 0-1
         
-        return df
\ No newline at end of file
+        return df
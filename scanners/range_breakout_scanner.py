@@ -1,14 +1,14 @@
-import pandas as pd
 import numpy as np
-from utils.data_fetcher import DataFetcher
-from utils.technical_indicators import TechnicalIndicators
+from scanners.base_scanner import BaseScanner
+from utils.scan_profiler import SCAN_PROFILER
 
-class RangeBreakoutScanner:
+class RangeBreakoutScanner(BaseScanner):
     """Range Breakout Scanner using Pine Script logic with 4-hour intervals"""
     
-    def __init__(self):
-        self.data_fetcher = DataFetcher()
-        self.tech_indicators = TechnicalIndicators()
+    scanner_label = "Range Breakout"
+    min_bars = 100
+    # Signals that hold over a run of bars (keyed by the bar they began on)
+    STATE_SIGNALS = ('Near Upper Boundary', 'Near Lower Boundary')
         
     def scan(self, timeframe="4h", lookback_days=60):
         """
@@ -21,60 +21,64 @@ class RangeBreakoutScanner:
         Returns:
             DataFrame with range breakout signals
         """
-        try:
-            symbols = self.data_fetcher.get_nse_stock_list()
-            results = []
-            
-            for symbol in symbols[:100]:  # Limit for performance
-                try:
-                    # Fetch data
-                    data = self.data_fetcher.get_stock_data(
-                        symbol, 
-                        period=f"{lookback_days}d",
-                        interval=timeframe
-                    )
-                    
-                    if data is None or len(data) < 100:
-                        continue
-                    
-                    # Detect ranges using Pine Script logic
-                    ranges = self.detect_ranges(data)
-                    
-                    if ranges:
-                        # Check for breakouts
-                        breakout = self.detect_breakout(data, ranges[-1])
-                        
-                        if breakout['type'] != 'none':
-                            current_price = data['Close'].iloc[-1]
-                            volume = data['Volume'].iloc[-1] if 'Volume' in data else 0
-                            
-                            # Calculate range statistics
-                            range_data = ranges[-1]
-                            range_width = ((range_data['top'] - range_data['bottom']) / range_data['bottom']) * 100
-                            
-                            results.append({
-                                'Symbol': symbol,
-                                'Breakout_Type': breakout['type'],
-                                'Current_Price': round(current_price, 2),
-                                'Range_Top': round(range_data['top'], 2),
-                                'Range_Bottom': round(range_data['bottom'], 2),
-                                'Range_Width_%': round(range_width, 2),
-                                'Breakout_Strength': breakout['strength'],
-                                'Volume': int(volume),
-                                'Days_in_Range': range_data['duration'],
-                                'Timeframe': timeframe
-                            })
-                            
-                except Exception as e:
-                    print(f"Error processing {symbol}: {e}")
-                    continue
-            
-            return pd.DataFrame(results)
+        return self.run_scan(timeframe, lookback_days)
+    
+    def analyze(self, symbol, data, timeframe):
+        """
+        Detect a range breakout signal for a single symbol
+        
+        Args:
+            symbol: Stock symbol
+            data: OHLCV DataFrame
+            timeframe: Data timeframe
             
-        except Exception as e:
-            print(f"Error in Range Breakout scanner: {e}")
-            return pd.DataFrame()
+        Returns:
+            Dict with result row, or None when there is no signal
+        """
+        # Detect ranges using Pine Script logic
+        ranges = self.detect_ranges(data)
+        
+        if not ranges:
+            return None
+        
+        # Check for breakouts
+        breakout = self.detect_breakout(data, ranges[-1])
+        
+        if breakout['type'] == 'none':
+            return None
+        
+        current_price = data['Close'].iloc[-1]
+        volume = data['Volume'].iloc[-1] if 'Volume' in data else 0
+        
+        # Calculate range statistics
+        range_data = ranges[-1]
+        range_width = ((range_data['top'] - range_data['bottom']) / range_data['bottom']) * 100
+        
+        # Breakouts belong to the latest bar; boundary proximity is keyed by the bar it began on
+        bar_time = data.index[-1]
+        if breakout['type'] in self.STATE_SIGNALS:
+            close = data['Close'].to_numpy()
+            bar_time = self.state_onset(
+                data.index,
+                lambda i: i > range_data['end']
+                and self.boundary_signal(close[i], range_data)['type'] == breakout['type']
+            )
+        
+        return {
+            'Symbol': symbol,
+            'Breakout_Type': breakout['type'],
+            'Current_Price': round(current_price, 2),
+            'Range_Top': round(range_data['top'], 2),
+            'Range_Bottom': round(range_data['bottom'], 2),
+            'Range_Width_%': round(range_width, 2),
+            'Breakout_Strength': breakout['strength'],
+            'Volume': int(volume),
+            'Days_in_Range': range_data['duration'],
+            'Bar_Time': bar_time,
+            'Timeframe': timeframe
+        }
     
+    @SCAN_PROFILER.profiled('levels', rows_arg=1)
     def detect_ranges(self, data, length=20, mult=1.0, atr_length=500):
         """
         Detect price ranges using Pine Script logic
@@ -183,19 +187,36 @@ class RangeBreakoutScanner:
                 return {'type': 'Downward Breakout', 'strength': round(strength, 1)}
             
             # Range continuation
-            elif range_bottom < current_price < range_top:
-                # Check proximity to boundaries
-                if current_price > range_middle:
-                    proximity = ((current_price - range_middle) / (range_top - range_middle)) * 100
-                    if proximity > 80:
-                        return {'type': 'Near Upper Boundary', 'strength': round(proximity, 1)}
-                else:
-                    proximity = ((range_middle - current_price) / (range_middle - range_bottom)) * 100
-                    if proximity > 80:
-                        return {'type': 'Near Lower Boundary', 'strength': round(proximity, 1)}
-            
-            return {'type': 'none', 'strength': 0}
+            return self.boundary_signal(current_price, range_data)
             
         except Exception as e:
             print(f"Error in breakout detection: {e}")
             return {'type': 'none', 'strength': 0}
+    
+    def boundary_signal(self, price, range_data):
+        """
+        Check a price inside a range for proximity to its boundaries
+        
+        Args:
+            price: Close price
+            range_data: Range information
+            
+        Returns:
+            Dict with signal type ('none' away from the boundaries) and strength
+        """
+        range_top = range_data['top']
+        range_bottom = range_data['bottom']
+        range_middle = range_data['middle']
+        
+        if range_bottom < price < range_top:
+            # Check proximity to boundaries
+            if price > range_middle:
+                proximity = ((price - range_middle) / (range_top - range_middle)) * 100
+                if proximity > 80:
+                    return {'type': 'Near Upper Boundary', 'strength': round(proximity, 1)}
+            else:
+                proximity = ((range_middle - price) / (range_middle - range_bottom)) * 100
+                if proximity > 80:
+                    return {'type': 'Near Lower Boundary', 'strength': round(proximity, 1)}
+        
+        return {'type': 'none', 'strength': 0}
@@ -1,80 +1,157 @@
-import pandas as pd
 import numpy as np
-from utils.data_fetcher import DataFetcher
-from utils.technical_indicators import TechnicalIndicators
+from scanners.base_scanner import BaseScanner
+from utils.prefilter import PrefilterPipeline
+from utils.panel_indicators import PanelIndicators
+from utils.scan_profiler import SCAN_PROFILER
 
-class ResistanceBreakoutScanner:
+class ResistanceBreakoutScanner(BaseScanner):
     """Resistance Breakout Scanner with 4-hour intervals for breakout + retracement detection"""
     
-    def __init__(self):
-        self.data_fetcher = DataFetcher()
-        self.tech_indicators = TechnicalIndicators()
+    scanner_label = "Resistance Breakout"
+    min_bars = 100
+    # Signals that hold over a run of bars (keyed by the bar they began on)
+    STATE_SIGNALS = ('Retracement Entry',)
         
-    def scan(self, timeframe="4h", lookback_days=90):
+    def scan(self, timeframe="4h", lookback_days=90, liquid_only=False):
         """
         Scan for resistance breakout signals
         
         Args:
             timeframe: Data timeframe (4h recommended)
             lookback_days: Number of days to look back
+            liquid_only: Also skip illiquid symbols and symbols far below their
+                         recent high (faster, but may drop signals)
             
         Returns:
             DataFrame with resistance breakout signals
         """
-        try:
-            symbols = self.data_fetcher.get_nse_stock_list()
-            results = []
-            
-            for symbol in symbols[:100]:  # Limit for performance
-                try:
-                    # Fetch data
-                    data = self.data_fetcher.get_stock_data(
-                        symbol, 
-                        period=f"{lookback_days}d",
-                        interval=timeframe
-                    )
-                    
-                    if data is None or len(data) < 100:
-                        continue
-                    
-                    # Identify resistance levels
-                    resistance_levels = self.identify_resistance_levels(data)
-                    
-                    if resistance_levels:
-                        # Check for breakouts and retracements
-                        signal = self.detect_resistance_breakout(data, resistance_levels)
-                        
-                        if signal['type'] != 'none':
-                            current_price = data['Close'].iloc[-1]
-                            volume = data['Volume'].iloc[-1] if 'Volume' in data else 0
-                            
-                            # Get the relevant resistance level
-                            resistance_level = signal['resistance_level']
-                            distance_to_resistance = ((current_price - resistance_level) / resistance_level) * 100
-                            
-                            results.append({
-                                'Symbol': symbol,
-                                'Signal_Type': signal['type'],
-                                'Current_Price': round(current_price, 2),
-                                'Resistance_Level': round(resistance_level, 2),
-                                'Distance_to_Resistance_%': round(distance_to_resistance, 2),
-                                'Breakout_Strength': signal['strength'],
-                                'Volume': int(volume),
-                                'Resistance_Touches': signal['touches'],
-                                'Days_Since_Breakout': signal.get('days_since_breakout', 0),
-                                'Timeframe': timeframe
-                            })
-                            
-                except Exception as e:
-                    print(f"Error processing {symbol}: {e}")
-                    continue
-            
-            return pd.DataFrame(results)
+        self.prefilter = self.build_prefilter(liquid_only)
+        return self.run_scan(timeframe, lookback_days)
+    
+    def build_prefilter(self, liquid_only=False):
+        """Skip symbols with no peak near a breakout level, plus illiquid ones when asked"""
+        if not liquid_only:
+            return PrefilterPipeline(min_bars=self.min_bars, candidates=self.level_candidates)
+        return PrefilterPipeline(
+            min_bars=self.min_bars,
+            min_price=10,
+            min_turnover=5000000,  # mean traded value per bar (INR)
+            # Breakouts are judged against the 20-bar high; retracement entries
+            # sit 5%+ under it, so allow a wide band
+            max_atr_distance=6,
+            level_side='high',
+            level_lookback=20,
+            candidates=self.level_candidates
+        )
+    
+    @staticmethod
+    def level_candidates(panel, window=20, tolerance=0.02):
+        """
+        Find symbols that may have a signal, from their peaks alone
+        
+        A resistance level averages highs within tolerance of a peak, so it
+        lies within tolerance of that peak. Each signal of
+        detect_resistance_breakout() bounds the level from the last two
+        closes and the recent highs; a symbol without a peak in any of
+        those bands cannot signal.
+        
+        Args:
+            panel: BarPanel with every fetched bar
+            window: Peak window of identify_resistance_levels()
+            tolerance: Level matching tolerance of that method
             
-        except Exception as e:
-            print(f"Error in Resistance Breakout scanner: {e}")
-            return pd.DataFrame()
+        Returns:
+            Boolean array with one entry per symbol
+        """
+        high = panel.field('high')
+        close = panel.field('close')
+        peaks = high == PanelIndicators.rolling_max(high, window, center=True)
+        price = panel.latest(close)
+        previous = close[:, -2] if close.shape[1] > 1 else np.full(len(panel), np.nan)
+        high_20 = np.max(np.nan_to_num(high[:, -20:], nan=-np.inf), axis=1)
+        high_10 = np.max(np.nan_to_num(high[:, -10:], nan=-np.inf), axis=1)
+        
+        def level_band(lowest, highest):
+            # Slack keeps rounding at the band edges on the safe side
+            return PrefilterPipeline.any_between(
+                high, peaks,
+                lowest / (1 + tolerance) * (1 - 1e-9),
+                highest / (1 - tolerance) * (1 + 1e-9)
+            )
+        
+        # Fresh breakout: previous close <= 1.01 x level < close
+        fresh = level_band(previous / 1.01, price / 1.01)
+        # Retracement entry: 30-70% back from a 3%+ breakout, 5%+ under the
+        # 20-bar high and still 0.5% above the level
+        with np.errstate(invalid='ignore'):
+            retraced = price < high_20 * 0.95
+        retracement = retraced & level_band(
+            high_20 - (high_20 - price) / 0.3,
+            np.minimum(price / 1.005, high_20 / 1.03)
+        )
+        # Failed breakout: close <= level < previous close, after a 2%+ breakout
+        failed = level_band(price, np.minimum(previous, high_10 / 1.02))
+        
+        return fresh | retracement | failed | np.isnan(price) | np.isnan(previous)
     
+    def analyze(self, symbol, data, timeframe):
+        """
+        Detect a resistance breakout signal for a single symbol
+        
+        Args:
+            symbol: Stock symbol
+            data: OHLCV DataFrame
+            timeframe: Data timeframe
+            
+        Returns:
+            Dict with result row, or None when there is no signal
+        """
+        # Identify resistance levels
+        resistance_levels = self.identify_resistance_levels(data)
+        
+        if not resistance_levels:
+            return None
+        
+        # Check for breakouts and retracements
+        signal = self.detect_resistance_breakout(data, resistance_levels)
+        
+        if signal['type'] == 'none':
+            return None
+        
+        current_price = data['Close'].iloc[-1]
+        volume = data['Volume'].iloc[-1] if 'Volume' in data else 0
+        
+        # Get the relevant resistance level
+        resistance_level = signal['resistance_level']
+        distance_to_resistance = ((current_price - resistance_level) / resistance_level) * 100
+        
+        # Breakouts belong to the latest bar; a retracement is keyed by the bar it began on
+        bar_time = data.index[-1]
+        if signal['type'] in self.STATE_SIGNALS:
+            close = data['Close'].to_numpy()
+            recent_high = data['High'].rolling(20, min_periods=1).max().to_numpy()
+            threshold = resistance_level * 1.01
+            bar_time = self.state_onset(
+                data.index,
+                lambda i: not (i > 0 and close[i] > threshold and close[i - 1] <= threshold)
+                and self.retracement_pct(close[i], recent_high[i], resistance_level) is not None
+            )
+        
+        return {
+            'Symbol': symbol,
+            'Signal_Type': signal['type'],
+            'Current_Price': round(current_price, 2),
+            'Resistance_Level': round(resistance_level, 2),
+            'Distance_to_Resistance_%': round(distance_to_resistance, 2),
+            'Breakout_Strength': signal['strength'],
+            'Volume': int(volume),
+            'Resistance_Touches': signal['touches'],
+            'Days_Since_Breakout': signal.get('days_since_breakout', 0),
+            'Bar_Time': bar_time,
+            'Timeframe': timeframe
+        }
+    
+    @SCAN_PROFILER.profiled('levels', rows_arg=1)
     def identify_resistance_levels(self, data, window=20, min_touches=3):
         """
         Identify resistance levels from price data
@@ -181,27 +258,19 @@ class ResistanceBreakoutScanner:
                     
                     # Find if price went significantly above resistance and came back
                     max_price_recent = recent_data['High'].max()
-                    breakout_height = max_price_recent - level
+                    retracement_pct = self.retracement_pct(current_price, max_price_recent, level)
                     
-                    if (breakout_height > level * 0.03 and  # At least 3% breakout
-                        current_price < max_price_recent * 0.95 and  # Retraced at least 5%
-                        current_price > level * 1.005):  # Still above resistance
-                        
-                        retracement_pct = ((max_price_recent - current_price) / 
-                                         (max_price_recent - level)) * 100
+                    if retracement_pct is not None:
+                        strength = 100 - retracement_pct  # Stronger if less retraced
                         
-                        # Look for retracement patterns
-                        if 30 <= retracement_pct <= 70:  # Healthy retracement
-                            strength = 100 - retracement_pct  # Stronger if less retraced
-                            
-                            return {
-                                'type': 'Retracement Entry',
-                                'resistance_level': level,
-                                'strength': round(strength, 1),
-                                'touches': resistance['touches'],
-                                'retracement_%': round(retracement_pct, 1),
-                                'max_breakout_price': round(max_price_recent, 2)
-                            }
+                        return {
+                            'type': 'Retracement Entry',
+                            'resistance_level': level,
+                            'strength': round(strength, 1),
+                            'touches': resistance['touches'],
+                            'retracement_%': round(retracement_pct, 1),
+                            'max_breakout_price': round(max_price_recent, 2)
+                        }
                 
                 # Failed breakout (false breakout)
                 elif (previous_price > level and current_price <= level):
@@ -224,3 +293,31 @@ class ResistanceBreakoutScanner:
         except Exception as e:
             print(f"Error in resistance breakout detection: {e}")
             return {'type': 'none', 'strength': 0}
+    
+    @staticmethod
+    def retracement_pct(price, recent_high, level):
+        """
+        Measure a healthy retracement toward a broken resistance level
+        
+        Args:
+            price: Close price
+            recent_high: Highest high of the last 20 bars
+            level: Resistance level
+            
+        Returns:
+            Retracement as % of the breakout height, or None unless price
+            broke out at least 3%, retraced 30-70% and is still above the level
+        """
+        breakout_height = recent_high - level
+        
+        if (breakout_height > level * 0.03 and  # At least 3% breakout
+            price < recent_high * 0.95 and  # Retraced at least 5%
+            price > level * 1.005):  # Still above resistance
+            
+            retracement_pct = ((recent_high - price) / breakout_height) * 100
+            
+            # Look for retracement patterns
+            if 30 <= retracement_pct <= 70:  # Healthy retracement
+                return retracement_pct
+        
+        return None
@@ -0,0 +1,96 @@
+from scanners.macd_scanner_original import MACDScannerOriginal
+from scanners.range_breakout_scanner import RangeBreakoutScanner
+from scanners.resistance_breakout_scanner import ResistanceBreakoutScanner
+from scanners.support_level_scanner import SupportLevelScanner
+
+# Scanner jobs shown in the app, keyed by display name.
+# Each job is (scanner class, keyword arguments for scanner.scan()).
+SCANNER_JOBS = {
+    "MACD 15min": (MACDScannerOriginal, {"timeframe": "15m"}),
+    "MACD 4h": (MACDScannerOriginal, {"timeframe": "4h"}),
+    "MACD 1d": (MACDScannerOriginal, {"timeframe": "1d"}),
+    "Range Breakout 4h": (RangeBreakoutScanner, {"timeframe": "4h"}),
+    "Resistance Breakout 4h": (ResistanceBreakoutScanner, {"timeframe": "4h"}),
+    "Support Level 4h": (SupportLevelScanner, {"timeframe": "4h"})
+}
+
+
+def job_slug(name):
+    """URL and command-line form of a scanner job name ('MACD 4h' -> 'macd-4h')"""
+    return name.lower().replace(' ', '-').replace('_', '-')
+
+
+def get_scanner_jobs(names=None):
+    """
+    Get scanner job definitions
+
+    Args:
+        names: Optional iterable of job names to select (defaults to all jobs)
+
+    Returns:
+        Dict with job name as key and (scanner class, scan kwargs) as value
+    """
+    if names is None:
+        return dict(SCANNER_JOBS)
+    return {name: SCANNER_JOBS[name] for name in names if name in SCANNER_JOBS}
+
+
+def job_signature(scanner_cls, scan_kwargs):
+    """
+    Identify the work a scanner job does
+
+    Jobs with equal signatures produce identical results, so a cycle runs
+    each signature once. Scanners may define canonical_scan_kwargs() to
+    fold equivalent arguments together.
+
+    Args:
+        scanner_cls: Scanner class
+        scan_kwargs: Keyword arguments for scanner.scan()
+
+    Returns:
+        Hashable tuple
+    """
+    canonical = getattr(scanner_cls, 'canonical_scan_kwargs', None)
+    kwargs = canonical(scan_kwargs) if canonical is not None else scan_kwargs
+    return (scanner_cls.__module__, scanner_cls.__qualname__, tuple(sorted(kwargs.items())))
+
+
+def dedupe_jobs(jobs):
+    """
+    Collapse jobs that do identical work
+
+    Args:
+        jobs: Dict with job name as key and (scanner class, scan kwargs) as value
+
+    Returns:
+        Tuple of (dict of distinct jobs, dict mapping every job name to the
+        name of the distinct job whose results it shares)
+    """
+    distinct = {}
+    aliases = {}
+    by_signature = {}
+
+    for name, (scanner_cls, scan_kwargs) in jobs.items():
+        signature = job_signature(scanner_cls, scan_kwargs)
+        if signature not in by_signature:
+            by_signature[signature] = name
+            distinct[name] = (scanner_cls, scan_kwargs)
+        aliases[name] = by_signature[signature]
+
+    return distinct, aliases
+
+
+def job_interval(scanner_cls, scan_kwargs):
+    """
+    Get the bar interval a job scans (its results change when this bar closes)
+
+    Args:
+        scanner_cls: Scanner class
+        scan_kwargs: Keyword arguments for scanner.scan()
+
+    Returns:
+        Interval string such as '15m', '4h' or '1d'
+    """
+    canonical = getattr(scanner_cls, 'canonical_scan_kwargs', None)
+    kwargs = canonical(scan_kwargs) if canonical is not None else scan_kwargs
+    return kwargs.get('timeframe', '1d')
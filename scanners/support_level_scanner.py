@@ -1,78 +1,142 @@
-import pandas as pd
 import numpy as np
-from utils.data_fetcher import DataFetcher
-from utils.technical_indicators import TechnicalIndicators
+from scanners.base_scanner import BaseScanner
+from utils.prefilter import PrefilterPipeline
+from utils.panel_indicators import PanelIndicators
+from utils.scan_profiler import SCAN_PROFILER
 
-class SupportLevelScanner:
+class SupportLevelScanner(BaseScanner):
     """Support Level Scanner showing support & resistance levels on 4-hour intervals"""
     
-    def __init__(self):
-        self.data_fetcher = DataFetcher()
-        self.tech_indicators = TechnicalIndicators()
+    scanner_label = "Support Level"
+    min_bars = 100
         
-    def scan(self, timeframe="4h", lookback_days=90):
+    def scan(self, timeframe="4h", lookback_days=90, liquid_only=False):
         """
         Scan for support level signals
         
         Args:
             timeframe: Data timeframe (4h recommended)
             lookback_days: Number of days to look back
+            liquid_only: Also skip illiquid symbols and symbols far from their
+                         recent range (faster, but may drop signals)
             
         Returns:
             DataFrame with support level signals
         """
-        try:
-            symbols = self.data_fetcher.get_nse_stock_list()
-            results = []
-            
-            for symbol in symbols[:100]:  # Limit for performance
-                try:
-                    # Fetch data
-                    data = self.data_fetcher.get_stock_data(
-                        symbol, 
-                        period=f"{lookback_days}d",
-                        interval=timeframe
-                    )
-                    
-                    if data is None or len(data) < 100:
-                        continue
-                    
-                    # Identify support and resistance levels
-                    support_levels = self.identify_support_levels(data)
-                    resistance_levels = self.identify_resistance_levels(data)
-                    
-                    # Analyze current position relative to levels
-                    analysis = self.analyze_current_position(data, support_levels, resistance_levels)
-                    
-                    if analysis['signal'] != 'none':
-                        current_price = data['Close'].iloc[-1]
-                        volume = data['Volume'].iloc[-1] if 'Volume' in data else 0
-                        
-                        results.append({
-                            'Symbol': symbol,
-                            'Signal': analysis['signal'],
-                            'Current_Price': round(current_price, 2),
-                            'Nearest_Support': round(analysis['nearest_support'], 2) if analysis['nearest_support'] else None,
-                            'Nearest_Resistance': round(analysis['nearest_resistance'], 2) if analysis['nearest_resistance'] else None,
-                            'Distance_to_Support_%': round(analysis['distance_to_support'], 2) if analysis['distance_to_support'] else None,
-                            'Distance_to_Resistance_%': round(analysis['distance_to_resistance'], 2) if analysis['distance_to_resistance'] else None,
-                            'Support_Strength': analysis['support_strength'],
-                            'Resistance_Strength': analysis['resistance_strength'],
-                            'Risk_Reward_Ratio': analysis['risk_reward'],
-                            'Volume': int(volume),
-                            'Timeframe': timeframe
-                        })
-                        
-                except Exception as e:
-                    print(f"Error processing {symbol}: {e}")
-                    continue
-            
-            return pd.DataFrame(results)
+        self.prefilter = self.build_prefilter(liquid_only)
+        return self.run_scan(timeframe, lookback_days)
+    
+    def build_prefilter(self, liquid_only=False):
+        """Skip symbols with no pivot near the price, plus illiquid ones when asked"""
+        if not liquid_only:
+            return PrefilterPipeline(min_bars=self.min_bars, candidates=self.level_candidates)
+        return PrefilterPipeline(
+            min_bars=self.min_bars,
+            min_price=10,
+            min_turnover=5000000,  # mean traded value per bar (INR)
+            max_atr_distance=5,
+            level_side='both',
+            level_lookback=60,
+            candidates=self.level_candidates
+        )
+    
+    @staticmethod
+    def level_candidates(panel, window=20, tolerance=0.025):
+        """
+        Find symbols that may have a signal, from their pivots alone
+        
+        A support level averages lows within tolerance of a trough, so it
+        lies within tolerance of that trough (likewise resistance and peaks).
+        Every signal needs a support at most 5% below the close or a
+        resistance at most 3% above it, so a symbol without a trough or peak
+        in the matching band cannot signal.
+        
+        Args:
+            panel: BarPanel with every fetched bar
+            window: Pivot window of identify_support/resistance_levels()
+            tolerance: Level matching tolerance of those methods
             
-        except Exception as e:
-            print(f"Error in Support Level scanner: {e}")
-            return pd.DataFrame()
+        Returns:
+            Boolean array with one entry per symbol
+        """
+        low = panel.field('low')
+        high = panel.field('high')
+        close = panel.latest(panel.field('close'))
+        troughs = low == PanelIndicators.rolling_min(low, window, center=True)
+        peaks = high == PanelIndicators.rolling_max(high, window, center=True)
+        # Slack keeps rounding at the band edges on the safe side
+        slack = 1e-9
+        
+        near_support = PrefilterPipeline.any_between(
+            low, troughs,
+            close * 0.95 / (1 + tolerance) * (1 - slack),
+            close / (1 - tolerance) * (1 + slack)
+        )
+        near_resistance = PrefilterPipeline.any_between(
+            high, peaks,
+            close / (1 + tolerance) * (1 - slack),
+            close * 1.03 / (1 - tolerance) * (1 + slack)
+        )
+        return near_support | near_resistance | np.isnan(close)
+    
+    def analyze(self, symbol, data, timeframe):
+        """
+        Detect a support level signal for a single symbol
+        
+        Args:
+            symbol: Stock symbol
+            data: OHLCV DataFrame
+            timeframe: Data timeframe
+            
+        Returns:
+            Dict with result row, or None when there is no signal
+        """
+        # Identify support and resistance levels
+        support_levels = self.identify_support_levels(data)
+        resistance_levels = self.identify_resistance_levels(data)
+        
+        # Analyze current position relative to levels
+        analysis = self.analyze_current_position(data, support_levels, resistance_levels)
+        
+        if analysis['signal'] == 'none':
+            return None
+        
+        current_price = data['Close'].iloc[-1]
+        volume = data['Volume'].iloc[-1] if 'Volume' in data else 0
+        
+        # Every signal here is a position relative to the levels, keyed by the
+        # bar the price entered it (levels held fixed)
+        close = data['Close'].to_numpy()
+        support = analysis['nearest_support']
+        resistance = analysis['nearest_resistance']
+        support_data = {'level': support, 'strength': analysis['support_strength']} if support else None
+        resistance_data = {'level': resistance, 'strength': analysis['resistance_strength']} if resistance else None
+        bar_time = self.state_onset(
+            data.index,
+            lambda i: self.determine_signal(
+                close[i], support_data, resistance_data,
+                (close[i] - support) / close[i] * 100 if support else None,
+                (resistance - close[i]) / close[i] * 100 if resistance else None
+            ) == analysis['signal']
+        )
+        
+        return {
+            'Symbol': symbol,
+            'Signal': analysis['signal'],
+            'Current_Price': round(current_price, 2),
+            'Nearest_Support': round(analysis['nearest_support'], 2) if analysis['nearest_support'] else None,
+            'Nearest_Resistance': round(analysis['nearest_resistance'], 2) if analysis['nearest_resistance'] else None,
+            'Distance_to_Support_%': round(analysis['distance_to_support'], 2) if analysis['distance_to_support'] else None,
+            'Distance_to_Resistance_%': round(analysis['distance_to_resistance'], 2) if analysis['distance_to_resistance'] else None,
+            'Support_Strength': analysis['support_strength'],
+            'Resistance_Strength': analysis['resistance_strength'],
+            'Risk_Reward_Ratio': analysis['risk_reward'],
+            'Volume': int(volume),
+            'Bar_Time': bar_time,
+            'Timeframe': timeframe
+        }
     
+    @SCAN_PROFILER.profiled('levels', rows_arg=1)
     def identify_support_levels(self, data, window=20, min_touches=2):
         """
         Identify support levels from price data
@@ -135,6 +199,7 @@ class SupportLevelScanner:
             print(f"Error in support level identification: {e}")
             return []
     
+    @SCAN_PROFILER.profiled('levels', rows_arg=1)
     def identify_resistance_levels(self, data, window=20, min_touches=2):
         """
         Identify resistance levels from price data
@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from utils.alert_dispatcher import AlertDispatcher, WebhookSink
+
+
+class StandIn:
+    """Local webhook endpoint recording every request
+
+    Responses are taken from a script of (status, headers) pairs, then 200.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.script = []
+        self.lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stand_in.lock:
+                    stand_in.requests.append((time.monotonic(), body))
+                    status, headers = stand_in.script.pop(0) if stand_in.script else (200, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def wait_for(self, count, timeout=10):
+        """Wait until count requests arrived"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if len(self.requests) >= count:
+                    return list(self.requests)
+            time.sleep(0.02)
+        raise AssertionError(f"expected {count} requests, got {len(self.requests)}")
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+def insert_events(n, scanner='MACD 4h'):
+    """Signal insert events for n symbols"""
+    bar_time = pd.Timestamp('2025-06-02 09:15', tz='Asia/Kolkata')
+    return [{'event': 'insert', 'scanner': scanner, 'symbol': f"SYM{i}.NS", 'timeframe': '4h',
+             'bar_time': bar_time, 'row': {'Signal': 'Bullish Crossover', 'Current_Price': 100.0 + i}}
+            for i in range(n)]
+
+
+def make_dispatcher(sink, tmp_path, **kwargs):
+    options = dict(state_path=str(tmp_path / 'alerts_sent.json'), batch_window=0.3, retry_backoff=0.05)
+    dispatcher = AlertDispatcher([sink], **{**options, **kwargs})
+    dispatcher.start()
+    return dispatcher
+
+
+def test_alerts_within_the_batch_window_share_a_request(stand_in, tmp_path):
+    dispatcher = make_dispatcher(WebhookSink(stand_in.url, max_batch=3, min_interval=0), tmp_path)
+
+    assert dispatcher.submit(insert_events(5)) == 5
+    requests = stand_in.wait_for(2)
+    dispatcher.stop(timeout=5)
+
+    assert [body['count'] for _, body in requests] == [3, 2]
+    assert requests[0][1]['alerts'][0]['symbol'] == 'SYM0'
+    assert dispatcher.stats()['sinks']['webhook']['sent'] == 5
+
+
+def test_sends_keep_the_sink_min_interval(stand_in, tmp_path):
+    dispatcher = make_dispatcher(WebhookSink(stand_in.url, max_batch=1, min_interval=0.4), tmp_path,
+                                 batch_window=0)
+
+    dispatcher.submit(insert_events(3))
+    requests = stand_in.wait_for(3)
+    dispatcher.stop(timeout=5)
+
+    gaps = [later[0] - earlier[0] for earlier, later in zip(requests, requests[1:])]
+    assert min(gaps) >= 0.35
+
+
+def test_retry_waits_for_retry_after(stand_in, tmp_path):
+    stand_in.script = [(429, {'Retry-After': '1'})]
+    dispatcher = make_dispatcher(WebhookSink(stand_in.url, min_interval=0), tmp_path)
+
+    dispatcher.submit(insert_events(2))
+    requests = stand_in.wait_for(2)
+    dispatcher.stop(timeout=5)
+
+    assert requests[0][1] == requests[1][1]
+    assert requests[1][0] - requests[0][0] >= 0.95
+    counters = dispatcher.stats()['sinks']['webhook']
+    assert (counters['retries'], counters['sent'], counters['failed']) == (1, 2, 0)
+
+
+def test_delivered_alerts_are_not_resent_after_a_restart(stand_in, tmp_path):
+    first = make_dispatcher(WebhookSink(stand_in.url, min_interval=0), tmp_path)
+    first.submit(insert_events(2))
+    stand_in.wait_for(1)
+    first.stop(timeout=5)
+
+    second = make_dispatcher(WebhookSink(stand_in.url, min_interval=0), tmp_path)
+    assert second.submit(insert_events(2)) == 0
+    assert second.submit(insert_events(3)) == 1
+    requests = stand_in.wait_for(2)
+    second.stop(timeout=5)
+
+    assert [alert['symbol'] for alert in requests[1][1]['alerts']] == ['SYM2']
+
+
+@pytest.mark.parametrize('remove', [False, True])
+def test_stop_returns_while_a_full_queue_waits_on_retries(stand_in, tmp_path, remove):
+    stand_in.script = [(503, {})] * 10
+    dispatcher = make_dispatcher(WebhookSink(stand_in.url, min_interval=0), tmp_path,
+                                 batch_window=0, retry_backoff=5, max_pending=1)
+
+    dispatcher.submit(insert_events(1))
+    stand_in.wait_for(1)
+    # The worker now sleeps before its retry and the queue fills up
+    dispatcher.submit(insert_events(3))
+    assert dispatcher.pending() == {'webhook': 1}
+
+    started = time.monotonic()
+    if remove:
+        dispatcher.remove_sink('webhook')
+    else:
+        dispatcher.stop(timeout=0.5)
+
+    assert time.monotonic() - started < 2
+
+
+def test_processes_sharing_a_state_file_send_each_alert_once(stand_in, tmp_path):
+    # The app and the API server each run a dispatcher over the same file
+    app = make_dispatcher(WebhookSink(stand_in.url, min_interval=0), tmp_path)
+    server = make_dispatcher(WebhookSink(stand_in.url, min_interval=0), tmp_path)
+
+    app.submit(insert_events(4))
+    server.submit(insert_events(4))
+    time.sleep(1)
+    app.stop(timeout=5)
+    server.stop(timeout=5)
+
+    symbols = [alert['symbol'] for _, body in stand_in.requests for alert in body['alerts']]
+    assert sorted(symbols) == ['SYM0', 'SYM1', 'SYM2', 'SYM3']
+
+
+def test_failed_alerts_are_released_for_another_attempt(stand_in, tmp_path):
+    stand_in.script = [(400, {})]
+    dispatcher = make_dispatcher(WebhookSink(stand_in.url, min_interval=0), tmp_path)
+
+    dispatcher.submit(insert_events(1))
+    stand_in.wait_for(1)
+    time.sleep(0.2)
+    assert dispatcher.submit(insert_events(1)) == 1
+    stand_in.wait_for(2)
+    dispatcher.stop(timeout=5)
+
+    assert dispatcher.stats()['sinks']['webhook']['sent'] == 1
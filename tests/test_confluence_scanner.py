@@ -0,0 +1,70 @@
+import pandas as pd
+
+from scanners.confluence_scanner import ConfluenceScanner
+from utils.signal_table import SignalTable
+
+BAR_TIME = pd.Timestamp('2025-06-02 00:00', tz='Asia/Kolkata')
+
+
+def macd_crossover(symbol, timeframe='1d', bar_time=BAR_TIME):
+    """One MACDScannerOriginal result row"""
+    return pd.DataFrame([{
+        'symbol': symbol, 'type': 'bullish', 'bar_time': bar_time,
+        'price': 1500.0, 'timeframe': timeframe, 'confidence': 0.8
+    }])
+
+
+def breakout(symbol, timeframe='4h'):
+    """One RangeBreakoutScanner result row"""
+    return pd.DataFrame([{
+        'Symbol': symbol + '.NS', 'Breakout_Type': 'Upward Breakout', 'Bar_Time': BAR_TIME,
+        'Current_Price': 1500.0, 'Timeframe': timeframe, 'Breakout_Strength': 70.0
+    }])
+
+
+def test_aliased_jobs_count_one_signal():
+    # MACD 15min scans daily bars and shares MACD 1d's results
+    shared = macd_crossover('INFY')
+    results = {'MACD 15min': shared, 'MACD 1d': shared}
+
+    assert ConfluenceScanner().scan(results, min_signals=2).empty
+
+    scored = ConfluenceScanner().scan(results, min_signals=1)
+    assert scored['Aligned_Signals'].tolist() == [1]
+    assert scored['Scanners'].tolist() == ['MACD 15min']
+
+
+def test_equal_reports_from_separate_frames_count_once():
+    results = {'MACD 15min': macd_crossover('INFY'), 'MACD 1d': macd_crossover('INFY')}
+
+    assert ConfluenceScanner().scan(results, min_signals=2).empty
+
+
+def test_distinct_signals_still_align():
+    results = {
+        'MACD 1d': macd_crossover('INFY'),
+        'MACD 15min': macd_crossover('INFY'),
+        'Range Breakout 4h': breakout('INFY')
+    }
+
+    scored = ConfluenceScanner().scan(results, min_signals=2)
+
+    assert scored['Symbol'].tolist() == ['INFY.NS']
+    assert scored['Aligned_Signals'].tolist() == [2]
+    assert scored['Timeframes'].tolist() == ['1d, 4h']
+
+
+def test_crossovers_on_different_bars_are_distinct():
+    results = {
+        'MACD 1d': macd_crossover('INFY'),
+        'MACD 15min': macd_crossover('INFY', bar_time=BAR_TIME - pd.Timedelta(days=1))
+    }
+
+    assert ConfluenceScanner().scan(results, min_signals=2)['Aligned_Signals'].tolist() == [2]
+
+
+def test_first_rows_marks_repeats():
+    shared = macd_crossover('INFY')
+    table = SignalTable.from_results({'MACD 15min': shared, 'MACD 1d': shared, 'Range Breakout 4h': breakout('TCS')})
+
+    assert table.first_rows().tolist() == [True, False, True]
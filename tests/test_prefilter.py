@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from scanners.resistance_breakout_scanner import ResistanceBreakoutScanner
+from scanners.support_level_scanner import SupportLevelScanner
+from utils.panel_indicators import BarPanel, PanelIndicators
+from utils.synthetic_market import SyntheticMarket
+
+
+@pytest.fixture(scope='module')
+def universe():
+    market = SyntheticMarket(seed=3)
+    return market.universe(market.symbols(40), '4h')
+
+
+@pytest.mark.parametrize('scanner_cls', [SupportLevelScanner, ResistanceBreakoutScanner])
+def test_default_prefilter_keeps_every_signal(universe, scanner_cls):
+    scanner = scanner_cls()
+    signals = [symbol for symbol, data in universe.items() if scanner.analyze(symbol, data, '4h')]
+
+    kept = scanner.build_prefilter().apply(universe)
+
+    assert signals
+    assert set(signals) <= set(kept)
+    assert len(kept) < len(universe)
+
+
+@pytest.mark.parametrize('scanner_cls', [SupportLevelScanner, ResistanceBreakoutScanner])
+def test_liquidity_stages_are_opt_in(scanner_cls):
+    assert scanner_cls().build_prefilter().stages() == ['bars', 'candidates']
+    assert scanner_cls().build_prefilter(liquid_only=True).stages() == \
+        ['bars', 'price', 'turnover', 'level_distance', 'candidates']
+
+
+def test_centered_rolling_matches_pandas(universe):
+    data = next(iter(universe.values()))
+    panel = BarPanel({'A': data}, max_bars=None)
+
+    for window in (7, 20):
+        expected = data['Low'].rolling(window, center=True).min().to_numpy()
+        actual = PanelIndicators.rolling_min(panel.field('low'), window, center=True)[0]
+        np.testing.assert_allclose(actual, expected)
@@ -0,0 +1,669 @@
+import json
+import os
+import queue
+from contextlib import contextmanager
+import threading
+import time
+import urllib.error
+import urllib.request
+import pandas as pd
+import pytz
+from utils.signal_diff import SignalDiffer
+from utils.signal_table import SignalTable
+
+try:
+    import fcntl
+except ImportError:  # No cross-process state lock (Windows)
+    fcntl = None
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# Where sent alert keys are remembered across restarts
+ALERT_STATE_PATH = "history/alerts_sent.json"
+
+
+class AlertDeliveryError(Exception):
+    """A sink failed to deliver a batch
+
+    Args:
+        message: Error description
+        retryable: Whether sending the same batch again may succeed
+        retry_after: Optional seconds the endpoint asked to wait
+    """
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def post_json(url, payload, headers=None, timeout=10):
+    """
+    POST a JSON body
+
+    Args:
+        url: Endpoint URL
+        payload: JSON-serializable body
+        headers: Optional extra request headers
+        timeout: Socket timeout in seconds
+
+    Returns:
+        Response body as text
+
+    Raises:
+        AlertDeliveryError: On network errors and non-2xx responses (4xx other
+            than 408 and 429 are not retryable)
+    """
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload, default=str).encode('utf-8'),
+        headers={'Content-Type': 'application/json', **(headers or {})},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.read().decode('utf-8', 'replace')
+    except urllib.error.HTTPError as e:
+        retry_after = e.headers.get('Retry-After') if e.headers else None
+        raise AlertDeliveryError(
+            f"HTTP {e.code} from {url}",
+            retryable=e.code >= 500 or e.code in (408, 429),
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+        )
+    except (urllib.error.URLError, OSError) as e:
+        raise AlertDeliveryError(f"Cannot reach {url}: {e}")
+
+
+def format_alert(alert):
+    """One-line text form of an alert"""
+    parts = [' · '.join(part for part in (alert['symbol'], alert['scanner'], alert.get('signal')) if part)]
+    if alert.get('price') is not None:
+        parts.append(f"@ {alert['price']:,.2f}")
+    if alert.get('bar_time'):
+        parts.append(f"({alert['timeframe']} bar {alert['bar_time'][:16].replace('T', ' ')})")
+    return ' '.join(parts)
+
+
+class AlertSink:
+    """Destination receiving batches of alerts
+
+    Subclasses implement send(). Each sink has its own batch size and
+    minimum interval between sends, matching the limits of its service.
+    """
+
+    name = "sink"
+
+    def __init__(self, max_batch=20, min_interval=1.0, timeout=10):
+        """
+        Args:
+            max_batch: Most alerts sent in one message
+            min_interval: Minimum seconds between two sends
+            timeout: Request timeout in seconds
+        """
+        self.max_batch = max_batch
+        self.min_interval = min_interval
+        self.timeout = timeout
+
+    def send(self, alerts):
+        """
+        Deliver one batch
+
+        Args:
+            alerts: List of alert dicts
+
+        Raises:
+            AlertDeliveryError: When the batch was not delivered
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def summary(alerts):
+        """Title line of a batch"""
+        return f"📈 {len(alerts)} new signal{'s' if len(alerts) != 1 else ''}"
+
+
+class WebhookSink(AlertSink):
+    """POST each batch as JSON ({"alerts": [...]}) to a URL"""
+
+    name = "webhook"
+
+    def __init__(self, url, headers=None, max_batch=100, min_interval=0.5, timeout=10):
+        """
+        Args:
+            url: Webhook URL
+            headers: Optional extra request headers (e.g. authorization)
+            max_batch: Most alerts per request
+            min_interval: Minimum seconds between requests
+            timeout: Request timeout in seconds
+        """
+        super().__init__(max_batch, min_interval, timeout)
+        self.url = url
+        self.headers = headers or {}
+
+    def send(self, alerts):
+        post_json(self.url, {'count': len(alerts), 'alerts': alerts}, self.headers, self.timeout)
+
+
+class TelegramSink(AlertSink):
+    """Send each batch as one Telegram bot message"""
+
+    name = "telegram"
+
+    def __init__(self, token, chat_id, api_base="https://api.telegram.org",
+                 max_batch=20, min_interval=3.0, timeout=10):
+        """
+        Args:
+            token: Bot token
+            chat_id: Chat receiving the alerts
+            api_base: Bot API base URL
+            max_batch: Most alerts per message (keeps messages under 4096 characters)
+            min_interval: Minimum seconds between messages (group chats allow 20 per minute)
+            timeout: Request timeout in seconds
+        """
+        super().__init__(max_batch, min_interval, timeout)
+        self.url = f"{api_base.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+
+    def send(self, alerts):
+        text = '\n'.join([self.summary(alerts)] + [f"• {format_alert(alert)}" for alert in alerts])
+        post_json(self.url, {'chat_id': self.chat_id, 'text': text[:4096],
+                             'disable_web_page_preview': True}, timeout=self.timeout)
+
+
+class EmailSink(AlertSink):
+    """Send each batch as one email through the SendGrid v3 mail API"""
+
+    name = "email"
+
+    def __init__(self, api_key, sender, recipients, api_base="https://api.sendgrid.com",
+                 max_batch=200, min_interval=60.0, timeout=15):
+        """
+        Args:
+            api_key: SendGrid API key
+            sender: From address
+            recipients: List of addresses
+            api_base: Mail API base URL
+            max_batch: Most alerts per email
+            min_interval: Minimum seconds between emails
+            timeout: Request timeout in seconds
+        """
+        super().__init__(max_batch, min_interval, timeout)
+        self.url = f"{api_base.rstrip('/')}/v3/mail/send"
+        self.api_key = api_key
+        self.sender = sender
+        self.recipients = list(recipients)
+
+    def send(self, alerts):
+        body = '\n'.join([self.summary(alerts), ''] + [format_alert(alert) for alert in alerts])
+        post_json(self.url, {
+            'personalizations': [{'to': [{'email': address} for address in self.recipients]}],
+            'from': {'email': self.sender},
+            'subject': f"NSE Scanner: {self.summary(alerts)}",
+            'content': [{'type': 'text/plain', 'value': body}]
+        }, {'Authorization': f"Bearer {self.api_key}"}, self.timeout)
+
+
+def sinks_from_env(environ=None):
+    """
+    Build the sinks configured through environment variables
+
+    ALERT_WEBHOOK_URL enables the webhook sink; ALERT_TELEGRAM_TOKEN and
+    ALERT_TELEGRAM_CHAT_ID the Telegram sink; ALERT_SENDGRID_API_KEY,
+    ALERT_EMAIL_FROM and ALERT_EMAIL_TO (comma-separated) the email sink.
+    ALERT_TELEGRAM_API and ALERT_SENDGRID_API override the service base
+    URLs (for a proxy or a local stand-in).
+
+    Args:
+        environ: Optional mapping (defaults to os.environ)
+
+    Returns:
+        List of AlertSink
+    """
+    env = os.environ if environ is None else environ
+    sinks = []
+    if env.get('ALERT_WEBHOOK_URL'):
+        sinks.append(WebhookSink(env['ALERT_WEBHOOK_URL']))
+    if env.get('ALERT_TELEGRAM_TOKEN') and env.get('ALERT_TELEGRAM_CHAT_ID'):
+        sinks.append(TelegramSink(env['ALERT_TELEGRAM_TOKEN'], env['ALERT_TELEGRAM_CHAT_ID'],
+                                  api_base=env.get('ALERT_TELEGRAM_API', "https://api.telegram.org")))
+    if env.get('ALERT_SENDGRID_API_KEY') and env.get('ALERT_EMAIL_FROM') and env.get('ALERT_EMAIL_TO'):
+        sinks.append(EmailSink(env['ALERT_SENDGRID_API_KEY'], env['ALERT_EMAIL_FROM'],
+                               [address.strip() for address in env['ALERT_EMAIL_TO'].split(',') if address.strip()],
+                               api_base=env.get('ALERT_SENDGRID_API', "https://api.sendgrid.com")))
+    return sinks
+
+
+class AlertDispatcher:
+    """Queue new signals and deliver them to notification sinks in the background
+
+    Attached to the scan service as a snapshot listener: each snapshot's
+    insert events become alerts that are put on one queue per sink, so the
+    scan cycle only pays for the queue puts and a slow or failing endpoint
+    holds up nothing but its own sink. Every sink has a worker thread that
+
+    - waits batch_window seconds after the first alert and sends everything
+      queued by then as one message (up to the sink's max_batch)
+    - keeps at least the sink's min_interval between sends
+    - retries transient failures with exponential backoff, honoring
+      Retry-After, and drops the batch after max_retries
+
+    Alert keys (scanner, symbol, timeframe, bar time) delivered by each
+    sink are saved to state_path, so a restart, which makes every current
+    signal new to the scan service again, does not resend them. The file
+    is also shared between processes (the app and the API server scan on
+    their own): a worker claims a batch's keys in the file under an
+    exclusive lock before sending, so each alert is sent by one process
+    only, and releases them again if delivery fails.
+    """
+
+    def __init__(self, sinks, state_path=ALERT_STATE_PATH, batch_window=2.0, max_retries=3,
+                 retry_backoff=2.0, dedup_days=7, max_pending=1000):
+        """
+        Args:
+            sinks: List of AlertSink (names must be unique)
+            state_path: JSON file of delivered alert keys (None to keep them in memory)
+            batch_window: Seconds to gather alerts into one message
+            max_retries: Retries of a failed batch before it is dropped
+            retry_backoff: Seconds before the first retry (doubles per retry)
+            dedup_days: Days a delivered key is remembered
+            max_pending: Alerts queued per sink before new ones are dropped
+        """
+        self.sinks = []
+        self.enabled = False
+        self.state_path = state_path
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.dedup_days = dedup_days
+        self.max_pending = max_pending
+        self.counters = {}
+        self._queues = {}
+        self._queued = {}
+        self._sent = self._load_state()
+        self._threads = {}
+        self._stops = {}
+        self._running = False
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        for sink in sinks:
+            self.add_sink(sink)
+
+    @staticmethod
+    def alert_key(event):
+        """Identity of an alert: scanner, symbol, timeframe and bar time"""
+        bar_time = event.get('bar_time')
+        bar_time = pd.Timestamp(bar_time).isoformat() if bar_time is not None and not pd.isna(bar_time) else ''
+        return '|'.join([str(event['scanner']), str(event['symbol']), str(event.get('timeframe') or ''), bar_time])
+
+    @staticmethod
+    def alert_from_event(event):
+        """
+        Build an alert from a signal insert event
+
+        Args:
+            event: SignalDiffer event dict
+
+        Returns:
+            JSON-serializable alert dict
+        """
+        row = event.get('row') or {}
+        signal = next((row[column] for column in SignalTable.LABEL_COLUMNS[:3] + ['current_signal', 'type']
+                       if row.get(column) is not None), None)
+        price = next((row[column] for column in SignalTable.PRICE_COLUMNS if row.get(column) is not None), None)
+        bar_time = event.get('bar_time')
+        if bar_time is not None and not pd.isna(bar_time):
+            bar_time = pd.Timestamp(bar_time)
+            bar_time = (bar_time.tz_convert(IST) if bar_time.tzinfo else bar_time).isoformat()
+        else:
+            bar_time = None
+        return {
+            'key': AlertDispatcher.alert_key(event),
+            'scanner': event['scanner'],
+            'symbol': str(event['symbol']).replace(SignalTable.SYMBOL_SUFFIX, ''),
+            'timeframe': event.get('timeframe'),
+            'signal': str(signal) if signal is not None else None,
+            'price': float(price) if price is not None and not pd.isna(price) else None,
+            'bar_time': bar_time
+        }
+
+    def add_sink(self, sink):
+        """
+        Add a sink, starting its worker when the dispatcher is running
+
+        Args:
+            sink: AlertSink (ignored when a sink of the same name exists)
+        """
+        with self._lock:
+            if sink.name in self._queues:
+                return
+            self.sinks.append(sink)
+            self.enabled = True
+            self._queues[sink.name] = queue.Queue(maxsize=self.max_pending)
+            self._queued[sink.name] = set()
+            self.counters[sink.name] = {'sent': 0, 'batches': 0, 'failed': 0, 'dropped': 0,
+                                        'retries': 0, 'last_error': None}
+            if self._running:
+                self._start_worker(sink)
+
+    def remove_sink(self, name):
+        """
+        Remove a sink after its queued alerts are delivered
+
+        Args:
+            name: Sink name
+        """
+        with self._lock:
+            sink_queue = self._queues.pop(name, None)
+            if sink_queue is None:
+                return
+            self.sinks = [sink for sink in self.sinks if sink.name != name]
+            self.enabled = bool(self.sinks)
+            self._queued.pop(name, None)
+            self.counters.pop(name, None)
+            self._threads.pop(name, None)
+            stop = self._stops.pop(name, None)
+        if stop is not None:
+            self._signal_stop(stop, sink_queue)
+
+    def _start_worker(self, sink):
+        """Start the worker thread of one sink (caller holds the lock)"""
+        stop = threading.Event()
+        thread = threading.Thread(target=self._worker, args=(sink, self._queues[sink.name], stop),
+                                  name=f"alerts-{sink.name}", daemon=True)
+        thread.start()
+        self._threads[sink.name] = thread
+        self._stops[sink.name] = stop
+
+    @staticmethod
+    def _signal_stop(stop, sink_queue):
+        """
+        Ask a worker to finish its queue and exit, without blocking
+
+        A worker waiting on an empty queue is woken by a None; when the queue
+        is full the put is skipped, as the worker sees the event after its
+        current batch.
+        """
+        stop.set()
+        try:
+            sink_queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def start(self):
+        """Start one worker thread per sink (no-op when already running)"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            for sink in self.sinks:
+                self._start_worker(sink)
+
+    def stop(self, timeout=None):
+        """
+        Deliver queued alerts, then stop the worker threads
+
+        Never blocks on a full queue; only the wait for the workers is bounded
+        by timeout.
+
+        Args:
+            timeout: Seconds to wait for each worker
+        """
+        with self._lock:
+            threads, self._threads = list(self._threads.values()), {}
+            stops, self._stops = dict(self._stops), {}
+            queues = dict(self._queues)
+            self._running = False
+        for name, stop in stops.items():
+            self._signal_stop(stop, queues[name])
+        for thread in threads:
+            thread.join(timeout)
+
+    def append(self, snapshot):
+        """
+        Queue the new signals of a published snapshot (ScanService listener)
+
+        Args:
+            snapshot: ScanSnapshot
+        """
+        if self.enabled and snapshot.version > 0:
+            self.submit([event for event in snapshot.events if event['event'] == SignalDiffer.INSERT])
+
+    def submit(self, events, sinks=None):
+        """
+        Queue insert events on every sink that has not delivered them yet
+
+        Never blocks: alerts beyond a sink's max_pending are dropped.
+
+        Args:
+            events: List of SignalDiffer insert event dicts
+            sinks: Optional iterable of sink names to queue on (defaults to all)
+
+        Returns:
+            Number of alerts queued over all sinks
+        """
+        return self.enqueue([self.alert_from_event(event) for event in events], sinks)
+
+    def enqueue(self, alerts, sinks=None):
+        """
+        Queue prepared alerts (see alert_from_event) like submit()
+
+        Args:
+            alerts: List of alert dicts
+            sinks: Optional iterable of sink names to queue on (defaults to all)
+
+        Returns:
+            Number of alerts queued over all sinks
+        """
+        with self._lock:
+            targets = [sink.name for sink in self.sinks if sinks is None or sink.name in sinks]
+
+        queued = 0
+        for name in targets:
+            for alert in alerts:
+                with self._lock:
+                    sink_queue = self._queues.get(name)
+                    if sink_queue is None or alert['key'] in self._sent.get(name, {}) or alert['key'] in self._queued[name]:
+                        continue
+                    self._queued[name].add(alert['key'])
+                try:
+                    sink_queue.put_nowait(alert)
+                    queued += 1
+                except queue.Full:
+                    with self._lock:
+                        if name in self.counters:
+                            self._queued[name].discard(alert['key'])
+                            self.counters[name]['dropped'] += 1
+        return queued
+
+    def pending(self):
+        """Alerts waiting per sink"""
+        with self._lock:
+            queues = dict(self._queues)
+        return {name: sink_queue.qsize() for name, sink_queue in queues.items()}
+
+    def _worker(self, sink, sink_queue, stop):
+        """Worker thread body for one sink: batch, rate limit and deliver"""
+        last_send = 0.0
+
+        while not stop.is_set():
+            alert = sink_queue.get()
+            if alert is None:
+                # Woken by a stop request (or left over from an earlier one)
+                continue
+
+            # Gather everything arriving within the batch window
+            batch = [alert]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < sink.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    alert = sink_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if alert is None:
+                    break
+                batch.append(alert)
+
+            last_send = self._send_batch(sink, batch, last_send)
+
+        # Deliver whatever was queued before the stop request
+        rest = []
+        while True:
+            try:
+                alert = sink_queue.get_nowait()
+            except queue.Empty:
+                break
+            if alert is not None:
+                rest.append(alert)
+        for start in range(0, len(rest), sink.max_batch):
+            last_send = self._send_batch(sink, rest[start:start + sink.max_batch], last_send)
+
+    def _send_batch(self, sink, batch, last_send):
+        """Claim, rate limit, deliver and record one batch; returns the last send time"""
+        claimed = self._claim(sink.name, batch)
+        if claimed:
+            wait = sink.min_interval - (time.monotonic() - last_send)
+            if wait > 0:
+                time.sleep(wait)
+            if not self._deliver(sink, claimed):
+                self._release(sink.name, [alert['key'] for alert in claimed])
+            last_send = time.monotonic()
+
+        with self._lock:
+            self._queued.get(sink.name, set()).difference_update(alert['key'] for alert in batch)
+        return last_send
+
+    def _claim(self, name, batch):
+        """
+        Mark a batch's alerts as sent by one sink before delivering them
+
+        Args:
+            name: Sink name
+            batch: List of alert dicts
+
+        Returns:
+            Alerts of the batch no process has sent or claimed yet
+        """
+        with self._shared_state():
+            with self._lock:
+                sent = self._sent.setdefault(name, {})
+                claimed = [alert for alert in batch if alert['key'] not in sent]
+                sent_at = time.time()
+                sent.update({alert['key']: sent_at for alert in claimed})
+            if claimed:
+                self._save_state()
+        return claimed
+
+    def _release(self, name, keys):
+        """Forget the claim on alerts a sink failed to deliver"""
+        with self._shared_state():
+            with self._lock:
+                sent = self._sent.get(name, {})
+                for key in keys:
+                    sent.pop(key, None)
+            self._save_state()
+
+    @contextmanager
+    def _shared_state(self):
+        """
+        Hold the state file lock, with the delivered keys read fresh from the file
+
+        Other processes write the file only under the same lock, so the file
+        is the current state of every process.
+        """
+        with self._state_lock:
+            lock_file = None
+            if self.state_path:
+                try:
+                    os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+                    lock_file = open(f"{self.state_path}.lock", 'a')
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                except OSError as e:
+                    print(f"Error locking alert state {self.state_path}: {e}")
+                state = self._load_state()
+                with self._lock:
+                    self._sent = state
+            try:
+                yield
+            finally:
+                if lock_file is not None:
+                    lock_file.close()
+
+    def _deliver(self, sink, batch):
+        """Send one batch with retries; returns whether it was delivered"""
+        # A removed sink still finishes its queue, off the counters
+        counters = self.counters.get(sink.name) or {'sent': 0, 'batches': 0, 'failed': 0, 'retries': 0, 'last_error': None}
+        delay = self.retry_backoff
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                sink.send(batch)
+                with self._lock:
+                    counters['sent'] += len(batch)
+                    counters['batches'] += 1
+                return True
+            except AlertDeliveryError as e:
+                error = e
+            except Exception as e:
+                error = AlertDeliveryError(str(e))
+
+            with self._lock:
+                counters['last_error'] = str(error)
+            if not error.retryable or attempt == self.max_retries:
+                break
+            with self._lock:
+                counters['retries'] += 1
+            time.sleep(max(delay, error.retry_after or 0))
+            delay *= 2
+
+        print(f"Error sending {len(batch)} alerts to {sink.name}: {counters['last_error']}")
+        with self._lock:
+            counters['failed'] += len(batch)
+        return False
+
+    def _load_state(self):
+        """Read delivered alert keys, dropping those older than dedup_days"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, encoding='utf-8') as handle:
+                state = json.load(handle)
+        except (OSError, ValueError) as e:
+            print(f"Error loading alert state from {self.state_path}: {e}")
+            return {}
+        cutoff = time.time() - self.dedup_days * 86400
+        return {name: {key: sent_at for key, sent_at in keys.items() if sent_at >= cutoff}
+                for name, keys in state.items()}
+
+    def _save_state(self):
+        """Write delivered alert keys atomically (caller holds the shared state)"""
+        if not self.state_path:
+            return
+        cutoff = time.time() - self.dedup_days * 86400
+        with self._lock:
+            for name, keys in self._sent.items():
+                self._sent[name] = {key: sent_at for key, sent_at in keys.items() if sent_at >= cutoff}
+            state = json.dumps(self._sent)
+        try:
+            temporary = f"{self.state_path}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as handle:
+                handle.write(state)
+            os.replace(temporary, self.state_path)
+        except OSError as e:
+            print(f"Error saving alert state to {self.state_path}: {e}")
+
+    def stats(self):
+        """
+        Get delivery counters
+
+        Returns:
+            Dict with enabled and, per sink name, sent, batches, failed,
+            dropped, retries, pending and last_error
+        """
+        pending = self.pending()
+        with self._lock:
+            sinks = {name: {**counters, 'pending': pending[name]} for name, counters in self.counters.items()}
+        return {'enabled': self.enabled, 'sinks': sinks}
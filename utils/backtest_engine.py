@@ -0,0 +1,405 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from utils.panel_indicators import BarPanel, PanelIndicators
+
+def load_history(directory):
+    """
+    Load stored bar history, one file per symbol
+
+    Args:
+        directory: Folder with <SYMBOL>.csv or <SYMBOL>.parquet OHLCV files
+
+    Returns:
+        Dict with symbol as key and OHLCV DataFrame as value
+    """
+    data_map = {}
+
+    for filename in sorted(os.listdir(directory)):
+        symbol, ext = os.path.splitext(filename)
+        path = os.path.join(directory, filename)
+        try:
+            if ext == '.csv':
+                data = pd.read_csv(path, index_col=0, parse_dates=True)
+            elif ext == '.parquet':
+                data = pd.read_parquet(path)
+            else:
+                continue
+            if not data.empty:
+                data_map[symbol] = data.sort_index()
+        except Exception as e:
+            print(f"Error loading history for {symbol}: {e}")
+            continue
+
+    return data_map
+
+
+def save_history(data_map, directory, file_format='parquet'):
+    """
+    Store bar history, one file per symbol
+
+    Args:
+        data_map: Dict with symbol as key and OHLCV DataFrame as value
+        directory: Destination folder (created if missing)
+        file_format: 'parquet' or 'csv'
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    for symbol, data in data_map.items():
+        path = os.path.join(directory, f"{symbol}.{file_format}")
+        if file_format == 'csv':
+            data.to_csv(path)
+        else:
+            data.to_parquet(path)
+
+
+class BacktestReport:
+    """Forward-return statistics for every backtested signal type"""
+
+    def __init__(self, summary, returns, horizons, elapsed, n_symbols, n_bars):
+        """
+        Args:
+            summary: DataFrame with one row per signal type
+            returns: Dict with signal name as key and {horizon: array of % returns} as value
+            horizons: Forward horizons in bars
+            elapsed: Backtest run time in seconds
+            n_symbols: Number of symbols replayed
+            n_bars: Total number of bars replayed
+        """
+        self.summary = summary
+        self.returns = returns
+        self.horizons = horizons
+        self.elapsed = elapsed
+        self.n_symbols = n_symbols
+        self.n_bars = n_bars
+
+    def distribution(self, signal, percentiles=(5, 10, 25, 50, 75, 90, 95)):
+        """
+        Forward-return distribution of one signal type
+
+        Args:
+            signal: Signal name, e.g. 'Fresh Breakout'
+            percentiles: Percentiles to report
+
+        Returns:
+            DataFrame with one row per horizon and one column per percentile
+        """
+        rows = []
+        for horizon in self.horizons:
+            values = self.returns.get(signal, {}).get(horizon, np.array([]))
+            row = {'Horizon_Bars': horizon, 'Count': len(values)}
+            for p in percentiles:
+                row[f'P{p}_%'] = round(float(np.percentile(values, p)), 2) if len(values) else None
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+class BacktestEngine:
+    """Vectorized replay of scanner detection logic over stored history
+
+    Each scanner's signal is re-expressed as array operations over a
+    (symbols x bars) panel, so every bar of every symbol is evaluated at once
+    instead of calling scan() bar by bar. Detection at bar t only uses bars up
+    to t, and forward returns are measured from the close of bar t.
+
+    Signals:
+        MACD: bearish to bullish crossover as in MACDScannerOriginal
+        Range Breakout: Upward/Downward Breakout of the latest detect_ranges range
+        Resistance Breakout: Fresh Breakout, Retracement Entry and Failed Breakout
+            against the most recent confirmed resistance level
+        Support Level: Near Strong Support / Near Strong Resistance
+    """
+
+    def __init__(self, horizons=(1, 5, 10, 20), chunk_size=200, peak_window=20,
+                 level_lookback=120, range_length=20, range_mult=1.0, range_atr_length=500):
+        """
+        Args:
+            horizons: Forward-return horizons in bars
+            chunk_size: Symbols processed per panel (bounds memory)
+            peak_window: Centered window used to confirm peaks and troughs
+            level_lookback: Bars searched for touches of a support/resistance level
+            range_length: Minimum range length (RangeBreakoutScanner.detect_ranges)
+            range_mult: Range width multiplier
+            range_atr_length: ATR length for range width
+        """
+        self.horizons = tuple(sorted(horizons))
+        self.chunk_size = chunk_size
+        self.peak_window = peak_window
+        self.level_lookback = level_lookback
+        self.range_length = range_length
+        self.range_mult = range_mult
+        self.range_atr_length = range_atr_length
+
+    def run(self, data_map):
+        """
+        Backtest every signal type over the given history
+
+        Args:
+            data_map: Dict with symbol as key and OHLCV DataFrame as value
+
+        Returns:
+            BacktestReport
+        """
+        started = time.perf_counter()
+        symbols = list(data_map)
+        collected = {}
+        n_bars = 0
+
+        for start in range(0, len(symbols), self.chunk_size):
+            chunk = {symbol: data_map[symbol] for symbol in symbols[start:start + self.chunk_size]}
+            panel = BarPanel(chunk, max_bars=None)
+            n_bars += int(panel.bars_available.sum())
+
+            for name, (scanner, direction, mask) in self.detect_signals(panel).items():
+                outcome = self._outcomes(panel, mask, direction)
+                entry = collected.setdefault(name, {'scanner': scanner, 'direction': direction, 'parts': []})
+                entry['parts'].append(outcome)
+
+        summary, returns = self._summarize(collected)
+        return BacktestReport(summary, returns, self.horizons,
+                              round(time.perf_counter() - started, 2), len(symbols), n_bars)
+
+    def detect_signals(self, panel):
+        """
+        Detect every signal type at every bar of a panel
+
+        Args:
+            panel: BarPanel
+
+        Returns:
+            Dict with signal name as key and (scanner, direction, bool mask) as value
+        """
+        signals = {}
+        signals.update(self._macd_signals(panel))
+        signals.update(self._range_signals(panel))
+        signals.update(self._resistance_signals(panel))
+        signals.update(self._support_signals(panel))
+        return signals
+
+    def _macd_signals(self, panel):
+        close = panel.field('close')
+        macd_line, signal_line, _ = PanelIndicators.macd(close)
+        prev_macd = PanelIndicators.shift(macd_line, 1)
+        prev_signal = PanelIndicators.shift(signal_line, 1)
+
+        # calculate_macd needs at least 30 closes
+        enough = np.cumsum(~np.isnan(close), axis=1) >= 30
+        with np.errstate(invalid='ignore'):
+            crossover = enough & (prev_macd < prev_signal) & (macd_line > signal_line)
+
+        return {'MACD Crossover': ('MACD', 1, crossover)}
+
+    def _range_signals(self, panel):
+        ind = PanelIndicators
+        close = panel.field('close')
+        length = self.range_length
+
+        # Range at bar t is built from the previous `length` closes
+        ma = ind.shift(ind.sma(close, length), 1)
+        window_high = ind.shift(ind.rolling_max(close, length), 1)
+        window_low = ind.shift(ind.rolling_min(close, length), 1)
+        atr = ind.atr(panel.field('high'), panel.field('low'), close, self.range_atr_length) * self.range_mult
+
+        with np.errstate(invalid='ignore'):
+            in_range = (window_high - ma <= atr) & (ma - window_low <= atr)
+
+            top = ind.ffill(np.where(in_range, ma + atr, np.nan))
+            bottom = ind.ffill(np.where(in_range, ma - atr, np.nan))
+            outside = (close > top) | (close < bottom)
+
+            # A breakout is the first close outside the latest range
+            outside_count = np.cumsum(outside, axis=1)
+            count_at_start = ind.ffill(np.where(in_range, outside_count - outside, np.nan))
+            prior_outside = ind.shift(outside_count.astype(np.float64), 1) - count_at_start
+            first_exit = outside & (np.nan_to_num(prior_outside, nan=0.0) == 0) & ~np.isnan(count_at_start)
+
+            upward = first_exit & (close > top)
+            downward = first_exit & (close < bottom)
+
+        return {
+            'Upward Breakout': ('Range Breakout', 1, upward),
+            'Downward Breakout': ('Range Breakout', -1, downward)
+        }
+
+    def _levels(self, series, tolerance, find_peaks):
+        """
+        Most recent confirmed peak (or trough) level with its touch statistics
+
+        Args:
+            series: High (peaks) or Low (troughs) panel
+            tolerance: Relative distance counted as a touch
+            find_peaks: True for resistance peaks, False for support troughs
+
+        Returns:
+            Tuple of (level, touches, strength) panels valid at each bar
+        """
+        ind = PanelIndicators
+        window = self.peak_window
+        half = window // 2
+        lookback = self.level_lookback
+        n_symbols, n_bars = series.shape
+
+        # pandas' centered window of `window` bars spans [p - half, p + window - half - 1],
+        # so a peak at p is confirmed once bar p + window - half - 1 has closed
+        delay = window - half - 1
+        extreme = ind.rolling_max(series, window) if find_peaks else ind.rolling_min(series, window)
+        candidate = ind.shift(series, delay)
+        with np.errstate(invalid='ignore'):
+            confirmed = np.where(candidate == extreme, candidate, np.nan)
+        candidate_level = ind.ffill(confirmed)
+
+        level = np.full_like(series, np.nan)
+        touches = np.zeros_like(series)
+        strength = np.zeros_like(series)
+
+        if n_bars <= lookback:
+            return level, touches, strength
+
+        # Touches are counted over the `lookback` bars before t. The reference
+        # level moves with t, so each window is scanned, but one offset at a
+        # time over every bar: memory stays at a few panels instead of a
+        # (symbols x bars x lookback) window array
+        previous = ind.shift(series, 1)
+        ref = candidate_level[:, lookback - 1:]
+        band = tolerance * ref
+        count = np.zeros(ref.shape)
+        total = np.zeros(ref.shape)
+        bars_since_touch = np.zeros(ref.shape)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for offset in range(lookback):
+                # Bar t - offset - 1 of every window ending at bar t
+                values = previous[:, lookback - 1 - offset:n_bars - offset]
+                near = np.abs(values - ref) <= band
+                count += near
+                total += np.where(near, values, 0.0)
+                bars_since_touch[(bars_since_touch == 0) & near] = offset + 1
+            bars_since_touch[bars_since_touch == 0] = 1
+
+            level[:, lookback - 1:] = np.where(count > 0, total / count, np.nan)
+            touches[:, lookback - 1:] = count
+            strength[:, lookback - 1:] = count * (1 + bars_since_touch / lookback)
+
+        return level, touches, strength
+
+    def _resistance_signals(self, panel):
+        ind = PanelIndicators
+        close = panel.field('close')
+        high = panel.field('high')
+        prev_close = ind.shift(close, 1)
+
+        # ResistanceBreakoutScanner: 2% touch tolerance, at least 3 touches
+        level, touches, _ = self._levels(high, 0.02, find_peaks=True)
+        valid = touches >= 3
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fresh = valid & (close > level * 1.01) & (prev_close <= level * 1.01)
+
+            recent_max = ind.rolling_max(high, 20)
+            retracement_pct = (recent_max - close) / (recent_max - level) * 100
+            retracement = (valid & ~fresh & (close > level) & (recent_max - level > level * 0.03)
+                           & (close < recent_max * 0.95) & (close > level * 1.005)
+                           & (retracement_pct >= 30) & (retracement_pct <= 70))
+
+            failed = (valid & (prev_close > level) & (close <= level)
+                      & (ind.rolling_max(high, 10) > level * 1.02))
+
+        return {
+            'Fresh Breakout': ('Resistance Breakout', 1, fresh),
+            'Retracement Entry': ('Resistance Breakout', 1, retracement),
+            'Failed Breakout': ('Resistance Breakout', -1, failed)
+        }
+
+    def _support_signals(self, panel):
+        close = panel.field('close')
+
+        # SupportLevelScanner: 2.5% touch tolerance, at least 2 touches, strength >= 5
+        support, support_touches, support_strength = self._levels(panel.field('low'), 0.025, find_peaks=False)
+        resistance, resistance_touches, resistance_strength = self._levels(panel.field('high'), 0.025, find_peaks=True)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dist_support = (close - support) / close * 100
+            dist_resistance = (resistance - close) / close * 100
+
+            near_support = ((support_touches >= 2) & (support < close) & (dist_support <= 3)
+                            & (support_strength >= 5))
+            near_resistance = (~near_support & (resistance_touches >= 2) & (resistance > close)
+                               & (dist_resistance <= 3) & (resistance_strength >= 5))
+
+        return {
+            'Near Strong Support': ('Support Level', 1, near_support),
+            'Near Strong Resistance': ('Support Level', -1, near_resistance)
+        }
+
+    def _outcomes(self, panel, mask, direction):
+        """Forward returns and excursions for every signal occurrence in a panel"""
+        close = panel.field('close')
+        n_bars = close.shape[1]
+        rows, cols = np.nonzero(mask)
+        entry = close[rows, cols]
+
+        outcome = {'symbols': set(panel.symbols[i] for i in np.unique(rows)), 'forward': {}}
+
+        for horizon in self.horizons:
+            target = cols + horizon
+            in_range = target < n_bars
+            forward = np.full(len(rows), np.nan)
+            forward[in_range] = close[rows[in_range], target[in_range]] / entry[in_range] - 1
+            outcome['forward'][horizon] = forward * 100
+
+        # Excursions over the longest horizon, gathered only at signal bars
+        max_horizon = self.horizons[-1]
+        offsets = cols[:, None] + np.arange(1, max_horizon + 1)
+        inside = offsets < n_bars
+        path = np.full(offsets.shape, np.nan)
+        path[inside] = close[np.repeat(rows, max_horizon).reshape(offsets.shape)[inside], offsets[inside]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            signed_path = direction * (path / entry[:, None] - 1) * 100
+
+        complete = inside.all(axis=1) & ~np.isnan(signed_path).any(axis=1)
+        signed_path = signed_path[complete]
+        outcome['mfe'] = signed_path.max(axis=1) if len(signed_path) else np.array([])
+        outcome['mae'] = signed_path.min(axis=1) if len(signed_path) else np.array([])
+        outcome['bars_to_peak'] = signed_path.argmax(axis=1) + 1 if len(signed_path) else np.array([])
+        return outcome
+
+    def _summarize(self, collected):
+        rows = []
+        returns = {}
+
+        for name, entry in collected.items():
+            parts = entry['parts']
+            direction = entry['direction']
+            symbols = set().union(*(part['symbols'] for part in parts))
+            row = {
+                'Scanner': entry['scanner'],
+                'Signal': name,
+                'Direction': 'Bullish' if direction > 0 else 'Bearish',
+                'Signals': int(sum(len(part['forward'][self.horizons[0]]) for part in parts)),
+                'Symbols': len(symbols)
+            }
+            returns[name] = {}
+
+            for horizon in self.horizons:
+                values = np.concatenate([part['forward'][horizon] for part in parts])
+                values = values[~np.isnan(values)]
+                returns[name][horizon] = values
+                if len(values):
+                    row[f'Mean_{horizon}b_%'] = round(float(values.mean()), 3)
+                    row[f'Median_{horizon}b_%'] = round(float(np.median(values)), 3)
+                    row[f'Hit_Rate_{horizon}b_%'] = round(float((direction * values > 0).mean() * 100), 1)
+                else:
+                    row[f'Mean_{horizon}b_%'] = None
+                    row[f'Median_{horizon}b_%'] = None
+                    row[f'Hit_Rate_{horizon}b_%'] = None
+
+            mfe = np.concatenate([part['mfe'] for part in parts])
+            mae = np.concatenate([part['mae'] for part in parts])
+            bars_to_peak = np.concatenate([part['bars_to_peak'] for part in parts])
+            row['Avg_MFE_%'] = round(float(mfe.mean()), 3) if len(mfe) else None
+            row['Avg_MAE_%'] = round(float(mae.mean()), 3) if len(mae) else None
+            row['Avg_Bars_to_Peak'] = round(float(bars_to_peak.mean()), 1) if len(bars_to_peak) else None
+            rows.append(row)
+
+        return pd.DataFrame(rows), returns
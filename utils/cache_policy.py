@@ -0,0 +1,219 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from utils.market_calendar import IST, NSE_CALENDAR
+
+class CachePolicy:
+    """Expiry times for market data aligned to NSE bars and trading hours
+
+    Data fetched while the market is open stays valid until the next bar of
+    its interval closes, capped at the refresh grid so the forming bar's
+    price is never older than one refresh step. Sessions, holidays and bar
+    boundaries come from the market calendar. After the close the data is
+    refreshed once when the closing prices have settled and then kept until
+    the next session opens, so nights, weekends and holidays never refetch.
+    """
+
+    def __init__(self, refresh_minutes=15, publish_delay=30, settle_minutes=30, calendar=None):
+        """
+        Args:
+            refresh_minutes: Longest time intraday data is kept while the market is open
+            publish_delay: Seconds after a bar closes before it is expected at Yahoo
+            settle_minutes: Minutes after the close before closing prices are final
+            calendar: MarketCalendar (defaults to the NSE calendar)
+        """
+        self.refresh_minutes = refresh_minutes
+        self.publish_delay = timedelta(seconds=publish_delay)
+        self.settle_minutes = settle_minutes
+        self.calendar = calendar or NSE_CALENDAR
+
+    def session_bounds(self, now):
+        """Get the session open and close on the day of now (IST datetimes)"""
+        return self.calendar.session_bounds(now)
+
+    def is_trading_day(self, day):
+        """Whether the exchange trades on a date"""
+        return self.calendar.is_trading_day(day)
+
+    def is_session_open(self, now=None):
+        """Check whether the market is open at now (defaults to the current time)"""
+        return self.calendar.is_session_open(now)
+
+    def next_session_open(self, now=None):
+        """Get the next session open strictly after now"""
+        return self.calendar.next_session_open(now)
+
+    def next_bar_close(self, interval, now=None):
+        """
+        Get when the bar forming at now closes
+
+        Args:
+            interval: Bar interval ('15m', '1h', '4h', '1d', ...)
+            now: Optional IST datetime during the session
+
+        Returns:
+            IST datetime (the session close for daily and longer bars)
+        """
+        return self.calendar.next_bar_close(interval, now)
+
+    def expires_at(self, interval, now=None):
+        """
+        Get when data of an interval fetched at now goes stale
+
+        Args:
+            interval: Bar interval
+            now: Optional IST datetime (defaults to the current time)
+
+        Returns:
+            IST datetime
+        """
+        now = now or datetime.now(IST)
+        _, session_close = self.session_bounds(now)
+
+        if self.is_session_open(now):
+            refresh = self.next_bar_close(f"{self.refresh_minutes}m", now)
+            return min(self.next_bar_close(interval, now), refresh) + self.publish_delay
+
+        settled = session_close + timedelta(minutes=self.settle_minutes)
+        if self.is_trading_day(now) and session_close <= now < settled:
+            return settled
+
+        return self.next_session_open(now) + self.publish_delay
+
+
+class TTLCache:
+    """Thread-safe cache whose entries expire on a CachePolicy schedule
+
+    Concurrent requests for the same key wait for a single load rather than
+    each hitting the network, so scanners sharing a universe and timeframe
+    fetch every symbol once. Loads that fail or return None are not cached.
+    Process-pool scan jobs get their own copy of the cache.
+    """
+
+    def __init__(self, max_entries=5000, policy=None):
+        """
+        Args:
+            max_entries: Maximum number of cached entries
+            policy: CachePolicy deciding expiry times (defaults to NSE hours)
+        """
+        self.max_entries = max_entries
+        self.policy = policy or CachePolicy()
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def is_fresh(self, key):
+        """Whether a key holds an unexpired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.time()
+
+    def get(self, key, default=None):
+        """
+        Get an unexpired entry
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, expires):
+        """
+        Store a value until an expiry time
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            expires: Timezone-aware datetime the entry goes stale
+        """
+        with self._lock:
+            self._entries[key] = (expires.timestamp(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, interval, loader):
+        """
+        Get a cached value, loading it once when missing or stale
+
+        Args:
+            key: Cache key
+            interval: Bar interval deciding the expiry of a fresh load
+            loader: Callable returning the value (exceptions propagate)
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+
+                pending = self._loading.get(key)
+                owner = pending is None
+                if owner:
+                    pending = threading.Event()
+                    self._loading[key] = pending
+                    self.misses += 1
+
+            if not owner:
+                # Another thread is loading this key; use its result
+                pending.wait()
+                continue
+
+            try:
+                value = loader()
+                if value is not None:
+                    self.put(key, value, self.policy.expires_at(interval))
+                return value
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+                pending.set()
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            Dict with entries, hits, misses and hit_rate (0-100)
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(100 * self.hits / lookups, 1) if lookups else 0.0
+            }
+
+
+# Market data shared by every fetcher in the process
+MARKET_DATA_CACHE = TTLCache()
@@ -0,0 +1,372 @@
+import inspect
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from scanners.scanner_registry import SCANNER_JOBS, job_interval
+from utils.cache_policy import MARKET_DATA_CACHE
+from utils.market_calendar import IST
+from utils.signal_table import SignalTable
+from utils.technical_indicators import TechnicalIndicators
+
+# Result columns drawn as horizontal levels, with their line colors
+LEVEL_COLUMNS = OrderedDict([
+    ('Resistance_Level', '#ef5350'),
+    ('Nearest_Resistance', '#ef5350'),
+    ('Nearest_Support', '#26a69a')
+])
+
+# Result columns drawn as a shaded range box (top, bottom)
+RANGE_COLUMNS = ('Range_Top', 'Range_Bottom')
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a line
+
+    Keeps the first and last points and, from every bucket in between,
+    the point forming the largest triangle with the previously kept point
+    and the next bucket's average, so peaks and turns survive.
+
+    Args:
+        x: 1-D float array of x positions (increasing)
+        y: 1-D float array of values
+        threshold: Number of points to keep
+
+    Returns:
+        Sorted integer array of kept indices
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    a = 0
+
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+
+        bucket_x = x[start:end]
+        bucket_y = y[start:end]
+        area = np.abs((x[a] - avg_x) * (bucket_y - y[a]) - (x[a] - bucket_x) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+
+    kept[-1] = n - 1
+    return kept
+
+
+def minmax_indices(y, buckets):
+    """
+    Min/max downsampling for bars (keeps each bucket's lowest and highest value)
+
+    Args:
+        y: 1-D float array of values
+        buckets: Number of buckets (up to twice as many indices are kept)
+
+    Returns:
+        Sorted integer array of kept indices
+    """
+    n = len(y)
+    if 2 * buckets >= n:
+        return np.arange(n)
+
+    size = int(np.ceil(n / buckets))
+    starts = np.arange(0, n, size)
+    kept = []
+    for start in starts:
+        window = y[start:start + size]
+        kept.append(start + int(np.argmin(window)))
+        kept.append(start + int(np.argmax(window)))
+    return np.unique(kept)
+
+
+def ohlc_buckets(bars, max_candles):
+    """
+    Merge consecutive candles so at most max_candles remain
+
+    Each merged candle opens at its first bar's open, closes at its last
+    bar's close and spans the highest high and lowest low in between, so
+    no price extreme is lost.
+
+    Args:
+        bars: DataFrame with Open, High, Low, Close and optional Volume columns
+        max_candles: Maximum number of candles
+
+    Returns:
+        DataFrame indexed by each bucket's first bar time
+    """
+    n = len(bars)
+    if n <= max_candles:
+        return bars
+
+    size = int(np.ceil(n / max_candles))
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    merged = {
+        'Open': bars['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(bars['High'].to_numpy(), starts),
+        'Low': np.minimum.reduceat(bars['Low'].to_numpy(), starts),
+        'Close': bars['Close'].to_numpy()[ends]
+    }
+    if 'Volume' in bars.columns:
+        merged['Volume'] = np.add.reduceat(bars['Volume'].to_numpy(), starts)
+    return pd.DataFrame(merged, index=bars.index[starts])
+
+
+class ChartBuilder:
+    """Per-symbol candle and MACD charts drawn from bars the scan already fetched
+
+    Bars are read from the shared market data cache under the key the
+    scanner used (scanner.bars_cache_key), so opening a chart right after a
+    scan does no network I/O; only an expired entry falls back to the
+    scanner's own fetch, which refills the cache. Long histories are
+    downsampled before plotting (candles merged in OHLC buckets, MACD lines
+    with LTTB, the histogram with min/max buckets), and finished figures are
+    kept as JSON per (job, symbol, last bar, levels), so reopening a chart
+    or serving it to another session skips the build.
+    """
+
+    def __init__(self, cache=MARKET_DATA_CACHE, max_points=1200, figure_entries=256):
+        """
+        Args:
+            cache: TTLCache holding the scanners' bars
+            max_points: Maximum candles and line points drawn per chart
+            figure_entries: Finished figures kept in memory
+        """
+        self.cache = cache
+        self.max_points = max_points
+        self.figure_entries = figure_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def job_bars_request(scanner_name):
+        """
+        Get the bars a scanner job analyzes
+
+        Args:
+            scanner_name: Job name from SCANNER_JOBS
+
+        Returns:
+            Tuple of (scanner class, timeframe, lookback days)
+        """
+        scanner_cls, scan_kwargs = SCANNER_JOBS[scanner_name]
+        defaults = {
+            name: parameter.default
+            for name, parameter in inspect.signature(scanner_cls.scan).parameters.items()
+            if parameter.default is not inspect.Parameter.empty
+        }
+        kwargs = {**defaults, **scan_kwargs}
+        return scanner_cls, job_interval(scanner_cls, kwargs), kwargs.get('lookback_days')
+
+    def cached_bars(self, scanner_name, symbol, fetch=True):
+        """
+        Get a symbol's bars as the scanner job saw them
+
+        Args:
+            scanner_name: Job name from SCANNER_JOBS
+            symbol: Symbol as reported in the results (suffix optional)
+            fetch: Whether to fetch through the scanner when the cache misses
+
+        Returns:
+            Tuple of (DataFrame with OHLCV data or None, timeframe)
+        """
+        scanner_cls, timeframe, lookback_days = self.job_bars_request(scanner_name)
+        symbol = SignalTable.normalize_symbol(symbol)
+        bars = self.cache.get(scanner_cls.bars_cache_key(symbol, timeframe, lookback_days))
+        if bars is None and fetch:
+            try:
+                bars = scanner_cls().fetch_symbol_data(symbol, timeframe, lookback_days)
+            except Exception as e:
+                print(f"Error fetching chart bars for {symbol}: {e}")
+                bars = None
+        return bars, timeframe
+
+    @staticmethod
+    def signal_levels(row):
+        """
+        Get the price levels a result row reports
+
+        Args:
+            row: Dict-like result row
+
+        Returns:
+            Tuple of (list of (column, level) pairs, (top, bottom) or None)
+        """
+        levels = []
+        for column in LEVEL_COLUMNS:
+            value = row.get(column)
+            if value is not None and not pd.isna(value):
+                levels.append((column, float(value)))
+
+        box = None
+        top, bottom = (row.get(column) for column in RANGE_COLUMNS)
+        if top is not None and bottom is not None and not pd.isna(top) and not pd.isna(bottom):
+            box = (float(top), float(bottom))
+        return levels, box
+
+    def figure_json(self, scanner_name, row, fetch=True):
+        """
+        Get the chart of a result row as Plotly JSON
+
+        Args:
+            scanner_name: Job name from SCANNER_JOBS
+            row: Dict-like result row with a Symbol (or symbol) entry
+            fetch: Whether to fetch through the scanner when the cache misses
+
+        Returns:
+            Figure JSON string, or None when no bars are available
+        """
+        symbol = row.get('Symbol', row.get('symbol'))
+        if symbol is None:
+            return None
+
+        bars, timeframe = self.cached_bars(scanner_name, symbol, fetch=fetch)
+        if bars is None or bars.empty:
+            return None
+
+        levels, box = self.signal_levels(row)
+        key = (scanner_name, SignalTable.normalize_symbol(symbol), timeframe, bars.index[-1],
+               len(bars), float(bars['Close'].iloc[-1]), tuple(levels), box)
+
+        with self._lock:
+            figure = self._figures.get(key)
+            if figure is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return figure
+            self.misses += 1
+
+        try:
+            figure = self.build_figure(bars, f"{symbol} · {timeframe}", timeframe, levels, box).to_json()
+        except Exception as e:
+            print(f"Error building chart for {symbol}: {e}")
+            return None
+
+        with self._lock:
+            self._figures[key] = figure
+            while len(self._figures) > self.figure_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def figure(self, scanner_name, row, fetch=True):
+        """
+        Get the chart of a result row as a Plotly figure dict
+
+        Args:
+            scanner_name: Job name from SCANNER_JOBS
+            row: Dict-like result row
+            fetch: Whether to fetch through the scanner when the cache misses
+
+        Returns:
+            Figure dict for st.plotly_chart, or None when no bars are available
+        """
+        figure = self.figure_json(scanner_name, row, fetch=fetch)
+        return json.loads(figure) if figure is not None else None
+
+    def build_figure(self, bars, title, timeframe, levels=(), box=None):
+        """
+        Draw candles with signal levels over a MACD panel
+
+        Args:
+            bars: DataFrame with OHLCV data
+            title: Chart title
+            timeframe: Bar interval (decides which gaps are hidden)
+            levels: (name, price) pairs drawn as horizontal lines
+            box: Optional (top, bottom) range drawn as a shaded box
+
+        Returns:
+            plotly.graph_objects.Figure
+        """
+        bars = bars.dropna(subset=['Open', 'High', 'Low', 'Close'])
+        macd = TechnicalIndicators.calculate_macd(bars['Close'])
+        times = self._wall_times(bars.index)
+
+        candles = ohlc_buckets(bars.set_axis(times), self.max_points)
+        positions = np.arange(len(bars), dtype=float)
+        line_index = lttb(positions, macd['MACD'].to_numpy(dtype=float), self.max_points)
+        signal_index = lttb(positions, macd['Signal'].to_numpy(dtype=float), self.max_points)
+        histogram = macd['Histogram'].to_numpy(dtype=float)
+        histogram_index = minmax_indices(histogram, self.max_points // 2)
+
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.03,
+                            row_heights=[0.7, 0.3])
+        fig.add_trace(go.Candlestick(
+            x=candles.index, open=candles['Open'], high=candles['High'],
+            low=candles['Low'], close=candles['Close'], name='Price'
+        ), row=1, col=1)
+
+        for name, price in levels:
+            fig.add_hline(y=price, line_dash='dash', line_color=LEVEL_COLUMNS[name],
+                          annotation_text=f"{name.replace('_', ' ')} {price:,.2f}",
+                          annotation_position='top left', row=1, col=1)
+        if box is not None:
+            fig.add_hrect(y0=box[1], y1=box[0], fillcolor='#42a5f5', opacity=0.12,
+                          line_width=0, annotation_text='Range', annotation_position='top left',
+                          row=1, col=1)
+
+        colors = np.where(histogram[histogram_index] >= 0, '#26a69a', '#ef5350')
+        fig.add_trace(go.Bar(x=times[histogram_index], y=histogram[histogram_index],
+                             marker_color=colors, name='Histogram'), row=2, col=1)
+        fig.add_trace(go.Scatter(x=times[line_index], y=macd['MACD'].to_numpy()[line_index],
+                                 mode='lines', line=dict(color='#1e88e5', width=1.5), name='MACD'),
+                      row=2, col=1)
+        fig.add_trace(go.Scatter(x=times[signal_index], y=macd['Signal'].to_numpy()[signal_index],
+                                 mode='lines', line=dict(color='#fb8c00', width=1.5), name='Signal'),
+                      row=2, col=1)
+
+        fig.update_xaxes(rangebreaks=self._rangebreaks(timeframe))
+        fig.update_layout(
+            title=title, height=600, showlegend=False, bargap=0,
+            xaxis_rangeslider_visible=False, margin=dict(l=10, r=10, t=40, b=10)
+        )
+        return fig
+
+    @staticmethod
+    def _wall_times(index):
+        """Bar times as timezone-naive IST wall-clock times"""
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_convert(IST).tz_localize(None)
+        return index
+
+    @staticmethod
+    def _rangebreaks(timeframe):
+        """Hide weekends, and nights for intraday bars"""
+        breaks = [dict(bounds=['sat', 'mon'])]
+        if timeframe == '4h':
+            # 4h bars start at 08:00 and 12:00
+            breaks.append(dict(bounds=[16, 8], pattern='hour'))
+        elif timeframe not in ('1d', '5d', '1wk', '1mo', '3mo'):
+            breaks.append(dict(bounds=[15.5, 9.25], pattern='hour'))
+        return breaks
+
+    def stats(self):
+        """
+        Get figure cache counters
+
+        Returns:
+            Dict with entries, hits and misses
+        """
+        with self._lock:
+            return {'entries': len(self._figures), 'hits': self.hits, 'misses': self.misses}
+
+
+# Figures shared by every session in the process
+CHART_BUILDER = ChartBuilder()
@@ -1,15 +1,19 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import time
 import os
+from utils.cache_policy import MARKET_DATA_CACHE
+from utils.market_calendar import NSE_CALENDAR
+from utils.scan_profiler import SCAN_PROFILER
 
 class DataFetcher:
     """Data fetching utilities for NSE stocks and market data"""
     
     def __init__(self):
         self.nse_stocks = self._load_nse_stock_list()
+        # Bars are shared by every fetcher until their next bar close
+        self.cache = MARKET_DATA_CACHE
     
     def _load_nse_stock_list(self):
         """
@@ -54,6 +58,9 @@ class DataFetcher:
         """
         Fetch stock data from Yahoo Finance
         
+        Bars are served from the shared market data cache until the next bar
+        of the interval closes (or the next session opens).
+        
         Args:
             symbol: Stock symbol (e.g., 'RELIANCE.NS')
             period: Data period ('1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max')
@@ -63,36 +70,61 @@ class DataFetcher:
             DataFrame with OHLCV data
         """
         try:
-            # Convert interval for yfinance compatibility
-            interval_map = {
-                "15m": "15m",
-                "1h": "1h", 
-                "4h": "1h",  # Will aggregate to 4h later
-                "1d": "1d"
-            }
-            
-            yf_interval = interval_map.get(interval, interval)
-            
-            # Fetch data
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period=period, interval=yf_interval)
-            
-            if data.empty:
-                return None
-            
-            # Convert to 4-hour data if requested
-            if interval == "4h" and yf_interval == "1h":
-                data = self._resample_to_4h(data)
+            data = self.cache.get_or_load(
+                self.cache_key(symbol, period, interval),
+                interval,
+                lambda: self._download_stock_data(symbol, period, interval)
+            )
             
-            # Clean data
-            data = data.dropna()
-            
-            return data
+            # Callers get their own copy so cached bars are never modified
+            return data.copy() if data is not None else None
             
         except Exception as e:
             print(f"Error fetching data for {symbol}: {e}")
             return None
     
+    @staticmethod
+    def cache_key(symbol, period, interval):
+        """Key of a symbol's bars in the market data cache"""
+        return ('bars', symbol, period, interval)
+    
+    def _download_stock_data(self, symbol, period, interval):
+        """
+        Download bars from Yahoo Finance (errors propagate)
+        
+        Args:
+            symbol: Stock symbol
+            period: Data period
+            interval: Data interval
+        
+        Returns:
+            DataFrame with OHLCV data, or None when Yahoo returns nothing
+        """
+        # Convert interval for yfinance compatibility
+        interval_map = {
+            "15m": "15m",
+            "1h": "1h", 
+            "4h": "1h",  # Will aggregate to 4h later
+            "1d": "1d"
+        }
+        
+        yf_interval = interval_map.get(interval, interval)
+        
+        # Fetch data
+        ticker = yf.Ticker(symbol)
+        data = ticker.history(period=period, interval=yf_interval)
+        
+        if data.empty:
+            return None
+        
+        # Convert to 4-hour data if requested
+        if interval == "4h" and yf_interval == "1h":
+            data = self._resample_to_4h(data)
+        
+        # Clean data
+        return data.dropna()
+    
+    @SCAN_PROFILER.profiled('resample', rows_arg=1)
     def _resample_to_4h(self, hourly_data):
         """
         Resample hourly data to 4-hour intervals
@@ -105,7 +137,7 @@ class DataFetcher:
         """
         try:
             # Resample to 4-hour intervals
-            resampled = hourly_data.resample('4H').agg({
+            resampled = hourly_data.resample('4h').agg({
                 'Open': 'first',
                 'High': 'max',
                 'Low': 'min',
@@ -135,12 +167,14 @@ class DataFetcher:
         
         for symbol in symbols:
             try:
+                cached = self.cache.is_fresh(self.cache_key(symbol, period, interval))
                 data = self.get_stock_data(symbol, period, interval)
                 if data is not None:
                     stock_data[symbol] = data
                 
-                # Small delay to avoid rate limiting
-                time.sleep(0.1)
+                # Small delay to avoid rate limiting (only after a download)
+                if not cached:
+                    time.sleep(0.1)
                 
             except Exception as e:
                 print(f"Error fetching {symbol}: {e}")
@@ -185,17 +219,8 @@ class DataFetcher:
             Boolean indicating if market is open
         """
         try:
-            now = datetime.now()
-            
-            # NSE trading hours: 9:15 AM to 3:30 PM IST (Monday to Friday)
-            market_open = now.replace(hour=9, minute=15, second=0, microsecond=0)
-            market_close = now.replace(hour=15, minute=30, second=0, microsecond=0)
-            
-            # Check if it's a weekday and within trading hours
-            is_weekday = now.weekday() < 5  # Monday = 0, Friday = 4
-            is_trading_hours = market_open <= now <= market_close
-            
-            return is_weekday and is_trading_hours
+            # NSE trading hours: 9:15 AM to 3:30 PM IST on trading days (no weekends or holidays)
+            return NSE_CALENDAR.is_session_open()
             
         except Exception as e:
             print(f"Error checking market hours: {e}")
@@ -0,0 +1,243 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+import pytz
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# Holiday list shipped with the project
+DEFAULT_HOLIDAYS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'data', 'nse_holidays.csv')
+
+class MarketCalendar:
+    """NSE trading days, session hours and bar boundaries
+
+    Trading days are weekdays that are not listed in the holiday file (a
+    CSV of date,description rows; '#' lines are comments). Bar closes
+    follow how the scanners build bars: intraday bars are counted from the
+    09:15 open with the last bar cut short at 15:30, and 4h bars are
+    resampled from 1h bars on clock boundaries (00:00, 04:00, ...), so a 4h
+    bar is complete when the last hourly bar in it closes (12:15 and 15:30).
+    Daily and longer bars close with the session.
+    """
+
+    SESSION_OPEN = (9, 15)
+    SESSION_CLOSE = (15, 30)
+
+    # Bar length in minutes for every interval (None for daily and longer)
+    INTERVAL_MINUTES = {
+        '1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30,
+        '60m': 60, '1h': 60, '90m': 90, '4h': 240
+    }
+
+    # Intervals resampled from shorter downloaded bars on clock boundaries
+    RESAMPLED_FROM = {'4h': '1h'}
+
+    def __init__(self, holidays_path=DEFAULT_HOLIDAYS_PATH):
+        """
+        Args:
+            holidays_path: CSV of exchange holidays (None for weekends only)
+        """
+        self.holidays_path = holidays_path
+        self.holidays = self.load_holidays(holidays_path) if holidays_path else {}
+        self._bar_closes = {}
+        self._lock = threading.Lock()
+        self._warned_years = set()
+
+    @staticmethod
+    def load_holidays(path):
+        """
+        Read a holiday file
+
+        Args:
+            path: CSV path with date (YYYY-MM-DD) and description columns
+
+        Returns:
+            Dict with date as key and description as value
+        """
+        holidays = {}
+        try:
+            with open(path, encoding='utf-8') as handle:
+                for line in handle:
+                    line = line.strip()
+                    if not line or line.startswith('#') or line.lower().startswith('date'):
+                        continue
+                    day, _, description = line.partition(',')
+                    holidays[date.fromisoformat(day.strip())] = description.strip()
+        except (OSError, ValueError) as e:
+            print(f"Error loading market holidays from {path}: {e}")
+        return holidays
+
+    def holiday_name(self, day):
+        """Name of the holiday on a date, or None"""
+        day = day.date() if isinstance(day, datetime) else day
+        return self.holidays.get(day)
+
+    def is_trading_day(self, day):
+        """
+        Check whether the exchange trades on a date
+
+        Args:
+            day: date or datetime
+
+        Returns:
+            Boolean (weekdays that are not holidays)
+        """
+        day = day.date() if isinstance(day, datetime) else day
+        if self.holidays and day.year not in self._warned_years and \
+                not any(holiday.year == day.year for holiday in self.holidays):
+            # Only weekends are known for years missing from the file
+            self._warned_years.add(day.year)
+            print(f"Market calendar has no holidays for {day.year}; update {self.holidays_path}")
+        return day.weekday() < 5 and day not in self.holidays
+
+    def session_bounds(self, now):
+        """
+        Get the session open and close on the day of now
+
+        Args:
+            now: IST datetime
+
+        Returns:
+            Tuple of (open, close) IST datetimes
+        """
+        session_open = now.replace(hour=self.SESSION_OPEN[0], minute=self.SESSION_OPEN[1], second=0, microsecond=0)
+        session_close = now.replace(hour=self.SESSION_CLOSE[0], minute=self.SESSION_CLOSE[1], second=0, microsecond=0)
+        return session_open, session_close
+
+    def is_session_open(self, now=None):
+        """
+        Check whether the market is open
+
+        Args:
+            now: Optional IST datetime (defaults to the current time)
+
+        Returns:
+            Boolean
+        """
+        now = now or datetime.now(IST)
+        session_open, session_close = self.session_bounds(now)
+        return self.is_trading_day(now) and session_open <= now < session_close
+
+    def next_session_open(self, now=None):
+        """
+        Get the next session open strictly after now
+
+        Args:
+            now: Optional IST datetime (defaults to the current time)
+
+        Returns:
+            IST datetime
+        """
+        now = now or datetime.now(IST)
+        candidate, _ = self.session_bounds(now)
+        if candidate <= now:
+            candidate = self._next_day(candidate)
+        while not self.is_trading_day(candidate):
+            candidate = self._next_day(candidate)
+        return candidate
+
+    @staticmethod
+    def _next_day(moment):
+        """Same wall-clock time on the next calendar day"""
+        return IST.localize(moment.replace(tzinfo=None) + timedelta(days=1))
+
+    @staticmethod
+    def _previous_day(moment):
+        """Same wall-clock time on the previous calendar day"""
+        return IST.localize(moment.replace(tzinfo=None) - timedelta(days=1))
+
+    def bar_closes(self, interval, day):
+        """
+        Get every bar close of an interval in one session
+
+        Args:
+            interval: Bar interval ('15m', '1h', '4h', '1d', ...)
+            day: IST datetime on the session's date
+
+        Returns:
+            Sorted tuple of IST datetimes (empty on non-trading days)
+        """
+        key = (interval, day.date())
+        with self._lock:
+            closes = self._bar_closes.get(key)
+        if closes is not None:
+            return closes
+
+        closes = ()
+        if self.is_trading_day(day):
+            session_open, session_close = self.session_bounds(day)
+            base = self.RESAMPLED_FROM.get(interval, interval)
+            minutes = self.INTERVAL_MINUTES.get(base)
+
+            if minutes is None:
+                closes = (session_close,)
+            else:
+                # Downloaded bars: (start, close) from the open, cut at the session close
+                bars = []
+                start = session_open
+                while start < session_close:
+                    bars.append((start, min(start + timedelta(minutes=minutes), session_close)))
+                    start += timedelta(minutes=minutes)
+
+                if interval in self.RESAMPLED_FROM:
+                    # A resampled bar is complete when its last source bar closes
+                    width = self.INTERVAL_MINUTES[interval]
+                    midnight = session_open.replace(hour=0, minute=0)
+                    last_close = {}
+                    for start, close in bars:
+                        bucket = int((start - midnight).total_seconds() // 60) // width
+                        last_close[bucket] = close
+                    closes = tuple(sorted(last_close.values()))
+                else:
+                    closes = tuple(close for _, close in bars)
+
+        with self._lock:
+            if len(self._bar_closes) > 1000:
+                self._bar_closes.clear()
+            self._bar_closes[key] = closes
+        return closes
+
+    def next_bar_close(self, interval, now=None):
+        """
+        Get the first bar close strictly after now, skipping closed days
+
+        Args:
+            interval: Bar interval
+            now: Optional IST datetime (defaults to the current time)
+
+        Returns:
+            IST datetime
+        """
+        now = now or datetime.now(IST)
+        day = now
+        for _ in range(30):
+            for close in self.bar_closes(interval, day):
+                if close > now:
+                    return close
+            day = self._next_day(day)
+        raise ValueError(f"No trading session within 30 days of {now}")
+
+    def last_bar_close(self, interval, now=None):
+        """
+        Get the most recent bar close at or before now, skipping closed days
+
+        Args:
+            interval: Bar interval
+            now: Optional IST datetime (defaults to the current time)
+
+        Returns:
+            IST datetime
+        """
+        now = now or datetime.now(IST)
+        day = now
+        for _ in range(30):
+            for close in reversed(self.bar_closes(interval, day)):
+                if close <= now:
+                    return close
+            day = self._previous_day(day)
+        raise ValueError(f"No trading session within 30 days before {now}")
+
+
+# Calendar shared by the scheduler, the data cache and the UI
+NSE_CALENDAR = MarketCalendar()
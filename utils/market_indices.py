@@ -1,263 +1,400 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from datetime import datetime
-import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from utils.cache_policy import MARKET_DATA_CACHE
+
+# Everything derived from one batch download of index and sector bars.
+# Shared by every caller; getters hand out copies.
+IndexSnapshot = namedtuple('IndexSnapshot', [
+    'history',    # symbol -> daily OHLCV DataFrame
+    'live',       # DataFrame of index quotes (get_live_indices)
+    'sectors',    # DataFrame of sector changes (get_sector_performance)
+    'momentum',   # index name -> momentum dict (calculate_index_momentum)
+    'sentiment',  # market sentiment dict, or None
+    'fetched_at'  # datetime of the download
+])
 
 class MarketIndices:
-    """Market indices data fetching and analysis"""
-    
+    """Market indices data fetching and analysis
+
+    Every index and sector symbol is fetched in one batched yf.download call
+    and the quotes, sector table, momentum and sentiment are all derived
+    from that single download. The result is kept in the market data cache
+    until the next LIVE_INTERVAL bar closes (the next session open after
+    hours), so repeated calls and reruns cost a cache lookup and a copy.
+    """
+
+    # Live quotes are refreshed on this bar grid while the market is open
+    LIVE_INTERVAL = "5m"
+    # Daily history downloaded for every symbol (covers momentum and sector changes)
+    HISTORY_PERIOD = "3mo"
+    # Shorter daily periods served from the downloaded history
+    HISTORY_SLICES = {"5d": None, "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3)}
+    # Indices averaged for market sentiment
+    SENTIMENT_INDICES = ['NIFTY', 'BANKNIFTY', 'SENSEX']
+    # Seconds before a failed download is retried
+    FAILURE_TTL = 60
+
     def __init__(self):
+        self.cache = MARKET_DATA_CACHE
         self.indices = {
             "NIFTY": "^NSEI",
-            "BANKNIFTY": "^NSEBANK", 
+            "BANKNIFTY": "^NSEBANK",
             "SENSEX": "^BSESN",
             "FINNIFTY": "^CNXFIN",
             "NIFTYMID": "^CNXMID",
             "NIFTYSMALL": "^CNXSC"
         }
-    
-    def get_live_indices(self):
+        self.sector_indices = {
+            "IT": "^CNXIT",
+            "BANK": "^NSEBANK",
+            "AUTO": "^CNXAUTO",
+            "PHARMA": "^CNXPHARMA",
+            "FMCG": "^CNXFMCG",
+            "METAL": "^CNXMETAL",
+            "REALTY": "^CNXREALTY",
+            "ENERGY": "^CNXENERGY"
+        }
+
+    def get_snapshot(self):
         """
-        Fetch live market indices data
-        
+        Get the cached index snapshot, downloading it when stale
+
+        A failed download is remembered as an empty snapshot for
+        FAILURE_TTL seconds, so an outage does not stall every rerun.
+
         Returns:
-            DataFrame with current indices information
+            IndexSnapshot (with empty tables when nothing could be fetched)
         """
+        key = ('indices', 'snapshot')
         try:
-            indices_data = []
-            
-            for name, symbol in self.indices.items():
-                try:
-                    # Fetch ticker data
-                    ticker = yf.Ticker(symbol)
-                    
-                    # Get recent data (last 2 days to calculate change)
-                    data = ticker.history(period="2d", interval="1d")
-                    
-                    if not data.empty and len(data) >= 1:
-                        current_price = data['Close'].iloc[-1]
-                        
-                        # Calculate change
-                        if len(data) >= 2:
-                            prev_close = data['Close'].iloc[-2]
-                        else:
-                            prev_close = current_price
-                        
-                        change = current_price - prev_close
-                        change_percent = (change / prev_close) * 100 if prev_close != 0 else 0
-                        
-                        indices_data.append({
-                            'Name': name,
-                            'Symbol': symbol,
-                            'Price': current_price,
-                            'Change': change,
-                            'Change%': change_percent,
-                            'Volume': data['Volume'].iloc[-1] if 'Volume' in data else 0,
-                            'Timestamp': datetime.now()
-                        })
-                    
-                    # Small delay to avoid rate limiting
-                    time.sleep(0.1)
-                    
-                except Exception as e:
-                    print(f"Error fetching {name}: {e}")
-                    continue
-            
-            return pd.DataFrame(indices_data)
-            
+            snapshot = self.cache.get_or_load(key, self.LIVE_INTERVAL, self._load_snapshot)
         except Exception as e:
             print(f"Error fetching market indices: {e}")
-            return pd.DataFrame()
-    
+            snapshot = None
+
+        if snapshot is None:
+            snapshot = IndexSnapshot(history={}, live=pd.DataFrame(), sectors=pd.DataFrame(),
+                                     momentum={}, sentiment=None, fetched_at=datetime.now())
+            self.cache.put(key, snapshot, snapshot.fetched_at + timedelta(seconds=self.FAILURE_TTL))
+        return snapshot
+
+    def _download_history(self, symbols, period="3mo", interval="1d"):
+        """
+        Download bars for several symbols in one batched request
+
+        Args:
+            symbols: List of Yahoo symbols
+            period: Data period
+            interval: Data interval
+
+        Returns:
+            Dict with symbol as key and OHLCV DataFrame as value (symbols
+            without data are left out)
+        """
+        data = yf.download(
+            symbols,
+            period=period,
+            interval=interval,
+            group_by='ticker',
+            threads=True,
+            progress=False
+        )
+
+        history = {}
+        if data is None or data.empty:
+            return history
+
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    continue
+                frame = data[symbol]
+            else:
+                frame = data
+            frame = frame.dropna(subset=['Close'])
+            if not frame.empty:
+                history[symbol] = frame
+
+        return history
+
+    def _load_snapshot(self):
+        """Download every index and sector and derive the snapshot (None when empty)"""
+        symbols = list(dict.fromkeys(list(self.indices.values()) + list(self.sector_indices.values())))
+        history = self._download_history(symbols, period=self.HISTORY_PERIOD)
+        if not history:
+            return None
+
+        live = self._live_quotes(history)
+        return IndexSnapshot(
+            history=history,
+            live=live,
+            sectors=self._sector_table(history),
+            momentum={name: self._momentum(name, history[symbol])
+                      for name, symbol in self.indices.items() if symbol in history},
+            sentiment=self._sentiment(live),
+            fetched_at=datetime.now()
+        )
+
+    def _live_quotes(self, history):
+        """Latest price and change for every index"""
+        indices_data = []
+        fetched_at = datetime.now()
+
+        for name, symbol in self.indices.items():
+            data = history.get(symbol)
+            if data is None:
+                continue
+
+            current_price = data['Close'].iloc[-1]
+
+            # Calculate change
+            prev_close = data['Close'].iloc[-2] if len(data) >= 2 else current_price
+            change = current_price - prev_close
+            change_percent = (change / prev_close) * 100 if prev_close != 0 else 0
+
+            indices_data.append({
+                'Name': name,
+                'Symbol': symbol,
+                'Price': current_price,
+                'Change': change,
+                'Change%': change_percent,
+                'Volume': data['Volume'].iloc[-1] if 'Volume' in data else 0,
+                'Timestamp': fetched_at
+            })
+
+        return pd.DataFrame(indices_data)
+
+    def _sector_table(self, history):
+        """1-day and 5-day changes for every sector index"""
+        sector_data = []
+
+        for sector, symbol in self.sector_indices.items():
+            data = history.get(symbol)
+            if data is None:
+                continue
+
+            current_price = data['Close'].iloc[-1]
+
+            # Calculate changes over different periods
+            change_1d = 0
+            change_5d = 0
+
+            if len(data) >= 2:
+                change_1d = ((current_price - data['Close'].iloc[-2]) / data['Close'].iloc[-2]) * 100
+
+            if len(data) >= 5:
+                change_5d = ((current_price - data['Close'].iloc[-5]) / data['Close'].iloc[-5]) * 100
+
+            sector_data.append({
+                'Sector': sector,
+                'Price': current_price,
+                'Change_1D%': change_1d,
+                'Change_5D%': change_5d,
+                'Volume': data['Volume'].iloc[-1] if 'Volume' in data else 0
+            })
+
+        return pd.DataFrame(sector_data)
+
+    def get_live_indices(self):
+        """
+        Fetch live market indices data
+
+        Quotes are cached until the next LIVE_INTERVAL bar closes while the
+        market is open, and until the next session opens otherwise.
+
+        Returns:
+            DataFrame with current indices information
+        """
+        return self.get_snapshot().live.copy()
+
     def get_index_data(self, index_name, period="1mo", interval="1d"):
         """
         Get historical data for a specific index
-        
+
+        Daily periods up to HISTORY_PERIOD are sliced from the snapshot;
+        other periods and intervals are downloaded and cached separately.
+
         Args:
             index_name: Name of the index (NIFTY, BANKNIFTY, etc.)
             period: Data period
             interval: Data interval
-            
+
         Returns:
             DataFrame with historical index data
         """
         try:
             if index_name not in self.indices:
                 raise ValueError(f"Index {index_name} not found")
-            
+
             symbol = self.indices[index_name]
-            ticker = yf.Ticker(symbol)
-            
-            data = ticker.history(period=period, interval=interval)
-            
-            return data
-            
+
+            if interval == "1d" and period in self.HISTORY_SLICES:
+                snapshot = self.get_snapshot()
+                if symbol in snapshot.history:
+                    return self._slice_period(snapshot.history[symbol], period).copy()
+
+            data = self.cache.get_or_load(
+                ('index', symbol, period, interval),
+                interval,
+                lambda: self._download_history([symbol], period, interval).get(symbol)
+            )
+
+            return data.copy() if data is not None else pd.DataFrame()
+
         except Exception as e:
             print(f"Error fetching {index_name} data: {e}")
             return pd.DataFrame()
-    
+
+    def _slice_period(self, data, period):
+        """Rows of a daily history within a period ('5d' = last 5 sessions)"""
+        offset = self.HISTORY_SLICES[period]
+        if offset is None:
+            return data.tail(int(period[:-1]))
+        return data[data.index > data.index[-1] - offset]
+
+    @staticmethod
+    def _momentum(index_name, data, short_period=5, long_period=20):
+        """
+        Momentum analysis of one index's daily history
+
+        Args:
+            index_name: Name of the index
+            data: Daily OHLCV DataFrame
+            short_period: Short term period for momentum
+            long_period: Long term period for momentum
+
+        Returns:
+            Dict with momentum analysis, or None when the history is too short
+        """
+        if data.empty or len(data) < long_period:
+            return None
+
+        # Calculate moving averages
+        short_ma = data['Close'].rolling(window=short_period).mean()
+        long_ma = data['Close'].rolling(window=long_period).mean()
+
+        current_price = data['Close'].iloc[-1]
+        current_short_ma = short_ma.iloc[-1]
+        current_long_ma = long_ma.iloc[-1]
+
+        # Momentum signals
+        momentum_signal = "Neutral"
+        if current_price > current_short_ma > current_long_ma:
+            momentum_signal = "Strong Bullish"
+        elif current_price > current_short_ma and current_short_ma < current_long_ma:
+            momentum_signal = "Weak Bullish"
+        elif current_price < current_short_ma > current_long_ma:
+            momentum_signal = "Weak Bearish"
+        elif current_price < current_short_ma < current_long_ma:
+            momentum_signal = "Strong Bearish"
+
+        # Calculate price change over different periods
+        price_1d = ((current_price - data['Close'].iloc[-2]) / data['Close'].iloc[-2]) * 100 if len(data) >= 2 else 0
+        price_5d = ((current_price - data['Close'].iloc[-6]) / data['Close'].iloc[-6]) * 100 if len(data) >= 6 else 0
+        price_20d = ((current_price - data['Close'].iloc[-21]) / data['Close'].iloc[-21]) * 100 if len(data) >= 21 else 0
+
+        return {
+            'index': index_name,
+            'current_price': current_price,
+            'momentum_signal': momentum_signal,
+            'short_ma': current_short_ma,
+            'long_ma': current_long_ma,
+            'change_1d': price_1d,
+            'change_5d': price_5d,
+            'change_20d': price_20d,
+            'volume': data['Volume'].iloc[-1] if 'Volume' in data else 0
+        }
+
     def calculate_index_momentum(self, index_name, short_period=5, long_period=20):
         """
         Calculate momentum for an index
-        
+
         Args:
             index_name: Name of the index
             short_period: Short term period for momentum
             long_period: Long term period for momentum
-            
+
         Returns:
             Dict with momentum analysis
         """
         try:
+            snapshot = self.get_snapshot()
+            if (short_period, long_period) == (5, 20) and index_name in snapshot.momentum:
+                momentum = snapshot.momentum[index_name]
+                return dict(momentum) if momentum is not None else None
+
             data = self.get_index_data(index_name, period="3mo", interval="1d")
-            
-            if data.empty or len(data) < long_period:
-                return None
-            
-            # Calculate moving averages
-            short_ma = data['Close'].rolling(window=short_period).mean()
-            long_ma = data['Close'].rolling(window=long_period).mean()
-            
-            current_price = data['Close'].iloc[-1]
-            current_short_ma = short_ma.iloc[-1]
-            current_long_ma = long_ma.iloc[-1]
-            
-            # Momentum signals
-            momentum_signal = "Neutral"
-            if current_price > current_short_ma > current_long_ma:
-                momentum_signal = "Strong Bullish"
-            elif current_price > current_short_ma and current_short_ma < current_long_ma:
-                momentum_signal = "Weak Bullish"
-            elif current_price < current_short_ma > current_long_ma:
-                momentum_signal = "Weak Bearish"
-            elif current_price < current_short_ma < current_long_ma:
-                momentum_signal = "Strong Bearish"
-            
-            # Calculate price change over different periods
-            price_1d = ((current_price - data['Close'].iloc[-2]) / data['Close'].iloc[-2]) * 100 if len(data) >= 2 else 0
-            price_5d = ((current_price - data['Close'].iloc[-6]) / data['Close'].iloc[-6]) * 100 if len(data) >= 6 else 0
-            price_20d = ((current_price - data['Close'].iloc[-21]) / data['Close'].iloc[-21]) * 100 if len(data) >= 21 else 0
-            
-            return {
-                'index': index_name,
-                'current_price': current_price,
-                'momentum_signal': momentum_signal,
-                'short_ma': current_short_ma,
-                'long_ma': current_long_ma,
-                'change_1d': price_1d,
-                'change_5d': price_5d,
-                'change_20d': price_20d,
-                'volume': data['Volume'].iloc[-1] if 'Volume' in data else 0
-            }
-            
+            return self._momentum(index_name, data, short_period, long_period)
+
         except Exception as e:
             print(f"Error calculating momentum for {index_name}: {e}")
             return None
-    
+
     def get_sector_performance(self):
         """
         Get performance of major sector indices
-        
+
         Returns:
             DataFrame with sector performance
         """
-        try:
-            sector_indices = {
-                "IT": "^CNXIT",
-                "BANK": "^NSEBANK",
-                "AUTO": "^CNXAUTO",
-                "PHARMA": "^CNXPHARMA",
-                "FMCG": "^CNXFMCG",
-                "METAL": "^CNXMETAL",
-                "REALTY": "^CNXREALTY",
-                "ENERGY": "^CNXENERGY"
-            }
-            
-            sector_data = []
-            
-            for sector, symbol in sector_indices.items():
-                try:
-                    ticker = yf.Ticker(symbol)
-                    data = ticker.history(period="5d", interval="1d")
-                    
-                    if not data.empty:
-                        current_price = data['Close'].iloc[-1]
-                        
-                        # Calculate changes over different periods
-                        change_1d = 0
-                        change_5d = 0
-                        
-                        if len(data) >= 2:
-                            change_1d = ((current_price - data['Close'].iloc[-2]) / data['Close'].iloc[-2]) * 100
-                        
-                        if len(data) >= 5:
-                            change_5d = ((current_price - data['Close'].iloc[-5]) / data['Close'].iloc[-5]) * 100
-                        
-                        sector_data.append({
-                            'Sector': sector,
-                            'Price': current_price,
-                            'Change_1D%': change_1d,
-                            'Change_5D%': change_5d,
-                            'Volume': data['Volume'].iloc[-1] if 'Volume' in data else 0
-                        })
-                    
-                    time.sleep(0.1)
-                    
-                except Exception as e:
-                    print(f"Error fetching {sector}: {e}")
-                    continue
-            
-            return pd.DataFrame(sector_data)
-            
-        except Exception as e:
-            print(f"Error fetching sector performance: {e}")
-            return pd.DataFrame()
-    
+        return self.get_snapshot().sectors.copy()
+
+    def _sentiment(self, indices_data):
+        """
+        Overall market sentiment from index quotes
+
+        Args:
+            indices_data: DataFrame from _live_quotes()
+
+        Returns:
+            Dict with market sentiment analysis, or None without major indices
+        """
+        if indices_data.empty:
+            return None
+
+        # Calculate average change across major indices
+        major_indices = indices_data[indices_data['Name'].isin(self.SENTIMENT_INDICES)]
+
+        if major_indices.empty:
+            return None
+
+        avg_change = major_indices['Change%'].mean()
+        positive_indices = len(major_indices[major_indices['Change%'] > 0])
+        total_indices = len(major_indices)
+
+        # Determine sentiment
+        if avg_change > 1 and positive_indices >= total_indices * 0.7:
+            sentiment = "Very Bullish"
+        elif avg_change > 0.5 and positive_indices >= total_indices * 0.6:
+            sentiment = "Bullish"
+        elif avg_change > -0.5 and positive_indices >= total_indices * 0.4:
+            sentiment = "Neutral"
+        elif avg_change > -1 and positive_indices >= total_indices * 0.3:
+            sentiment = "Bearish"
+        else:
+            sentiment = "Very Bearish"
+
+        return {
+            'sentiment': sentiment,
+            'avg_change': avg_change,
+            'positive_indices': positive_indices,
+            'total_indices': total_indices,
+            'positive_ratio': positive_indices / total_indices,
+            'timestamp': datetime.now()
+        }
+
     def get_market_sentiment(self):
         """
         Calculate overall market sentiment based on major indices
-        
+
+        Derived from the same cached snapshot as get_live_indices(), so it
+        never triggers a second download.
+
         Returns:
             Dict with market sentiment analysis
         """
-        try:
-            indices_data = self.get_live_indices()
-            
-            if indices_data.empty:
-                return None
-            
-            # Calculate average change across major indices
-            major_indices = indices_data[indices_data['Name'].isin(['NIFTY', 'BANKNIFTY', 'SENSEX'])]
-            
-            if major_indices.empty:
-                return None
-            
-            avg_change = major_indices['Change%'].mean()
-            positive_indices = len(major_indices[major_indices['Change%'] > 0])
-            total_indices = len(major_indices)
-            
-            # Determine sentiment
-            if avg_change > 1 and positive_indices >= total_indices * 0.7:
-                sentiment = "Very Bullish"
-            elif avg_change > 0.5 and positive_indices >= total_indices * 0.6:
-                sentiment = "Bullish"
-            elif avg_change > -0.5 and positive_indices >= total_indices * 0.4:
-                sentiment = "Neutral"
-            elif avg_change > -1 and positive_indices >= total_indices * 0.3:
-                sentiment = "Bearish"
-            else:
-                sentiment = "Very Bearish"
-            
-            return {
-                'sentiment': sentiment,
-                'avg_change': avg_change,
-                'positive_indices': positive_indices,
-                'total_indices': total_indices,
-                'positive_ratio': positive_indices / total_indices,
-                'timestamp': datetime.now()
-            }
-            
-        except Exception as e:
-            print(f"Error calculating market sentiment: {e}")
-            return None
+        sentiment = self.get_snapshot().sentiment
+        return dict(sentiment) if sentiment is not None else None
@@ -0,0 +1,200 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+class BarPanel:
+    """OHLCV bars for a symbol universe as aligned 2-D numpy arrays
+
+    Each field is a (symbols x bars) float64 matrix. Series are aligned on their
+    most recent bar (right edge) and padded with NaN on the left, so column -1
+    is always the latest bar of every symbol.
+    """
+
+    FIELDS = {
+        'open': 'Open',
+        'high': 'High',
+        'low': 'Low',
+        'close': 'Close',
+        'volume': 'Volume'
+    }
+
+    def __init__(self, data_map, max_bars=400):
+        """
+        Args:
+            data_map: Dict with symbol as key and OHLCV DataFrame as value
+            max_bars: Maximum number of trailing bars kept per symbol (None keeps all)
+        """
+        self.symbols = list(data_map)
+        longest = max((len(data) for data in data_map.values()), default=0)
+        self.n_bars = longest if max_bars is None else min(max_bars, longest)
+        self.fields = {}
+
+        for field, column in self.FIELDS.items():
+            matrix = np.full((len(self.symbols), self.n_bars), np.nan)
+            for i, symbol in enumerate(self.symbols):
+                data = data_map[symbol]
+                if column not in data or self.n_bars == 0:
+                    continue
+                values = data[column].to_numpy(dtype=np.float64)[-self.n_bars:]
+                matrix[i, self.n_bars - len(values):] = values
+            self.fields[field] = matrix
+
+        self.bars_available = np.array([min(len(data_map[s]), self.n_bars) for s in self.symbols])
+        self.last_bar_time = [data_map[s].index[-1] if len(data_map[s]) else None for s in self.symbols]
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def field(self, name):
+        """
+        Get a bar field matrix
+
+        Args:
+            name: Field name (open, high, low, close, volume)
+
+        Returns:
+            (symbols x bars) numpy array
+        """
+        return self.fields[name]
+
+    def latest(self, matrix):
+        """Get the most recent value of a panel matrix for every symbol"""
+        return matrix[:, -1] if matrix.ndim == 2 and matrix.shape[1] else np.full(len(self.symbols), np.nan)
+
+
+class PanelIndicators:
+    """Technical indicators computed across a whole BarPanel at once
+
+    Every function takes and returns (symbols x bars) arrays; loops run over
+    bars where the indicator is recursive, never over symbols.
+    """
+
+    @staticmethod
+    def shift(matrix, periods=1):
+        """Shift a panel right by periods bars (previous values)"""
+        result = np.full_like(matrix, np.nan)
+        if periods <= 0:
+            return matrix.copy()
+        if periods < matrix.shape[1]:
+            result[:, periods:] = matrix[:, :-periods]
+        return result
+
+    @staticmethod
+    def ffill(matrix):
+        """Carry the last non-NaN value forward along the bar axis"""
+        valid = ~np.isnan(matrix)
+        positions = np.where(valid, np.arange(matrix.shape[1]), 0)
+        np.maximum.accumulate(positions, axis=1, out=positions)
+        result = matrix[np.arange(matrix.shape[0])[:, None], positions]
+        # Bars before a symbol's first valid value stay NaN
+        result[~np.logical_or.accumulate(valid, axis=1)] = np.nan
+        return result
+
+    @staticmethod
+    def sma(matrix, period):
+        """Simple moving average over period bars (NaN until the window is full)"""
+        period = int(period)
+        result = np.full_like(matrix, np.nan)
+        if period <= 0 or period > matrix.shape[1]:
+            return result
+
+        valid = ~np.isnan(matrix)
+        csum = np.cumsum(np.where(valid, matrix, 0.0), axis=1)
+        ccount = np.cumsum(valid, axis=1)
+
+        window_sum = csum[:, period - 1:].copy()
+        window_sum[:, 1:] -= csum[:, :-period]
+        window_count = ccount[:, period - 1:].copy()
+        window_count[:, 1:] -= ccount[:, :-period]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[:, period - 1:] = np.where(window_count == period, window_sum / period, np.nan)
+        return result
+
+    @staticmethod
+    def ema(matrix, period):
+        """
+        Exponential moving average seeded with each symbol's first bar
+
+        Matches MACDScannerOriginal.calculate_ema (k = 2 / (period + 1), no bias
+        adjustment) so panel screens agree with the app's MACD scanner.
+        """
+        k = 2 / (int(period) + 1)
+        # Walk bars over a time-major copy so each step touches contiguous memory
+        columns = np.ascontiguousarray(matrix.T)
+        result = np.empty_like(columns)
+        prev = np.full(columns.shape[1], np.nan)
+
+        for t in range(columns.shape[0]):
+            current = columns[t]
+            blended = current * k + prev * (1 - k)
+            # Seed on the first valid bar and carry the last value through gaps
+            prev = np.where(np.isnan(prev), current, np.where(np.isnan(current), prev, blended))
+            result[t] = prev
+        return np.ascontiguousarray(result.T)
+
+    @staticmethod
+    def rolling_max(matrix, period, center=False):
+        """Highest value over the last period bars (or period bars centered on each bar)"""
+        return PanelIndicators._rolling(matrix, period, np.max, center)
+
+    @staticmethod
+    def rolling_min(matrix, period, center=False):
+        """Lowest value over the last period bars (or period bars centered on each bar)"""
+        return PanelIndicators._rolling(matrix, period, np.min, center)
+
+    @staticmethod
+    def rolling_std(matrix, period):
+        """Sample standard deviation over the last period bars"""
+        mean = PanelIndicators.sma(matrix, period)
+        mean_sq = PanelIndicators.sma(matrix * matrix, period)
+        period = int(period)
+        with np.errstate(invalid='ignore'):
+            var = (mean_sq - mean * mean) * period / max(period - 1, 1)
+        return np.sqrt(np.clip(var, 0, None))
+
+    @staticmethod
+    def _rolling(matrix, period, reducer, center=False):
+        period = int(period)
+        result = np.full_like(matrix, np.nan)
+        if period <= 0 or period > matrix.shape[1]:
+            return result
+        windows = sliding_window_view(matrix, period, axis=1)
+        # NaN inside a window propagates, matching pandas rolling defaults;
+        # a centered window spans period // 2 bars back, like rolling(center=True)
+        start = period // 2 if center else period - 1
+        result[:, start:start + windows.shape[1]] = reducer(windows, axis=-1)
+        return result
+
+    @staticmethod
+    def macd(close, fast=12, slow=26, signal=9):
+        """
+        MACD line, signal line and histogram
+
+        Returns:
+            Tuple of (macd, signal, histogram) panels
+        """
+        macd_line = PanelIndicators.ema(close, fast) - PanelIndicators.ema(close, slow)
+        signal_line = PanelIndicators.ema(macd_line, signal)
+        return macd_line, signal_line, macd_line - signal_line
+
+    @staticmethod
+    def rsi(close, period=14):
+        """Relative Strength Index using simple average gains and losses"""
+        delta = close - PanelIndicators.shift(close, 1)
+        gain = PanelIndicators.sma(np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0)), period)
+        loss = PanelIndicators.sma(np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0)), period)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rs = gain / loss
+            return 100 - (100 / (1 + rs))
+
+    @staticmethod
+    def true_range(high, low, close):
+        """True range of each bar"""
+        prev_close = PanelIndicators.shift(close, 1)
+        # fmax ignores NaN, so the first bar falls back to high - low
+        return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+    @staticmethod
+    def atr(high, low, close, period=14):
+        """Average True Range as a rolling mean of the true range"""
+        return PanelIndicators.sma(PanelIndicators.true_range(high, low, close), period)
@@ -0,0 +1,206 @@
+import time
+import numpy as np
+from utils.panel_indicators import BarPanel, PanelIndicators
+
+class PrefilterPipeline:
+    """Cheap vectorized predicates that run before a scanner's detector
+
+    Stages run in order over the whole fetched universe at once, using a
+    BarPanel of the trailing bars each predicate needs. Only symbols that
+    pass every enabled stage reach the per-symbol detector. A stage whose
+    inputs are missing for a symbol (e.g. no volume data) lets it through
+    rather than rejecting on unknown information.
+
+    Stages (each disabled when its threshold is None):
+
+    - bars: at least min_bars bars available
+    - price: last close within [min_price, max_price]
+    - turnover: mean close x volume over the last turnover_bars bars
+      at least min_turnover
+    - level_distance: last close within max_atr_distance ATRs of the recent
+      high, low or either (level_side), over the last level_lookback bars
+    - candidates: a scanner-supplied predicate over the panel that is a
+      necessary condition of its detector, so it never drops a signal
+
+    The price, turnover and level_distance stages reject symbols the
+    detector could still signal on, so scanners enable them only on request.
+    """
+
+    LEVEL_SIDES = ('high', 'low', 'both')
+
+    def __init__(self, min_bars=None, min_price=None, max_price=None, min_turnover=None,
+                 turnover_bars=20, max_atr_distance=None, level_side='both', level_lookback=60,
+                 atr_period=14, candidates=None, candidate_bars=None):
+        """
+        Args:
+            min_bars: Minimum number of bars
+            min_price: Minimum last close
+            max_price: Maximum last close
+            min_turnover: Minimum mean traded value (close x volume) per bar
+            turnover_bars: Bars averaged for turnover
+            max_atr_distance: Maximum distance from the recent high/low in ATRs
+            level_side: 'high', 'low' or 'both' (nearest of the two)
+            level_lookback: Bars used for the recent high/low
+            atr_period: ATR period for the level distance
+            candidates: Callable taking the BarPanel and returning a boolean
+                        array of symbols the detector may signal on
+            candidate_bars: Trailing bars the candidates predicate needs
+                            (None for every fetched bar)
+        """
+        if level_side not in self.LEVEL_SIDES:
+            raise ValueError(f"level_side must be one of {self.LEVEL_SIDES}")
+
+        self.min_bars = min_bars
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_turnover = min_turnover
+        self.turnover_bars = turnover_bars
+        self.max_atr_distance = max_atr_distance
+        self.level_side = level_side
+        self.level_lookback = level_lookback
+        self.atr_period = atr_period
+        self.candidates = candidates
+        self.candidate_bars = candidate_bars
+
+        self.report = []
+        self.elapsed = 0.0
+
+    def stages(self):
+        """
+        Get the enabled stages in evaluation order
+
+        Returns:
+            List of stage names
+        """
+        enabled = [
+            ('bars', self.min_bars is not None),
+            ('price', self.min_price is not None or self.max_price is not None),
+            ('turnover', self.min_turnover is not None),
+            ('level_distance', self.max_atr_distance is not None),
+            ('candidates', self.candidates is not None)
+        ]
+        return [name for name, on in enabled if on]
+
+    def window(self):
+        """Trailing bars the panel predicates need (None for every bar)"""
+        if self.candidates is not None and self.candidate_bars is None:
+            return None
+        window = 1
+        if self.candidates is not None:
+            window = max(window, self.candidate_bars)
+        if self.min_turnover is not None:
+            window = max(window, self.turnover_bars)
+        if self.max_atr_distance is not None:
+            window = max(window, self.level_lookback, self.atr_period + 1)
+        return window
+
+    def _price(self, panel):
+        """Last close within the price band"""
+        close = panel.latest(panel.field('close'))
+        passed = np.ones(len(panel), dtype=bool)
+        if self.min_price is not None:
+            passed &= ~(close < self.min_price)
+        if self.max_price is not None:
+            passed &= ~(close > self.max_price)
+        return passed
+
+    def _turnover(self, panel):
+        """Mean traded value per bar at least min_turnover"""
+        traded = (panel.field('close') * panel.field('volume'))[:, -self.turnover_bars:]
+        counts = np.sum(~np.isnan(traded), axis=1)
+        totals = np.nansum(traded, axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            turnover = totals / counts
+        return (counts == 0) | (turnover >= self.min_turnover)
+
+    def _level_distance(self, panel):
+        """Last close within max_atr_distance ATRs of the recent high/low"""
+        high = panel.field('high')
+        low = panel.field('low')
+        close = panel.field('close')
+
+        atr = panel.latest(PanelIndicators.atr(high, low, close, self.atr_period))
+        last = panel.latest(close)
+        recent_high = np.max(np.nan_to_num(high[:, -self.level_lookback:], nan=-np.inf), axis=1)
+        recent_low = np.min(np.nan_to_num(low[:, -self.level_lookback:], nan=np.inf), axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            from_high = np.abs(recent_high - last) / atr
+            from_low = np.abs(last - recent_low) / atr
+
+        if self.level_side == 'high':
+            distance = from_high
+        elif self.level_side == 'low':
+            distance = from_low
+        else:
+            distance = np.fmin(from_high, from_low)
+
+        return ~np.isfinite(distance) | (distance <= self.max_atr_distance)
+
+    @staticmethod
+    def any_between(values, marks, low, high):
+        """
+        Check which symbols have a marked bar valued within a band
+
+        Args:
+            values: (symbols x bars) array
+            marks: (symbols x bars) boolean array of the bars to consider
+            low: Lower band edge per symbol (NaN or -inf for no edge)
+            high: Upper band edge per symbol (NaN or inf for no edge)
+
+        Returns:
+            Boolean array with one entry per symbol
+        """
+        low = np.where(np.isnan(low), -np.inf, low)[:, None]
+        high = np.where(np.isnan(high), np.inf, high)[:, None]
+        with np.errstate(invalid='ignore'):
+            return np.any(marks & (values >= low) & (values <= high), axis=1)
+
+    def apply(self, data_map):
+        """
+        Run every enabled stage and keep the survivors
+
+        Per-stage counts are stored in self.report as dicts with Stage,
+        Input, Passed and Rejected.
+
+        Args:
+            data_map: Dict with symbol as key and OHLCV DataFrame as value
+
+        Returns:
+            Dict of surviving symbols in data_map order
+        """
+        started = time.perf_counter()
+        symbols = list(data_map)
+        alive = np.ones(len(symbols), dtype=bool)
+        report = []
+
+        def record(stage, passed):
+            before = int(alive.sum())
+            alive[:] = alive & passed
+            after = int(alive.sum())
+            report.append({'Stage': stage, 'Input': before, 'Passed': after, 'Rejected': before - after})
+
+        stages = self.stages()
+
+        if 'bars' in stages:
+            lengths = np.array([len(data_map[symbol]) for symbol in symbols], dtype=np.int64)
+            record('bars', lengths >= self.min_bars)
+
+        panel_stages = [stage for stage in stages if stage != 'bars']
+        if panel_stages:
+            # One panel of the trailing bars for every symbol still alive
+            positions = np.flatnonzero(alive)
+            panel = BarPanel({symbols[i]: data_map[symbols[i]] for i in positions}, max_bars=self.window())
+            predicates = {'price': self._price, 'turnover': self._turnover,
+                          'level_distance': self._level_distance, 'candidates': self.candidates}
+
+            for stage in panel_stages:
+                passed = np.zeros(len(symbols), dtype=bool)
+                if len(positions):
+                    passed[positions] = predicates[stage](panel)
+                record(stage, passed)
+
+        self.report = report
+        self.elapsed = time.perf_counter() - started
+
+        return {symbol: data_map[symbol] for symbol, keep in zip(symbols, alive) if keep}
@@ -0,0 +1,607 @@
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from urllib.parse import urlsplit, parse_qsl, unquote
+import numpy as np
+import pandas as pd
+from scanners.confluence_scanner import ConfluenceScanner
+from scanners.scanner_registry import job_slug
+
+def to_jsonable(value):
+    """
+    Convert a result value to plain JSON types
+
+    Timestamps become ISO strings, numpy scalars become Python numbers and
+    NaN, NaT and infinities become None.
+
+    Args:
+        value: Any value found in scanner results or signal events
+
+    Returns:
+        JSON-serializable value
+    """
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [to_jsonable(item) for item in value]
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class APIError(Exception):
+    """Request error carrying an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ResultAPI:
+    """Read-only JSON API over the scan service's latest snapshot
+
+    Transport independent: handle() maps a request to (status, headers,
+    body). Every response body is a pure function of the snapshot version
+    and the normalized request, so the ETag is computed from those alone.
+    A matching If-None-Match is answered with 304 before any data is
+    touched, and rendered bodies are kept in a small LRU, so hundreds of
+    clients polling the same URLs cost almost nothing between scans.
+
+    Endpoints (GET or HEAD):
+
+    - /api/health: service status and snapshot version
+    - /api/scanners: scanners with row counts, timings and errors
+    - /api/scanners/<scanner>: one scanner's results; filter with
+      column=value[,value...], min_<column>= and max_<column>=, order with
+      sort=<column>&order=asc|desc, page with limit= and offset=
+    - /api/signals: every scanner's signals in the common schema
+      (same filters)
+    - /api/confluence: confluence scores (min_signals=, direction=bullish|bearish)
+    - /api/events: signal inserts, updates and expiries of the last scan
+    """
+
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 1000
+    PAGE_PARAMS = ('sort', 'order', 'limit', 'offset')
+
+    def __init__(self, service, cache_entries=512):
+        """
+        Args:
+            service: ScanService whose snapshots are served
+            cache_entries: Rendered response bodies kept
+        """
+        self.service = service
+        self.cache_entries = cache_entries
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def etag(version, path, query):
+        """Entity tag of a response (snapshot version plus the normalized request)"""
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(f"{version}|{path}|{sorted(query)}".encode())
+        return f'"{digest.hexdigest()}"'
+
+    def handle(self, method, target, headers=None):
+        """
+        Answer one request
+
+        Args:
+            method: HTTP method
+            target: Request target (path and query string)
+            headers: Dict of request headers with lower-case names
+
+        Returns:
+            Tuple of (status code, dict of response headers, body bytes)
+        """
+        headers = headers or {}
+        self.requests += 1
+
+        if method not in ('GET', 'HEAD'):
+            return self._error(405, f"Method {method} not allowed")
+
+        parts = urlsplit(target)
+        path = parts.path.rstrip('/') or '/'
+        query = parse_qsl(parts.query, keep_blank_values=False)
+
+        # /api/health is live status, everything else only changes with the snapshot
+        snapshot = self.service.snapshot()
+        tag = None if path == '/api/health' else self.etag(snapshot.version, path, query)
+
+        if tag is not None and tag in [value.strip() for value in headers.get('if-none-match', '').split(',')]:
+            self.not_modified += 1
+            return 304, {'ETag': tag, 'Cache-Control': 'no-cache'}, b''
+
+        body = self._cached_body(tag)
+        if body is None:
+            try:
+                payload = self._route(path, dict(query), snapshot)
+            except APIError as e:
+                return self._error(e.status, e.message)
+            except Exception as e:
+                print(f"Error serving {target}: {e}")
+                return self._error(500, "Internal error")
+
+            body = json.dumps(to_jsonable(payload), separators=(',', ':')).encode()
+            self._store_body(tag, body)
+
+        response_headers = {'Content-Type': 'application/json', 'Cache-Control': 'no-cache'}
+        if tag is not None:
+            response_headers['ETag'] = tag
+        return 200, response_headers, body if method == 'GET' else b''
+
+    def _cached_body(self, tag):
+        if tag is None:
+            return None
+        with self._lock:
+            body = self._bodies.get(tag)
+            if body is not None:
+                self._bodies.move_to_end(tag)
+            return body
+
+    def _store_body(self, tag, body):
+        if tag is None:
+            return
+        with self._lock:
+            self._bodies[tag] = body
+            while len(self._bodies) > self.cache_entries:
+                self._bodies.popitem(last=False)
+
+    @staticmethod
+    def _error(status, message):
+        body = json.dumps({'error': message}).encode()
+        return status, {'Content-Type': 'application/json', 'Cache-Control': 'no-cache'}, body
+
+    def _route(self, path, query, snapshot):
+        """Dispatch a request path to its endpoint"""
+        if path == '/api/health':
+            status = self.service.status()
+            return {'status': 'ok', 'version': snapshot.version, 'scan_time': snapshot.scan_time,
+                    'running': status['running'], 'next_scan_time': status['next_scan_time']}
+        if path == '/api/scanners':
+            return self.scanners(snapshot)
+        if path.startswith('/api/scanners/'):
+            return self.scanner_results(snapshot, unquote(path[len('/api/scanners/'):]), query)
+        if path == '/api/signals':
+            return self.signals(snapshot, query)
+        if path == '/api/confluence':
+            return self.confluence(snapshot, query)
+        if path == '/api/events':
+            return {'version': snapshot.version, 'scan_time': snapshot.scan_time,
+                    'events': [self.event_payload(event) for event in snapshot.events]}
+        raise APIError(404, f"Unknown endpoint {path}")
+
+    def scanners(self, snapshot):
+        """Scanner list with row counts, timings and errors"""
+        return {
+            'version': snapshot.version,
+            'scan_time': snapshot.scan_time,
+            'scanners': [
+                {
+                    'name': name,
+                    'slug': job_slug(name),
+                    'rows': len(results) if isinstance(results, pd.DataFrame) else 0,
+                    'seconds': snapshot.timings.get(name),
+                    'error': snapshot.errors.get(name)
+                }
+                for name, results in snapshot.results.items()
+            ]
+        }
+
+    @staticmethod
+    def find_scanner(snapshot, key):
+        """Resolve a scanner by name or slug"""
+        for name in snapshot.results:
+            if key == name or job_slug(key) == job_slug(name):
+                return name
+        raise APIError(404, f"Unknown scanner {key}")
+
+    def scanner_results(self, snapshot, key, query):
+        """One scanner's filtered, sorted and paginated results"""
+        name = self.find_scanner(snapshot, key)
+        results = snapshot.results[name]
+        if not isinstance(results, pd.DataFrame):
+            results = pd.DataFrame()
+
+        page = self.page(results, query, ranking=snapshot.rankings.get(name))
+        page.update({'scanner': name, 'version': snapshot.version, 'scan_time': snapshot.scan_time})
+        return page
+
+    def signals(self, snapshot, query):
+        """Every scanner's signals in the common SignalTable schema"""
+        frame = snapshot.signal_table.to_frame()
+        frame['Direction'] = frame['Direction'].map({1: 'bullish', -1: 'bearish', 0: 'neutral'})
+        page = self.page(frame, query)
+        page.update({'version': snapshot.version, 'scan_time': snapshot.scan_time})
+        return page
+
+    def confluence(self, snapshot, query):
+        """Confluence scores over the snapshot's signal table"""
+        try:
+            min_signals = int(query.get('min_signals', 2))
+        except ValueError:
+            raise APIError(400, "min_signals must be an integer")
+
+        directions = {'bullish': 1, 'bearish': -1, 'both': None}
+        direction = query.get('direction', 'both').lower()
+        if direction not in directions:
+            raise APIError(400, "direction must be bullish, bearish or both")
+
+        frame = ConfluenceScanner().score(snapshot.signal_table, min_signals=min_signals,
+                                          direction=directions[direction])
+        rest = {key: value for key, value in query.items() if key not in ('min_signals', 'direction')}
+        page = self.page(frame, rest)
+        page.update({'version': snapshot.version, 'scan_time': snapshot.scan_time})
+        return page
+
+    @staticmethod
+    def event_payload(event):
+        """Signal event with the scanner slug added"""
+        return dict(event, scanner_slug=job_slug(event['scanner']))
+
+    @staticmethod
+    def _column(frame, name):
+        """Match a query column name case-insensitively"""
+        for column in frame.columns:
+            if str(column).lower() == name.lower():
+                return column
+        raise APIError(400, f"Unknown column {name}")
+
+    @staticmethod
+    def _bound(series, value):
+        """Parse a range bound in the column's own type"""
+        if pd.api.types.is_datetime64_any_dtype(series):
+            bound = pd.Timestamp(value)
+            if series.dt.tz is not None and bound.tz is None:
+                bound = bound.tz_localize(series.dt.tz)
+            return bound
+        try:
+            return float(value)
+        except ValueError:
+            raise APIError(400, f"Invalid bound {value}")
+
+    def filter_frame(self, frame, query):
+        """
+        Apply column filters from query parameters
+
+        Args:
+            frame: Results DataFrame
+            query: Dict of query parameters (paging parameters are ignored)
+
+        Returns:
+            Filtered DataFrame
+        """
+        mask = np.ones(len(frame), dtype=bool)
+
+        for key, value in query.items():
+            if key in self.PAGE_PARAMS or frame.empty:
+                continue
+
+            if key.startswith('min_') or key.startswith('max_'):
+                column = self._column(frame, key[4:])
+                series = frame[column]
+                bound = self._bound(series, value)
+                values = series if pd.api.types.is_datetime64_any_dtype(series) else pd.to_numeric(series, errors='coerce')
+                mask &= (values >= bound if key.startswith('min_') else values <= bound).to_numpy(dtype=bool)
+            else:
+                column = self._column(frame, key)
+                wanted = {item.strip().lower() for item in value.split(',')}
+                mask &= frame[column].astype(str).str.lower().isin(wanted).to_numpy()
+
+        return frame[mask] if not mask.all() else frame
+
+    def page(self, frame, query, ranking=None):
+        """
+        Filter, sort and paginate a frame
+
+        Unfiltered sorts whose page lies within the scanner's top-K heaps are
+        served from the precomputed ranking instead of sorting.
+
+        Args:
+            frame: Results DataFrame
+            query: Dict of query parameters
+            ranking: Optional ResultRanking of the unfiltered frame
+
+        Returns:
+            Dict with total, offset, limit and rows
+        """
+        try:
+            limit = min(int(query.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+            offset = int(query.get('offset', 0))
+        except ValueError:
+            raise APIError(400, "limit and offset must be integers")
+        if limit < 0 or offset < 0:
+            raise APIError(400, "limit and offset must not be negative")
+
+        order = query.get('order', 'desc').lower()
+        if order not in ('asc', 'desc'):
+            raise APIError(400, "order must be asc or desc")
+        ascending = order == 'asc'
+
+        filtered = self.filter_frame(frame, query)
+        total = len(filtered)
+
+        sort = query.get('sort')
+        if sort and not filtered.empty:
+            column = self._column(filtered, sort)
+            if filtered is frame and ranking is not None and len(ranking) == len(frame) and offset + limit <= ranking.k:
+                rows = ranking.top(column, ascending=ascending, n=offset + limit).iloc[offset:]
+            else:
+                rows = filtered.sort_values(column, ascending=ascending, kind='stable',
+                                            na_position='last').iloc[offset:offset + limit]
+        else:
+            rows = filtered.iloc[offset:offset + limit]
+
+        return {'total': total, 'offset': offset, 'limit': limit, 'rows': rows.to_dict('records')}
+
+    def delta_message(self, snapshot, scanners=None):
+        """
+        WebSocket message carrying one scan's signal changes
+
+        Args:
+            snapshot: Published ScanSnapshot
+            scanners: Optional set of scanner slugs to include
+
+        Returns:
+            JSON string
+        """
+        events = [self.event_payload(event) for event in snapshot.events
+                  if scanners is None or job_slug(event['scanner']) in scanners]
+        return json.dumps(to_jsonable({
+            'type': 'delta',
+            'version': snapshot.version,
+            'scan_time': snapshot.scan_time,
+            'events': events
+        }), separators=(',', ':'))
+
+
+class ResultAPIServer:
+    """Single-threaded asyncio HTTP/1.1 and WebSocket server for ResultAPI
+
+    HTTP connections are kept alive between requests. WebSocket clients
+    connect to /ws, may send {"subscribe": ["macd-4h", ...]} (or null for
+    every scanner), and receive a "delta" message with the signal events of
+    every newly published snapshot. Clients that fall behind by more than
+    MAX_PENDING messages are disconnected.
+    """
+
+    WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+    MAX_PENDING = 32
+    MAX_HEADER_LINES = 100
+    MAX_FRAME_BYTES = 65536
+    KEEP_ALIVE_SECONDS = 60
+
+    STATUS_TEXT = {
+        101: 'Switching Protocols', 200: 'OK', 304: 'Not Modified', 400: 'Bad Request',
+        404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'
+    }
+
+    def __init__(self, api, host="127.0.0.1", port=8765, cors_origin=None):
+        """
+        Args:
+            api: ResultAPI answering requests
+            host: Interface to bind (local only by default)
+            port: TCP port
+            cors_origin: Optional Access-Control-Allow-Origin value for browser dashboards
+        """
+        self.api = api
+        self.host = host
+        self.port = port
+        self.cors_origin = cors_origin
+        self.loop = None
+        self.clients = {}
+        self._server = None
+        self._ready = threading.Event()
+
+    async def serve(self):
+        """Serve until cancelled"""
+        self.loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.api.service.add_listener(self._on_snapshot)
+        self._ready.set()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self.api.service.remove_listener(self._on_snapshot)
+
+    def run(self):
+        """Serve in the current thread until interrupted"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+    def start_in_thread(self):
+        """
+        Serve from a daemon thread with its own event loop
+
+        Returns:
+            The server thread (started and listening)
+        """
+        thread = threading.Thread(target=self.run, name="result-api", daemon=True)
+        thread.start()
+        self._ready.wait(10)
+        return thread
+
+    def _on_snapshot(self, snapshot):
+        """Scan thread callback: hand the snapshot to the event loop"""
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._broadcast, snapshot)
+
+    def _broadcast(self, snapshot):
+        """Queue one delta message per distinct subscription"""
+        messages = {}
+        for writer, client in list(self.clients.items()):
+            key = client['scanners']
+            if key not in messages:
+                messages[key] = self.api.delta_message(snapshot, key)
+            if client['queue'].qsize() >= self.MAX_PENDING:
+                writer.close()
+                continue
+            client['queue'].put_nowait(messages[key])
+
+    async def _read_headers(self, reader):
+        """Read header lines into a dict with lower-case names"""
+        headers = {}
+        for _ in range(self.MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                return headers
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        raise ValueError("Too many headers")
+
+    def _write_response(self, writer, status, headers, body, keep_alive=True):
+        lines = [f"HTTP/1.1 {status} {self.STATUS_TEXT.get(status, 'OK')}"]
+        headers = dict(headers, **{'Content-Length': str(len(body)),
+                                   'Connection': 'keep-alive' if keep_alive else 'close'})
+        if self.cors_origin:
+            headers['Access-Control-Allow-Origin'] = self.cors_origin
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+    async def _handle_connection(self, reader, writer):
+        """Serve HTTP requests on one connection, or hand it to the WebSocket loop"""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.KEEP_ALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                    headers = await self._read_headers(reader)
+                except ValueError:
+                    self._write_response(writer, *ResultAPI._error(400, "Malformed request"), keep_alive=False)
+                    break
+
+                length = int(headers.get('content-length', 0) or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                if urlsplit(target).path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                    await self._handle_websocket(reader, writer, headers)
+                    return
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                status, response_headers, body = self.api.handle(method, target, headers)
+                self._write_response(writer, status, response_headers, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def encode_frame(payload, opcode=0x1):
+        """Encode one unmasked server frame"""
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([length])
+        elif length < 65536:
+            header += bytes([126]) + length.to_bytes(2, 'big')
+        else:
+            header += bytes([127]) + length.to_bytes(8, 'big')
+        return header + payload
+
+    async def _read_frame(self, reader):
+        """Read one masked client frame as (opcode, payload)"""
+        first, second = await reader.readexactly(2)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = int.from_bytes(await reader.readexactly(2), 'big')
+        elif length == 127:
+            length = int.from_bytes(await reader.readexactly(8), 'big')
+        if length > self.MAX_FRAME_BYTES:
+            raise ValueError("WebSocket frame too large")
+
+        mask = await reader.readexactly(4) if second & 0x80 else b'\x00\x00\x00\x00'
+        data = await reader.readexactly(length)
+        unmasked = (int.from_bytes(data, 'big') ^ int.from_bytes((mask * (length // 4 + 1))[:length], 'big'))
+        return opcode, unmasked.to_bytes(length, 'big') if length else b''
+
+    async def _handle_websocket(self, reader, writer, headers):
+        """Complete the handshake, then push deltas and read subscriptions"""
+        key = headers.get('sec-websocket-key', '')
+        accept = base64.b64encode(hashlib.sha1((key + self.WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+
+        client = {'scanners': None, 'queue': asyncio.Queue()}
+        self.clients[writer] = client
+        snapshot = self.api.service.snapshot()
+        client['queue'].put_nowait(json.dumps(to_jsonable({
+            'type': 'hello',
+            'version': snapshot.version,
+            'scan_time': snapshot.scan_time,
+            'scanners': [job_slug(name) for name in snapshot.results]
+        })))
+
+        sender = asyncio.ensure_future(self._send_messages(writer, client['queue']))
+        try:
+            while True:
+                opcode, payload = await self._read_frame(reader)
+                if opcode == 0x8:
+                    writer.write(self.encode_frame(payload[:2], 0x8))
+                    break
+                if opcode == 0x9:
+                    writer.write(self.encode_frame(payload, 0xA))
+                elif opcode == 0x1:
+                    client['queue'].put_nowait(self._subscribe(client, payload))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            sender.cancel()
+            writer.close()
+
+    @staticmethod
+    def _subscribe(client, payload):
+        """Apply a client's subscription message and build the reply"""
+        try:
+            message = json.loads(payload.decode())
+            scanners = message.get('subscribe')
+            client['scanners'] = frozenset(job_slug(name) for name in scanners) if scanners else None
+            return json.dumps({'type': 'subscribed',
+                               'scanners': sorted(client['scanners']) if client['scanners'] else None})
+        except (ValueError, AttributeError, TypeError):
+            return json.dumps({'type': 'error', 'error': 'Expected {"subscribe": [scanner, ...]}'})
+
+    async def _send_messages(self, writer, queue):
+        """Write queued messages to one WebSocket client"""
+        try:
+            while True:
+                message = await queue.get()
+                writer.write(self.encode_frame(message.encode()))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
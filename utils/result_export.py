@@ -0,0 +1,212 @@
+import io
+import json
+import threading
+import zipfile
+from collections import OrderedDict
+import pandas as pd
+from utils.signal_diff import SignalDiffer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet and Arrow exports are optional
+    pa = None
+    pq = None
+
+# Export format -> (file extension, MIME type)
+EXPORT_FORMATS = OrderedDict([
+    ('zip', ('zip', 'application/zip')),
+    ('parquet', ('parquet', 'application/vnd.apache.parquet')),
+    ('arrow', ('arrow', 'application/vnd.apache.arrow.file'))
+])
+
+
+def results_frame(results, scan_time):
+    """
+    Combine scanner results into one table
+
+    Args:
+        results: Dict with job name as key and results DataFrame as value
+        scan_time: IST datetime of the cycle
+
+    Returns:
+        DataFrame with Scanner and Scan_Time columns first
+    """
+    frames = []
+    for name, frame in results.items():
+        if isinstance(frame, pd.DataFrame) and not frame.empty:
+            frame = frame.copy()
+            frame.insert(0, 'Scan_Time', scan_time)
+            frame.insert(0, 'Scanner', name)
+            frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=['Scanner', 'Scan_Time'])
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+
+def parquet_safe(frame):
+    """Convert mixed-type object columns to strings so Parquet can store them"""
+    frame = frame.copy()
+    for column in frame.columns:
+        if frame[column].dtype == object:
+            values = frame[column]
+            types = {type(value) for value in values if value is not None and not (isinstance(value, float) and pd.isna(value))}
+            if len(types) > 1 or (types and not types <= {str}):
+                frame[column] = values.map(lambda value: None if value is None or (isinstance(value, float) and pd.isna(value)) else str(value))
+    return frame
+
+
+class ResultExporter:
+    """In-memory serializer for a snapshot's scan results
+
+    Exports are built in memory buffers and returned as bytes for
+    st.download_button or an HTTP response, so nothing is written to the
+    server's disk. Formats:
+
+    - zip: one CSV per scanner plus signal_changes.csv and a manifest.json
+      recording every column's dtype
+    - parquet: all scanners in one zstd-compressed table with a Scanner
+      column (typed columns, including timezone-aware bar times)
+    - arrow: the same table as an Arrow IPC file, readable with
+      pyarrow.ipc.open_file or pandas.read_feather
+
+    Parquet and Arrow need pyarrow. The last few exports are kept per
+    snapshot version, so every session downloading the same scan shares
+    one serialization.
+    """
+
+    def __init__(self, max_entries=6, compression_level=1):
+        """
+        Args:
+            max_entries: Exports kept in memory
+            compression_level: Zip deflate level (1 favors speed)
+        """
+        self.max_entries = max_entries
+        self.compression_level = compression_level
+        self._exports = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available_formats():
+        """Formats that can be produced with the installed packages"""
+        return [fmt for fmt in EXPORT_FORMATS if fmt == 'zip' or pa is not None]
+
+    @staticmethod
+    def file_name(fmt, scan_time):
+        """Download file name for a format and cycle time"""
+        extension = EXPORT_FORMATS[fmt][0]
+        stamp = scan_time.strftime('%Y%m%d_%H%M%S') if scan_time is not None else 'latest'
+        return f"scan_results_{stamp}.{extension}"
+
+    @staticmethod
+    def mime_type(fmt):
+        """MIME type of a format"""
+        return EXPORT_FORMATS[fmt][1]
+
+    def export(self, snapshot, fmt='zip'):
+        """
+        Serialize a snapshot's results
+
+        Args:
+            snapshot: ScanSnapshot
+            fmt: 'zip', 'parquet' or 'arrow'
+
+        Returns:
+            Bytes of the export
+
+        Raises:
+            ValueError: For an unknown format, or Parquet/Arrow without pyarrow
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt}")
+        if fmt not in self.available_formats():
+            raise ValueError(f"{fmt} export needs pyarrow (pip install pyarrow)")
+
+        key = (snapshot.version, fmt)
+        with self._lock:
+            data = self._exports.get(key)
+            if data is not None:
+                self._exports.move_to_end(key)
+                return data
+
+        if fmt == 'zip':
+            data = self.to_zip(snapshot.results, snapshot.scan_time, snapshot.events)
+        else:
+            table = self.to_table(snapshot.results, snapshot.scan_time)
+            data = self.to_parquet(table) if fmt == 'parquet' else self.to_arrow(table)
+
+        with self._lock:
+            self._exports[key] = data
+            while len(self._exports) > self.max_entries:
+                self._exports.popitem(last=False)
+        return data
+
+    def to_zip(self, results, scan_time, events=()):
+        """
+        Zip one CSV per scanner in memory
+
+        Args:
+            results: Dict with scanner name as key and results DataFrame as value
+            scan_time: IST datetime of the cycle
+            events: Optional signal change events of the cycle
+
+        Returns:
+            Bytes of the zip archive
+        """
+        buffer = io.BytesIO()
+        manifest = {'scan_time': scan_time.isoformat() if scan_time is not None else None, 'files': []}
+
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=self.compression_level) as archive:
+            frames = [(name, results) for name, results in results.items()
+                      if isinstance(results, pd.DataFrame) and not results.empty]
+            if events:
+                frames.append(('signal_changes', SignalDiffer.events_frame(events)))
+
+            for name, frame in frames:
+                filename = f"{name.replace(' ', '_')}.csv"
+                archive.writestr(filename, frame.to_csv(index=False))
+                manifest['files'].append({
+                    'file': filename,
+                    'name': name,
+                    'rows': len(frame),
+                    'dtypes': {str(column): str(dtype) for column, dtype in frame.dtypes.items()}
+                })
+
+            archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+
+        return buffer.getvalue()
+
+    @staticmethod
+    def to_table(results, scan_time):
+        """
+        Build one Arrow table over every scanner's results
+
+        Args:
+            results: Dict with scanner name as key and results DataFrame as value
+            scan_time: IST datetime of the cycle
+
+        Returns:
+            pyarrow.Table
+        """
+        frame = parquet_safe(results_frame(results, scan_time))
+        return pa.Table.from_pandas(frame, preserve_index=False)
+
+    @staticmethod
+    def to_parquet(table):
+        """Serialize a table as zstd-compressed Parquet bytes"""
+        sink = pa.BufferOutputStream()
+        pq.write_table(table, sink, compression='zstd')
+        return sink.getvalue().to_pybytes()
+
+    @staticmethod
+    def to_arrow(table):
+        """Serialize a table as Arrow IPC file bytes"""
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+# Exports shared by every session in the process
+RESULT_EXPORTER = ResultExporter()
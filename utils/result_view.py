@@ -0,0 +1,297 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+import pandas as pd
+from utils.signal_table import SignalTable
+
+# Sector file shipped with the project
+DEFAULT_SECTORS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'data', 'nse_sectors.csv')
+
+# Sector of symbols missing from the sector file
+UNKNOWN_SECTOR = 'Other'
+
+# One page of a filtered, sorted view
+ResultPage = namedtuple('ResultPage', ['rows', 'total', 'page', 'pages', 'offset'])
+
+
+def load_sector_map(path=DEFAULT_SECTORS_PATH):
+    """
+    Read a symbol-to-sector file
+
+    Args:
+        path: CSV path with symbol and sector columns ('#' lines are comments)
+
+    Returns:
+        Dict with normalized symbol (RELIANCE.NS) as key and sector as value
+    """
+    sectors = {}
+    try:
+        with open(path, encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if not line or line.startswith('#') or line.lower().startswith('symbol,'):
+                    continue
+                symbol, _, sector = line.partition(',')
+                sectors[SignalTable.normalize_symbol(symbol)] = sector.strip()
+    except OSError as e:
+        print(f"Error loading sectors from {path}: {e}")
+    return sectors
+
+
+class ResultView:
+    """Prebuilt filter and sort indexes over one scanner's results
+
+    Built once per scan snapshot. Signal labels and sectors are
+    dictionary-encoded, numeric columns are held as float arrays and every
+    requested sort order is a stable argsort kept for the life of the view,
+    so a widget change only combines boolean masks and slices a cached
+    order instead of filtering and sorting the DataFrame again. Only the
+    rows of the requested page are materialized.
+    """
+
+    # Signal label columns in order of preference (MACD original reports current_signal)
+    SIGNAL_COLUMNS = ['Signal', 'Signal_Type', 'Breakout_Type', 'current_signal', 'type']
+
+    def __init__(self, results, sectors=None, mask_entries=32):
+        """
+        Args:
+            results: Scanner results DataFrame
+            sectors: Optional dict of normalized symbol -> sector
+            mask_entries: Filter masks remembered per view
+        """
+        self.frame = results.reset_index(drop=True) if isinstance(results, pd.DataFrame) else pd.DataFrame()
+        self.mask_entries = mask_entries
+        self._orders = {}
+        self._masks = OrderedDict()
+        self._lock = threading.Lock()
+        n = len(self.frame)
+
+        symbols = SignalTable._column(self.frame, SignalTable.SYMBOL_COLUMNS) if n else None
+        if symbols is not None:
+            # Normalize and look up each distinct symbol once
+            codes, uniques = pd.factorize(symbols)
+            normalized = np.array([SignalTable.normalize_symbol(symbol) for symbol in uniques], dtype=object)
+            self.symbol_codes, self.symbol_names = codes, normalized
+            sector_of = np.array([sectors.get(symbol, UNKNOWN_SECTOR) if sectors else UNKNOWN_SECTOR
+                                  for symbol in normalized], dtype=object)
+            labels = sector_of[codes]
+        else:
+            self.symbol_codes, self.symbol_names = np.zeros(n, dtype=np.int64), np.array([''], dtype=object)
+            labels = [UNKNOWN_SECTOR] * n
+        self.sector_codes, self.sector_names = self._encode(labels)
+
+        self.signal_column = next((column for column in self.SIGNAL_COLUMNS if column in self.frame.columns), None)
+        signals = self.frame[self.signal_column].astype(str).tolist() if self.signal_column else [''] * n
+        self.signal_codes, self.signal_names = self._encode(signals)
+
+        self.numeric = {
+            column: self.frame[column].to_numpy(dtype=float, na_value=np.nan)
+            for column, dtype in self.frame.dtypes.items()
+            if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        }
+
+    def __len__(self):
+        return len(self.frame)
+
+    @staticmethod
+    def _encode(values):
+        """Dictionary-encode labels (codes index the sorted unique names)"""
+        codes, names = pd.factorize(pd.Series(values, dtype=object), sort=True)
+        return codes, list(names)
+
+    @staticmethod
+    def _counts(codes, names):
+        """Count of rows per encoded label"""
+        counts = np.bincount(codes, minlength=len(names)) if len(codes) else np.zeros(len(names), dtype=int)
+        return OrderedDict((name, int(count)) for name, count in zip(names, counts))
+
+    def facets(self):
+        """
+        Get the values the filters can take
+
+        Returns:
+            Dict with signals and sectors (label -> row count) and ranges
+            (numeric column -> (min, max) over present values)
+        """
+        ranges = {}
+        for column, values in self.numeric.items():
+            present = values[~np.isnan(values)]
+            if len(present):
+                ranges[column] = (float(present.min()), float(present.max()))
+        return {
+            'signals': self._counts(self.signal_codes, self.signal_names),
+            'sectors': self._counts(self.sector_codes, self.sector_names),
+            'ranges': ranges
+        }
+
+    def mask(self, signals=None, sectors=None, ranges=None, search=None, symbols=None):
+        """
+        Get the rows passing a set of filters
+
+        Args:
+            signals: Optional iterable of signal labels to keep
+            sectors: Optional iterable of sectors to keep
+            ranges: Optional dict of numeric column -> (low, high); either
+                bound may be None
+            search: Optional case-insensitive symbol substring
+            symbols: Optional iterable of symbols to keep (e.g. a watchlist)
+
+        Returns:
+            Boolean numpy array (None when no filter applies)
+        """
+        key = (
+            tuple(sorted(signals)) if signals else (),
+            tuple(sorted(sectors)) if sectors else (),
+            tuple(sorted(ranges.items())) if ranges else (),
+            (search or '').strip().upper(),
+            tuple(sorted(SignalTable.normalize_symbol(symbol) for symbol in symbols)) if symbols is not None else None
+        )
+        if key == ((), (), (), '', None):
+            return None
+
+        with self._lock:
+            cached = self._masks.get(key)
+            if cached is not None:
+                self._masks.move_to_end(key)
+                return cached
+
+        mask = np.ones(len(self.frame), dtype=bool)
+        if key[0]:
+            mask &= np.isin(self.signal_codes, self._codes_of(self.signal_names, key[0]))
+        if key[1]:
+            mask &= np.isin(self.sector_codes, self._codes_of(self.sector_names, key[1]))
+        for column, (low, high) in key[2]:
+            values = self.numeric.get(column)
+            if values is None:
+                continue
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        if key[3]:
+            matches = [index for index, symbol in enumerate(self.symbol_names) if key[3] in symbol]
+            mask &= np.isin(self.symbol_codes, matches)
+        if key[4] is not None:
+            wanted = set(key[4])
+            mask &= np.isin(self.symbol_codes, [index for index, symbol in enumerate(self.symbol_names) if symbol in wanted])
+
+        with self._lock:
+            self._masks[key] = mask
+            while len(self._masks) > self.mask_entries:
+                self._masks.popitem(last=False)
+        return mask
+
+    @staticmethod
+    def _codes_of(names, wanted):
+        """Codes of the wanted labels (unknown labels match nothing)"""
+        return [index for index, name in enumerate(names) if name in wanted]
+
+    def order(self, column, ascending=False):
+        """
+        Get the row order of a sort, computed once per column and direction
+
+        Args:
+            column: Sort column (None keeps the scanner's order)
+            ascending: Sort direction
+
+        Returns:
+            Integer numpy array equal to a stable sort_values() with missing
+            values last
+        """
+        if column is None or column not in self.frame.columns:
+            return np.arange(len(self.frame))
+
+        key = (column, ascending)
+        with self._lock:
+            order = self._orders.get(key)
+        if order is not None:
+            return order
+
+        values = self.numeric.get(column)
+        if values is not None:
+            order = np.argsort(values if ascending else -values, kind='stable')
+        else:
+            order = self.frame[column].sort_values(ascending=ascending, kind='stable',
+                                                   na_position='last').index.to_numpy()
+
+        with self._lock:
+            self._orders[key] = order
+        return order
+
+    def page(self, sort=None, ascending=False, page=1, page_size=50, **filters):
+        """
+        Get one page of a filtered, sorted view
+
+        Args:
+            sort: Optional sort column
+            ascending: Sort direction
+            page: 1-based page number (clamped to the available pages)
+            page_size: Rows per page
+            **filters: signals, sectors, ranges, search and symbols as for mask()
+
+        Returns:
+            ResultPage with the page's rows, the filtered total, the page
+            number, the page count and the offset of the first row
+        """
+        order = self.order(sort, ascending)
+        mask = self.mask(**filters)
+        if mask is not None:
+            order = order[mask[order]]
+
+        total = len(order)
+        pages = max(1, -(-total // page_size))
+        page = min(max(1, int(page)), pages)
+        offset = (page - 1) * page_size
+        rows = self.frame.iloc[order[offset:offset + page_size]]
+        return ResultPage(rows=rows, total=total, page=page, pages=pages, offset=offset)
+
+
+class ResultViewCache:
+    """Result views of recent snapshots, shared by every session
+
+    Views are keyed by snapshot version and scanner name, so the indexes of
+    a scan are built the first time any session opens its tab and reused
+    until a newer snapshot replaces it.
+    """
+
+    def __init__(self, sectors_path=DEFAULT_SECTORS_PATH, max_entries=32):
+        """
+        Args:
+            sectors_path: Symbol-to-sector CSV (None for no sectors)
+            max_entries: Views kept in memory
+        """
+        self.sectors = load_sector_map(sectors_path) if sectors_path else {}
+        self.max_entries = max_entries
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, snapshot, name):
+        """
+        Get the view of one scanner's results in a snapshot
+
+        Args:
+            snapshot: ScanSnapshot
+            name: Scanner name
+
+        Returns:
+            ResultView
+        """
+        key = (snapshot.version, name)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+
+        view = ResultView(snapshot.results.get(name), sectors=self.sectors)
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > self.max_entries:
+                self._views.popitem(last=False)
+        return view
+
+
+# Views shared by every session in the process
+RESULT_VIEWS = ResultViewCache()
@@ -0,0 +1,121 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+class DetectionCache:
+    """Per-symbol detection results keyed by a fingerprint of the input bars
+
+    A scanner only re-runs detection for a symbol when the bars it would
+    analyze differ from the last run; otherwise the cached row (or the cached
+    "no signal") is served. Shared by every scanner in the process and safe to
+    use from scan threads. Process-pool scan jobs get their own copy, so the
+    cache only carries over between cycles for the thread and sharded executors.
+    """
+
+    FINGERPRINT_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, max_entries=50000):
+        """
+        Args:
+            max_entries: Maximum cached (scanner, symbol, timeframe) entries
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(data):
+        """
+        Hash the bars a detector would see
+
+        Hashes the full bar arrays rather than just the tail because Yahoo
+        back-adjusts history for dividends and splits; hashing is memory-speed
+        and negligible next to detection.
+
+        Args:
+            data: OHLCV DataFrame
+
+        Returns:
+            Hex digest string
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        index = data.index
+        if isinstance(index, pd.DatetimeIndex):
+            digest.update(np.ascontiguousarray(index.asi8).tobytes())
+        else:
+            digest.update(str(len(index)).encode())
+
+        for column in DetectionCache.FINGERPRINT_COLUMNS:
+            if column in data:
+                digest.update(np.ascontiguousarray(data[column].to_numpy(dtype=np.float64)).tobytes())
+
+        return digest.hexdigest()
+
+    def get(self, key, fingerprint):
+        """
+        Look up a cached detection result
+
+        Args:
+            key: (scanner, symbol, timeframe, params) tuple
+            fingerprint: Fingerprint of the current input bars
+
+        Returns:
+            Tuple of (hit, result row or None)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != fingerprint:
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            row = entry[1]
+
+        return True, dict(row) if row else None
+
+    def put(self, key, fingerprint, row):
+        """
+        Store a detection result
+
+        Args:
+            key: (scanner, symbol, timeframe, params) tuple
+            fingerprint: Fingerprint of the input bars
+            row: Result row dict, or None when there was no signal
+        """
+        with self._lock:
+            self._entries[key] = (fingerprint, dict(row) if row else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            Dict with entries, hits, misses and hit rate (%)
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0.0
+            }
+
+
+# Process-wide cache shared by all scanners
+DETECTION_CACHE = DetectionCache()
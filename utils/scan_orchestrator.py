@@ -0,0 +1,391 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+import pandas as pd
+from utils.scan_profiler import SCAN_PROFILER
+
+
+class ScannerPool:
+    """Scanner instances reused across scan cycles
+
+    Scanners hold per-run state (the detect pool, the prefilter report), so
+    an instance is leased to one job at a time. Returned instances are kept
+    per class and handed to the next job instead of building a new scanner
+    (and its DataFetcher) for every scan.
+    """
+
+    def __init__(self):
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scanner_cls):
+        """
+        Lease a scanner instance
+
+        Args:
+            scanner_cls: Scanner class
+
+        Returns:
+            An idle instance of scanner_cls, or a new one
+        """
+        with self._lock:
+            idle = self._idle.get(scanner_cls)
+            if idle:
+                return idle.pop()
+        return scanner_cls()
+
+    def release(self, scanner):
+        """
+        Return a leased scanner to the pool
+
+        Args:
+            scanner: Instance obtained from acquire()
+        """
+        if hasattr(scanner, 'detect_pool'):
+            scanner.detect_pool = None
+            scanner.detect_workers = 1
+        if hasattr(scanner, 'progress_callback'):
+            scanner.progress_callback = None
+        if hasattr(scanner, 'universe'):
+            scanner.universe = None
+        with self._lock:
+            self._idle.setdefault(type(scanner), []).append(scanner)
+
+
+# Scanner instances shared by every orchestrator in the process
+SCANNER_POOL = ScannerPool()
+
+
+class DetectPool:
+    """Process pool for sharded detection, kept across scan cycles
+
+    Workers come from the 'forkserver' start method (or 'spawn' where it is
+    unavailable), never from forking the multithreaded Streamlit or scan
+    service process, and they are started once instead of on every cycle.
+    Like every non-fork start method, workers import the main script as
+    __mp_main__, so entry points keep their side effects behind an
+    ``if __name__ == "__main__"`` guard.
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._workers = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _context():
+        methods = multiprocessing.get_all_start_methods()
+        return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+    def get(self, workers):
+        """
+        Get the shared pool, creating it (or resizing it) on demand
+
+        Args:
+            workers: Number of detection processes
+
+        Returns:
+            ProcessPoolExecutor
+        """
+        with self._lock:
+            # A worker that died leaves the pool unusable (ProcessPoolExecutor keeps no public flag)
+            broken = self._pool is not None and getattr(self._pool, '_broken', False)
+            if self._pool is None or self._workers != workers or broken:
+                if self._pool is not None:
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=self._context())
+                self._workers = workers
+            return self._pool
+
+    def discard(self, pool):
+        """
+        Stop a pool that still runs shards of abandoned or failed jobs
+
+        The next get() starts a fresh pool.
+
+        Args:
+            pool: Pool obtained from get()
+        """
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        terminate_pool(pool)
+
+    def shutdown(self):
+        """Stop the pool's workers (runs at interpreter exit)"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+# Sharded detection processes shared by every orchestrator in the process
+DETECT_POOL = DetectPool()
+# Stop the workers before concurrent.futures joins its executors at exit, so
+# the forkserver pool's named semaphores are released
+threading._register_atexit(DETECT_POOL.shutdown)
+
+
+def run_scanner_job(scanner_cls, scan_kwargs, detect_pool=None, detect_workers=1, progress=None,
+                    universe=None, profile=None, name=None):
+    """
+    Run a single scan on a pooled scanner instance
+
+    Kept at module level so it can be pickled for process pools.
+
+    Args:
+        scanner_cls: Scanner class to instantiate
+        scan_kwargs: Keyword arguments for scanner.scan()
+        detect_pool: Optional process pool for sharded symbol detection
+        detect_workers: Number of processes in detect_pool
+        progress: Optional callable receiving the scanner's progress events
+        universe: Optional list of symbols replacing the scanner's default universe
+        profile: Optional ScanProfile recording the job's stages
+        name: Job name used in the profile
+
+    Returns:
+        DataFrame with scanner results
+    """
+    scanner = SCANNER_POOL.acquire(scanner_cls)
+    try:
+        if detect_pool is not None and hasattr(scanner, 'detect_pool'):
+            scanner.detect_pool = detect_pool
+            scanner.detect_workers = detect_workers
+        if progress is not None and hasattr(scanner, 'progress_callback'):
+            scanner.progress_callback = progress
+        if universe is not None and hasattr(scanner, 'universe'):
+            scanner.universe = universe
+        with SCAN_PROFILER.job(profile, name or scanner_cls.__name__):
+            return scanner.scan(**scan_kwargs)
+    finally:
+        SCANNER_POOL.release(scanner)
+
+
+def start_job_thread(name, thread_name, events, args):
+    """
+    Run a scanner job on its own daemon thread
+
+    The thread reports the moment the job starts, so its timeout is counted
+    from there. Being a daemon, a job abandoned after its timeout never keeps
+    the interpreter alive.
+
+    Args:
+        name: Job name
+        thread_name: Name of the worker thread
+        events: Queue receiving the job's 'started' event
+        args: Positional arguments for run_scanner_job()
+
+    Returns:
+        Future resolved with the job's result
+    """
+    future = Future()
+
+    def work():
+        if not future.set_running_or_notify_cancel():
+            return
+        events.put({'type': 'started', 'job': name, 'at': time.monotonic()})
+        try:
+            future.set_result(run_scanner_job(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=work, name=thread_name, daemon=True).start()
+    return future
+
+
+def terminate_pool(pool):
+    """
+    Shut down a process pool, killing workers that still run abandoned jobs
+
+    Args:
+        pool: ProcessPoolExecutor
+    """
+    # ProcessPoolExecutor has no public way to stop a running call before Python 3.14
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+class ScanOrchestrator:
+    """Runs independent scanner jobs concurrently on threads or a process pool
+
+    Executors:
+        thread: each job runs in its own worker thread
+        process: each job runs in a worker process
+        sharded: jobs run in threads (fetching is I/O bound) while per-symbol
+            detection is sharded across a shared process pool (DETECT_POOL,
+            kept across cycles), with bars passed through shared memory
+
+    A job that runs past its timeout is abandoned, never waited for: its
+    thread is a daemon and no later job is queued behind it. A process pool
+    running an abandoned job is replaced for the remaining jobs and its
+    workers are killed when the cycle ends.
+    """
+
+    EXECUTORS = ("thread", "process", "sharded")
+
+    def __init__(self, executor="thread", max_workers=None, job_timeout=600, universe=None):
+        """
+        Args:
+            executor: Pool type, 'thread', 'process' or 'sharded'
+            max_workers: Maximum number of jobs running at once, and detection
+                processes in sharded mode (defaults to CPU count)
+            job_timeout: Seconds a single job may run before it is abandoned
+            universe: Optional list of symbols every job scans instead of its default universe
+        """
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown executor {executor}, expected one of {self.EXECUTORS}")
+
+        self.executor = executor
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.job_timeout = job_timeout
+        self.universe = list(universe) if universe is not None else None
+
+    def run(self, jobs, on_event=None):
+        """
+        Run scanner jobs concurrently and collect results as they finish
+
+        Args:
+            jobs: Dict with job name as key and (scanner class, scan kwargs) as value
+            on_event: Optional callable receiving every stream() event
+
+        Returns:
+            Dict with 'results' (job name -> DataFrame of completed jobs),
+            'errors' (job name -> error message), 'timings' (job name ->
+            seconds) and 'profile' (ScanProfile with per-stage timings; the
+            process executor records none)
+        """
+        results = {}
+        errors = {}
+        timings = {}
+        profile = SCAN_PROFILER.begin_cycle()
+
+        for event in self.stream(jobs, profile):
+            if on_event is not None:
+                on_event(event)
+            if event['type'] == 'result':
+                results[event['job']] = event['results']
+                timings[event['job']] = event['seconds']
+            elif event['type'] == 'error':
+                errors[event['job']] = event['error']
+                timings[event['job']] = event['seconds']
+
+        return {'results': results, 'errors': errors, 'timings': timings,
+                'profile': SCAN_PROFILER.end_cycle(profile)}
+
+    def stream(self, jobs, profile=None):
+        """
+        Run scanner jobs concurrently, yielding events as they happen
+
+        At most max_workers jobs run at once; jobs abandoned after their
+        timeout do not count, as they never hold a worker a later job waits
+        for. Thread jobs report when their worker starts them, and their
+        timeout counts from then; process jobs are only handed to an idle
+        worker, so theirs counts from submission. Per-symbol progress is streamed for the thread and sharded executors;
+        process-pool jobs only report when they finish.
+
+        Args:
+            jobs: Dict with job name as key and (scanner class, scan kwargs) as value
+            profile: Optional ScanProfile the jobs record their stages in
+                (ignored by the process executor, whose jobs run elsewhere)
+
+        Yields:
+            Event dicts with 'type' and 'job', plus:
+            - started: nothing else
+            - progress: done, total and rows (new result rows)
+            - result: results (DataFrame) and seconds
+            - error: error (message) and seconds
+        """
+        if not jobs:
+            return
+
+        pending_jobs = list(jobs.items())
+        workers = max(1, min(self.max_workers, len(pending_jobs)))
+        if self.executor == "process":
+            profile = None
+        pool = ProcessPoolExecutor(max_workers=workers) if self.executor == "process" else None
+        # Process pools that ran a job past its timeout
+        retired = []
+        detect_pool = DETECT_POOL.get(self.max_workers) if self.executor == "sharded" else None
+        # A job left running or a broken pool stops the detect pool being reused
+        discard_detect_pool = False
+        # Started and progress events and finished futures, in arrival order
+        events = queue.Queue()
+        # future -> [job name, start time (None until started), process pool]
+        running = {}
+        submitted = 0
+
+        def reporter(name):
+            if self.executor == "process":
+                return None
+            return lambda progress: events.put(dict(progress, type='progress', job=name))
+
+        try:
+            while pending_jobs or running:
+                # Keep every worker busy
+                while pending_jobs and len(running) < workers:
+                    name, (scanner_cls, scan_kwargs) = pending_jobs.pop(0)
+                    args = (scanner_cls, scan_kwargs, detect_pool, self.max_workers, reporter(name),
+                            self.universe, profile, name)
+                    if pool is not None:
+                        future = pool.submit(run_scanner_job, *args)
+                        events.put({'type': 'started', 'job': name, 'at': time.monotonic()})
+                    else:
+                        future = start_job_thread(name, f"scan_{submitted}", events, args)
+                    submitted += 1
+                    running[future] = [name, None, pool]
+                    future.add_done_callback(events.put)
+
+                started = [entry[1] for entry in running.values() if entry[1] is not None]
+                timeout = max(0, min(started) + self.job_timeout - time.monotonic()) if started else None
+                try:
+                    item = events.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if isinstance(item, dict):
+                    # Events of a job abandoned after its timeout are dropped
+                    entry = next((entry for entry in running.values() if entry[0] == item['job']), None)
+                    if entry is not None:
+                        if item['type'] == 'started':
+                            entry[1] = item.pop('at')
+                        yield item
+                elif item is not None and item in running:
+                    name, started_at, _ = running.pop(item)
+                    seconds = round(time.monotonic() - (started_at or time.monotonic()), 2)
+                    try:
+                        result = item.result()
+                        yield {'type': 'result', 'job': name, 'seconds': seconds,
+                               'results': result if isinstance(result, pd.DataFrame) else pd.DataFrame()}
+                    except Exception as e:
+                        discard_detect_pool = discard_detect_pool or isinstance(e, BrokenExecutor)
+                        print(f"Error running scanner job {name}: {e}")
+                        yield {'type': 'error', 'job': name, 'seconds': seconds, 'error': str(e)}
+
+                # Abandon jobs that ran past their timeout
+                now = time.monotonic()
+                for future, (name, started_at, job_pool) in list(running.items()):
+                    if started_at is not None and now - started_at >= self.job_timeout:
+                        future.cancel()
+                        running.pop(future)
+                        discard_detect_pool = True
+                        if job_pool is not None and job_pool is pool:
+                            # The abandoned job keeps its worker process: later jobs get a new pool
+                            retired.append(pool)
+                            pool = ProcessPoolExecutor(max_workers=workers)
+                        print(f"Scanner job {name} timed out after {self.job_timeout}s")
+                        yield {'type': 'error', 'job': name, 'seconds': round(now - started_at, 2),
+                               'error': f"Timed out after {self.job_timeout}s"}
+        finally:
+            # Do not block on abandoned jobs
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            for retired_pool in retired:
+                terminate_pool(retired_pool)
+            if detect_pool is not None and (discard_detect_pool or running):
+                DETECT_POOL.discard(detect_pool)
@@ -0,0 +1,482 @@
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import wraps
+import pandas as pd
+
+# Scan stages in pipeline order ('other' is job time outside every named stage)
+STAGES = ('fetch', 'resample', 'prefilter', 'indicators', 'levels', 'detect', 'other')
+
+
+class _Span:
+    """One open timed region on a scan thread"""
+
+    __slots__ = ('stage', 'scope', 'symbol', 'rows', 'wall', 'cpu', 'child_wall', 'child_cpu')
+
+    def __init__(self, stage, scope, symbol):
+        self.stage = stage
+        self.scope = scope
+        self.symbol = symbol
+        self.rows = None
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+
+
+class _NullSpan:
+    """Stand-in yielded when nothing is being profiled (rows are discarded)"""
+
+    __slots__ = ('rows',)
+
+
+class ScanProfile:
+    """Stage timings of one scan cycle
+
+    Every span's exclusive time (its duration minus the spans nested in
+    it) is added to its (job, stage) totals, so the stages of a job add up
+    to the job's wall time: an indicator computed inside level detection
+    counts as 'indicators', not twice. Per-symbol totals cover every span
+    run for the symbol. Spans are also kept as trace events, up to
+    max_events per cycle.
+    """
+
+    def __init__(self, max_events=50000, capture=False):
+        """
+        Args:
+            max_events: Trace events kept (later spans are counted but not traced)
+            capture: Whether jobs run under cProfile in this cycle
+        """
+        self.started = time.time()
+        self.duration = None
+        self.max_events = max_events
+        self.capture = capture
+        self.dropped = 0
+        self.cprofile_text = None
+        self.cprofile_data = None
+        self._origin = time.perf_counter()
+        # (job, stage) -> [exclusive wall, exclusive CPU, calls, rows]
+        self._stages = OrderedDict()
+        # job -> [wall, CPU]
+        self._jobs = OrderedDict()
+        # (job, symbol) -> [wall, CPU, bars]
+        self._symbols = {}
+        self._events = []
+        self._threads = {}
+        self._profilers = []
+        self._trace = None
+        self._lock = threading.Lock()
+
+    def record(self, job, span, wall, cpu):
+        """Add a closed span (called by ScanProfiler)"""
+        own_wall, own_cpu = wall - span.child_wall, cpu - span.child_cpu
+        with self._lock:
+            totals = self._stages.get((job, span.stage))
+            if totals is None:
+                totals = self._stages[(job, span.stage)] = [0.0, 0.0, 0, 0]
+            totals[0] += own_wall
+            totals[1] += own_cpu
+            if span.scope is None:
+                # Job and symbol scopes only add their unattributed time
+                totals[2] += 1
+                totals[3] += span.rows or 0
+
+            if span.scope == 'symbol':
+                symbol = self._symbols.get((job, span.symbol))
+                if symbol is None:
+                    symbol = self._symbols[(job, span.symbol)] = [0.0, 0.0, 0]
+                symbol[0] += wall
+                symbol[1] += cpu
+                symbol[2] = max(symbol[2], span.rows or 0)
+            elif span.scope == 'job':
+                self._jobs[job] = [wall, cpu]
+
+            if len(self._events) < self.max_events:
+                self._events.append((span.wall - self._origin, wall, cpu, job, span.stage, span.scope,
+                                     span.symbol, span.rows, threading.get_ident()))
+            else:
+                self.dropped += 1
+
+    def register_thread(self, name):
+        """Remember the name of the calling thread for the trace"""
+        with self._lock:
+            self._threads.setdefault(threading.get_ident(), name)
+
+    def add_profiler(self, profiler):
+        """Keep a job's cProfile for the cycle report"""
+        with self._lock:
+            self._profilers.append(profiler)
+
+    def finish(self):
+        """Close the cycle and merge the cProfile captures"""
+        self.duration = round(time.perf_counter() - self._origin, 3)
+        with self._lock:
+            profilers, self._profilers = self._profilers, []
+        if not profilers:
+            return
+
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        self.cprofile_data = marshal.dumps(stats.stats)
+
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats('cumulative').print_stats(40)
+        self.cprofile_text = stream.getvalue()
+
+    @property
+    def jobs(self):
+        """Names of the jobs that ran under the profiler"""
+        with self._lock:
+            return list(self._jobs)
+
+    def stage_frame(self):
+        """
+        Get time per stage over every job
+
+        Returns:
+            DataFrame with Stage, Wall s, CPU s, Calls, Rows and Share %
+            (of the summed job wall time), in pipeline order
+        """
+        with self._lock:
+            items = list(self._stages.items())
+        totals = OrderedDict((stage, [0.0, 0.0, 0, 0]) for stage in STAGES)
+        for (_, stage), values in items:
+            entry = totals.setdefault(stage, [0.0, 0.0, 0, 0])
+            for i, value in enumerate(values):
+                entry[i] += value
+
+        overall = sum(entry[0] for entry in totals.values())
+        return pd.DataFrame([
+            {
+                'Stage': stage,
+                'Wall s': round(wall, 3),
+                'CPU s': round(cpu, 3),
+                'Calls': calls,
+                'Rows': rows,
+                'Share %': round(100 * wall / overall, 1) if overall else 0.0
+            }
+            for stage, (wall, cpu, calls, rows) in totals.items() if calls or wall
+        ])
+
+    def job_frame(self):
+        """
+        Get each job's wall and CPU time split by stage
+
+        Returns:
+            DataFrame with Scanner, Wall s, CPU s, Symbols and one column
+            of wall seconds per stage that ran, slowest job first
+        """
+        with self._lock:
+            jobs = dict(self._jobs)
+            stages = list(self._stages.items())
+            symbols = {}
+            for job, _ in self._symbols:
+                symbols[job] = symbols.get(job, 0) + 1
+
+        present = [stage for stage in STAGES if any(key[1] == stage for key, _ in stages)]
+        present += [key[1] for key, _ in stages if key[1] not in present]
+        rows = []
+        for job, (wall, cpu) in jobs.items():
+            row = {'Scanner': job, 'Wall s': round(wall, 3), 'CPU s': round(cpu, 3),
+                   'Symbols': symbols.get(job, 0)}
+            for stage in present:
+                row[stage] = 0.0
+            for (name, stage), values in stages:
+                if name == job:
+                    row[stage] = round(values[0], 3)
+            rows.append(row)
+
+        frame = pd.DataFrame(rows)
+        return frame.sort_values('Wall s', ascending=False, kind='stable') if not frame.empty else frame
+
+    def slowest_symbols(self, n=10, job=None):
+        """
+        Get the symbols that took longest
+
+        Args:
+            n: Number of symbols
+            job: Optional job name to restrict to
+
+        Returns:
+            DataFrame with Scanner, Symbol, Wall ms, CPU ms and Bars
+        """
+        with self._lock:
+            items = [(key, values) for key, values in self._symbols.items() if job is None or key[0] == job]
+        items.sort(key=lambda item: item[1][0], reverse=True)
+        return pd.DataFrame([
+            {'Scanner': name, 'Symbol': symbol, 'Wall ms': round(wall * 1000, 1),
+             'CPU ms': round(cpu * 1000, 1), 'Bars': bars}
+            for (name, symbol), (wall, cpu, bars) in items[:n]
+        ])
+
+    def trace(self):
+        """
+        Get the cycle as a Chrome trace (chrome://tracing, Perfetto)
+
+        Returns:
+            Dict in the Trace Event Format: one complete event per span,
+            one track per scan thread
+        """
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+            dropped = self.dropped
+
+        tids = {}
+        for ident in [event[8] for event in events] + list(threads):
+            tids.setdefault(ident, len(tids) + 1)
+
+        trace = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': 'scan cycle'}}]
+        for ident, tid in tids.items():
+            trace.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid,
+                          'args': {'name': threads.get(ident, f"thread {tid}")}})
+
+        for start, wall, cpu, job, stage, scope, symbol, rows, ident in events:
+            if scope == 'job':
+                name, category = job, 'job'
+            elif scope == 'symbol':
+                name, category = symbol, 'symbol'
+            else:
+                name, category = stage, 'stage'
+            args = {'job': job, 'cpu_ms': round(cpu * 1000, 3)}
+            if symbol is not None:
+                args['symbol'] = symbol
+            if rows is not None:
+                args['rows'] = rows
+            trace.append({'name': name, 'cat': category, 'ph': 'X', 'pid': 1, 'tid': tids[ident],
+                          'ts': round(start * 1e6, 1), 'dur': round(wall * 1e6, 1), 'args': args})
+
+        return {
+            'traceEvents': trace,
+            'displayTimeUnit': 'ms',
+            'otherData': {'started': self.started, 'duration': self.duration, 'dropped_events': dropped}
+        }
+
+    def trace_json(self):
+        """Chrome trace as UTF-8 JSON bytes (built once the cycle has finished)"""
+        if self._trace is not None:
+            return self._trace
+        data = json.dumps(self.trace(), separators=(',', ':')).encode('utf-8')
+        if self.duration is not None:
+            self._trace = data
+        return data
+
+
+class ScanProfiler:
+    """Per-stage, per-symbol instrumentation of scan jobs
+
+    A scan cycle creates a ScanProfile with begin_cycle() and each job runs
+    inside job(profile, name) on its worker thread. Within a job, scanner
+    code marks stages with stage() or the profiled() decorator and
+    symbols with symbol(). Outside a job these calls cost one attribute
+    lookup and record nothing, so the same scanners run unprofiled in
+    charts, benchmarks and detection worker processes. Wall time comes from
+    perf_counter() and CPU time from thread_time(), so concurrent jobs do
+    not inflate each other's CPU figures.
+
+    capture_next() arms a cProfile capture of the next cycle: each job of
+    that cycle runs under its own cProfile.Profile and the merged stats are
+    attached to the cycle's profile.
+    """
+
+    def __init__(self, max_events=50000, history=5):
+        """
+        Args:
+            max_events: Trace events kept per cycle
+            history: Finished cycle profiles kept
+        """
+        self.max_events = max_events
+        self.history = deque(maxlen=history)
+        self._local = threading.local()
+        self._capture_next = False
+        self._lock = threading.Lock()
+
+    def begin_cycle(self):
+        """
+        Start profiling a scan cycle
+
+        Returns:
+            ScanProfile for the cycle's jobs
+        """
+        with self._lock:
+            capture, self._capture_next = self._capture_next, False
+        return ScanProfile(max_events=self.max_events, capture=capture)
+
+    def end_cycle(self, profile):
+        """
+        Finish a cycle's profile and keep it in the history
+
+        Args:
+            profile: ScanProfile from begin_cycle()
+
+        Returns:
+            The finished profile
+        """
+        profile.finish()
+        with self._lock:
+            self.history.append(profile)
+        return profile
+
+    def latest(self):
+        """Most recently finished profile, or None"""
+        with self._lock:
+            return self.history[-1] if self.history else None
+
+    def capture_next(self, enabled=True):
+        """Arm (or disarm) a cProfile capture of the next cycle"""
+        with self._lock:
+            self._capture_next = enabled
+
+    @property
+    def capture_pending(self):
+        """Whether the next cycle will be captured with cProfile"""
+        with self._lock:
+            return self._capture_next
+
+    def _open(self, stage, scope=None, symbol=None):
+        """Open a span on the calling thread (None when not profiling)"""
+        local = self._local
+        if getattr(local, 'profile', None) is None:
+            return None
+        stack = local.stack
+        parent = stack[-1] if stack else None
+        if scope is None and parent is not None and parent.stage == stage:
+            # Nested calls within one stage count once
+            return None
+        span = _Span(stage, scope, symbol if symbol is not None else (parent.symbol if parent else None))
+        stack.append(span)
+        return span
+
+    def _close(self, span):
+        """Close the innermost span and record it"""
+        wall = time.perf_counter() - span.wall
+        cpu = time.thread_time() - span.cpu
+        local = self._local
+        stack = local.stack
+        stack.pop()
+        if stack:
+            parent = stack[-1]
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+            if parent.scope == 'symbol' and span.rows:
+                parent.rows = max(parent.rows or 0, span.rows)
+        local.profile.record(local.job, span, wall, cpu)
+
+    @contextmanager
+    def job(self, profile, name):
+        """
+        Profile a scanner job on the calling thread
+
+        Args:
+            profile: ScanProfile of the cycle (None to run unprofiled)
+            name: Job name
+        """
+        if profile is None:
+            yield
+            return
+
+        local = self._local
+        previous = (getattr(local, 'profile', None), getattr(local, 'job', None), getattr(local, 'stack', None))
+        local.profile, local.job, local.stack = profile, name, []
+        profile.register_thread(threading.current_thread().name)
+
+        capturer = None
+        if profile.capture:
+            capturer = cProfile.Profile()
+            try:
+                capturer.enable()
+            except ValueError as e:
+                # Only one profiler may be active at a time on some Python versions
+                print(f"Error starting cProfile for {name}: {e}")
+                capturer = None
+
+        span = self._open('other', scope='job')
+        try:
+            yield
+        finally:
+            self._close(span)
+            if capturer is not None:
+                capturer.disable()
+                profile.add_profiler(capturer)
+            local.profile, local.job, local.stack = previous
+
+    @contextmanager
+    def symbol(self, symbol):
+        """
+        Attribute the enclosed stages to one symbol
+
+        Args:
+            symbol: Stock symbol
+        """
+        span = self._open('other', scope='symbol', symbol=symbol)
+        if span is None:
+            yield _NullSpan()
+            return
+        try:
+            yield span
+        finally:
+            self._close(span)
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Time the enclosed code as one stage
+
+        Args:
+            name: Stage name (see STAGES)
+            rows: Optional rows processed (may also be set on the yielded span)
+
+        Yields:
+            Span whose rows attribute can be set while it runs
+        """
+        span = self._open(name)
+        if span is None:
+            yield _NullSpan()
+            return
+        span.rows = rows
+        try:
+            yield span
+        finally:
+            self._close(span)
+
+    def profiled(self, stage, rows_arg=0):
+        """
+        Decorate a function so its calls are timed as a stage
+
+        Args:
+            stage: Stage name (see STAGES)
+            rows_arg: Position of the argument whose length is the rows
+                processed (e.g. 1 for a method taking self, data)
+
+        Returns:
+            Decorator
+        """
+        def decorate(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                span = self._open(stage)
+                if span is None:
+                    return function(*args, **kwargs)
+                if len(args) > rows_arg:
+                    try:
+                        span.rows = len(args[rows_arg])
+                    except TypeError:
+                        pass
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self._close(span)
+            return wrapper
+        return decorate
+
+
+# Profiler shared by every scan in the process
+SCAN_PROFILER = ScanProfiler()
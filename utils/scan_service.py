@@ -0,0 +1,576 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from types import MappingProxyType
+import pandas as pd
+import pytz
+from scanners.scanner_registry import SCANNER_JOBS, get_scanner_jobs, dedupe_jobs, job_interval
+from utils.market_calendar import NSE_CALENDAR
+from utils.scan_orchestrator import ScanOrchestrator
+from utils.signal_diff import SignalDiffer
+from utils.signal_table import SignalTable
+from utils.topk import ResultRanking
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# One completed scan cycle. Snapshots are never modified after they are
+# published; readers must treat the DataFrames inside as read-only.
+ScanSnapshot = namedtuple('ScanSnapshot', [
+    'version',       # increases by one per published cycle (0 = no scan yet)
+    'scan_time',     # IST datetime the cycle finished, or None
+    'results',       # scanner name -> results DataFrame
+    'errors',        # scanner name -> error message for this cycle
+    'timings',       # scanner name -> seconds for this cycle
+    'events',        # signal insert/update/expire events for this cycle
+    'signal_table',  # SignalTable over all results
+    'rankings',      # scanner name -> ResultRanking
+    'duration',      # seconds the whole cycle took
+    'profile'        # ScanProfile of the cycle (per-stage timings), or None
+])
+
+
+class ScanService:
+    """Long-lived background scanner decoupled from Streamlit reruns
+
+    A single daemon thread runs scan cycles on its own schedule (or when a
+    scan is requested) and publishes each cycle as an immutable ScanSnapshot
+    by swapping one reference. Sessions only read the latest snapshot, so
+    pages render immediately while a scan runs, and widget interaction can
+    neither interrupt a scan nor start a second one. While a cycle runs,
+    per-scanner progress and the rows found so far are available through
+    progress() and live_results().
+
+    Sessions subscribe with the scanners they view and their auto-scan
+    preference. Each cycle runs the union of subscribed scanners, with jobs
+    doing identical work run once and their results shared by every job
+    name, and auto-scan runs on the shortest interval any subscriber asked
+    for. Upstream requests and CPU therefore stay flat as sessions are
+    added. Without live subscriptions the service falls back to its own
+    auto_scan, interval_minutes and enabled settings.
+
+    With schedule_mode 'bar_close' (the default), auto-scan runs each job
+    bar_delay_seconds after its own bar closes (every 15m bar for 15m jobs,
+    12:15 and 15:30 for 4h jobs, the session close for daily jobs), and a
+    cycle runs only the jobs whose bar closed. Weekends and NSE holidays
+    have no bar closes, so nothing runs. Cycles never overlap: a bar that
+    closes while a cycle runs is picked up by the next cycle, once. With
+    'interval', auto-scan runs every interval_minutes during sessions.
+    """
+
+    # Minimum minutes between scheduled scans
+    MIN_INTERVAL_MINUTES = 15
+    # Seconds without a heartbeat before a subscription is dropped
+    SUBSCRIPTION_TTL = 600
+
+    SCHEDULE_MODES = ('bar_close', 'interval')
+
+    DEFAULT_CONFIG = {
+        'auto_scan': False,
+        'interval_minutes': 15,
+        'schedule_mode': 'bar_close',
+        'bar_delay_seconds': 45,
+        'enabled': list(SCANNER_JOBS),
+        'executor': 'thread',
+        'max_workers': min(os.cpu_count() or 1, 6),
+        'job_timeout': 600,
+        'top_k': 100
+    }
+
+    def __init__(self, **config):
+        """
+        Args:
+            **config: Overrides for DEFAULT_CONFIG keys
+        """
+        unknown = set(config) - set(self.DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown scan service settings: {sorted(unknown)}")
+
+        self.config = {**self.DEFAULT_CONFIG, **config}
+        self.differ = SignalDiffer()
+        self.calendar = NSE_CALENDAR
+        self.last_error = None
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._scan_requested = False
+        self._running_since = None
+        # Session id -> scanners, auto_scan, interval_minutes and last_seen
+        self._subscriptions = {}
+        # Job name -> live progress of the running (or last) cycle
+        self._progress = {}
+        # Job name -> job whose results it shares in the running (or last) cycle
+        self._aliases = {}
+        # Callables notified with every published snapshot
+        self._listeners = []
+        # Job name -> bar close its last cycle scanned
+        self._scanned_bars = {}
+        self._progress_lock = threading.Lock()
+        self._snapshot = ScanSnapshot(
+            version=0,
+            scan_time=None,
+            results=MappingProxyType({}),
+            errors=MappingProxyType({}),
+            timings=MappingProxyType({}),
+            events=(),
+            signal_table=SignalTable.from_results({}),
+            rankings=MappingProxyType({}),
+            duration=0.0,
+            profile=None
+        )
+
+    def start(self):
+        """Start the scan thread (no-op when it is already running)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="scan-service", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the scan thread after the current cycle
+
+        Args:
+            timeout: Seconds to wait for the thread to exit
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self):
+        """Whether the scan thread is running"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def snapshot(self):
+        """
+        Get the latest published snapshot
+
+        Returns:
+            ScanSnapshot
+        """
+        return self._snapshot
+
+    def get_config(self):
+        """Get a copy of the current settings"""
+        with self._lock:
+            return dict(self.config, enabled=list(self.config['enabled']))
+
+    def configure(self, **changes):
+        """
+        Update settings; they apply from the next cycle
+
+        Args:
+            **changes: New values for DEFAULT_CONFIG keys
+
+        Returns:
+            True when any setting changed
+        """
+        unknown = set(changes) - set(self.DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown scan service settings: {sorted(unknown)}")
+
+        with self._lock:
+            changed = {key: value for key, value in changes.items() if self.config.get(key) != value}
+            self.config.update(changed)
+
+        if changed:
+            # The schedule may have moved
+            self._wake.set()
+        return bool(changed)
+
+    def subscribe(self, session_id, scanners, auto_scan=False, interval_minutes=15):
+        """
+        Register or update a session's subscription
+
+        Args:
+            session_id: Streamlit session id (any hashable key)
+            scanners: Scanner job names the session views
+            auto_scan: Whether the session wants scheduled scans
+            interval_minutes: The session's preferred scan interval
+
+        Returns:
+            True when the subscription changed
+        """
+        subscription = {
+            'scanners': [name for name in scanners if name in SCANNER_JOBS],
+            'auto_scan': bool(auto_scan),
+            'interval_minutes': int(interval_minutes)
+        }
+
+        with self._lock:
+            previous = self._subscriptions.get(session_id)
+            changed = previous is None or any(previous[key] != value for key, value in subscription.items())
+            self._subscriptions[session_id] = dict(subscription, last_seen=time.monotonic())
+
+        if changed:
+            # The shared schedule may have moved
+            self._wake.set()
+        return changed
+
+    def touch(self, session_id):
+        """Keep a session's subscription alive"""
+        with self._lock:
+            if session_id in self._subscriptions:
+                self._subscriptions[session_id]['last_seen'] = time.monotonic()
+
+    def unsubscribe(self, session_id):
+        """Drop a session's subscription"""
+        with self._lock:
+            self._subscriptions.pop(session_id, None)
+        self._wake.set()
+
+    def subscriber_count(self):
+        """Number of live subscriptions"""
+        with self._lock:
+            return len(self._live_subscriptions())
+
+    def _live_subscriptions(self):
+        """Drop expired subscriptions and return the rest (caller holds the lock)"""
+        cutoff = time.monotonic() - self.SUBSCRIPTION_TTL
+        for session_id in [key for key, sub in self._subscriptions.items() if sub['last_seen'] < cutoff]:
+            del self._subscriptions[session_id]
+        return list(self._subscriptions.values())
+
+    def schedule(self):
+        """
+        Get the schedule shared by every subscriber
+
+        Returns:
+            Dict with auto_scan, mode (schedule_mode), interval_minutes (never
+            below MIN_INTERVAL_MINUTES) and enabled (job names in SCANNER_JOBS order)
+        """
+        with self._lock:
+            subscriptions = self._live_subscriptions()
+            if not subscriptions:
+                auto_scan = self.config['auto_scan']
+                intervals = [self.config['interval_minutes']]
+                wanted = set(self.config['enabled'])
+            else:
+                auto_subscriptions = [sub for sub in subscriptions if sub['auto_scan']]
+                auto_scan = bool(auto_subscriptions)
+                intervals = [sub['interval_minutes'] for sub in auto_subscriptions] or [self.config['interval_minutes']]
+                wanted = set().union(*(sub['scanners'] for sub in subscriptions))
+
+            mode = self.config['schedule_mode']
+
+        return {
+            'auto_scan': auto_scan,
+            'mode': mode,
+            'interval_minutes': max(min(intervals), self.MIN_INTERVAL_MINUTES),
+            'enabled': [name for name in SCANNER_JOBS if name in wanted]
+        }
+
+    def add_listener(self, callback):
+        """
+        Call back after each published snapshot
+
+        Callbacks run on the scan thread and must return quickly.
+
+        Args:
+            callback: Callable receiving the new ScanSnapshot
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Stop calling a snapshot callback"""
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def request_scan(self):
+        """
+        Ask for a scan as soon as possible
+
+        Returns:
+            False when a scan is already running or queued (nothing is added)
+        """
+        with self._lock:
+            if self._running_since is not None or self._scan_requested:
+                return False
+            self._scan_requested = True
+
+        self._wake.set()
+        return True
+
+    def upcoming_scans(self, now=None):
+        """
+        Get when each scheduled job runs next
+
+        Args:
+            now: Optional IST datetime (defaults to the current time)
+
+        Returns:
+            Dict with job name as key and IST datetime as value (empty when
+            auto-scan is off); jobs already due map to now
+        """
+        schedule = self.schedule()
+        if not schedule['auto_scan']:
+            return {}
+        now = now or datetime.now(IST)
+
+        if schedule['mode'] == 'interval':
+            last = self._snapshot.scan_time
+            if last is None:
+                due = now
+            else:
+                due = last + timedelta(minutes=schedule['interval_minutes'])
+                if not self.calendar.is_session_open(due):
+                    due = self.calendar.next_session_open(due)
+            return {name: max(due, now) for name in schedule['enabled']}
+
+        delay = timedelta(seconds=self.config['bar_delay_seconds'])
+        with self._lock:
+            scanned = dict(self._scanned_bars)
+
+        upcoming = {}
+        for name, (scanner_cls, scan_kwargs) in get_scanner_jobs(schedule['enabled']).items():
+            interval = job_interval(scanner_cls, scan_kwargs)
+            latest = self.calendar.last_bar_close(interval, now - delay)
+            if name not in scanned or scanned[name] < latest:
+                upcoming[name] = now
+            else:
+                upcoming[name] = self.calendar.next_bar_close(interval, now - delay) + delay
+        return upcoming
+
+    def due_jobs(self, now=None):
+        """
+        Get the scheduled jobs that should run now
+
+        Args:
+            now: Optional IST datetime (defaults to the current time)
+
+        Returns:
+            List of job names
+        """
+        now = now or datetime.now(IST)
+        return [name for name, due in self.upcoming_scans(now).items() if due <= now]
+
+    def next_scan_time(self):
+        """
+        Get when the next scheduled scan is due
+
+        Returns:
+            IST datetime, or None when auto-scan is off
+        """
+        upcoming = self.upcoming_scans()
+        return min(upcoming.values()) if upcoming else None
+
+    def status(self):
+        """
+        Get the service state for display
+
+        Returns:
+            Dict with alive, running, running_for (seconds), scan_requested,
+            version, next_scan_time, subscribers and last_error
+        """
+        with self._lock:
+            running_since = self._running_since
+            requested = self._scan_requested
+
+        return {
+            'alive': self.is_alive(),
+            'running': running_since is not None,
+            'running_for': round(time.monotonic() - running_since, 1) if running_since is not None else 0.0,
+            'scan_requested': requested,
+            'version': self._snapshot.version,
+            'next_scan_time': self.next_scan_time(),
+            'subscribers': self.subscriber_count(),
+            'last_error': self.last_error
+        }
+
+    def progress(self):
+        """
+        Get per-scanner progress of the running (or last) cycle
+
+        Returns:
+            Dict with job name as key and a dict with status ('queued',
+            'running', 'done' or 'error'), done, total, signals, elapsed and
+            eta (seconds, None until the first symbol completes) as value
+        """
+        now = time.monotonic()
+        progress = {}
+        with self._progress_lock:
+            for name, shared in self._aliases.items():
+                job = self._progress[shared]
+                elapsed = 0.0
+                if job['started'] is not None:
+                    elapsed = (job['finished'] or now) - job['started']
+
+                eta = None
+                if job['status'] == 'running' and job['done'] and job['total']:
+                    eta = round(elapsed / job['done'] * (job['total'] - job['done']), 1)
+                elif job['status'] in ('done', 'error'):
+                    eta = 0.0
+
+                progress[name] = {
+                    'status': job['status'],
+                    'done': job['done'],
+                    'total': job['total'],
+                    'signals': len(job['ranking']),
+                    'elapsed': round(elapsed, 1),
+                    'eta': eta
+                }
+        return progress
+
+    def live_results(self, name, column=None, ascending=False, n=50):
+        """
+        Get the rows a scanner has found so far in the running cycle
+
+        Args:
+            name: Scanner job name
+            column: Optional sort column
+            ascending: Sort direction
+            n: Number of rows
+
+        Returns:
+            DataFrame of raw result rows (empty when the job has none yet)
+        """
+        with self._progress_lock:
+            job = self._progress.get(self._aliases.get(name, name))
+            if job is None or len(job['ranking']) == 0:
+                return pd.DataFrame()
+            ranking = job['ranking']
+            if column is None:
+                return ranking.frame().head(n).copy()
+            return ranking.top(column, ascending, n).copy()
+
+    def _record_progress(self, event):
+        """Apply one orchestrator stream() event to the live progress"""
+        with self._progress_lock:
+            job = self._progress.get(event['job'])
+            if job is None:
+                return
+
+            if event['type'] == 'started':
+                job['status'] = 'running'
+                job['started'] = time.monotonic()
+            elif event['type'] == 'progress':
+                job['done'] = event['done']
+                job['total'] = event['total']
+                job['ranking'].extend(event['rows'])
+            else:
+                job['status'] = 'done' if event['type'] == 'result' else 'error'
+                job['finished'] = time.monotonic()
+                if job['total'] is not None:
+                    job['done'] = job['total']
+
+    def _notify(self, snapshot):
+        """Pass a published snapshot to every listener"""
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Error in scan snapshot listener: {e}")
+
+    def _loop(self):
+        """Scan thread body: run due cycles, otherwise sleep until the next one"""
+        while not self._stop.is_set():
+            self._wake.clear()
+
+            with self._lock:
+                requested = self._scan_requested
+            if requested:
+                self.run_cycle()
+                continue
+
+            due = self.due_jobs()
+            if due:
+                self.run_cycle(due)
+                continue
+
+            next_scan = self.next_scan_time()
+            timeout = 60.0
+            if next_scan is not None:
+                timeout = min(timeout, max((next_scan - datetime.now(IST)).total_seconds(), 0.0))
+            self._wake.wait(timeout)
+
+    def run_cycle(self, names=None):
+        """
+        Run one scan cycle and publish its snapshot
+
+        Scanners that were not part of this cycle keep their previous results.
+
+        Args:
+            names: Optional job names to run (defaults to every enabled job)
+
+        Returns:
+            The published ScanSnapshot, or None when the cycle failed
+        """
+        with self._lock:
+            config = dict(self.config)
+            self._scan_requested = False
+            self._running_since = time.monotonic()
+
+        started = time.monotonic()
+        bars = {}
+        try:
+            orchestrator = ScanOrchestrator(
+                executor=config['executor'],
+                max_workers=config['max_workers'],
+                job_timeout=config['job_timeout']
+            )
+            # Identical jobs run once; every name they stand for gets the result
+            selected = get_scanner_jobs(self.schedule()['enabled'] if names is None else names)
+            jobs, aliases = dedupe_jobs(selected)
+            # The bars this cycle covers; closes during the cycle are left for the next one
+            scan_start = datetime.now(IST) - timedelta(seconds=config['bar_delay_seconds'])
+            bars = {name: self.calendar.last_bar_close(job_interval(*job), scan_start)
+                    for name, job in selected.items()}
+            with self._progress_lock:
+                self._aliases = aliases
+                self._progress = {
+                    name: {'status': 'queued', 'done': 0, 'total': None, 'started': None,
+                           'finished': None, 'ranking': ResultRanking(k=config['top_k'])}
+                    for name in jobs
+                }
+            outcome = orchestrator.run(jobs, on_event=self._record_progress)
+            for key in ('results', 'errors', 'timings'):
+                outcome[key] = {name: outcome[key][shared] for name, shared in aliases.items()
+                                if shared in outcome[key]}
+
+            previous = self._snapshot
+            results = {**previous.results, **outcome['results']}
+            # Shared results share one ranking
+            rankings = dict(previous.rankings)
+            fresh = {name: ResultRanking.from_frame(frame, k=config['top_k'])
+                     for name, frame in outcome['results'].items() if aliases[name] == name}
+            rankings.update({name: fresh[aliases[name]] for name in outcome['results']})
+
+            snapshot = ScanSnapshot(
+                version=previous.version + 1,
+                scan_time=datetime.now(IST),
+                results=MappingProxyType(results),
+                errors=MappingProxyType(dict(outcome['errors'])),
+                timings=MappingProxyType(dict(outcome['timings'])),
+                events=tuple(self.differ.diff_all(outcome['results'])),
+                signal_table=SignalTable.from_results(results),
+                rankings=MappingProxyType(rankings),
+                duration=round(time.monotonic() - started, 2),
+                profile=outcome.get('profile')
+            )
+
+            # Publish with a single reference swap
+            self._snapshot = snapshot
+            self.last_error = None
+            self._notify(snapshot)
+            return snapshot
+
+        except Exception as e:
+            print(f"Error in scan service cycle: {e}")
+            self.last_error = str(e)
+            return None
+
+        finally:
+            with self._lock:
+                self._running_since = None
+                # Failed jobs wait for their next bar instead of retrying at once
+                self._scanned_bars.update(bars)
@@ -0,0 +1,490 @@
+import re
+import numpy as np
+from utils.panel_indicators import BarPanel, PanelIndicators
+
+class ScreenSyntaxError(ValueError):
+    """Raised when a screen expression cannot be parsed"""
+
+
+# Token patterns, tried in order
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+\.\d*|\.\d+|\d+)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op>>=|<=|==|!=|>|<|\+|-|\*|/|\(|\)|,)
+    )""", re.VERBOSE)
+
+_COMPARISONS = {'>', '<', '>=', '<=', '==', '!='}
+
+# Longest period an indicator may use, in bars
+MAX_PERIOD = 5000
+_KEYWORDS = {'and', 'or', 'not'}
+
+# Indicator functions: default input series (None when the function reads
+# several fields itself) and default numeric parameters. A None parameter is
+# required. Functions with a default series accept an explicit series as their
+# first argument, e.g. sma(200) == sma(close, 200).
+FUNCTIONS = {
+    'sma': ('close', (None,)),
+    'ema': ('close', (None,)),
+    'std': ('close', (None,)),
+    'highest': ('high', (None,)),
+    'lowest': ('low', (None,)),
+    'roc': ('close', (None,)),
+    'rsi': ('close', (14,)),
+    'vol_sma': ('volume', (None,)),
+    'atr': (None, (14,)),
+    'macd': (None, (12, 26, 9)),
+    'signal': (None, (12, 26, 9)),
+    'histogram': (None, (12, 26, 9)),
+    'prev': ('required', (1,)),
+    'abs': ('required', ()),
+    'crosses_above': ('pair', ()),
+    'crosses_below': ('pair', ())
+}
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise ScreenSyntaxError(f"Unexpected character at position {pos}: {text[pos:pos + 10]!r}")
+        pos = match.end()
+        if match.group('number'):
+            tokens.append(('num', float(match.group('number'))))
+        elif match.group('name'):
+            name = match.group('name').lower()
+            tokens.append(('kw' if name in _KEYWORDS else 'name', name))
+        else:
+            tokens.append(('op', match.group('op')))
+
+    tokens.append(('end', None))
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing canonical AST tuples
+
+    Nodes are plain tuples so structurally identical sub-expressions compare
+    and hash equal, which is what lets the evaluator share them.
+    """
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, kind, value=None):
+        token = self.take()
+        if token[0] != kind or (value is not None and token[1] != value):
+            expected = value or kind
+            raise ScreenSyntaxError(f"Expected {expected!r} but found {token[1]!r}")
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek()[0] != 'end':
+            raise ScreenSyntaxError(f"Unexpected {self.peek()[1]!r} after end of expression")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek() == ('kw', 'or'):
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek() == ('kw', 'and'):
+            self.take()
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek() == ('kw', 'not'):
+            self.take()
+            return ('not', self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        node = self.parse_sum()
+        token = self.peek()
+        if token[0] == 'op' and token[1] in _COMPARISONS:
+            self.take()
+            node = ('cmp', token[1], node, self.parse_sum())
+        return node
+
+    def parse_sum(self):
+        node = self.parse_term()
+        while self.peek() in (('op', '+'), ('op', '-')):
+            op = self.take()[1]
+            node = ('bin', op, node, self.parse_term())
+        return node
+
+    def parse_term(self):
+        node = self.parse_unary()
+        while self.peek() in (('op', '*'), ('op', '/')):
+            op = self.take()[1]
+            node = ('bin', op, node, self.parse_unary())
+        return node
+
+    def parse_unary(self):
+        if self.peek() == ('op', '-'):
+            self.take()
+            operand = self.parse_unary()
+            if operand[0] == 'num':
+                return ('num', -operand[1])
+            return ('neg', operand)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        token = self.take()
+
+        if token[0] == 'end':
+            raise ScreenSyntaxError("Unexpected end of expression")
+
+        if token[0] == 'num':
+            return token
+
+        if token == ('op', '('):
+            node = self.parse_or()
+            self.expect('op', ')')
+            return node
+
+        if token[0] == 'name':
+            name = token[1]
+            args = []
+            if self.peek() == ('op', '('):
+                self.take()
+                if self.peek() != ('op', ')'):
+                    args.append(self.parse_or())
+                    while self.peek() == ('op', ','):
+                        self.take()
+                        args.append(self.parse_or())
+                self.expect('op', ')')
+
+            if name in BarPanel.FIELDS:
+                if args:
+                    raise ScreenSyntaxError(f"Field {name!r} does not take arguments")
+                return ('field', name)
+            return _canonical_call(name, args)
+
+        raise ScreenSyntaxError(f"Unexpected {token[1]!r}")
+
+
+def _literal(node, name):
+    """Check a period parameter: a whole number of bars from 1 to MAX_PERIOD"""
+    if node[0] != 'num':
+        raise ScreenSyntaxError(f"Parameters of {name}() must be numbers")
+    value = node[1]
+    if not float(value).is_integer() or not 1 <= value <= MAX_PERIOD:
+        raise ScreenSyntaxError(
+            f"Periods of {name}() must be whole numbers from 1 to {MAX_PERIOD}, got {describe(node)}")
+    return int(value)
+
+
+def _canonical_call(name, args):
+    """Resolve defaults so equivalent calls produce identical nodes"""
+    if name not in FUNCTIONS:
+        raise ScreenSyntaxError(f"Unknown indicator or field {name!r}")
+
+    default_series, defaults = FUNCTIONS[name]
+
+    if default_series == 'pair':
+        if len(args) != 2:
+            raise ScreenSyntaxError(f"{name}() takes exactly two arguments")
+        return ('call', name, tuple(args), ())
+
+    series = ()
+    if default_series == 'required':
+        if not args:
+            raise ScreenSyntaxError(f"{name}() needs a series argument")
+        series, args = (args[0],), args[1:]
+    elif default_series is not None:
+        if len(args) == len(defaults) + 1:
+            series, args = (args[0],), args[1:]
+        else:
+            series = (('field', default_series),)
+
+    if len(args) > len(defaults):
+        raise ScreenSyntaxError(f"{name}() takes at most {len(defaults)} parameters")
+
+    params = [_literal(arg, name) for arg in args]
+    for default in defaults[len(params):]:
+        if default is None:
+            raise ScreenSyntaxError(f"{name}() needs a period, e.g. {name}(20)")
+        params.append(default)
+
+    return ('call', name, series, tuple(params))
+
+
+def describe(node):
+    """
+    Render a canonical node back to readable expression text
+
+    Args:
+        node: AST node
+
+    Returns:
+        String such as 'sma(200)' or 'vol_sma(20)'
+    """
+    kind = node[0]
+    if kind == 'num':
+        value = node[1]
+        return str(int(value)) if float(value).is_integer() else str(value)
+    if kind == 'field':
+        return node[1]
+    if kind == 'neg':
+        return f"-{describe(node[1])}"
+    if kind == 'not':
+        return f"not {describe(node[1])}"
+    if kind in ('and', 'or'):
+        return f"({describe(node[1])} {kind} {describe(node[2])})"
+    if kind in ('bin', 'cmp'):
+        return f"{describe(node[2])} {node[1]} {describe(node[3])}"
+
+    _, name, series, params = node
+    default_series, defaults = FUNCTIONS[name]
+    args = [describe(s) for s in series if not (s[0] == 'field' and s[1] == default_series)]
+    shown = list(params)
+    while shown and len(shown) <= len(defaults) and shown[-1] == defaults[len(shown) - 1]:
+        shown.pop()
+    args.extend(str(p) for p in shown)
+    return f"{name}({', '.join(args)})" if args else name
+
+
+def lookback(node):
+    """
+    Count the bars before the latest one that a node's latest value reads
+
+    EMA-based indicators are seeded from the first bar, so like moving
+    averages they count their period.
+
+    Args:
+        node: AST node
+
+    Returns:
+        Number of earlier bars
+    """
+    kind = node[0]
+    if kind in ('num', 'field'):
+        return 0
+    if kind in ('neg', 'not'):
+        return lookback(node[1])
+    if kind in ('and', 'or'):
+        return max(lookback(node[1]), lookback(node[2]))
+    if kind in ('bin', 'cmp'):
+        return max(lookback(node[2]), lookback(node[3]))
+
+    _, name, series, params = node
+    inner = max((lookback(s) for s in series), default=0)
+    if name == 'abs':
+        return inner
+    if name in ('crosses_above', 'crosses_below'):
+        return inner + 1
+    if name in ('macd', 'signal', 'histogram'):
+        fast, slow, signal = params
+        return max(fast, slow) + signal - 2
+    if name in ('prev', 'roc', 'rsi', 'atr'):
+        # Built on bar-to-bar changes, which read one bar more than the window
+        return inner + params[0]
+    return inner + params[0] - 1
+
+
+class ScreenExpression:
+    """A compiled screen over a BarPanel
+
+    Example:
+        expr = ScreenExpression("macd > signal and close > sma(200) and volume > 2*vol_sma(20)")
+        mask = expr.evaluate(panel)['mask']
+    """
+
+    def __init__(self, text):
+        """
+        Args:
+            text: Screen expression
+
+        Raises:
+            ScreenSyntaxError: If the expression is invalid
+        """
+        if not text or not text.strip():
+            raise ScreenSyntaxError("Screen expression is empty")
+        self.text = text.strip()
+        self.node = _Parser(self.text).parse()
+        if not self._is_boolean(self.node):
+            raise ScreenSyntaxError("Screen must be a condition, e.g. close > sma(50)")
+        self.terms = self._collect_terms(self.node, [])
+        # Bars per symbol needed for the latest value of every term
+        self.bars_needed = lookback(self.node) + 1
+
+    @staticmethod
+    def _is_boolean(node):
+        return node[0] in ('cmp', 'and', 'or', 'not') or (
+            node[0] == 'call' and node[1] in ('crosses_above', 'crosses_below'))
+
+    def _collect_terms(self, node, terms):
+        """Collect operand terms worth showing as result columns"""
+        kind = node[0]
+        if kind in ('and', 'or'):
+            self._collect_terms(node[1], terms)
+            self._collect_terms(node[2], terms)
+        elif kind == 'not':
+            self._collect_terms(node[1], terms)
+        elif kind == 'cmp':
+            for operand in node[2:]:
+                if operand[0] != 'num' and operand not in terms:
+                    terms.append(operand)
+        elif kind == 'call' and node[1] in ('crosses_above', 'crosses_below'):
+            for operand in node[2]:
+                if operand[0] != 'num' and operand not in terms:
+                    terms.append(operand)
+        return terms
+
+    def evaluate(self, panel):
+        """
+        Evaluate the screen across every symbol of a panel at once
+
+        Args:
+            panel: BarPanel
+
+        Returns:
+            Dict with 'mask' (bool per symbol at the latest bar) and 'values'
+            (term text -> latest value per symbol)
+        """
+        if len(panel) == 0 or panel.n_bars == 0:
+            return {'mask': np.zeros(len(panel), dtype=bool),
+                    'values': {describe(term): np.full(len(panel), np.nan) for term in self.terms},
+                    'nodes_evaluated': 0}
+
+        evaluator = _PanelEvaluator(panel)
+        result = evaluator.eval(self.node)
+        result = np.broadcast_to(result, (len(panel), max(panel.n_bars, 1)))
+        mask = result[:, -1].astype(bool)
+
+        values = {}
+        for term in self.terms:
+            matrix = np.broadcast_to(evaluator.eval(term), (len(panel), max(panel.n_bars, 1)))
+            values[describe(term)] = matrix[:, -1]
+
+        return {'mask': mask, 'values': values, 'nodes_evaluated': len(evaluator.memo)}
+
+
+class _PanelEvaluator:
+    """Evaluates AST nodes over a panel, computing each distinct node once"""
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.memo = {}
+
+    def eval(self, node):
+        if node in self.memo:
+            return self.memo[node]
+        value = self._compute(node)
+        self.memo[node] = value
+        return value
+
+    def _compute(self, node):
+        kind = node[0]
+
+        if kind == 'num':
+            return np.float64(node[1])
+        if kind == 'field':
+            return self.panel.field(node[1])
+        if kind == 'neg':
+            return -self.eval(node[1])
+        if kind == 'not':
+            return ~np.asarray(self.eval(node[1]), dtype=bool)
+        if kind == 'and':
+            return np.logical_and(self.eval(node[1]), self.eval(node[2]))
+        if kind == 'or':
+            return np.logical_or(self.eval(node[1]), self.eval(node[2]))
+
+        if kind == 'bin':
+            left, right = self.eval(node[2]), self.eval(node[3])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if node[1] == '+':
+                    return left + right
+                if node[1] == '-':
+                    return left - right
+                if node[1] == '*':
+                    return left * right
+                return left / right
+
+        if kind == 'cmp':
+            left, right = self.eval(node[2]), self.eval(node[3])
+            with np.errstate(invalid='ignore'):
+                if node[1] == '>':
+                    return left > right
+                if node[1] == '<':
+                    return left < right
+                if node[1] == '>=':
+                    return left >= right
+                if node[1] == '<=':
+                    return left <= right
+                if node[1] == '==':
+                    return left == right
+                return left != right
+
+        return self._call(node)
+
+    def _call(self, node):
+        _, name, series, params = node
+        ind = PanelIndicators
+
+        if name in ('macd', 'signal', 'histogram'):
+            # The three MACD outputs share one computation
+            key = ('macd_all',) + params
+            if key not in self.memo:
+                self.memo[key] = ind.macd(self.panel.field('close'), *params)
+            macd_line, signal_line, histogram = self.memo[key]
+            return {'macd': macd_line, 'signal': signal_line, 'histogram': histogram}[name]
+
+        if name == 'atr':
+            return ind.atr(self.panel.field('high'), self.panel.field('low'),
+                           self.panel.field('close'), params[0])
+
+        if name in ('crosses_above', 'crosses_below'):
+            left, right = (np.broadcast_to(self.eval(s), (len(self.panel), self.panel.n_bars)) for s in series)
+            diff = left - right
+            prev_diff = ind.shift(diff, 1)
+            with np.errstate(invalid='ignore'):
+                if name == 'crosses_above':
+                    return (diff > 0) & (prev_diff <= 0)
+                return (diff < 0) & (prev_diff >= 0)
+
+        values = self.eval(series[0])
+
+        if name == 'abs':
+            return np.abs(values)
+        if name == 'prev':
+            return ind.shift(values, params[0])
+        if name in ('sma', 'vol_sma'):
+            return ind.sma(values, params[0])
+        if name == 'ema':
+            return ind.ema(values, params[0])
+        if name == 'std':
+            return ind.rolling_std(values, params[0])
+        if name == 'highest':
+            return ind.rolling_max(values, params[0])
+        if name == 'lowest':
+            return ind.rolling_min(values, params[0])
+        if name == 'rsi':
+            return ind.rsi(values, params[0])
+        if name == 'roc':
+            previous = ind.shift(values, params[0])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return (values - previous) / previous * 100
+
+        raise ScreenSyntaxError(f"Unsupported function {name!r}")
@@ -0,0 +1,215 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+class SharedBarPanel:
+    """OHLCV bars for many symbols packed into a single shared memory block
+
+    Bars are stored back to back in one float64 matrix (one row per bar) with a
+    parallel int64 array of UTC timestamps. Worker processes attach by name and
+    rebuild per-symbol DataFrames from views, so no DataFrame is ever pickled.
+    """
+
+    COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self, data_map):
+        """
+        Args:
+            data_map: Dict with symbol as key and OHLCV DataFrame as value
+        """
+        self.symbols = list(data_map)
+        lengths = [len(data_map[symbol]) for symbol in self.symbols]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64)
+        total = int(self.offsets[-1])
+
+        n_cols = len(self.COLUMNS)
+        size = max(total * (n_cols + 1) * 8, 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+        values, times = self._views(self.shm.buf, total)
+        self.timezones = []
+
+        for i, symbol in enumerate(self.symbols):
+            data = data_map[symbol]
+            start, end = self.offsets[i], self.offsets[i + 1]
+
+            for j, column in enumerate(self.COLUMNS):
+                if column in data:
+                    values[start:end, j] = data[column].to_numpy(dtype=np.float64)
+                else:
+                    values[start:end, j] = 0.0
+
+            index = data.index
+            if isinstance(index, pd.DatetimeIndex):
+                tz = str(index.tz) if index.tz is not None else None
+                utc_index = index.tz_convert('UTC') if tz else index
+                times[start:end] = utc_index.as_unit('ns').asi8
+            else:
+                tz = None
+                times[start:end] = np.arange(end - start)
+            self.timezones.append(tz)
+
+        # Drop local views so the block can be closed cleanly
+        del values, times
+
+    @staticmethod
+    def _views(buf, total):
+        n_cols = len(SharedBarPanel.COLUMNS)
+        values = np.ndarray((total, n_cols), dtype=np.float64, buffer=buf)
+        times = np.ndarray((total,), dtype=np.int64, buffer=buf, offset=total * n_cols * 8)
+        return values, times
+
+    def meta(self):
+        """
+        Describe the block for worker processes
+
+        Returns:
+            Small picklable dict with block name, symbols, offsets and timezones
+        """
+        return {
+            'name': self.shm.name,
+            'symbols': self.symbols,
+            'offsets': self.offsets,
+            'timezones': self.timezones
+        }
+
+    def close(self):
+        """Release and remove the shared memory block"""
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def attach(meta):
+        """
+        Attach to an existing block from a worker process
+
+        Args:
+            meta: Dict returned by SharedBarPanel.meta()
+
+        Returns:
+            SharedMemory handle (caller must close it)
+        """
+        # Pool workers share the parent's resource tracker, so attaching does
+        # not take ownership; the creating process unlinks the block.
+        return shared_memory.SharedMemory(name=meta['name'])
+
+    @staticmethod
+    def frame(meta, values, times, i):
+        """
+        Rebuild one symbol's OHLCV DataFrame from shared views
+
+        Args:
+            meta: Dict returned by SharedBarPanel.meta()
+            values: Shared bar matrix view
+            times: Shared timestamp view
+            i: Symbol position
+
+        Returns:
+            OHLCV DataFrame
+        """
+        start, end = meta['offsets'][i], meta['offsets'][i + 1]
+        tz = meta['timezones'][i]
+        if tz:
+            index = pd.DatetimeIndex(times[start:end].copy(), tz='UTC').tz_convert(tz)
+        else:
+            index = pd.DatetimeIndex(times[start:end].copy())
+        return pd.DataFrame(values[start:end].copy(), index=index, columns=SharedBarPanel.COLUMNS)
+
+
+def analyze_shard(meta, scanner_cls, timeframe, positions):
+    """
+    Run a scanner's per-symbol detection for one shard of the universe
+
+    Kept at module level so it can be pickled for process pools.
+
+    Args:
+        meta: Dict returned by SharedBarPanel.meta()
+        scanner_cls: Scanner class providing analyze()
+        timeframe: Data timeframe
+        positions: Symbol positions in the shared panel
+
+    Returns:
+        List of (position, result row) tuples for symbols with a signal
+    """
+    shm = SharedBarPanel.attach(meta)
+    records = []
+
+    try:
+        values, times = SharedBarPanel._views(shm.buf, int(meta['offsets'][-1]))
+        scanner = scanner_cls()
+
+        for i in positions:
+            symbol = meta['symbols'][i]
+            try:
+                data = SharedBarPanel.frame(meta, values, times, i)
+                row = scanner.analyze(symbol, data, timeframe)
+                if row:
+                    records.append((i, row))
+            except Exception as e:
+                print(f"Error processing {symbol}: {e}")
+                continue
+
+        del values, times
+    finally:
+        shm.close()
+
+    return records
+
+
+class ShardedDetector:
+    """Shards symbol detection across a process pool using shared memory inputs"""
+
+    def __init__(self, pool, workers, shards_per_worker=4):
+        """
+        Args:
+            pool: ProcessPoolExecutor used for detection
+            workers: Number of worker processes in the pool
+            shards_per_worker: Shards submitted per worker, for load balancing
+        """
+        self.pool = pool
+        self.workers = max(1, workers)
+        self.shards_per_worker = shards_per_worker
+
+    def detect(self, scanner_cls, data_map, timeframe, keyed=False):
+        """
+        Analyze every symbol in data_map on the process pool
+
+        Args:
+            scanner_cls: Scanner class providing analyze()
+            data_map: Dict with symbol as key and OHLCV DataFrame as value
+            timeframe: Data timeframe
+            keyed: Return (symbol, row) pairs instead of bare rows
+
+        Returns:
+            List of result rows (or (symbol, row) pairs) for symbols with a
+            signal, in the same symbol order as data_map
+        """
+        if not data_map:
+            return []
+
+        panel = SharedBarPanel(data_map)
+
+        try:
+            meta = panel.meta()
+            n_symbols = len(panel.symbols)
+            n_shards = min(n_symbols, self.workers * self.shards_per_worker)
+
+            # Interleave symbols so each shard gets a similar mix of bar counts
+            futures = [
+                self.pool.submit(analyze_shard, meta, scanner_cls, timeframe, list(range(k, n_symbols, n_shards)))
+                for k in range(n_shards)
+            ]
+
+            records = []
+            for future in futures:
+                records.extend(future.result())
+        finally:
+            panel.close()
+
+        records.sort(key=lambda record: record[0])
+        if keyed:
+            return [(panel.symbols[i], row) for i, row in records]
+        return [row for _, row in records]
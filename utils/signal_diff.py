@@ -0,0 +1,230 @@
+import hashlib
+import threading
+import pandas as pd
+
+class SignalDiffer:
+    """Change-data-capture over scanner results
+
+    Signals are keyed by (scanner, symbol, timeframe, bar time) so the same
+    crossover seen on consecutive scans is recognized as the same signal.
+    The previous cycle is kept as a compact index of key hash -> content
+    hash per scanner, and each cycle produces typed events:
+
+    - insert: a signal that was not present in the previous cycle
+    - update: the same signal with different values (e.g. a forming bar)
+    - expire: a signal from the previous cycle that is no longer reported
+    """
+
+    INSERT = 'insert'
+    UPDATE = 'update'
+    EXPIRE = 'expire'
+
+    SYMBOL_COLUMNS = ['Symbol', 'symbol']
+    TIMEFRAME_COLUMNS = ['Timeframe', 'timeframe']
+    BAR_TIME_COLUMNS = ['Bar_Time', 'bar_time']
+    # Columns that change on every scan without the signal itself changing
+    VOLATILE_COLUMNS = ['timestamp', 'Scan_Time']
+
+    def __init__(self):
+        # scanner -> {key hash: (content hash, key)}
+        self._index = {}
+        self._lock = threading.Lock()
+        self.cycles = 0
+
+    @staticmethod
+    def _hash(value):
+        """Compact 64-bit hash of a value's repr"""
+        digest = hashlib.blake2b(repr(value).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little')
+
+    @staticmethod
+    def _first(row, columns, default=None):
+        """Get the first present column value from a result row"""
+        for column in columns:
+            if column in row:
+                return row[column]
+        return default
+
+    @staticmethod
+    def _bar_time_key(bar_time):
+        """Normalize a bar time so tz-aware and UTC copies compare equal"""
+        if bar_time is None:
+            return None
+        try:
+            stamp = pd.Timestamp(bar_time)
+        except (TypeError, ValueError):
+            return str(bar_time)
+        if pd.isna(stamp):
+            return None
+        if stamp.tzinfo is not None:
+            stamp = stamp.tz_convert('UTC').tz_localize(None)
+        return stamp.value
+
+    def signal_key(self, scanner, row, timeframe=None):
+        """
+        Build the identity of a signal
+
+        Args:
+            scanner: Scanner name
+            row: Result row dict
+            timeframe: Fallback timeframe when the row has none
+
+        Returns:
+            Tuple of (scanner, symbol, timeframe, bar time)
+        """
+        return (
+            scanner,
+            self._first(row, self.SYMBOL_COLUMNS),
+            self._first(row, self.TIMEFRAME_COLUMNS, timeframe),
+            self._bar_time_key(self._first(row, self.BAR_TIME_COLUMNS))
+        )
+
+    def content_hash(self, row):
+        """Hash the values of a signal, ignoring per-scan and key columns"""
+        skip = set(self.VOLATILE_COLUMNS + self.BAR_TIME_COLUMNS)
+        return self._hash(tuple(
+            (column, value) for column, value in sorted(row.items())
+            if column not in skip
+        ))
+
+    @staticmethod
+    def _rows(results):
+        """Convert scanner results into a list of row dicts"""
+        if results is None:
+            return []
+        if isinstance(results, pd.DataFrame):
+            return results.to_dict('records')
+        return list(results)
+
+    def diff(self, scanner, results, timeframe=None):
+        """
+        Diff one scanner's results against its previous cycle
+
+        Args:
+            scanner: Scanner name
+            results: DataFrame or list of result row dicts
+            timeframe: Fallback timeframe for rows without one
+
+        Returns:
+            List of event dicts with event, scanner, symbol, timeframe,
+            bar_time and row (None for expire events)
+        """
+        current = {}
+        rows = {}
+
+        for row in self._rows(results):
+            key = self.signal_key(scanner, row, timeframe)
+            key_hash = self._hash(key)
+            current[key_hash] = (self.content_hash(row), key)
+            rows[key_hash] = row
+
+        events = []
+
+        with self._lock:
+            previous = self._index.get(scanner, {})
+
+            for key_hash, (content, key) in current.items():
+                before = previous.get(key_hash)
+                if before is None:
+                    events.append(self._event(self.INSERT, key, rows[key_hash]))
+                elif before[0] != content:
+                    events.append(self._event(self.UPDATE, key, rows[key_hash]))
+
+            for key_hash, (_, key) in previous.items():
+                if key_hash not in current:
+                    events.append(self._event(self.EXPIRE, key, None))
+
+            self._index[scanner] = current
+
+        return events
+
+    def diff_all(self, results_by_scanner):
+        """
+        Diff every scanner in a scan cycle
+
+        Scanners missing from the cycle (disabled or timed out) keep their
+        previous state and produce no expire events.
+
+        Args:
+            results_by_scanner: Dict with scanner name as key and results as value
+
+        Returns:
+            List of event dicts across all scanners
+        """
+        events = []
+        for scanner, results in results_by_scanner.items():
+            events.extend(self.diff(scanner, results))
+
+        with self._lock:
+            self.cycles += 1
+
+        return events
+
+    @staticmethod
+    def _event(kind, key, row):
+        """Build an event dict for a signal key"""
+        scanner, symbol, timeframe, _ = key
+        bar_time = SignalDiffer._first(row, SignalDiffer.BAR_TIME_COLUMNS) if row else None
+        if bar_time is None and key[3] is not None and not isinstance(key[3], str):
+            bar_time = pd.Timestamp(key[3], tz='UTC')
+        return {
+            'event': kind,
+            'scanner': scanner,
+            'symbol': symbol,
+            'timeframe': timeframe,
+            'bar_time': bar_time,
+            'row': row
+        }
+
+    def reset(self, scanner=None):
+        """
+        Forget previous state so the next cycle reports everything as new
+
+        Args:
+            scanner: Scanner name, or None for all scanners
+        """
+        with self._lock:
+            if scanner is None:
+                self._index.clear()
+            else:
+                self._index.pop(scanner, None)
+
+    def active_count(self):
+        """Number of signals in the current state across all scanners"""
+        with self._lock:
+            return sum(len(index) for index in self._index.values())
+
+    @staticmethod
+    def summarize(events):
+        """
+        Count events by type
+
+        Args:
+            events: List of event dicts
+
+        Returns:
+            Dict with insert, update and expire counts
+        """
+        counts = {SignalDiffer.INSERT: 0, SignalDiffer.UPDATE: 0, SignalDiffer.EXPIRE: 0}
+        for event in events:
+            counts[event['event']] += 1
+        return counts
+
+    @staticmethod
+    def events_frame(events):
+        """
+        Flatten events into a DataFrame for display and export
+
+        Args:
+            events: List of event dicts
+
+        Returns:
+            DataFrame with one row per event
+        """
+        columns = ['Event', 'Scanner', 'Symbol', 'Timeframe', 'Bar_Time']
+        if not events:
+            return pd.DataFrame(columns=columns)
+        return pd.DataFrame([
+            [e['event'], e['scanner'], e['symbol'], e['timeframe'], e['bar_time']]
+            for e in events
+        ], columns=columns)
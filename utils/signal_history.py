@@ -0,0 +1,380 @@
+import os
+import queue
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+import pytz
+from utils.signal_diff import SignalDiffer
+from utils.signal_table import SignalTable, NAT
+from scanners.scanner_registry import job_slug
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # The history store is optional
+    pa = None
+    ds = None
+    pq = None
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+class SignalHistoryStore:
+    """Append-only log of every scan cycle's signals as partitioned Parquet
+
+    Each published snapshot is appended as one row per active signal (event
+    'insert', 'update' or 'hold') plus one row per expired signal, under a
+    Hive-style layout:
+
+        <root>/date=2025-07-01/scanner=support-level-4h/part-....parquet
+
+    Appends are queued and written by a background thread, so the scan
+    cycle only pays for a queue put. Files of past days are compacted into
+    one symbol-sorted, zstd-compressed file per partition, which keeps the
+    file count at one per scanner per day and lets Parquet row-group
+    statistics skip other symbols. query() pushes date, scanner, symbol and
+    signal predicates down to partition pruning and row-group filtering.
+
+    Needs pyarrow; without it the store is disabled and appends are ignored.
+    """
+
+    SCHEMA = pa.schema([
+        ('scan_time', pa.timestamp('ns', tz='UTC')),
+        ('version', pa.int64()),
+        ('event', pa.string()),
+        ('symbol', pa.string()),
+        ('scanner_name', pa.string()),
+        ('timeframe', pa.string()),
+        ('direction', pa.int8()),
+        ('signal', pa.string()),
+        ('strength', pa.float64()),
+        ('price', pa.float64()),
+        ('bar_time', pa.timestamp('ns', tz='UTC'))
+    ]) if pa is not None else None
+
+    PARTITIONING = pa.schema([('date', pa.date32()), ('scanner', pa.string())]) if pa is not None else None
+
+    HOLD = 'hold'
+    COMPACTED_FILE = 'data.parquet'
+    ROW_GROUP_SIZE = 50000
+
+    def __init__(self, root="history/signals", compact_past_days=True):
+        """
+        Args:
+            root: Directory holding the partitioned log
+            compact_past_days: Merge each past day's files into one per scanner
+        """
+        self.root = root
+        self.compact_past_days = compact_past_days
+        self.enabled = pa is not None
+        self.rows_written = 0
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # IST date of the last written snapshot (compaction runs when it changes)
+        self._last_day = None
+
+        if not self.enabled:
+            print("Signal history disabled: pyarrow is not installed (pip install pyarrow)")
+
+    def start(self):
+        """Start the writer thread (no-op when disabled or already running)"""
+        with self._lock:
+            if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._writer, name="signal-history", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Write every queued snapshot, then stop the writer thread
+
+        Args:
+            timeout: Seconds to wait for pending writes
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def append(self, snapshot):
+        """
+        Queue a published snapshot for writing (ScanService listener)
+
+        Args:
+            snapshot: ScanSnapshot
+        """
+        if self.enabled and snapshot.version > 0:
+            self._queue.put(snapshot)
+
+    def pending(self):
+        """Number of snapshots waiting to be written"""
+        return self._queue.qsize()
+
+    def _writer(self):
+        """Writer thread body"""
+        if self.compact_past_days:
+            self._compact_safely()
+
+        while True:
+            snapshot = self._queue.get()
+            if snapshot is None:
+                break
+            try:
+                self.write_snapshot(snapshot)
+                day = snapshot.scan_time.astimezone(IST).date()
+                if self.compact_past_days and self._last_day is not None and day != self._last_day:
+                    self._compact_safely()
+                self._last_day = day
+            except Exception as e:
+                print(f"Error writing signal history: {e}")
+                self.last_error = str(e)
+
+    def _compact_safely(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Error compacting signal history: {e}")
+            self.last_error = str(e)
+
+    @staticmethod
+    def snapshot_frame(snapshot):
+        """
+        Flatten a snapshot into history rows
+
+        Args:
+            snapshot: ScanSnapshot
+
+        Returns:
+            DataFrame in the SCHEMA column order
+        """
+        table = snapshot.signal_table
+        columns = table.columns
+
+        # Event kind of each active signal, keyed like the signal table rows
+        kinds = {}
+        expired = []
+        for event in snapshot.events:
+            bar_time = SignalDiffer._bar_time_key(event['bar_time'])
+            key = (event['scanner'], SignalTable.normalize_symbol(event['symbol']), str(event['timeframe']),
+                   bar_time if isinstance(bar_time, (int, np.integer)) else NAT)
+            if event['event'] == SignalDiffer.EXPIRE:
+                expired.append(key)
+            else:
+                kinds[key] = event['event']
+
+        symbols = np.array(table.symbols, dtype=object)[columns['symbol']] if table.symbols else np.empty(0, dtype=object)
+        scanners = np.array(table.scanners, dtype=object)[columns['scanner']] if table.scanners else np.empty(0, dtype=object)
+        timeframes = np.array(table.timeframes, dtype=object)[columns['timeframe']] if table.timeframes else np.empty(0, dtype=object)
+        bar_times = columns['bar_time']
+        events = [kinds.get(key, SignalHistoryStore.HOLD)
+                  for key in zip(scanners, symbols, timeframes, bar_times.tolist())]
+
+        n_expired = len(expired)
+        frame = pd.DataFrame({
+            'event': events + [SignalDiffer.EXPIRE] * n_expired,
+            'symbol': list(symbols) + [key[1] for key in expired],
+            'scanner_name': list(scanners) + [key[0] for key in expired],
+            'timeframe': list(timeframes) + [key[2] for key in expired],
+            'direction': np.concatenate([columns['direction'], np.zeros(n_expired, dtype=np.int8)]),
+            'signal': list(columns['label']) + [None] * n_expired,
+            'strength': np.concatenate([columns['strength'], np.full(n_expired, np.nan)]),
+            'price': np.concatenate([columns['price'], np.full(n_expired, np.nan)]),
+            'bar_time': pd.to_datetime(
+                np.concatenate([bar_times, np.array([key[3] for key in expired], dtype=np.int64)]),
+                unit='ns', utc=True
+            )
+        })
+        frame.insert(0, 'version', snapshot.version)
+        frame.insert(0, 'scan_time', pd.Timestamp(snapshot.scan_time).tz_convert('UTC'))
+        return frame
+
+    def partition_dir(self, day, scanner):
+        """Directory of one day's rows for one scanner"""
+        return os.path.join(self.root, f"date={day.isoformat()}", f"scanner={job_slug(scanner)}")
+
+    def write_snapshot(self, snapshot):
+        """
+        Write one snapshot's rows (one new file per scanner partition)
+
+        Args:
+            snapshot: ScanSnapshot
+
+        Returns:
+            Number of rows written
+        """
+        frame = self.snapshot_frame(snapshot)
+        if frame.empty:
+            return 0
+
+        day = snapshot.scan_time.astimezone(IST).date()
+        name = f"part-{snapshot.scan_time.astimezone(IST).strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+
+        for scanner, rows in frame.groupby('scanner_name', sort=False):
+            directory = self.partition_dir(day, scanner)
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(rows, schema=self.SCHEMA, preserve_index=False)
+            self._write_table(table, os.path.join(directory, name))
+
+        self.rows_written += len(frame)
+        return len(frame)
+
+    @classmethod
+    def _write_table(cls, table, path):
+        """Write a table atomically (readers never see a partial file)"""
+        directory, name = os.path.split(path)
+        temp = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, temp, compression='zstd', row_group_size=cls.ROW_GROUP_SIZE)
+        os.replace(temp, path)
+
+    def compact(self, before=None):
+        """
+        Merge the files of each past day's partitions into one sorted file
+
+        Args:
+            before: Only compact days before this date (defaults to today in IST)
+
+        Returns:
+            Number of partitions compacted
+        """
+        if not self.enabled or not os.path.isdir(self.root):
+            return 0
+
+        before = before or datetime.now(IST).date()
+        compacted = 0
+
+        for day_dir in sorted(os.listdir(self.root)):
+            if not day_dir.startswith('date='):
+                continue
+            try:
+                day = date.fromisoformat(day_dir[len('date='):])
+            except ValueError:
+                continue
+            if day >= before:
+                continue
+
+            for scanner_dir in os.listdir(os.path.join(self.root, day_dir)):
+                directory = os.path.join(self.root, day_dir, scanner_dir)
+                parts = sorted(name for name in os.listdir(directory)
+                               if name.endswith('.parquet') and not name.startswith('.'))
+                if not parts or parts == [self.COMPACTED_FILE]:
+                    continue
+
+                table = pa.concat_tables(
+                    pq.read_table(os.path.join(directory, name), schema=self.SCHEMA) for name in parts
+                ).sort_by([('symbol', 'ascending'), ('scan_time', 'ascending')])
+                self._write_table(table, os.path.join(directory, self.COMPACTED_FILE))
+                for name in parts:
+                    if name != self.COMPACTED_FILE:
+                        os.remove(os.path.join(directory, name))
+                compacted += 1
+
+        return compacted
+
+    def dataset(self):
+        """pyarrow Dataset over the whole log"""
+        return ds.dataset(
+            self.root,
+            format='parquet',
+            schema=pa.unify_schemas([self.SCHEMA, self.PARTITIONING]),
+            partitioning=ds.partitioning(self.PARTITIONING, flavor='hive')
+        )
+
+    def query(self, symbols=None, scanners=None, signals=None, timeframes=None, events=None,
+              start=None, end=None, days=None, columns=None):
+        """
+        Read history rows matching a filter
+
+        Every predicate is pushed down: dates and scanners prune partition
+        directories, the rest skip Parquet row groups by their statistics.
+
+        Example:
+            store.query(symbols='HDFCBANK', signals='Fresh Breakout', days=30)
+
+        Args:
+            symbols: Symbol or list of symbols (bare or with .NS)
+            scanners: Scanner name/slug or list of them
+            signals: Signal label or list of labels (e.g. 'Fresh Breakout')
+            timeframes: Timeframe or list of timeframes
+            events: Event kind or list ('insert', 'update', 'hold', 'expire')
+            start: Earliest scan time (datetime, date or ISO string)
+            end: Latest scan time (datetime, date or ISO string, inclusive)
+            days: Shortcut for start = now - days
+            columns: Optional list of columns to read
+
+        Returns:
+            DataFrame of matching rows ordered by scan time
+        """
+        if not self.enabled or not os.path.isdir(self.root):
+            return pd.DataFrame(columns=columns or self.SCHEMA.names)
+
+        def as_list(value):
+            return [value] if isinstance(value, str) else list(value)
+
+        if days is not None:
+            start = datetime.now(IST) - timedelta(days=days)
+
+        predicates = []
+        if start is not None:
+            start = self._timestamp(start)
+            predicates.append(ds.field('date') >= start.tz_convert(IST).date())
+            predicates.append(ds.field('scan_time') >= pa.scalar(start.to_pydatetime(), pa.timestamp('ns', tz='UTC')))
+        if end is not None:
+            if isinstance(end, str) and len(end) == 10:
+                end = date.fromisoformat(end)
+            if isinstance(end, date) and not isinstance(end, datetime):
+                # A date includes the whole day
+                end = datetime.combine(end, datetime.max.time())
+            end = self._timestamp(end)
+            predicates.append(ds.field('date') <= end.tz_convert(IST).date())
+            predicates.append(ds.field('scan_time') <= pa.scalar(end.to_pydatetime(), pa.timestamp('ns', tz='UTC')))
+        if scanners is not None:
+            predicates.append(ds.field('scanner').isin([job_slug(name) for name in as_list(scanners)]))
+        if symbols is not None:
+            predicates.append(ds.field('symbol').isin([SignalTable.normalize_symbol(s) for s in as_list(symbols)]))
+        if signals is not None:
+            predicates.append(ds.field('signal').isin(as_list(signals)))
+        if timeframes is not None:
+            predicates.append(ds.field('timeframe').isin(as_list(timeframes)))
+        if events is not None:
+            predicates.append(ds.field('event').isin(as_list(events)))
+
+        expression = None
+        for predicate in predicates:
+            expression = predicate if expression is None else expression & predicate
+
+        try:
+            table = self.dataset().to_table(filter=expression, columns=columns)
+        except Exception as e:
+            print(f"Error querying signal history: {e}")
+            return pd.DataFrame(columns=columns or self.SCHEMA.names)
+
+        frame = table.to_pandas()
+        if 'scan_time' in frame.columns:
+            frame = frame.sort_values('scan_time', kind='stable', ignore_index=True)
+        return frame
+
+    @staticmethod
+    def _timestamp(value):
+        """Convert a datetime or date to a UTC Timestamp (naive values are IST)"""
+        stamp = pd.Timestamp(value)
+        if stamp.tzinfo is None:
+            stamp = stamp.tz_localize(IST)
+        return stamp.tz_convert('UTC')
+
+    def stats(self):
+        """
+        Get writer counters
+
+        Returns:
+            Dict with enabled, rows_written, pending and last_error
+        """
+        return {
+            'enabled': self.enabled,
+            'rows_written': self.rows_written,
+            'pending': self.pending(),
+            'last_error': self.last_error
+        }
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+
+# Integer value of NaT in the bar_time column
+NAT = np.iinfo(np.int64).min
+
+class SignalTable:
+    """Columnar table of signals from every scanner under one schema
+
+    Each scanner returns its own DataFrame shape (MACDScannerOriginal uses
+    lowercase columns and bare symbols, the others use Symbol with the .NS
+    suffix). SignalTable maps them onto a common schema stored as numpy
+    columns, with symbols, scanners and timeframes dictionary-encoded as
+    integer codes. A CSR-style symbol index gives the rows of any symbol
+    without scanning the table, and joins across scanners are bincounts
+    over the symbol codes.
+
+    Columns: symbol, scanner, timeframe (codes), direction (+1 bullish,
+    -1 bearish, 0 neutral), label, strength (0-100, NaN when unknown),
+    price and bar_time (UTC nanoseconds, NaT when unknown).
+    """
+
+    SYMBOL_SUFFIX = '.NS'
+
+    SYMBOL_COLUMNS = ['Symbol', 'symbol']
+    TIMEFRAME_COLUMNS = ['Timeframe', 'timeframe']
+    LABEL_COLUMNS = ['Signal', 'Signal_Type', 'Breakout_Type', 'type']
+    PRICE_COLUMNS = ['Current_Price', 'price']
+    BAR_TIME_COLUMNS = ['Bar_Time', 'bar_time']
+    # Strength column and the factor that scales it to 0-100
+    STRENGTH_COLUMNS = [('Strength', 1.0), ('Breakout_Strength', 1.0), ('confidence', 100.0)]
+
+    # Direction of every signal label the scanners emit
+    DIRECTIONS = {
+        'bullish': 1,
+        'Bullish Crossover': 1,
+        'Bullish Momentum': 1,
+        'Bearish Crossover': -1,
+        'Bearish Momentum': -1,
+        'Upward Breakout': 1,
+        'Downward Breakout': -1,
+        'Near Upper Boundary': 0,
+        'Near Lower Boundary': 0,
+        'Fresh Breakout': 1,
+        'Retracement Entry': 1,
+        'Failed Breakout': -1,
+        'Near Strong Support': 1,
+        'Near Strong Resistance': -1,
+        'Good Risk-Reward Setup': 1,
+        'Above Resistance': 1,
+        'Below Support': -1
+    }
+
+    def __init__(self, symbols, scanners, timeframes, columns):
+        """
+        Args:
+            symbols: List of symbol names (index = symbol code)
+            scanners: List of scanner names (index = scanner code)
+            timeframes: List of timeframes (index = timeframe code)
+            columns: Dict of equal-length numpy arrays keyed by column name
+        """
+        self.symbols = symbols
+        self.symbol_index = {symbol: code for code, symbol in enumerate(symbols)}
+        self.scanners = scanners
+        self.timeframes = timeframes
+        self.columns = columns
+
+        # CSR index: rows of symbol code c are order[offsets[c]:offsets[c + 1]]
+        codes = columns['symbol']
+        self._order = np.argsort(codes, kind='stable')
+        self._offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(symbols)))))
+
+    def __len__(self):
+        return len(self.columns['symbol'])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    @classmethod
+    def normalize_symbol(cls, symbol):
+        """
+        Normalize a symbol to its Yahoo form (RELIANCE -> RELIANCE.NS)
+
+        Args:
+            symbol: Symbol as reported by a scanner
+
+        Returns:
+            Normalized symbol string
+        """
+        symbol = str(symbol).strip().upper()
+        if '.' in symbol or symbol.startswith('^'):
+            return symbol
+        return symbol + cls.SYMBOL_SUFFIX
+
+    @staticmethod
+    def _column(frame, candidates):
+        """Get the first present column from a results DataFrame"""
+        for column in candidates:
+            if column in frame.columns:
+                return frame[column]
+        return None
+
+    @staticmethod
+    def _codes(values, names, index):
+        """Dictionary-encode values, extending the name list as needed"""
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = index.get(value)
+            if code is None:
+                code = len(names)
+                index[value] = code
+                names.append(value)
+            codes[i] = code
+        return codes
+
+    @classmethod
+    def from_results(cls, results_by_scanner):
+        """
+        Build a signal table from scanner results
+
+        Args:
+            results_by_scanner: Dict with scanner name as key and results DataFrame as value
+
+        Returns:
+            SignalTable with one row per signal
+        """
+        symbols, symbol_index = [], {}
+        scanners, scanner_index = [], {}
+        timeframes, timeframe_index = [], {}
+        parts = {name: [] for name in
+                 ['symbol', 'scanner', 'timeframe', 'direction', 'label', 'strength', 'price', 'bar_time']}
+
+        for scanner, frame in results_by_scanner.items():
+            if not isinstance(frame, pd.DataFrame) or frame.empty:
+                continue
+            symbol_column = cls._column(frame, cls.SYMBOL_COLUMNS)
+            if symbol_column is None:
+                continue
+
+            n = len(frame)
+            raw_symbols = symbol_column.to_numpy()
+            normalized = {value: cls.normalize_symbol(value) for value in pd.unique(raw_symbols)}
+            parts['symbol'].append(cls._codes([normalized[v] for v in raw_symbols], symbols, symbol_index))
+            parts['scanner'].append(cls._codes([scanner] * n, scanners, scanner_index))
+
+            timeframe = cls._column(frame, cls.TIMEFRAME_COLUMNS)
+            timeframe = timeframe.astype(str).to_numpy() if timeframe is not None else ['unknown'] * n
+            parts['timeframe'].append(cls._codes(list(timeframe), timeframes, timeframe_index))
+
+            labels = cls._column(frame, cls.LABEL_COLUMNS)
+            labels = labels.astype(str).to_numpy() if labels is not None else np.full(n, '', dtype=object)
+            parts['label'].append(np.asarray(labels, dtype=object))
+            parts['direction'].append(np.array([cls.DIRECTIONS.get(label, 0) for label in labels], dtype=np.int8))
+
+            strength = np.full(n, np.nan)
+            for column, scale in cls.STRENGTH_COLUMNS:
+                if column in frame.columns:
+                    strength = pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=np.float64) * scale
+                    break
+            parts['strength'].append(np.clip(strength, 0, 100))
+
+            price = cls._column(frame, cls.PRICE_COLUMNS)
+            parts['price'].append(
+                pd.to_numeric(price, errors='coerce').to_numpy(dtype=np.float64) if price is not None
+                else np.full(n, np.nan)
+            )
+
+            bar_time = cls._column(frame, cls.BAR_TIME_COLUMNS)
+            parts['bar_time'].append(cls._bar_times(bar_time, n))
+
+        dtypes = {'symbol': np.int32, 'scanner': np.int32, 'timeframe': np.int32, 'direction': np.int8,
+                  'label': object, 'strength': np.float64, 'price': np.float64, 'bar_time': np.int64}
+        columns = {
+            name: np.concatenate(arrays) if arrays else np.empty(0, dtype=dtypes[name])
+            for name, arrays in parts.items()
+        }
+
+        return cls(symbols, scanners, timeframes, columns)
+
+    @staticmethod
+    def _bar_times(bar_time, n):
+        """Convert a bar time column to UTC nanoseconds (NaT where missing)"""
+        if bar_time is None:
+            return np.full(n, NAT, dtype=np.int64)
+        if pd.api.types.is_datetime64_any_dtype(bar_time):
+            times = pd.DatetimeIndex(bar_time)
+            times = times.tz_convert('UTC') if times.tz is not None else times
+        else:
+            # Mixed timezones or missing values arrive as objects
+            times = pd.to_datetime(bar_time.to_numpy(dtype=object), utc=True, errors='coerce')
+        return pd.DatetimeIndex(times).as_unit('ns').asi8.copy()
+
+    def symbol_rows(self, symbol):
+        """
+        Get the row positions of a symbol's signals
+
+        Args:
+            symbol: Symbol name (bare or with the .NS suffix)
+
+        Returns:
+            Array of row positions
+        """
+        code = self.symbol_index.get(self.normalize_symbol(symbol))
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self._order[self._offsets[code]:self._offsets[code + 1]]
+
+    def first_rows(self):
+        """
+        Get a boolean mask of the first row of every distinct signal
+
+        Scanner jobs that do the same work report the same signal under
+        different names (MACD 15min scans daily bars, like MACD 1d). A signal
+        is identified by its symbol, timeframe, label and bar time, so only
+        the first report of each counts.
+
+        Returns:
+            Boolean numpy array
+        """
+        if len(self) == 0:
+            return np.zeros(0, dtype=bool)
+        columns = self.columns
+        keys = pd.DataFrame({
+            'symbol': columns['symbol'],
+            'timeframe': columns['timeframe'],
+            'label': columns['label'],
+            'bar_time': columns['bar_time']
+        })
+        return ~keys.duplicated().to_numpy()
+
+    def select(self, scanner=None, timeframe=None, direction=None):
+        """
+        Get a boolean row mask for a filter
+
+        Args:
+            scanner: Optional scanner name
+            timeframe: Optional timeframe
+            direction: Optional direction (+1, -1 or 0)
+
+        Returns:
+            Boolean numpy array
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if scanner is not None:
+            mask &= self.columns['scanner'] == (self.scanners.index(scanner) if scanner in self.scanners else -1)
+        if timeframe is not None:
+            mask &= self.columns['timeframe'] == (self.timeframes.index(timeframe) if timeframe in self.timeframes else -1)
+        if direction is not None:
+            mask &= self.columns['direction'] == direction
+        return mask
+
+    def to_frame(self, rows=None):
+        """
+        Decode rows into a DataFrame
+
+        Args:
+            rows: Optional row positions or boolean mask (defaults to all rows)
+
+        Returns:
+            DataFrame with the common signal schema
+        """
+        rows = slice(None) if rows is None else rows
+        columns = self.columns
+        return pd.DataFrame({
+            'Symbol': np.array(self.symbols, dtype=object)[columns['symbol'][rows]] if self.symbols else [],
+            'Scanner': np.array(self.scanners, dtype=object)[columns['scanner'][rows]] if self.scanners else [],
+            'Timeframe': np.array(self.timeframes, dtype=object)[columns['timeframe'][rows]] if self.timeframes else [],
+            'Direction': columns['direction'][rows],
+            'Signal': columns['label'][rows],
+            'Strength': columns['strength'][rows],
+            'Price': columns['price'][rows],
+            'Bar_Time': pd.to_datetime(columns['bar_time'][rows], unit='ns', utc=True)
+        })
@@ -0,0 +1,276 @@
+import zlib
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from utils.cache_policy import TTLCache
+from utils.market_calendar import IST
+
+# Last session of every synthetic history (fixed so bars never depend on the clock)
+DEFAULT_END = datetime(2026, 6, 30)
+
+# Bars generated per symbol when no count is given (range detection needs 500)
+DEFAULT_BARS = {
+    "15m": 600,
+    "1h": 600,
+    "4h": 600,
+    "1d": 520
+}
+
+
+class SyntheticMarket:
+    """Deterministic OHLCV bars shaped like NSE downloads
+
+    Every symbol's history is a chain of regimes: trending (steady drift),
+    ranging (oscillation between a floor and a ceiling) and breakout (a
+    range that resolves in a sharp move on heavy volume). Sessions may open
+    with a gap, and isolated volume spikes are sprinkled through the day.
+    Bars are timestamped like Yahoo bars after the fetcher's processing:
+    intraday bars from the 09:15 open in IST, 4h bars on clock boundaries
+    (08:00 and 12:00) and daily bars at midnight, on weekdays (or the
+    trading days of a calendar).
+
+    The same seed, symbol, interval and bar count always give identical
+    bars, in any process and in any order of generation.
+    """
+
+    REGIMES = ('trend', 'range', 'breakout')
+
+    # Bar start offsets from midnight in minutes, per session
+    SESSION_STARTS = {
+        "15m": [9 * 60 + 15 + 15 * i for i in range(25)],
+        "1h": [9 * 60 + 15 + 60 * i for i in range(7)],
+        "4h": [8 * 60, 12 * 60],
+        "1d": [0]
+    }
+
+    # Volume share of each 1h bar in a session (U-shaped)
+    HOURLY_VOLUME_PROFILE = [0.24, 0.14, 0.11, 0.10, 0.11, 0.13, 0.17]
+
+    def __init__(self, seed=7, end=DEFAULT_END, daily_volatility=0.018, gap_probability=0.1,
+                 spike_probability=0.02, regime_weights=(0.4, 0.35, 0.25), calendar=None):
+        """
+        Args:
+            seed: Random seed shared by every symbol
+            end: Date of the last session
+            daily_volatility: Standard deviation of daily log returns
+            gap_probability: Chance a session opens with a gap
+            spike_probability: Chance of a volume spike on any bar
+            regime_weights: Relative frequency of trend, range and breakout regimes
+            calendar: Optional MarketCalendar deciding the trading days (None for
+                every weekday, so bars do not change when the holiday file does)
+        """
+        self.seed = seed
+        self.end = end
+        self.daily_volatility = daily_volatility
+        self.gap_probability = gap_probability
+        self.spike_probability = spike_probability
+        weights = np.asarray(regime_weights, dtype=float)
+        self.regime_weights = weights / weights.sum()
+        self.calendar = calendar
+        self._indexes = {}
+
+    @staticmethod
+    def symbols(count, prefix="SYN"):
+        """
+        Get synthetic symbol names
+
+        Args:
+            count: Number of symbols
+            prefix: Name prefix
+
+        Returns:
+            List like ['SYN0001.NS', 'SYN0002.NS', ...]
+        """
+        width = max(4, len(str(count)))
+        return [f"{prefix}{i:0{width}d}.NS" for i in range(1, count + 1)]
+
+    def sessions(self, count):
+        """
+        Get the last trading days up to the end date
+
+        Args:
+            count: Number of sessions
+
+        Returns:
+            List of IST midnight datetimes, oldest first
+        """
+        days = []
+        day = IST.localize(datetime(self.end.year, self.end.month, self.end.day))
+        while len(days) < count:
+            trading = self.calendar.is_trading_day(day) if self.calendar else day.weekday() < 5
+            if trading:
+                days.append(day)
+            day = IST.localize(datetime(day.year, day.month, day.day) - timedelta(days=1))
+        return days[::-1]
+
+    def bar_index(self, interval, n_bars):
+        """
+        Get the timestamps of a history
+
+        Args:
+            interval: '15m', '1h', '4h' or '1d'
+            n_bars: Number of bars
+
+        Returns:
+            IST DatetimeIndex of the last n_bars bars up to the end date
+        """
+        key = (interval, n_bars)
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        starts = self.SESSION_STARTS.get(interval)
+        if starts is None:
+            raise ValueError(f"Unsupported interval {interval}")
+        per_session = len(starts)
+        sessions = self.sessions(-(-n_bars // per_session))
+        stamps = [day + timedelta(minutes=minute) for day in sessions for minute in starts]
+        index = pd.DatetimeIndex(stamps[-n_bars:])
+        self._indexes[key] = index
+        return index
+
+    def _rng(self, symbol, interval):
+        """Random generator of one symbol and interval, independent of call order"""
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), zlib.crc32(interval.encode())])
+
+    def _regime_returns(self, rng, n_bars, sigma):
+        """
+        Build log returns as a chain of regimes
+
+        Returns:
+            Tuple of (log return array, per-bar volume multiplier array)
+        """
+        returns = np.empty(n_bars)
+        volume = np.ones(n_bars)
+        position = 0
+
+        while position < n_bars:
+            regime = self.REGIMES[rng.choice(len(self.REGIMES), p=self.regime_weights)]
+            length = min(int(rng.integers(20, 120)), n_bars - position)
+            noise = rng.normal(0.0, sigma, length)
+
+            if regime == 'trend':
+                drift = rng.choice((-1, 1)) * rng.uniform(0.05, 0.25) * sigma
+                segment = drift + noise
+            else:
+                # Oscillate inside a band: the level follows a sine, returns are its steps
+                amplitude = rng.uniform(2.0, 5.0) * sigma
+                period = rng.uniform(8, 30)
+                phase = rng.uniform(0, 2 * np.pi)
+                level = amplitude * np.sin(phase + 2 * np.pi * np.arange(length + 1) / period)
+                segment = np.diff(level) + 0.4 * noise
+
+                if regime == 'breakout' and length > 10:
+                    # The last bars leave the range on a burst of volume
+                    burst = min(int(rng.integers(3, 8)), length // 3)
+                    direction = rng.choice((-1, 1), p=(0.35, 0.65))
+                    segment[-burst:] = direction * rng.uniform(1.0, 2.5) * sigma + noise[-burst:]
+                    volume[position + length - burst:position + length] *= rng.uniform(2.5, 6.0, burst)
+
+            returns[position:position + length] = segment
+            position += length
+
+        return returns, volume
+
+    def bars(self, symbol, interval="1d", n_bars=None):
+        """
+        Generate one symbol's history
+
+        Args:
+            symbol: Symbol name (seeds the symbol's random stream)
+            interval: '15m', '1h', '4h' or '1d'
+            n_bars: Number of bars (defaults per interval)
+
+        Returns:
+            DataFrame with Open, High, Low, Close and Volume columns on an
+            IST DatetimeIndex
+        """
+        n_bars = n_bars or DEFAULT_BARS.get(interval, 250)
+        index = self.bar_index(interval, n_bars)
+        rng = self._rng(symbol, interval)
+
+        per_session = len(self.SESSION_STARTS[interval])
+        sigma = self.daily_volatility / np.sqrt(per_session)
+
+        returns, volume_factor = self._regime_returns(rng, n_bars, sigma)
+
+        # Session opens gap away from the previous close
+        session_start = np.zeros(n_bars, dtype=bool)
+        first = (per_session - n_bars % per_session) % per_session
+        session_start[(np.arange(n_bars) + first) % per_session == 0] = True
+        session_start[0] = False
+        gaps = np.where(session_start & (rng.random(n_bars) < self.gap_probability),
+                        rng.normal(0.0, 2.0 * self.daily_volatility, n_bars), 0.0)
+
+        start_price = float(np.exp(rng.uniform(np.log(20), np.log(5000))))
+        log_close = np.log(start_price) + np.cumsum(returns + gaps)
+        close = np.exp(log_close)
+
+        previous = np.concatenate([[np.log(start_price)], log_close[:-1]])
+        open_ = np.exp(previous + gaps + rng.normal(0.0, 0.1 * sigma, n_bars))
+        wick = np.abs(rng.normal(0.0, 0.5 * sigma, (2, n_bars)))
+        high = np.maximum(open_, close) * np.exp(wick[0])
+        low = np.minimum(open_, close) * np.exp(-wick[1])
+
+        # Liquidity spans small caps to index heavyweights
+        base_volume = np.exp(rng.uniform(np.log(2e4), np.log(2e7))) / per_session
+        if interval == "15m":
+            profile = np.repeat(self.HOURLY_VOLUME_PROFILE, 4)[:per_session] * 7 / 4
+        elif interval == "1h":
+            profile = np.asarray(self.HOURLY_VOLUME_PROFILE) * 7
+        elif interval == "4h":
+            profile = np.array([sum(self.HOURLY_VOLUME_PROFILE[:3]), sum(self.HOURLY_VOLUME_PROFILE[3:])]) * 2
+        else:
+            profile = np.ones(1)
+        slot = (np.arange(n_bars) + first) % per_session
+        spikes = np.where(rng.random(n_bars) < self.spike_probability, rng.uniform(3.0, 10.0, n_bars), 1.0)
+        volume = base_volume * profile[slot] * volume_factor * spikes * rng.lognormal(0.0, 0.35, n_bars)
+        volume *= 1 + 2 * np.abs(gaps) / self.daily_volatility
+
+        return pd.DataFrame({
+            'Open': open_,
+            'High': high,
+            'Low': low,
+            'Close': close,
+            'Volume': volume.astype(np.int64)
+        }, index=index)
+
+    def universe(self, symbols, interval="1d", n_bars=None):
+        """
+        Generate histories for many symbols
+
+        Args:
+            symbols: Iterable of symbol names (or a count of SYN symbols)
+            interval: '15m', '1h', '4h' or '1d'
+            n_bars: Number of bars per symbol (defaults per interval)
+
+        Returns:
+            Dict with symbol as key and DataFrame as value
+        """
+        if isinstance(symbols, int):
+            symbols = self.symbols(symbols)
+        return {symbol: self.bars(symbol, interval, n_bars) for symbol in symbols}
+
+
+def synthetic_cache(scanner_cls, data_map, timeframe, lookback_days=None, hours=24):
+    """
+    Build a market data cache holding synthetic bars under a scanner's keys
+
+    Assign it to scanner.data_fetcher.cache so a scan reads the synthetic
+    bars instead of downloading.
+
+    Args:
+        scanner_cls: Scanner class whose bars_cache_key() names the entries
+        data_map: Dict with symbol as key and DataFrame as value
+        timeframe: Timeframe the scanner fetches
+        lookback_days: Lookback the scanner fetches
+        hours: Hours until the entries go stale
+
+    Returns:
+        TTLCache sized for the universe
+    """
+    cache = TTLCache(max_entries=max(len(data_map), 1))
+    expires = datetime.now(IST) + timedelta(hours=hours)
+    for symbol, data in data_map.items():
+        cache.put(scanner_cls.bars_cache_key(symbol, timeframe, lookback_days), data, expires)
+    return cache
@@ -1,10 +1,12 @@
 import pandas as pd
 import numpy as np
+from utils.scan_profiler import SCAN_PROFILER
 
 class TechnicalIndicators:
     """Technical indicators calculations for stock analysis"""
     
     @staticmethod
+    @SCAN_PROFILER.profiled('indicators')
     def calculate_macd(price_series, fast=12, slow=26, signal=9):
         """
         Calculate MACD (Moving Average Convergence Divergence)
@@ -43,6 +45,7 @@ class TechnicalIndicators:
             return pd.DataFrame()
     
     @staticmethod
+    @SCAN_PROFILER.profiled('indicators')
     def calculate_atr(data, period=14):
         """
         Calculate Average True Range (ATR)
@@ -77,6 +80,7 @@ class TechnicalIndicators:
             return pd.Series()
     
     @staticmethod
+    @SCAN_PROFILER.profiled('indicators')
     def calculate_sma(price_series, period):
         """
         Calculate Simple Moving Average
@@ -95,6 +99,7 @@ class TechnicalIndicators:
             return pd.Series()
     
     @staticmethod
+    @SCAN_PROFILER.profiled('indicators')
     def calculate_ema(price_series, period):
         """
         Calculate Exponential Moving Average
@@ -113,6 +118,7 @@ class TechnicalIndicators:
             return pd.Series()
     
     @staticmethod
+    @SCAN_PROFILER.profiled('indicators')
     def calculate_rsi(price_series, period=14):
         """
         Calculate Relative Strength Index (RSI)
@@ -139,6 +145,7 @@ class TechnicalIndicators:
             return pd.Series()
     
     @staticmethod
+    @SCAN_PROFILER.profiled('indicators')
     def calculate_bollinger_bands(price_series, period=20, std_dev=2):
         """
         Calculate Bollinger Bands
@@ -169,6 +176,7 @@ class TechnicalIndicators:
             return pd.DataFrame()
     
     @staticmethod
+    @SCAN_PROFILER.profiled('indicators')
     def calculate_stochastic(data, k_period=14, d_period=3):
         """
         Calculate Stochastic Oscillator
@@ -198,6 +206,7 @@ class TechnicalIndicators:
             return pd.DataFrame()
     
     @staticmethod
+    @SCAN_PROFILER.profiled('indicators')
     def calculate_volume_sma(volume_series, period):
         """
         Calculate Volume Simple Moving Average
@@ -216,6 +225,7 @@ class TechnicalIndicators:
             return pd.Series()
     
     @staticmethod
+    @SCAN_PROFILER.profiled('levels')
     def detect_support_resistance(data, window=20, min_touches=2):
         """
         Detect support and resistance levels
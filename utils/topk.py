@@ -0,0 +1,202 @@
+import heapq
+import math
+import numpy as np
+import pandas as pd
+
+class TopK:
+    """Bounded heap keeping the k best positions for one sort key and direction
+
+    Rows are pushed as they arrive; the heap root is the current worst kept
+    row, so each push is O(log k). Ties keep the earlier row, and missing
+    values rank after every present value, matching a stable
+    sort_values(na_position='last').
+    """
+
+    def __init__(self, k, descending=True):
+        """
+        Args:
+            k: Number of rows kept
+            descending: True to keep the largest values, False for the smallest
+        """
+        self.k = k
+        self.descending = descending
+        self._heap = []
+        self._missing = []
+        self._ordered = None
+
+    def __len__(self):
+        return len(self._heap) + len(self._missing)
+
+    def push(self, value, position):
+        """
+        Offer a row to the heap
+
+        Args:
+            value: Numeric sort value (None or NaN for missing)
+            position: Row position in arrival order
+        """
+        if value is None or math.isnan(value):
+            if len(self._missing) < self.k:
+                self._missing.append(position)
+                self._ordered = None
+            return
+
+        entry = (value if self.descending else -value, -position)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            self._ordered = None
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+            self._ordered = None
+
+    def positions(self, n=None):
+        """
+        Get kept row positions in rank order
+
+        Args:
+            n: Optional number of positions (defaults to all kept)
+
+        Returns:
+            List of row positions, best first
+        """
+        if self._ordered is None:
+            self._ordered = [-entry[1] for entry in sorted(self._heap, reverse=True)] + self._missing
+        return self._ordered[:n] if n is not None else self._ordered[:self.k]
+
+
+class ResultRanking:
+    """Top-K orderings of one scanner's results for every sortable column
+
+    Numeric and datetime columns get a TopK heap per direction, fed as rows
+    arrive, so the UI can render the top n rows of any common sort without
+    sorting the full result set. Other columns (and requests for more than k
+    rows) fall back to a full stable sort that is computed once per column
+    and direction and then reused.
+    """
+
+    def __init__(self, k=100):
+        """
+        Args:
+            k: Rows kept per heap (the largest slice the UI requests)
+        """
+        self.k = k
+        self.rows = []
+        self.ranked_columns = None
+        self._heaps = {}
+        self._frame = None
+        self._orderings = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    @staticmethod
+    def _sort_value(value):
+        """Convert a cell to a float sort key (None when missing or not numeric)"""
+        if value is None:
+            return None
+        if isinstance(value, pd.Timestamp):
+            return None if pd.isna(value) else float(value.value)
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _is_rankable(value):
+        """Whether a column's first value makes it a heap-ranked column"""
+        return isinstance(value, (int, float, np.number, pd.Timestamp)) and not isinstance(value, bool)
+
+    def _init_heaps(self, columns):
+        """Create a heap per direction for each ranked column"""
+        self.ranked_columns = list(columns)
+        for column in self.ranked_columns:
+            self._heaps[(column, True)] = TopK(self.k, descending=True)
+            self._heaps[(column, False)] = TopK(self.k, descending=False)
+
+    def add(self, row):
+        """
+        Add one result row and update every heap
+
+        Args:
+            row: Result row dict
+        """
+        if self.ranked_columns is None:
+            self._init_heaps([column for column, value in row.items() if self._is_rankable(value)])
+
+        position = len(self.rows)
+        self.rows.append(row)
+        for column in self.ranked_columns:
+            value = self._sort_value(row.get(column))
+            self._heaps[(column, True)].push(value, position)
+            self._heaps[(column, False)].push(value, position)
+
+        self._frame = None
+        self._orderings = {}
+
+    def extend(self, rows):
+        """Add several result rows"""
+        for row in rows:
+            self.add(row)
+
+    @classmethod
+    def from_frame(cls, results, k=100):
+        """
+        Build a ranking from a results DataFrame
+
+        Args:
+            results: Scanner results DataFrame
+            k: Rows kept per heap
+
+        Returns:
+            ResultRanking over the DataFrame's rows
+        """
+        ranking = cls(k)
+        if isinstance(results, pd.DataFrame) and not results.empty:
+            ranking._init_heaps([
+                column for column, dtype in results.dtypes.items()
+                if (pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype))
+                or pd.api.types.is_datetime64_any_dtype(dtype)
+            ])
+            ranking.extend(results.to_dict('records'))
+            ranking._frame = results.reset_index(drop=True)
+        return ranking
+
+    def frame(self):
+        """All rows as a DataFrame (built once until more rows arrive)"""
+        if self._frame is None:
+            self._frame = pd.DataFrame(self.rows)
+        return self._frame
+
+    def top(self, column, ascending=False, n=50):
+        """
+        Get the top n rows for a sort
+
+        Args:
+            column: Sort column
+            ascending: Sort direction
+            n: Number of rows
+
+        Returns:
+            DataFrame equal to a stable results.sort_values(column).head(n)
+        """
+        heap = self._heaps.get((column, not ascending))
+        if heap is not None and n <= self.k:
+            positions = heap.positions(n)
+        else:
+            positions = self._ordering(column, ascending)[:n]
+
+        return self.frame().iloc[positions]
+
+    def _ordering(self, column, ascending):
+        """Full stable ordering for a column, computed once"""
+        key = (column, ascending)
+        if key not in self._orderings:
+            frame = self.frame()
+            order = np.arange(len(frame))
+            if column in frame.columns:
+                ranked = frame[column].reset_index(drop=True).sort_values(
+                    ascending=ascending, kind='stable', na_position='last'
+                )
+                order = ranked.index.to_numpy()
+            self._orderings[key] = order
+        return self._orderings[key]
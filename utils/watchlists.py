@@ -0,0 +1,431 @@
+import ipaddress
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import numpy as np
+from utils.alert_dispatcher import TelegramSink, WebhookSink
+from utils.signal_diff import SignalDiffer
+from utils.signal_table import SignalTable
+
+# Where watchlists are saved
+WATCHLIST_PATH = "history/watchlists.json"
+
+# Alert channels a watchlist can subscribe to
+ALERT_CHANNELS = ('webhook', 'telegram')
+
+# Host names never accepted as webhook targets (this machine and local networks)
+PRIVATE_HOST_SUFFIXES = ('localhost', '.local', '.internal', '.lan', '.home.arpa')
+
+
+def validate_alert_target(channel, target, allowed_hosts=None):
+    """
+    Check the destination of a watchlist alert subscription
+
+    Webhooks must be http(s) URLs of a public host: no credentials, no
+    loopback, private or link-local addresses and no local host names, so
+    a watchlist cannot make the server POST into its own network. When
+    WATCHLIST_WEBHOOK_HOSTS (comma-separated) is set, only those hosts and
+    their subdomains are accepted. Telegram targets must be chat ids or
+    @channel names.
+
+    Args:
+        channel: None, 'webhook' or 'telegram'
+        target: Webhook URL or Telegram chat id
+        allowed_hosts: Optional iterable of host names (defaults to
+            WATCHLIST_WEBHOOK_HOSTS)
+
+    Returns:
+        Stripped target (None without a channel)
+
+    Raises:
+        ValueError: For an unknown channel or an unacceptable target
+    """
+    if channel is None:
+        return None
+    if channel not in ALERT_CHANNELS:
+        raise ValueError(f"Unknown alert channel {channel}")
+    target = str(target or '').strip()
+    if not target:
+        raise ValueError("Alerts need a webhook URL or Telegram chat id")
+
+    if channel == 'telegram':
+        if not re.fullmatch(r'-?\d{1,20}|@[A-Za-z0-9_]{5,32}', target):
+            raise ValueError("Telegram chat id must be a number or an @channel name")
+        return target
+
+    parts = urlsplit(target)
+    try:
+        host = (parts.hostname or '').rstrip('.').lower()
+        parts.port
+    except ValueError:
+        raise ValueError("Webhook URL has an invalid port")
+    if parts.scheme not in ('http', 'https') or not host:
+        raise ValueError("Webhook URL must start with http:// or https:// and name a host")
+    if parts.username is not None or parts.password is not None:
+        raise ValueError("Webhook URL must not contain credentials")
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        address = None
+    if address is not None and not address.is_global:
+        raise ValueError(f"Webhook address {host} is not a public address")
+    # Public names end in an alphabetic top-level domain; anything else may be a
+    # shorthand address the resolver expands (e.g. 127.1 or 0x7f.1)
+    if address is None and (host.endswith(PRIVATE_HOST_SUFFIXES)
+                            or not re.fullmatch(r'[a-z][a-z0-9-]*', host.rsplit('.', 1)[-1])
+                            or '.' not in host):
+        raise ValueError(f"Webhook host {host} is not a public host")
+
+    if allowed_hosts is None:
+        allowed_hosts = [name for name in os.environ.get('WATCHLIST_WEBHOOK_HOSTS', '').split(',') if name.strip()]
+    allowed_hosts = [name.strip().lower() for name in allowed_hosts]
+    if allowed_hosts and not any(host == name or host.endswith('.' + name) for name in allowed_hosts):
+        raise ValueError(f"Webhook host {host} is not in WATCHLIST_WEBHOOK_HOSTS")
+    return target
+
+
+class Watchlist:
+    """A user's named symbol list, optionally limited to some scanners
+
+    Args:
+        user: Owner name
+        name: Watchlist name (unique per user)
+        symbols: Iterable of symbols (bare or with the .NS suffix)
+        scanners: Optional iterable of scanner names (empty for all scanners)
+        alert_channel: Optional 'webhook' or 'telegram'
+        alert_target: Webhook URL or Telegram chat id for the channel
+    """
+
+    def __init__(self, user, name, symbols, scanners=(), alert_channel=None, alert_target=None):
+        self.user = user
+        self.name = name
+        self.symbols = sorted({SignalTable.normalize_symbol(symbol) for symbol in symbols if str(symbol).strip()})
+        self.scanners = sorted(set(scanners or ()))
+        self.alert_channel = alert_channel if alert_target else None
+        self.alert_target = alert_target if alert_channel else None
+        if self.alert_channel is not None and self.alert_channel not in ALERT_CHANNELS:
+            raise ValueError(f"Unknown alert channel {alert_channel}")
+
+    @property
+    def key(self):
+        """(user, name) identity"""
+        return (self.user, self.name)
+
+    @property
+    def destination(self):
+        """Alert sink name of the subscription, or None"""
+        if self.alert_channel is None:
+            return None
+        return f"{self.alert_channel}:{self.alert_target}"
+
+    def to_dict(self):
+        """JSON form without the user and name"""
+        return {
+            'symbols': self.symbols,
+            'scanners': self.scanners,
+            'alert_channel': self.alert_channel,
+            'alert_target': self.alert_target
+        }
+
+    @classmethod
+    def from_dict(cls, user, name, data):
+        """Build a watchlist from its JSON form"""
+        return cls(user, name, data.get('symbols', []), data.get('scanners', []),
+                   data.get('alert_channel'), data.get('alert_target'))
+
+
+class WatchlistStore:
+    """Per-user watchlists saved as one JSON file
+
+    Watchlists never trigger fetches or scans of their own: they are
+    evaluated as filters over the shared full-universe snapshot through
+    the signal table's per-symbol index, so the cost of a watchlist is
+    proportional to its symbol count, not to the universe. A revision
+    counter changes on every edit so listeners can rebuild their indexes.
+
+    The app and the API server each hold a store over the same file; every
+    read reloads the file when its modification time has changed, so an
+    edit saved by one process shows in the other.
+    """
+
+    def __init__(self, path=WATCHLIST_PATH):
+        """
+        Args:
+            path: JSON file holding every user's watchlists (None to keep them in memory)
+        """
+        self.path = path
+        self.revision = 0
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._watchlists = self._load()
+
+    @staticmethod
+    def _valid_name(value, label):
+        """Strip a user or watchlist name, rejecting empty and overlong values"""
+        value = re.sub(r'\s+', ' ', str(value or '')).strip()
+        if not value or len(value) > 64:
+            raise ValueError(f"{label} must be 1-64 characters")
+        return value
+
+    def _file_stamp(self):
+        """Modification time and size of the watchlist file (None when missing)"""
+        try:
+            stat = os.stat(self.path)
+        except (OSError, TypeError):
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _sync(self):
+        """Reload the file when another process changed it (caller holds the lock)"""
+        if not self.path:
+            return
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            self._watchlists = self._load()
+            self.revision += 1
+
+    def refresh(self):
+        """Reload the watchlist file if it changed since the last read or write"""
+        with self._lock:
+            self._sync()
+
+    def _load(self):
+        """Read the watchlist file"""
+        watchlists = OrderedDict()
+        self._stamp = self._file_stamp() if self.path else None
+        if not self.path or not os.path.exists(self.path):
+            return watchlists
+        try:
+            with open(self.path, encoding='utf-8') as handle:
+                data = json.load(handle)
+            for user, lists in data.items():
+                for name, entry in lists.items():
+                    watchlists[(user, name)] = Watchlist.from_dict(user, name, entry)
+        except (OSError, ValueError) as e:
+            print(f"Error loading watchlists from {self.path}: {e}")
+        return watchlists
+
+    def _save(self):
+        """Write every watchlist atomically (caller holds the lock)"""
+        self.revision += 1
+        if not self.path:
+            return
+        data = {}
+        for (user, name), watchlist in self._watchlists.items():
+            data.setdefault(user, {})[name] = watchlist.to_dict()
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temporary = f"{self.path}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as handle:
+                json.dump(data, handle, indent=2)
+            os.replace(temporary, self.path)
+            self._stamp = self._file_stamp()
+        except OSError as e:
+            print(f"Error saving watchlists to {self.path}: {e}")
+
+    def save(self, user, name, symbols, scanners=(), alert_channel=None, alert_target=None):
+        """
+        Create or replace a watchlist
+
+        Args:
+            user: Owner name
+            name: Watchlist name
+            symbols: Iterable of symbols
+            scanners: Optional iterable of scanner names (empty for all)
+            alert_channel: Optional 'webhook' or 'telegram'
+            alert_target: Webhook URL or Telegram chat id
+
+        Returns:
+            Saved Watchlist
+
+        Raises:
+            ValueError: For empty names, no symbols, an unknown channel or an
+                unacceptable alert target (see validate_alert_target)
+        """
+        alert_target = validate_alert_target(alert_channel, alert_target)
+        watchlist = Watchlist(self._valid_name(user, "User"), self._valid_name(name, "Watchlist name"),
+                              symbols, scanners, alert_channel, alert_target)
+        if not watchlist.symbols:
+            raise ValueError("A watchlist needs at least one symbol")
+        with self._lock:
+            self._sync()
+            self._watchlists[watchlist.key] = watchlist
+            self._save()
+        return watchlist
+
+    def delete(self, user, name):
+        """Remove a watchlist; returns whether it existed"""
+        with self._lock:
+            self._sync()
+            if self._watchlists.pop((user, name), None) is None:
+                return False
+            self._save()
+            return True
+
+    def get(self, user, name):
+        """Get one watchlist, or None"""
+        with self._lock:
+            self._sync()
+            return self._watchlists.get((user, name))
+
+    def user_watchlists(self, user):
+        """Watchlists of a user, by name"""
+        with self._lock:
+            self._sync()
+            return [watchlist for (owner, _), watchlist in self._watchlists.items() if owner == user]
+
+    def all(self):
+        """Every watchlist"""
+        with self._lock:
+            self._sync()
+            return list(self._watchlists.values())
+
+    @staticmethod
+    def rows(table, watchlist):
+        """
+        Get the signal table rows of a watchlist
+
+        Args:
+            table: Snapshot SignalTable
+            watchlist: Watchlist
+
+        Returns:
+            Sorted array of row positions
+        """
+        parts = [table.symbol_rows(symbol) for symbol in watchlist.symbols]
+        rows = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        if watchlist.scanners and len(rows):
+            codes = [code for code, scanner in enumerate(table.scanners) if scanner in watchlist.scanners]
+            rows = rows[np.isin(table.columns['scanner'][rows], codes)]
+        return rows
+
+    def signals(self, snapshot, watchlist):
+        """
+        Get a watchlist's signals from the shared snapshot
+
+        Args:
+            snapshot: ScanSnapshot
+            watchlist: Watchlist
+
+        Returns:
+            DataFrame with the signal table schema
+        """
+        return snapshot.signal_table.to_frame(self.rows(snapshot.signal_table, watchlist))
+
+    def signal_counts(self, snapshot, user=None):
+        """
+        Count signals per watchlist
+
+        Args:
+            snapshot: ScanSnapshot
+            user: Optional owner to restrict to
+
+        Returns:
+            Dict with watchlist name as key and signal count as value
+        """
+        watchlists = self.user_watchlists(user) if user is not None else self.all()
+        return {watchlist.name: len(self.rows(snapshot.signal_table, watchlist)) for watchlist in watchlists}
+
+
+class WatchlistAlerts:
+    """Route each snapshot's new signals to the watchlists subscribed to them
+
+    A symbol -> subscriptions index is rebuilt only when the store's
+    revision changes, so per snapshot the cost is one dict lookup per new
+    signal. Subscriptions sharing a destination share one sink, and the
+    dispatcher's per-sink deduplication sends a signal once per destination
+    even when several of its watchlists hold the symbol.
+    """
+
+    def __init__(self, store, dispatcher, telegram_token=None):
+        """
+        Args:
+            store: WatchlistStore
+            dispatcher: AlertDispatcher the subscription sinks are added to
+            telegram_token: Bot token for Telegram subscriptions (defaults to
+                ALERT_TELEGRAM_TOKEN)
+        """
+        self.store = store
+        self.dispatcher = dispatcher
+        self.telegram_token = telegram_token or os.environ.get('ALERT_TELEGRAM_TOKEN')
+        self.telegram_api = os.environ.get('ALERT_TELEGRAM_API', "https://api.telegram.org")
+        self._revision = None
+        self._by_symbol = {}
+        self._destinations = set()
+        self._lock = threading.Lock()
+
+    def _sink(self, watchlist):
+        """Build the sink of a subscription (None when it cannot be delivered)"""
+        try:
+            validate_alert_target(watchlist.alert_channel, watchlist.alert_target)
+        except ValueError as e:
+            # The file may predate validation or be edited by hand
+            print(f"Error in alerts of watchlist {watchlist.user}/{watchlist.name}: {e}")
+            return None
+        if watchlist.alert_channel == 'webhook':
+            sink = WebhookSink(watchlist.alert_target)
+        elif watchlist.alert_channel == 'telegram' and self.telegram_token:
+            sink = TelegramSink(self.telegram_token, watchlist.alert_target, api_base=self.telegram_api)
+        else:
+            return None
+        sink.name = watchlist.destination
+        return sink
+
+    def _refresh(self):
+        """Rebuild the subscription index and sinks after a store edit"""
+        self.store.refresh()
+        if self._revision == self.store.revision:
+            return
+        by_symbol = {}
+        destinations = set()
+        for watchlist in self.store.all():
+            sink = self._sink(watchlist)
+            if sink is None:
+                continue
+            self.dispatcher.add_sink(sink)
+            destinations.add(sink.name)
+            for symbol in watchlist.symbols:
+                by_symbol.setdefault(symbol, []).append((frozenset(watchlist.scanners), sink.name))
+
+        for name in self._destinations - destinations:
+            self.dispatcher.remove_sink(name)
+        self._by_symbol = by_symbol
+        self._destinations = destinations
+        self._revision = self.store.revision
+
+    def append(self, snapshot):
+        """
+        Queue a snapshot's new signals for subscribed watchlists (ScanService listener)
+
+        Args:
+            snapshot: ScanSnapshot
+        """
+        if snapshot.version <= 0:
+            return
+        with self._lock:
+            self._refresh()
+            by_symbol = self._by_symbol
+
+        routed = {}
+        for event in snapshot.events:
+            if event['event'] != SignalDiffer.INSERT:
+                continue
+            subscribers = by_symbol.get(SignalTable.normalize_symbol(event['symbol']))
+            if not subscribers:
+                continue
+            alert = None
+            for scanners, destination in subscribers:
+                if not scanners or event['scanner'] in scanners:
+                    alert = alert or self.dispatcher.alert_from_event(event)
+                    routed.setdefault(destination, []).append(alert)
+
+        for destination, alerts in routed.items():
+            self.dispatcher.enqueue(alerts, sinks=(destination,))
+
+    def subscriptions(self):
+        """Number of destinations receiving watchlist alerts"""
+        with self._lock:
+            return len(self._destinations)